@@ -0,0 +1,128 @@
+# capacity_bound.py
+import math
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from time_calculator import CalculadorDeTiempos
+
+
+@dataclass
+class CotaInferior:
+    """
+    Resultado del estimador.
+
+    flexibles: mínimo de trabajadores flexibles que puede cumplir los plazos
+        (None si ningún número de flexibles puede cumplirlos).
+    motivo: explicación legible de la restricción que fija la cota.
+    """
+    flexibles: Optional[int]
+    motivo: str
+
+    @property
+    def inviable(self) -> bool:
+        return self.flexibles is None
+
+
+class EstimadorCotaInferior:
+    """
+    Cota inferior analítica del número de trabajadores flexibles, sin simular.
+
+    Usa las tareas de Optimizer._prepare_and_prioritize_tasks y tres datos baratos:
+      - Capacidad: el trabajo de las tareas con nivel >= s de los lotes con plazo
+        <= d sólo lo pueden hacer trabajadores de nivel >= s, y cada uno aporta como
+        mucho los minutos laborables entre el inicio y el plazo (CalculadorDeTiempos).
+      - Camino crítico: una unidad recorre la cadena de 'previous_task_index' en
+        orden, así que la suma de duraciones por unidad de la cadena no puede
+        superar los minutos laborables hasta el plazo, tenga los trabajadores que tenga.
+      - Niveles: si una tarea exige un nivel que no tiene nadie ni los flexibles.
+
+    Sólo se descartan escenarios cuyo incumplimiento es seguro: la cota nunca es
+    mayor que el mínimo real, así que la búsqueda puede empezar en ella.
+    """
+
+    def __init__(self, tasks: List[Dict], units: int, time_calculator: CalculadorDeTiempos,
+                 start_date: datetime):
+        self.tasks = tasks
+        self.units = units
+        self.calculador = time_calculator
+        self.start_date = start_date
+        self._capacidad_por_plazo: Dict[date, float] = {}
+
+    def estimar(self, real_workers: List[Tuple[str, int]], skill_flexible: int) -> CotaInferior:
+        """
+        Args:
+            real_workers: (nombre, nivel) de la plantilla real.
+            skill_flexible: nivel de los trabajadores flexibles que añade el optimizador.
+        """
+        con_plazo = [task for task in self.tasks if self._plazo(task) is not None]
+        if not con_plazo:
+            return CotaInferior(0, "sin plazos")
+
+        # 1. Camino crítico: independiente del número de trabajadores
+        for indice, camino in self._caminos_criticos().items():
+            plazo = self._plazo(self.tasks[indice])
+            if plazo is not None and camino > self._capacidad(plazo):
+                return CotaInferior(None, f"el camino crítico hasta '{self.tasks[indice].get('name')}' "
+                                          f"({camino:.0f} min) no cabe antes del {plazo:%d/%m/%Y}")
+
+        # 2. Capacidad por plazo y nivel (condición de Hall sobre los niveles)
+        flexibles, motivo = 0, "capacidad suficiente con la plantilla actual"
+        plazos = sorted({self._plazo(task) for task in con_plazo})
+        niveles = sorted({task.get('required_skill_level', 1) for task in con_plazo})
+        for plazo in plazos:
+            capacidad = self._capacidad(plazo)
+            for nivel in niveles:
+                trabajo = sum(self._duracion(task) * self.units for task in con_plazo
+                              if self._plazo(task) <= plazo and task.get('required_skill_level', 1) >= nivel)
+                if trabajo <= 0:
+                    continue
+                reales = sum(1 for _, skill in real_workers if skill >= nivel)
+                if capacidad <= 0 or (nivel > skill_flexible and trabajo > reales * capacidad):
+                    return CotaInferior(None, f"{trabajo:.0f} min de nivel >= {nivel} no caben antes del "
+                                              f"{plazo:%d/%m/%Y} con los trabajadores disponibles")
+                necesarios = math.ceil(trabajo / capacidad - 1e-9) - reales
+                if necesarios > flexibles:
+                    flexibles = necesarios
+                    motivo = (f"{trabajo:.0f} min de nivel >= {nivel} antes del {plazo:%d/%m/%Y} "
+                              f"({capacidad:.0f} min por trabajador)")
+        return CotaInferior(flexibles, motivo)
+
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _duracion(task: Dict) -> float:
+        # La misma clave que lee LineaTemporalTarea
+        return float(task.get('duration', 0.0) or 0.0)
+
+    @staticmethod
+    def _plazo(task: Dict) -> Optional[date]:
+        plazo = task.get('deadline')
+        if isinstance(plazo, datetime):
+            return plazo.date()
+        return plazo if isinstance(plazo, date) else None
+
+    def _capacidad(self, plazo: date) -> float:
+        """Minutos laborables de un trabajador entre el inicio y el fin del día del plazo."""
+        if plazo not in self._capacidad_por_plazo:
+            limite = datetime.combine(plazo + timedelta(days=1), datetime.min.time())
+            self._capacidad_por_plazo[plazo] = self.calculador.calculate_work_minutes_between(self.start_date, limite)
+        return self._capacidad_por_plazo[plazo]
+
+    def _caminos_criticos(self) -> Dict[int, float]:
+        """Índice de tarea -> suma de duraciones por unidad desde el inicio de su cadena."""
+        caminos: Dict[int, float] = {}
+        for inicio in range(len(self.tasks)):
+            # Subir por la cadena hasta una tarea ya calculada, sin predecesora o repetida
+            cadena, indice = [], inicio
+            while indice not in caminos and indice not in cadena:
+                cadena.append(indice)
+                previo = self.tasks[indice].get('previous_task_index')
+                if not (isinstance(previo, int) and 0 <= previo < len(self.tasks)):
+                    break
+                indice = previo
+            base = caminos.get(indice, 0.0) if indice not in cadena else 0.0
+            for indice in reversed(cadena):
+                base += self._duracion(self.tasks[indice])
+                caminos[indice] = base
+        return caminos
@@ -13,6 +13,7 @@ import shutil
 import sqlite3
 import sys
 import math
+import weakref
 from dataclasses import asdict
 
 # --- FIX PARA macOS: EVITAR BUG DE QT CON ESPACIOS EN PATH ---
@@ -106,7 +107,10 @@ from report_strategy import (
     ReporteHistorialIteracion, ReportePilaFabricacionExcelMejorado,
 )
 from schedule_config import ScheduleConfig
-from simulation_engine import SimulationWorker, Optimizer
+from simulation_engine import Optimizer
+from simulation_cache import CacheSimulaciones
+from incremental_simulation import SimulacionIncremental
+from controllers.simulation_worker import SimulationWorker, simulation_finished_callback
 from visualization_generator import VisualizationGenerator
 
 # Componentes de la Interfaz de Usuario (UI)
@@ -167,6 +171,9 @@ class AppController(QObject):
         self.schedule_manager = schedule_manager
         self.logger = logging.getLogger("EvolucionTiemposApp")
         self.logger.info("Inicializando AppController...")
+        self.simulation_cache = CacheSimulaciones()
+        # Una re-simulación incremental por editor visual abierto
+        self._incremental_simulations = weakref.WeakKeyDictionary()
 
         # --- INICIO DE CAMBIOS ---
         # 1. Crear UNA SOLA instancia de CameraManager
@@ -1893,7 +1900,10 @@ class AppController(QObject):
                 time_calculator=time_calculator,
                 start_date=datetime.now(),
                 # NUEVO: Pasar referencia al diálogo para visualización (Fase 8.5)
-                visual_dialog_reference=flow_dialog
+                visual_dialog_reference=flow_dialog,
+                al_terminar=simulation_finished_callback(flow_dialog),
+                cache=self.simulation_cache,
+                incremental=self._incremental_simulations.setdefault(flow_dialog, SimulacionIncremental())
             )
             self.logger.info("AdaptadorScheduler creado con referencia al diálogo visual.")  # Log añadido
 
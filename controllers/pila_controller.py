@@ -1,13 +1,21 @@
 # -*- coding: utf-8 -*-
 import logging
+import os
+import weakref
 from datetime import datetime, time
 from PyQt6.QtCore import QObject, pyqtSignal, Qt, QThread, QTimer
 from PyQt6.QtWidgets import QDialog, QMessageBox, QListWidgetItem, QApplication
 
 # Core Engines
-from simulation_engine import Optimizer, SimulationWorker
+from simulation_engine import Optimizer
 from simulation_adapter import AdaptadorScheduler
+from event_engine import simulacion_inviable
+from capacity_bound import EstimadorCotaInferior
 from time_calculator import CalculadorDeTiempos
+from optimizer_pool import EvaluadorCandidatos
+from simulation_cache import CacheSimulaciones
+from incremental_simulation import SimulacionIncremental
+from controllers.simulation_worker import SimulationWorker, simulation_finished_callback
 import constants
 
 # UI
@@ -29,99 +37,274 @@ from ui.widgets import (
 class OptimizerWorker(QObject):
     """Worker para ejecutar el Optimizer en un hilo separado."""
     finished = pyqtSignal(object, object, int)  # results, audit, workers_needed
-
-    def __init__(self, optimizer, start_date, end_date, units):
+    # Se emite al terminar cada intento: flexible_workers, deadlines_met, results, audit
+    candidate_finished = pyqtSignal(int, bool, object, object)
+
+    # Máximo de trabajadores flexibles que se prueban antes de declarar la planificación inviable
+    MAX_FLEXIBLE_WORKERS = 20
+    # Nivel con el que se añaden los trabajadores flexibles
+    FLEXIBLE_WORKER_SKILL = 3
+    # Arrancar el pool de procesos cuesta alrededor de un segundo: solo compensa cuando cada
+    # simulación es larga. Se mide en tareas x unidades (~0.15 ms de simulación cada una).
+    MIN_PARALLEL_TASK_UNITS = 2000
+
+    def __init__(self, optimizer, start_date, end_date, units, max_processes=1):
         super().__init__()
         self.optimizer = optimizer
         self.start_date = start_date
         self.end_date = end_date
         self.units = units
+        # Con más de un proceso y un flujo grande los candidatos se simulan en paralelo (ver _run_parallel)
+        self.max_processes = max_processes or 1
         self.logger = logging.getLogger("EvolucionTiemposApp")
 
     def run(self):
-        """Ejecuta el bucle de optimización usando el NUEVO AdaptadorScheduler."""
+        """
+        Ejecuta la búsqueda (_search) y emite siempre 'finished', también si falla:
+        sin esa señal el diálogo de progreso no se cerraría.
+        """
+        try:
+            self._search()
+        except Exception as e:
+            self.logger.exception(f"Error durante la optimización: {e}")
+            self.finished.emit([], self.optimizer.audit_log, self.MAX_FLEXIBLE_WORKERS + 1)
+
+    def _search(self):
+        """
+        Busca el mínimo de trabajadores flexibles que cumple los plazos usando el
+        NUEVO AdaptadorScheduler.
+
+        Cumplir los plazos es monótono en el número de trabajadores extra, así que en
+        lugar de probar 0, 1, 2, ... se hace una búsqueda exponencial (0, 1, 2, 4, 8...
+        hasta el máximo) y luego una bisección entre el último fallo y el primer
+        éxito. El resultado es el mismo mínimo con O(log n) simulaciones.
+
+        La búsqueda empieza en una cota inferior analítica (EstimadorCotaInferior):
+        los números por debajo no pueden cumplir los plazos y no se simulan.
+        """
         self.logger.info("Iniciando ciclo de optimización con el motor de eventos unificado.")
-        flexible_workers_needed = 0
-        final_results = None
 
+        # Datos que no cambian entre intentos: se cargan una sola vez
         prioritized_tasks_template = self.optimizer._prepare_and_prioritize_tasks()
+        real_workers_data = self.optimizer.model.worker_repo.get_all_workers(include_inactive=False)
+        real_workers = [(data.nombre_completo, data.tipo_trabajador) for data in real_workers_data]
+        all_machines_data = self.optimizer.model.machine_repo.get_all_machines()
+        machines_dict = {m.id: m.nombre for m in all_machines_data}
+        # Con los plazos, el motor abandona un intento en cuanto un lote ya no puede cumplirlos
+        self.deadlines = self.optimizer._deadlines_by_instance()
+
+        # El calculador conserva su calendario compilado entre intentos
+        time_calculator = CalculadorDeTiempos(self.optimizer.schedule_config)
+        lower_bound = self._lower_bound(prioritized_tasks_template, real_workers, time_calculator)
+
+        if (self.max_processes > 1 and not getattr(self.optimizer, 'visual_dialog_reference', None)
+                and len(prioritized_tasks_template) * self.units >= self.MIN_PARALLEL_TASK_UNITS):
+            self._run_parallel(prioritized_tasks_template, real_workers, machines_dict, lower_bound)
+            return
 
-        while True:
-            self.logger.info(f"--- INICIANDO CICLO CON {flexible_workers_needed} TRABAJADOR(ES) FLEXIBLE(S) ---")
-
-            real_workers_data = self.optimizer.model.worker_repo.get_all_workers(include_inactive=False)
-            real_workers = [(data.nombre_completo, data.tipo_trabajador) for data in real_workers_data]
-            flexible_workers = [(f"Trabajador Flexible {i + 1}", 3) for i in range(flexible_workers_needed)]
-            all_workers_for_sim = real_workers + flexible_workers
+        def simular(flexible_workers_needed):
+            return self._run_attempt(flexible_workers_needed, prioritized_tasks_template,
+                                     real_workers, machines_dict, time_calculator)
 
-            sorted_workers = sorted(all_workers_for_sim, key=lambda w: w[1], reverse=True)
+        # --- 1. Búsqueda exponencial: primer número de flexibles que cumple ---
+        ultimo_fallo = lower_bound - 1
+        final_results = None
+        for candidato in self._galloping_points(lower_bound):
+            results, all_deadlines_met = simular(candidato)
+            if all_deadlines_met:
+                final_results = results
+                break
+            ultimo_fallo = candidato
+        else:
+            self.logger.critical(
+                f"Límite de {self.MAX_FLEXIBLE_WORKERS} trabajadores flexibles alcanzado. Planificación inviable.")
+            self.finished.emit(results, self.optimizer.audit_log, self.MAX_FLEXIBLE_WORKERS + 1)
+            return
 
-            production_flow = []
-            for task_info in prioritized_tasks_template:
-                start_date_for_task = None
-                if task_info.get('previous_task_index') is None:
-                    start_date_for_task = self.start_date
+        # --- 2. Bisección en (ultimo_fallo, candidato] ---
+        flexible_workers_needed = candidato
+        while flexible_workers_needed - ultimo_fallo > 1:
+            medio = (ultimo_fallo + flexible_workers_needed) // 2
+            results, all_deadlines_met = simular(medio)
+            if all_deadlines_met:
+                flexible_workers_needed, final_results = medio, results
+            else:
+                ultimo_fallo = medio
 
-                required_skill = task_info.get('required_skill_level', 1)
-                assigned_worker = None
+        self.logger.info(f"ÉXITO: Plazos cumplidos con {flexible_workers_needed} trabajadores flexibles.")
+        self.finished.emit(final_results, self.optimizer.audit_log, flexible_workers_needed)
 
-                for worker_name, worker_skill in sorted_workers:
-                    if worker_skill >= required_skill:
-                        assigned_worker = worker_name
+    def _run_parallel(self, prioritized_tasks_template, real_workers, machines_dict, lower_bound=0):
+        """
+        Misma búsqueda que _search(), pero evaluando varios números de flexibles a la vez
+        en procesos separados. Primero se lanzan los puntos de la búsqueda
+        exponencial y después, por rondas, hasta max_processes puntos repartidos
+        entre el último fallo y el primer éxito. Cada candidato se comunica a la UI
+        (candidate_finished) en cuanto termina. Un candidato cuya simulación falla
+        cuenta como que no cumple los plazos y la búsqueda sigue con los demás.
+        """
+        results_by_count = {}
+        failed = set()
+        success = None
+
+        def on_error(n, error):
+            self.logger.error(f"Falló la simulación con {n} trabajador(es) flexible(s): {error}")
+            running.discard(n)
+            failed.add(n)
+            self.candidate_finished.emit(n, False, [], [])
+
+        def last_failure():
+            return max((n for n in failed if success is None or n < success), default=lower_bound - 1)
+
+        with EvaluadorCandidatos(self.max_processes) as evaluator:
+            pending = self._galloping_points(lower_bound)[:self.max_processes]
+            while pending:
+                self.logger.info(f"--- EVALUANDO EN PARALELO {pending} TRABAJADOR(ES) FLEXIBLE(S) ---")
+                candidates = {
+                    n: self._build_attempt(n, prioritized_tasks_template, real_workers) + (machines_dict,)
+                    for n in pending
+                }
+                running = set(pending)
+                for n, results, audit in evaluator.evaluar(candidates, self.optimizer.schedule_config,
+                                                            self.start_date, plazos=self.deadlines,
+                                                            al_fallar=on_error):
+                    running.discard(n)
+                    self.optimizer.audit_log.extend(audit)
+                    deadlines_met = self._deadlines_met(results, audit)
+                    results_by_count[n] = results
+                    if deadlines_met:
+                        success = n if success is None else min(success, n)
+                    else:
+                        failed.add(n)
+                    self.candidate_finished.emit(n, bool(deadlines_met), results, audit)
+                    # La ronda está decidida cuando no queda ningún candidato por debajo del éxito
+                    if success is not None and not any(m < success for m in running):
                         break
 
-                workers_list = []
-                if assigned_worker:
-                    workers_list = [{'name': assigned_worker}]
+                if success is None:
+                    pending = [n for n in self._galloping_points(lower_bound)
+                               if n > last_failure()][:self.max_processes]
                 else:
-                    self.logger.warning(
-                        f"No se encontró trabajador con habilidad >= {required_skill} "
-                        f"para '{task_info.get('name', 'Tarea')}'"
-                    )
-
-                step = {
-                    "task": task_info,
-                    "workers": workers_list,
-                    "machine_id": task_info.get('machine_id'),
-                    "trigger_units": self.units,
-                    "start_date": start_date_for_task,
-                    "previous_task_index": task_info.get('previous_task_index')
-                }
-                production_flow.append(step)
-
-            all_machines_data = self.optimizer.model.machine_repo.get_all_machines()
-            machines_dict = {m.id: m.nombre for m in all_machines_data}
-            time_calculator = CalculadorDeTiempos(self.optimizer.schedule_config)
-
-            dialog_ref = getattr(self.optimizer, 'visual_dialog_reference', None)
-
-            scheduler = AdaptadorScheduler(
-                production_flow=production_flow,
-                all_workers_with_skills=all_workers_for_sim,
-                available_machines=machines_dict,
-                schedule_config=self.optimizer.schedule_config,
-                time_calculator=time_calculator,
-                start_date=self.start_date,
-                visual_dialog_reference=dialog_ref
-            )
+                    pending = self._points_between(last_failure(), success, self.max_processes)
 
-            results, audit = scheduler.run_simulation()
-            self.optimizer.audit_log.extend(audit)
+        if success is None:
+            self.logger.critical(
+                f"Límite de {self.MAX_FLEXIBLE_WORKERS} trabajadores flexibles alcanzado. Planificación inviable.")
+            self.finished.emit(results_by_count.get(self.MAX_FLEXIBLE_WORKERS, []), self.optimizer.audit_log,
+                               self.MAX_FLEXIBLE_WORKERS + 1)
+            return
 
-            all_deadlines_met = self.optimizer._verify_deadlines(results)
+        self.logger.info(f"ÉXITO: Plazos cumplidos con {success} trabajadores flexibles.")
+        self.finished.emit(results_by_count[success], self.optimizer.audit_log, success)
+
+    def _galloping_points(self, start=0):
+        """start, start+1, start+2, start+4... hasta MAX_FLEXIBLE_WORKERS (incluido)."""
+        start = min(start, self.MAX_FLEXIBLE_WORKERS)
+        points, step = [start], 1
+        while start + step < self.MAX_FLEXIBLE_WORKERS:
+            points.append(start + step)
+            step *= 2
+        if start < self.MAX_FLEXIBLE_WORKERS:
+            points.append(self.MAX_FLEXIBLE_WORKERS)
+        return points
+
+    def _lower_bound(self, prioritized_tasks_template, real_workers, time_calculator):
+        """
+        Número de flexibles por el que empieza la búsqueda. Si la cota demuestra que
+        ningún número cumple, se devuelve MAX_FLEXIBLE_WORKERS: basta una simulación
+        (que se detendrá pronto por plazo) para obtener los resultados que se muestran.
+        """
+        bound = EstimadorCotaInferior(prioritized_tasks_template, self.units, time_calculator,
+                                      self.start_date).estimar(real_workers, self.FLEXIBLE_WORKER_SKILL)
+        if bound.inviable:
+            self.logger.warning(f"Cota inferior: planificación inviable ({bound.motivo}).")
+            return self.MAX_FLEXIBLE_WORKERS
+        if bound.flexibles > 0:
+            self.logger.info(f"Cota inferior: al menos {bound.flexibles} trabajador(es) flexible(s) ({bound.motivo}).")
+        return min(bound.flexibles, self.MAX_FLEXIBLE_WORKERS)
+
+    @staticmethod
+    def _points_between(low, high, count):
+        """Hasta 'count' números repartidos de forma uniforme en el intervalo abierto (low, high)."""
+        if high - low <= count + 1:
+            return list(range(low + 1, high))
+        return sorted({low + (i * (high - low)) // (count + 1) for i in range(1, count + 1)})
+
+    def _run_attempt(self, flexible_workers_needed, prioritized_tasks_template, real_workers, machines_dict,
+                     time_calculator):
+        """Simula la planificación con N trabajadores flexibles. Devuelve (results, plazos_cumplidos)."""
+        self.logger.info(f"--- INICIANDO CICLO CON {flexible_workers_needed} TRABAJADOR(ES) FLEXIBLE(S) ---")
+
+        production_flow, all_workers_for_sim = self._build_attempt(
+            flexible_workers_needed, prioritized_tasks_template, real_workers)
+
+        dialog_ref = getattr(self.optimizer, 'visual_dialog_reference', None)
+
+        scheduler = AdaptadorScheduler(
+            production_flow=production_flow,
+            all_workers_with_skills=all_workers_for_sim,
+            available_machines=machines_dict,
+            schedule_config=self.optimizer.schedule_config,
+            time_calculator=time_calculator,
+            start_date=self.start_date,
+            visual_dialog_reference=dialog_ref,
+            al_terminar=simulation_finished_callback(dialog_ref),
+            plazos=self.deadlines
+        )
+
+        results, audit = scheduler.run_simulation()
+        self.optimizer.audit_log.extend(audit)
+
+        deadlines_met = self._deadlines_met(results, audit)
+        self.candidate_finished.emit(flexible_workers_needed, bool(deadlines_met), results, audit)
+        return results, deadlines_met
+
+    def _deadlines_met(self, results, audit):
+        """Un intento detenido por el motor (plazo inviable) no cumple, aunque sus resultados parciales sí."""
+        return not simulacion_inviable(audit) and self.optimizer._verify_deadlines(results)
+
+    def _build_attempt(self, flexible_workers_needed, prioritized_tasks_template, real_workers):
+        """Flujo de producción y lista de trabajadores para un intento con N flexibles."""
+        flexible_workers = [(f"Trabajador Flexible {i + 1}", self.FLEXIBLE_WORKER_SKILL)
+                            for i in range(flexible_workers_needed)]
+        all_workers_for_sim = real_workers + flexible_workers
+
+        sorted_workers = sorted(all_workers_for_sim, key=lambda w: w[1], reverse=True)
+
+        production_flow = []
+        for task_info in prioritized_tasks_template:
+            start_date_for_task = None
+            if task_info.get('previous_task_index') is None:
+                start_date_for_task = self.start_date
+
+            required_skill = task_info.get('required_skill_level', 1)
+            assigned_worker = None
+
+            for worker_name, worker_skill in sorted_workers:
+                if worker_skill >= required_skill:
+                    assigned_worker = worker_name
+                    break
 
-            if all_deadlines_met:
-                self.logger.info(f"ÉXITO: Plazos cumplidos con {flexible_workers_needed} trabajadores flexibles.")
-                final_results = results
-                break
+            workers_list = []
+            if assigned_worker:
+                workers_list = [{'name': assigned_worker}]
             else:
-                flexible_workers_needed += 1
-                if flexible_workers_needed > 20:
-                    self.logger.critical("Límite de 20 trabajadores flexibles alcanzado. Planificación inviable.")
-                    final_results = results
-                    break
+                self.logger.warning(
+                    f"No se encontró trabajador con habilidad >= {required_skill} "
+                    f"para '{task_info.get('name', 'Tarea')}'"
+                )
+
+            step = {
+                "task": task_info,
+                "workers": workers_list,
+                "machine_id": task_info.get('machine_id'),
+                "trigger_units": self.units,
+                "start_date": start_date_for_task,
+                "previous_task_index": task_info.get('previous_task_index')
+            }
+            production_flow.append(step)
 
-        self.finished.emit(final_results, self.optimizer.audit_log, flexible_workers_needed)
+        return production_flow, all_workers_for_sim
 
 
 class PilaController(QObject):
@@ -142,6 +325,10 @@ class PilaController(QObject):
         self.thread = None
         self.worker = None
         self.OptimizerWorker = OptimizerWorker # Reference for consistency if needed
+        # Re-simular sin cambios (Excel, Gantt, PDF...) devuelve el resultado guardado
+        self.simulation_cache = CacheSimulaciones()
+        # Una re-simulación incremental por editor visual abierto
+        self._incremental_simulations = weakref.WeakKeyDictionary()
 
     # =================================================================================
     # GESTIÓN DE LOTES (DEFINIR LOTE Y GESTIÓN)
@@ -658,10 +845,13 @@ class PilaController(QObject):
             )
 
             self.thread = QThread()
-            self.worker = OptimizerWorker(optimizer, start_date, end_date, params['units'])
+            # Sin editor visual y con un flujo grande, los candidatos se simulan en paralelo en procesos separados
+            self.worker = OptimizerWorker(optimizer, start_date, end_date, params['units'],
+                                          max_processes=os.cpu_count())
             self.worker.moveToThread(self.thread)
 
             self.thread.started.connect(self.worker.run)
+            self.worker.candidate_finished.connect(self._on_optimization_candidate_finished)
             self.worker.finished.connect(self._on_optimization_finished)
             self.worker.finished.connect(self.worker.deleteLater)
             self.thread.finished.connect(self.thread.deleteLater)
@@ -717,6 +907,12 @@ class PilaController(QObject):
             if hasattr(self.app, 'last_pila_id_calculated'):
                 calc_page.last_pila_id = self.app.last_pila_id_calculated
 
+    def _on_optimization_candidate_finished(self, flexible_workers, deadlines_met, results, audit):
+        """Informa del progreso de la optimización a medida que termina cada candidato."""
+        estado = "cumple los plazos" if deadlines_met else "no cumple los plazos"
+        self.view.statusBar().showMessage(
+            f"Optimización: con {flexible_workers} trabajador(es) flexible(s) {estado}...")
+
     def _on_optimization_finished(self, results, audit, workers_needed):
         calc_page = self.view.pages.get("calculate")
         calc_page.hide_progress()
@@ -780,7 +976,10 @@ class PilaController(QObject):
                 schedule_config=self.schedule_manager,
                 time_calculator=time_calculator,
                 start_date=datetime.now(),
-                visual_dialog_reference=flow_dialog
+                visual_dialog_reference=flow_dialog,
+                al_terminar=simulation_finished_callback(flow_dialog),
+                cache=self.simulation_cache,
+                incremental=self._incremental_simulations.setdefault(flow_dialog, SimulacionIncremental())
             )
 
             self._start_simulation_thread(scheduler)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import logging
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class SimulationWorker(QObject):
+    """
+    Ejecuta un AdaptadorScheduler en un QThread y traduce sus callbacks
+    (al_progresar) a señales de Qt. El núcleo de simulación no importa Qt.
+    """
+    finished = pyqtSignal(list, list)
+    progress_update = pyqtSignal(int, str)
+
+    def __init__(self, scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+        self.logger = logging.getLogger("EvolucionTiemposApp")
+
+    def run(self):
+        self.scheduler.al_progresar = self._on_progress
+        self.logger.info("SimulationWorker: Iniciando simulación en un hilo separado...")
+        try:
+            results, audit = self.scheduler.run_simulation()
+            self.finished.emit(results, audit)
+            self.logger.info("SimulationWorker: Simulación completada.")
+        except Exception as e:
+            self.logger.critical(f"Error crítico en el hilo de simulación: {e}", exc_info=True)
+            self.finished.emit([], [])
+
+    def _on_progress(self, processed_events, pending_events):
+        # El total de eventos no se conoce de antemano: se estima con los que quedan en cola
+        total = processed_events + pending_events
+        percent = min(99, int(100 * processed_events / total)) if total else 99
+        self.progress_update.emit(percent, f"Simulando... {processed_events} eventos procesados")
+
+
+def simulation_finished_callback(dialog):
+    """Callback 'al_terminar' para el AdaptadorScheduler que avisa al editor visual."""
+    if dialog is not None and hasattr(dialog, 'simulation_finished'):
+        return dialog.simulation_finished.emit
+    return None
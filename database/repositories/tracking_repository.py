@@ -1168,6 +1168,44 @@ class TrackingRepository(BaseRepository):
         finally:
             session.close()
 
+    def obtener_duraciones_historicas(self) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Duraciones reales registradas, en segundos, para ajustar las
+        distribuciones del modo Monte Carlo (ver monte_carlo.distribuciones_del_flujo).
+
+        Returns:
+            {'pasos': {paso_nombre: [segundos, ...]},
+             'productos': {producto_codigo: [segundos, ...]}}
+            Solo se incluyen pasos y trabajos completados con duracion positiva.
+        """
+        session = self.session_factory()
+        try:
+            pasos: Dict[str, List[int]] = {}
+            for nombre, segundos in session.query(
+                PasoTrazabilidad.paso_nombre, PasoTrazabilidad.duracion_paso_segundos
+            ).filter(
+                PasoTrazabilidad.estado_paso == 'completado',
+                PasoTrazabilidad.duracion_paso_segundos > 0
+            ):
+                pasos.setdefault(nombre, []).append(segundos)
+
+            productos: Dict[str, List[int]] = {}
+            for codigo, segundos in session.query(
+                TrabajoLog.producto_codigo, TrabajoLog.duracion_segundos
+            ).filter(
+                TrabajoLog.estado == 'completado',
+                TrabajoLog.duracion_segundos > 0
+            ):
+                productos.setdefault(codigo, []).append(segundos)
+
+            return {'pasos': pasos, 'productos': productos}
+
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error al obtener duraciones historicas: {e}")
+            return {'pasos': {}, 'productos': {}}
+        finally:
+            session.close()
+
     def get_trabajo_logs_por_trabajador(self, trabajador_id: int) -> List[TrabajoLogDTO]:
         """
         Obtiene todos los registros de trabajo (fichajes) de un trabajador,
@@ -0,0 +1,103 @@
+# dependency_graph.py
+from typing import Dict, List, Optional
+
+
+class GrafoDependencias:
+    """
+    Grafo de dependencias del flujo de producción, construido una sola vez al
+    inicializar el motor.
+
+    Contiene tres tipos de aristas entre tareas (identificadas por su tarea_id):
+      - Directas: predecesora -> tareas cuyo 'previous_task_index' apunta a ella.
+      - Inversas: tarea -> su predecesora estándar.
+      - Cíclicas: tarea -> destino de su 'next_cyclic_task_index' (y la inversa).
+
+    Sustituye a los recorridos de todas las líneas temporales que se hacían en
+    cada fin de unidad, de modo que las consultas no crecen con el tamaño del flujo.
+    """
+
+    def __init__(self):
+        self.indice_a_tarea_id: Dict[int, str] = {}
+        self.tarea_id_a_indice: Dict[str, int] = {}
+        self._dependientes: Dict[str, List[str]] = {}
+        self._predecesor: Dict[str, Optional[str]] = {}
+        self._indice_predecesor: Dict[str, Optional[int]] = {}
+        self._siguiente_ciclico: Dict[str, Optional[int]] = {}
+        self._origenes_ciclicos: Dict[str, List[str]] = {}
+
+    @classmethod
+    def construir(cls, production_flow: List[Dict], lineas_temporales: Dict,
+                  indice_a_tarea_id: Dict[int, str]) -> 'GrafoDependencias':
+        """
+        Construye el grafo a partir del flujo y de las líneas temporales del motor.
+
+        Args:
+            production_flow: Lista de pasos tal y como la recibe MotorDeEventos.
+            lineas_temporales: Diccionario tarea_id -> LineaTemporalTarea.
+            indice_a_tarea_id: Mapeo índice del flujo -> tarea_id.
+        """
+        grafo = cls()
+        grafo.indice_a_tarea_id = dict(indice_a_tarea_id)
+        grafo.tarea_id_a_indice = {tarea_id: i for i, tarea_id in indice_a_tarea_id.items()}
+
+        # Agrupar las líneas por el índice del que dependen, respetando el orden
+        # de inserción de 'lineas_temporales' (el mismo orden que el recorrido original).
+        lineas_por_dependencia: Dict[int, List[str]] = {}
+        for linea in lineas_temporales.values():
+            grafo._indice_predecesor[linea.id] = linea.dependency_index
+            grafo._predecesor[linea.id] = grafo._resolver_predecesor(linea.dependency_index)
+            if linea.dependency_index is not None:
+                lineas_por_dependencia.setdefault(linea.dependency_index, []).append(linea.id)
+
+        for tarea_id, indice in grafo.tarea_id_a_indice.items():
+            grafo._dependientes[tarea_id] = [
+                dependiente for dependiente in lineas_por_dependencia.get(indice, [])
+                if dependiente != tarea_id
+            ]
+
+            siguiente = None
+            if 0 <= indice < len(production_flow):
+                siguiente = production_flow[indice].get('next_cyclic_task_index')
+            grafo._siguiente_ciclico[tarea_id] = siguiente
+
+            destino_id = grafo.indice_a_tarea_id.get(siguiente) if siguiente is not None else None
+            if destino_id is not None:
+                grafo._origenes_ciclicos.setdefault(destino_id, []).append(tarea_id)
+
+        return grafo
+
+    def _resolver_predecesor(self, dependency_index) -> Optional[str]:
+        """Traduce un 'previous_task_index' a tarea_id (None o negativo = sin dependencia)."""
+        if dependency_index is None or (isinstance(dependency_index, int) and dependency_index < 0):
+            return None
+        return self.indice_a_tarea_id.get(dependency_index)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def contiene(self, tarea_id: str) -> bool:
+        return tarea_id in self.tarea_id_a_indice
+
+    def dependientes(self, tarea_id: str) -> List[str]:
+        """Tareas que dependen directamente de 'tarea_id' (aristas directas)."""
+        return self._dependientes.get(tarea_id, [])
+
+    def predecesor(self, tarea_id: str) -> Optional[str]:
+        """Tarea predecesora estándar de 'tarea_id', o None si es una raíz."""
+        return self._predecesor.get(tarea_id)
+
+    def indice_predecesor(self, tarea_id: str) -> Optional[int]:
+        """El 'previous_task_index' original de la tarea, tal y como se configuró."""
+        return self._indice_predecesor.get(tarea_id)
+
+    def siguiente_ciclico(self, tarea_id: str) -> Optional[int]:
+        """Índice del flujo al que salta el ciclo de 'tarea_id' ('next_cyclic_task_index')."""
+        return self._siguiente_ciclico.get(tarea_id)
+
+    def origenes_ciclicos(self, tarea_id: str) -> List[str]:
+        """Tareas cuyo salto cíclico apunta a 'tarea_id'."""
+        return self._origenes_ciclicos.get(tarea_id, [])
+
+    def tiene_dependencia_estandar(self, tarea_id: str) -> bool:
+        return self._indice_predecesor.get(tarea_id) is not None
@@ -1,46 +1,131 @@
 # event_engine.py
+import io
 import logging
 import heapq
 import pickle
 import os
 import time
-from datetime import datetime, date
-from typing import List, Dict, Optional
+from datetime import datetime, date, timedelta
+from typing import Callable, List, Dict, Optional, Set, Tuple
 from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 
-from PyQt6.QtWidgets import QApplication
-
 # Importamos todos los componentes de nuestra nueva arquitectura
 from time_calculator import CalculadorDeTiempos
-from resource_manager import GestorDeRecursos
+from resource_manager import GestorDeRecursos, IndiceReglasReasignacion
 from temporal_storage import RegistroTemporal
 from timeline_task import LineaTemporalTarea
-from simulation_events import EventoDeSimulacion, EventoInicioUnidad, EventoFinUnidad
+from simulation_events import EventoDeSimulacion, EventoInicioUnidad, EventoFinUnidad, EventoReasignacionTrabajador
+from event_index import FinalizacionesPendientes, IndiceEventosFuturos
+from dependency_graph import GrafoDependencias
+from sim_clock import RelojSimulacion
+from simulation_trace import TrazaSimulacion
 from calculation_audit import CalculationDecision, DecisionStatus
 
+# Cada cuántos eventos procesados se informa del progreso (si hay callback)
+INTERVALO_PROGRESO = 1000
+
+# Los eventos cancelados se quedan en el heap como lápidas hasta que salen. Cuando
+# superan esta fracción de la cola (y al menos MINIMO_LAPIDAS_COMPACTAR) se
+# reconstruye el heap sin ellos (ver MotorDeEventos._compactar_cola)
+PROPORCION_LAPIDAS_COMPACTAR = 0.5
+MINIMO_LAPIDAS_COMPACTAR = 64
+
+# Entrada del audit log que marca una simulación detenida por un plazo imposible
+DECISION_PLAZO_INVIABLE = 'PLAZO_INVIABLE'
+
+# Tarea con la que se reserva un recurso fuera de servicio (ver MotorDeEventos.bloquear_recurso)
+TAREA_NO_DISPONIBLE = 'NO_DISPONIBLE'
+# Duración de un bloqueo sin fecha de fin
+BLOQUEO_INDEFINIDO = timedelta(days=3650)
+
+
+def limite_de_plazo(plazo) -> Optional[datetime]:
+    """
+    Primer instante que ya incumple el plazo: el día siguiente al deadline a las
+    00:00, igual que Optimizer._verify_deadlines. None si no es una fecha.
+    """
+    if isinstance(plazo, datetime):
+        plazo = plazo.date()
+    if isinstance(plazo, date):
+        return datetime.combine(plazo + timedelta(days=1), datetime.min.time())
+    return None
+
+
+def simulacion_inviable(audit_log: List[CalculationDecision]) -> bool:
+    """True si la simulación se detuvo antes de terminar porque un lote ya no llegaba a su plazo."""
+    return any(getattr(decision, 'decision_type', None) == DECISION_PLAZO_INVIABLE for decision in audit_log)
+
+
 class MotorDeEventos:
     """
     Orquesta la simulación basada en eventos discretos, coordinando tareas,
     recursos y la persistencia de resultados con procesamiento en paralelo.
+
+    No depende de Qt: el progreso se comunica con el callback opcional
+    'al_progresar(eventos_procesados, eventos_en_cola)', y es la capa de UI la
+    que lo convierte en señales.
     """
 
     def __init__(self, production_flow: List[Dict], all_workers_data: List,
                  all_machines_data: Dict, schedule_config, start_date: datetime,
                  time_calculator: CalculadorDeTiempos,
                  checkpoint_path: str = None,
-                 visual_dialog_reference=None):  # <-- AÑADIDO
+                 visual_dialog_reference=None,  # <-- AÑADIDO
+                 registro_eventos: Optional[RegistroTemporal] = None,
+                 al_progresar: Optional[Callable[[int, int], None]] = None,
+                 plazos: Optional[Dict] = None):
 
         self.production_flow = production_flow
         self.logger = logging.getLogger(__name__)
+        # Diagnóstico del bucle caliente: categorías activables y búfer que sólo se vuelca ante errores
+        self.traza = TrazaSimulacion()
         self.lock = Lock()
         self.visual_dialog_reference = visual_dialog_reference
+        self.al_progresar = al_progresar
+        # {fabricacion_id: deadline}. Si se indica, la simulación se detiene en cuanto
+        # un lote ya no puede cumplir su plazo (ver _plazo_superado)
+        self.plazos = plazos or {}
+        self.plazo_incumplido = None
+        # Eventos generados y plazos preparados: se puede avanzar por tramos (avanzar_hasta)
+        self._iniciada = False
+        self.eventos_procesados = 0
+        # Instantáneas periódicas (cada N eventos) y primer evento que toca cada tarea,
+        # para re-simular desde el punto adecuado tras una edición (ver incremental_simulation.py)
+        self.intervalo_instantaneas: Optional[int] = None
+        self.instantaneas: List['InstantaneaMotor'] = []
+        self.primer_evento_por_tarea: Dict[str, int] = {}
+        # Simulación de un grupo de tareas independientes en otro proceso (ver simulation_partition.py):
+        # sólo arrancan las raíces del grupo y se anota el orden de procesamiento para fusionar
+        self.tareas_simuladas: Optional[Set[str]] = None
+        self.orden_procesado: Optional[List[tuple]] = None
+        # Modo por instantes (ver _procesar_instante): los eventos de un mismo instante se
+        # procesan juntos por 'prioridad'. Mientras dura un instante, sus eventos aún sin
+        # procesar están en _lote_en_curso y los que se programan esperan en
+        # _programados_en_lote para entrar al heap de una vez
+        self.agrupar_por_instante = False
+        self._lote_en_curso: Dict[int, EventoDeSimulacion] = {}
+        self._programados_en_lote: Optional[List[tuple]] = None
+        # Minutos de trabajo hasta el instante en curso por inicio de bloque: en un flujo
+        # sincronizado muchas unidades empezaron y terminan a la vez (ver _fila_resultado)
+        self._minutos_hasta_instante: Optional[Dict[datetime, float]] = None
 
         # --- 1. Inicializar Componentes de Soporte ---
         self.calculador_tiempos = time_calculator
-        self.gestor_recursos = GestorDeRecursos(self.calculador_tiempos)
-        temp_db_path = f"temp_simulation_{datetime.now().strftime('%Y%m%d%H%M%S')}.db"
-        self.registro_temporal = RegistroTemporal(db_path=temp_db_path)
+        # Reloj entero (tics desde el inicio de la simulación) para el heap y los calendarios
+        self.reloj = RelojSimulacion(start_date)
+        self.gestor_recursos = GestorDeRecursos(self.calculador_tiempos, self.reloj, self.traza)
+        # Sumidero opcional de eventos procesados. Los resultados se compilan en memoria
+        # a medida que se procesan los eventos, así que por defecto no se escribe nada a disco.
+        self.registro_temporal = registro_eventos
+        self.resultados_en_curso = []
+        self.audit_log_en_curso = []
+        # Índice secundario de la cola: evita recorrer el heap en cada consulta
+        self.indice_eventos = IndiceEventosFuturos()
+        # Fines de bloque pendientes por tarea, para los tiempos inactivos (ver EventoFinUnidad)
+        self.finalizaciones_pendientes = FinalizacionesPendientes()
+        # Eventos cancelados que siguen en el heap (se descartan al salir)
+        self.lapidas_en_cola = 0
 
         if checkpoint_path and os.path.exists(checkpoint_path):
             self._load_checkpoint(checkpoint_path)
@@ -63,19 +148,8 @@ class MotorDeEventos:
         self.tarea_id_a_indice = {}
 
         for i, step in enumerate(production_flow):
-            # ✅ DIAGNÓSTICO TEMPORAL (puedes eliminarlo después)
-            self.logger.critical("=" * 80)
-            self.logger.critical(f"🔍 DIAGNÓSTICO PASO {i}:")
-            self.logger.critical(f"  Task name: {step.get('task', {}).get('name', 'SIN NOMBRE')}")
-            self.logger.critical(f"  Workers field exists: {'workers' in step}")
-            self.logger.critical(f"  Workers value: {step.get('workers', 'NO EXISTE')}")
-            self.logger.critical(f"  Workers type: {type(step.get('workers', None))}")
-            if step.get('workers'):
-                self.logger.critical(f"  Workers length: {len(step.get('workers', []))}")
-                for idx, w in enumerate(step.get('workers', [])):
-                    self.logger.critical(f"    Worker {idx}: {w} (type: {type(w)})")
-            self.logger.critical("=" * 80)
-            # FIN DIAGNÓSTICO
+            self.traza('configuracion', "Paso %s: tarea='%s', workers=%r",
+                       i, step.get('task', {}).get('name', 'SIN NOMBRE'), step.get('workers', 'NO EXISTE'))
 
             task_data = step['task'].copy()
             task_data['trigger_units'] = step.get('trigger_units', 1)
@@ -89,18 +163,16 @@ class MotorDeEventos:
                         step['start_date'],
                         schedule_config.WORK_START_TIME
                     )
-                self.logger.info(
-                    f"📅 Tarea '{task_data.get('name', 'Sin nombre')}' configurada con fecha de inicio: "
-                    f"{task_data['scheduled_start_date'].strftime('%d/%m/%Y %H:%M')}"
-                )
+                self.traza('configuracion', "Tarea '%s' configurada con fecha de inicio: %s",
+                           task_data.get('name', 'Sin nombre'), task_data['scheduled_start_date'])
 
             if 'previous_task_index' in step and step['previous_task_index'] is not None:
                 task_data['previous_task_index'] = step['previous_task_index']
-                self.logger.debug(
-                    f"Tarea '{task_data.get('name')}' tiene dependencia con índice {step['previous_task_index']}"
-                )
+                self.traza('configuracion', "Tarea '%s' tiene dependencia con índice %s",
+                           task_data.get('name'), step['previous_task_index'])
 
-            linea_temporal = LineaTemporalTarea(task_data, self.gestor_recursos, self.calculador_tiempos)
+            linea_temporal = LineaTemporalTarea(task_data, self.gestor_recursos, self.calculador_tiempos,
+                                                self.traza)
 
             self.lineas_temporales[linea_temporal.id] = linea_temporal
             self.indice_a_tarea_id[i] = linea_temporal.id
@@ -127,21 +199,23 @@ class MotorDeEventos:
 
             # Log de verificación
             if trabajadores_nombres:
-                self.logger.debug(
-                    f"✅ Asignados {len(trabajadores_nombres)} trabajador(es) a '{linea_temporal.name}': "
-                    f"{', '.join(trabajadores_nombres)}"
-                )
+                self.traza('configuracion', "Asignados %d trabajador(es) a '%s': %s",
+                           len(trabajadores_nombres), linea_temporal.name, trabajadores_nombres)
             else:
                 self.logger.warning(
                     f"⚠️ Tarea '{linea_temporal.name}' no tiene trabajadores asignados. "
                     f"No podrá ejecutarse."
                 )
 
-            self.logger.debug(
-                f"Tarea registrada: índice={i}, id={linea_temporal.id}, "
-                f"name='{linea_temporal.name}', dependency_index={linea_temporal.dependency_index}, "
-                f"scheduled_start={'Sí' if linea_temporal.scheduled_start_date else 'NO'}"
-            )
+            self.traza('configuracion', "Tarea registrada: índice=%s, id=%s, name='%s', dependency_index=%s",
+                       i, linea_temporal.id, linea_temporal.name, linea_temporal.dependency_index)
+
+        # --- 4. Grafo de dependencias (directas, inversas y cíclicas), calculado una sola vez ---
+        self.grafo_dependencias = GrafoDependencias.construir(
+            self.production_flow, self.lineas_temporales, self.indice_a_tarea_id
+        )
+        # --- 5. Reglas de reasignación por tarea de origen, compiladas una sola vez ---
+        self.reglas_reasignacion = IndiceReglasReasignacion.construir(self.production_flow, self.indice_a_tarea_id)
 
         self.logger.info(f"Motor de eventos inicializado DESDE CERO con {len(self.lineas_temporales)} tareas.")
 
@@ -236,6 +310,9 @@ class MotorDeEventos:
         eventos_por_timestamp = {}
 
         for tarea in raices_verdaderas:
+            if self.tareas_simuladas is not None and tarea.id not in self.tareas_simuladas:
+                # Otro proceso simula esta raíz; la fecha de inicio sí cuenta para el ajuste del PASO 3
+                continue
             timestamp_evento = max(self.tiempo_actual, tarea.scheduled_start_date)
 
             if not self._tiene_evento_futuro(tarea.id, 1):
@@ -332,10 +409,9 @@ class MotorDeEventos:
         if not tareas_dependientes:
             return eventos_generados
 
-        self.logger.debug(
-            f"🔍 Verificando dependencias: '{self.lineas_temporales[tarea_completada_id].name}' "
-            f"alcanzó {unidad_completada} unidades. Encontradas {len(tareas_dependientes)} tarea(s) dependiente(s)."
-        )
+        self.traza('dependencias', "🔍 Verificando dependencias: '%s' alcanzó %s unidades. "
+                   "Encontradas %d tarea(s) dependiente(s).",
+                   self.lineas_temporales[tarea_completada_id].name, unidad_completada, len(tareas_dependientes))
 
         linea_predecesora = self.lineas_temporales[tarea_completada_id]
         unidades_predecesor_completadas_GLOBAL = linea_predecesora.unidades_finalizadas_total
@@ -351,10 +427,8 @@ class MotorDeEventos:
 
             # --- NUEVA LÓGICA DE PROPAGACIÓN (PASSTHROUGH) ---
             if tarea_dependiente.unidades_finalizadas_total >= tarea_dependiente.unidades_a_producir:
-                self.logger.info(
-                    f"  ⏩ Tarea dependiente '{tarea_dependiente.name}' YA ESTÁ COMPLETADA. "
-                    f"Propagando señal a través de ella..."
-                )
+                self.traza('dependencias', "  ⏩ Tarea dependiente '%s' YA ESTÁ COMPLETADA. "
+                           "Propagando señal a través de ella...", tarea_dependiente.name)
                 # Llamada recursiva: La tarea dependiente actúa como si acabara de completar 
                 # su última unidad para despertar a SUS dependientes.
                 eventos_propagados = self._verificar_dependencias_cumplidas(
@@ -375,39 +449,35 @@ class MotorDeEventos:
 
             # 1. Construir una lista de todas las unidades ya gestionadas (activas, programadas, o recién creadas)
             unidades_en_proceso_o_programadas = {
-                inst['unidad_actual'] for inst in tarea_dependiente.instancias_activas
+                inst['unidad_actual'] for inst in tarea_dependiente.instancias.values()
             }
 
-            # 2. Buscar en la cola principal del motor
-            for _, _, ev in self.eventos_futuros:
-                if not ev.cancelado and ev.datos.get('tarea_id') == tarea_dependiente.id:
-                    if ev.tipo_evento == 'INICIO_UNIDAD' or (
-                            ev.tipo_evento == 'FIN_BLOQUE_TRABAJO' and ev.datos.get('numero_unidad')):
-                        unidades_en_proceso_o_programadas.add(ev.datos.get('unidad', ev.datos.get('numero_unidad')))
+            # 2. Buscar en la cola principal del motor (vía índice, sin recorrer el heap)
+            unidades_en_proceso_o_programadas.update(
+                self.indice_eventos.unidades_programadas(tarea_dependiente.id)
+            )
 
             # 3. Buscar en la lista temporal de eventos que se acaban de crear
             for ev in eventos_ya_creados:
-                if not ev.cancelado and ev.datos.get('tarea_id') == tarea_dependiente.id:
+                if not ev.cancelado and ev.tarea_id == tarea_dependiente.id:
                     if ev.tipo_evento == 'INICIO_UNIDAD':
-                        unidades_en_proceso_o_programadas.add(ev.datos.get('unidad'))
+                        unidades_en_proceso_o_programadas.add(ev.unidad)
             
             # También chequear en los eventos que acabamos de generar en esta misma llamada recursiva
             for ev in eventos_generados:
-                if not ev.cancelado and ev.datos.get('tarea_id') == tarea_dependiente.id:
+                if not ev.cancelado and ev.tarea_id == tarea_dependiente.id:
                     if ev.tipo_evento == 'INICIO_UNIDAD':
-                        unidades_en_proceso_o_programadas.add(ev.datos.get('unidad'))
+                        unidades_en_proceso_o_programadas.add(ev.unidad)
 
             # 4. Encontrar la próxima unidad que NO esté en esa lista
             unidad_a_iniciar = tarea_dependiente.unidades_finalizadas_total + 1
             while unidad_a_iniciar in unidades_en_proceso_o_programadas:
                 unidad_a_iniciar += 1
 
-            self.logger.debug(
-                f"  Comprobando '{tarea_dependiente.name}':\n"
-                f"     • Finalizadas: {tarea_dependiente.unidades_finalizadas_total}\n"
-                f"     • En proceso o Programadas: {unidades_en_proceso_o_programadas}\n"
-                f"     • Próxima unidad a despertar: {unidad_a_iniciar}"
-            )
+            self.traza('dependencias', "  Comprobando '%s':\n     • Finalizadas: %s\n"
+                       "     • En proceso o Programadas: %s\n     • Próxima unidad a despertar: %s",
+                       tarea_dependiente.name, tarea_dependiente.unidades_finalizadas_total,
+                       unidades_en_proceso_o_programadas, unidad_a_iniciar)
             # --- FIN DE LA CORRECCIÓN ---
 
             # Validaciones de seguridad
@@ -417,11 +487,10 @@ class MotorDeEventos:
             # Calcular cuántas unidades predecesoras se necesitan para ESTA unidad
             unidades_predecesor_requeridas = (unidad_a_iniciar - 1) * min_predecessor_units + min_predecessor_units
 
-            self.logger.debug(
-                f"  Comprobando '{tarea_dependiente.name}' U{unidad_a_iniciar}:\n"
-                f"     • Requiere: {unidades_predecesor_requeridas} de '{linea_predecesora.name}'\n"
-                f"     • Disponibles: {unidades_predecesor_completadas_GLOBAL}"
-            )
+            self.traza('dependencias', "  Comprobando '%s' U%s:\n     • Requiere: %s de '%s'\n"
+                       "     • Disponibles: %s", tarea_dependiente.name, unidad_a_iniciar,
+                       unidades_predecesor_requeridas, linea_predecesora.name,
+                       unidades_predecesor_completadas_GLOBAL)
 
             # Si se cumple la condición de despertar
             if unidades_predecesor_completadas_GLOBAL >= unidades_predecesor_requeridas:
@@ -429,15 +498,13 @@ class MotorDeEventos:
                 # La dependencia SIEMPRE determina el inicio
                 timestamp_inicio = timestamp_actual
                 if hasattr(tarea_dependiente, 'scheduled_start_date') and tarea_dependiente.scheduled_start_date:
-                    self.logger.info(
-                        f"  ⚠️ Tarea '{tarea_dependiente.name}' desbloqueada por dependencia. "
-                        f"Su fecha programada ({tarea_dependiente.scheduled_start_date.strftime('%d/%m %H:%M')}) será ignorada."
-                    )
+                    self.traza('dependencias', "  ⚠️ Tarea '%s' desbloqueada por dependencia. "
+                               "Su fecha programada (%s) será ignorada.",
+                               tarea_dependiente.name, tarea_dependiente.scheduled_start_date)
 
                 # Crear y programar el nuevo evento de inicio
-                self.logger.info(
-                    f"🚀 DESBLOQUEANDO: '{tarea_dependiente.name}' unidad {unidad_a_iniciar} a las {timestamp_inicio.strftime('%d/%m %H:%M')}"
-                )
+                self.traza('dependencias', "🚀 DESBLOQUEANDO: '%s' unidad %s a las %s",
+                           tarea_dependiente.name, unidad_a_iniciar, timestamp_inicio)
 
                 # --- AHORA SÍ: Creamos la instancia para la tarea despertada ---
                 trabajadores_tarea_dependiente = getattr(tarea_dependiente, 'trabajadores_asignados', [])
@@ -467,7 +534,8 @@ class MotorDeEventos:
                 )
                 eventos_generados.append(evento_inicio)
             else:
-                self.logger.debug(f"  ...condición no cumplida. '{tarea_dependiente.name}' sigue durmiendo.")
+                self.traza('dependencias', "  ...condición no cumplida. '%s' sigue durmiendo.",
+                           tarea_dependiente.name)
 
         return eventos_generados
 
@@ -480,24 +548,7 @@ class MotorDeEventos:
         MODIFICADO: Ahora considera id_instancia.
         """
         with self.lock:  # Asegurar acceso thread-safe a la cola de eventos
-            for _, _, evento in self.eventos_futuros:
-
-                if (not evento.cancelado and
-                        isinstance(evento, (EventoInicioUnidad, EventoFinUnidad))):
-
-                    datos = evento.datos
-                    # Comprobar si la tarea y la unidad coinciden
-                    if (datos.get('tarea_id') == tarea_id and
-                            datos.get('unidad') == numero_unidad):
-
-                        # Si se especificó una instancia, debe coincidir
-                        if id_instancia:
-                            if datos.get('id_instancia') == id_instancia:
-                                return True
-                        else:
-                            # Si no se especificó instancia, cualquier coincidencia es válida
-                            return True
-            return False
+            return self.indice_eventos.tiene_unidad(tarea_id, numero_unidad, id_instancia)
 
     def _encontrar_tareas_dependientes(self, tarea_id: str) -> List:
         """
@@ -509,44 +560,80 @@ class MotorDeEventos:
         Returns:
             Lista de LineaTemporalTarea que dependen de esta tarea
         """
-        tareas_dependientes = []
-        # Obtener el índice de la tarea predecesora
-        if tarea_id not in self.tarea_id_a_indice:
+        if not self.grafo_dependencias.contiene(tarea_id):
             self.logger.warning(
                 f"No se puede encontrar el índice de la tarea '{tarea_id}' "
                 f"en el mapeo. No se pueden verificar dependencias."
             )
-            return tareas_dependientes
-        indice_predecesora = self.tarea_id_a_indice[tarea_id]
-        # Buscar todas las tareas cuyo dependency_index apunta a este índice
-        for linea_temporal in self.lineas_temporales.values():
-
-            # ==================== INICIO DE LA CORRECCIÓN ====================
-            # Si la tarea que estamos comprobando es la misma que la que se completó,
-            # la ignoramos para evitar bucles infinitos.
-            if linea_temporal.id == tarea_id:
-                continue
-            # ===================== FIN DE LA CORRECCIÓN ======================
-            if linea_temporal.dependency_index == indice_predecesora:
-                tareas_dependientes.append(linea_temporal)
-                self.logger.debug(
-                    f"  🔗 '{linea_temporal.name}' depende de '{tarea_id}' "
-                    f"(dependency_index={indice_predecesora})"
-                )
-        return tareas_dependientes
+            return []
+        # Las aristas directas ya excluyen a la propia tarea (evita bucles infinitos)
+        return [self.lineas_temporales[dependiente_id]
+                for dependiente_id in self.grafo_dependencias.dependientes(tarea_id)]
 
     def programar_eventos(self, eventos: List[EventoDeSimulacion]):
-        """Añade una lista de eventos al heap de forma segura para hilos (thread-safe)."""
+        """
+        Añade una lista de eventos al heap de forma segura para hilos (thread-safe).
+        Durante un instante del modo por instantes esperan en _programados_en_lote;
+        los índices se actualizan igualmente al momento.
+        """
         with self.lock:
-            self.logger.info(f"📥 programar_eventos: Recibidos {len(eventos)} eventos")  # ✅ AÑADIR
+            self.traza('motor', "programar_eventos: recibidos %d eventos", len(eventos))
             for evento in eventos:
-                heapq.heappush(self.eventos_futuros, (evento.timestamp, self.event_counter, evento))
+                tics = evento.tics
+                if tics is None:
+                    tics = evento.tics = self.reloj.a_tics(evento.timestamp)
+                if self._programados_en_lote is not None:
+                    self._programados_en_lote.append((tics, self.event_counter, evento))
+                else:
+                    heapq.heappush(self.eventos_futuros, (tics, self.event_counter, evento))
+                if evento.cancelado:
+                    # Lápida desde el principio: no entra en los índices
+                    self.lapidas_en_cola += 1
+                else:
+                    self.indice_eventos.registrar(evento)
+                    self.finalizaciones_pendientes.programar(tics, self.event_counter, evento)
                 self.event_counter += 1
 
     def cancelar_eventos(self, eventos_a_cancelar: List[EventoDeSimulacion]):
-        for evento in eventos_a_cancelar:
-            evento.cancelado = True
-        self.logger.debug(f"Marcados {len(eventos_a_cancelar)} eventos para cancelación.")
+        """
+        Marca los eventos como cancelados. Los que siguen en la cola se quedan en
+        el heap como lápidas y se descartan al salir; los ya procesados sólo se marcan.
+        """
+        with self.lock:
+            for evento in eventos_a_cancelar:
+                if evento.cancelado:
+                    continue
+                evento.cancelado = True
+                if evento in self.indice_eventos:
+                    self.indice_eventos.retirar(evento)
+                    self.finalizaciones_pendientes.retirar(evento)
+                    # Un evento del instante en curso ya no está en el heap: se salta sin dejar lápida
+                    if self._lote_en_curso.pop(id(evento), None) is None:
+                        self.lapidas_en_cola += 1
+            if (self.lapidas_en_cola >= MINIMO_LAPIDAS_COMPACTAR and
+                    self.lapidas_en_cola > PROPORCION_LAPIDAS_COMPACTAR * len(self.eventos_futuros)):
+                self._compactar_cola()
+        self.traza('motor', "Marcados %d eventos para cancelación.", len(eventos_a_cancelar))
+
+    def _compactar_cola(self):
+        """
+        Reconstruye el heap sin las lápidas. Las claves (tics, contador) son
+        únicas, así que el orden de salida de los eventos vivos no cambia.
+        """
+        antes = len(self.eventos_futuros)
+        self.eventos_futuros[:] = [entrada for entrada in self.eventos_futuros if not entrada[2].cancelado]
+        heapq.heapify(self.eventos_futuros)
+        if self._programados_en_lote:
+            self._programados_en_lote[:] = [entrada for entrada in self._programados_en_lote
+                                            if not entrada[2].cancelado]
+        self.lapidas_en_cola = 0
+        self.traza('motor', "Cola compactada: %d lápidas descartadas, %d eventos vivos",
+                   antes - len(self.eventos_futuros), len(self.eventos_futuros))
+
+    def eventos_en_cola(self) -> int:
+        """Eventos pendientes de procesar, sin contar las lápidas de los cancelados."""
+        return (len(self.eventos_futuros) + len(self._lote_en_curso) + len(self._programados_en_lote or ())
+                - self.lapidas_en_cola)
 
     def _save_checkpoint(self, checkpoint_path='simulation_checkpoint.pkl'):
         self.logger.info(f"Guardando checkpoint de la simulación en: {checkpoint_path}")
@@ -556,6 +643,9 @@ class MotorDeEventos:
             'event_counter': self.event_counter,
             'lineas_temporales': self.lineas_temporales,
             'gestor_recursos': self.gestor_recursos,
+            'audit_log_interno': self.audit_log_interno,
+            'resultados_en_curso': self.resultados_en_curso,
+            'audit_log_en_curso': self.audit_log_en_curso,
         }
         try:
             with open(checkpoint_path, 'wb') as f:
@@ -574,6 +664,32 @@ class MotorDeEventos:
             self.event_counter = simulation_state['event_counter']
             self.lineas_temporales = simulation_state['lineas_temporales']
             self.gestor_recursos = simulation_state['gestor_recursos']
+            # Checkpoints antiguos no guardaban la compilación incremental
+            self.audit_log_interno = simulation_state.get('audit_log_interno', [])
+            self.resultados_en_curso = simulation_state.get('resultados_en_curso', [])
+            self.audit_log_en_curso = simulation_state.get('audit_log_en_curso', [])
+            self.reloj = getattr(self.gestor_recursos, 'reloj', self.reloj)
+            # Las claves del heap (y los tics de cada evento, que los checkpoints
+            # antiguos no guardaban) se recalculan con el reloj restaurado
+            for _, _, evento in self.eventos_futuros:
+                evento.tics = self.reloj.a_tics(evento.timestamp)
+            self.eventos_futuros = [(evento.tics, contador, evento)
+                                    for _, contador, evento in self.eventos_futuros]
+            heapq.heapify(self.eventos_futuros)
+            self.lapidas_en_cola = sum(1 for _, _, evento in self.eventos_futuros if evento.cancelado)
+            # El mapeo de índices no se guarda en el checkpoint: se deriva del flujo
+            self.indice_a_tarea_id = {
+                i: step['task'].get('id', 'task_sin_id')
+                for i, step in enumerate(self.production_flow)
+                if step['task'].get('id', 'task_sin_id') in self.lineas_temporales
+            }
+            self.tarea_id_a_indice = {tarea_id: i for i, tarea_id in self.indice_a_tarea_id.items()}
+            self.grafo_dependencias = GrafoDependencias.construir(
+                self.production_flow, self.lineas_temporales, self.indice_a_tarea_id
+            )
+            self.reglas_reasignacion = IndiceReglasReasignacion.construir(self.production_flow, self.indice_a_tarea_id)
+            self.indice_eventos.reconstruir(self.eventos_futuros)
+            self.finalizaciones_pendientes.reconstruir(self.eventos_futuros)
             self.logger.info(f"Checkpoint cargado con éxito. La simulación se reanudará en {self.tiempo_actual}.")
         except (pickle.UnpicklingError, IOError, KeyError) as e:
             self.logger.critical(f"No se pudo cargar el checkpoint: {e}. Iniciando simulación desde cero.")
@@ -582,51 +698,28 @@ class MotorDeEventos:
     def ejecutar_simulacion(self, checkpoint_interval=5000, max_workers=None):
         """
         Ejecuta el bucle principal de simulación de forma SECUENCIAL para garantizar la estabilidad.
-        """
-        # PASO NUEVO: Limpiar fechas conflictivas
-        self._generar_eventos_iniciales()
-        self.logger.info("🚀 Iniciando bucle principal de procesamiento en modo SECUENCIAL...")
 
+        Con max_workers > 1, si el flujo contiene cadenas que no comparten
+        dependencias, trabajadores ni máquinas, cada grupo se simula en su propio
+        proceso y los resultados se fusionan en el orden en que los habría
+        procesado un único heap: la salida es idéntica a la secuencial.
+        """
+        grupos = self._grupos_independientes(max_workers)
         start_simulation_time = time.perf_counter()
-        processed_event_count = 0
-        iteracion = 0
-
-        # Log inicial del estado de la cola
-        self.logger.info(f"📊 Estado inicial: {len(self.eventos_futuros)} eventos en cola")
-
-        # --- BUCLE SECUENCIAL ---
-        while self.eventos_futuros:
-            iteracion += 1
-
-            if iteracion % 10 == 1 or iteracion <= 5:
-                self.logger.info(f"🔄 Iteración {iteracion}: {len(self.eventos_futuros)} eventos en cola")
 
-            # Extraer el siguiente evento
-            timestamp, _, evento = heapq.heappop(self.eventos_futuros)
-            self.tiempo_actual = timestamp
-
-            self.logger.info(
-                f"🔵 [{self.tiempo_actual.strftime('%d/%m %H:%M')}] "
-                f"Procesando evento #{iteracion}: {evento.tipo_evento}"
-            )
-
-            # ⚠️ OPTIMIZACIÓN MÁXIMA: Visualización deshabilitada para mejor rendimiento
-            # Las señales visuales están comentadas para evitar overhead en simulaciones grandes
-            # (El bloque de emisión de señales ha sido eliminado)
+        if grupos:
+            processed_event_count = self._procesar_en_paralelo(grupos)
+        else:
+            self._iniciar()
+            self.logger.info("🚀 Iniciando bucle principal de procesamiento en modo SECUENCIAL...")
 
-            # ✅ QUITAR EL TRY TEMPORALMENTE
-            self.logger.info(f"   → Procesando evento...")
-            nuevos_eventos = evento.procesar(self)
+            # Log inicial del estado de la cola
+            self.logger.info(f"📊 Estado inicial: {self.eventos_en_cola()} eventos en cola")
 
-            if nuevos_eventos:
-                self.programar_eventos(nuevos_eventos)
-                self.logger.info(f"   ✓ {len(nuevos_eventos)} nuevo(s) evento(s) programado(s)")
-            else:
-                self.logger.warning(f"   ⚠️ NO retornó eventos (nuevos_eventos={nuevos_eventos})")
+            processed_event_count = self._procesar_eventos()
 
-            self.registro_temporal.guardar_evento(evento)
-            processed_event_count += 1
-            self.logger.info(f"   ✓ Evento procesado")
+        if self.al_progresar is not None:
+            self.al_progresar(self.eventos_procesados, self.eventos_en_cola())
 
         end_simulation_time = time.perf_counter()
         total_duration = end_simulation_time - start_simulation_time
@@ -638,40 +731,375 @@ class MotorDeEventos:
         self.logger.info(f"  Duración Total: {total_duration:.2f} segundos")
         self.logger.info(f"  Eventos Procesados: {processed_event_count}")
         self.logger.info(f"  Rendimiento Medio: {events_per_second:.2f} eventos/segundo")
-        self.logger.info(f"  Iteraciones realizadas: {iteracion}")
-        self.logger.info(f"  Eventos restantes: {len(self.eventos_futuros)}")
+        self.logger.info(f"  Iteraciones realizadas: {self.eventos_procesados}")
+        self.logger.info(f"  Eventos restantes: {self.eventos_en_cola()}")
         self.logger.info("=" * 50)
 
-        if self.eventos_futuros:
-            self.logger.warning(f"⚠️ Simulación incompleta: {len(self.eventos_futuros)} eventos sin procesar")
+        if self.plazo_incumplido is not None:
+            # Resultado parcial: lo procesado hasta la parada, marcado con DECISION_PLAZO_INVIABLE
+            self.logger.warning(
+                f"⏹️ Simulación detenida: el lote '{self.plazo_incumplido['lote']}' no puede cumplir su plazo "
+                f"({self.plazo_incumplido['plazo']}). {self.eventos_en_cola()} eventos sin procesar.")
+            return self._completar_resultados(self.resultados_en_curso), self._cerrar_audit_log(self.audit_log_en_curso)
+
+        if self.eventos_en_cola():
+            self.logger.warning(f"⚠️ Simulación incompleta: {self.eventos_en_cola()} eventos sin procesar")
         else:
             self.logger.info("✅ Simulación completada. No hay más eventos por procesar.")
 
             self.logger.info(f"🏁 Simulación completada en {self.tiempo_actual.strftime('%d/%m/%Y %H:%M')}")
 
-            # ✅ CORRECCIÓN CRÍTICA: Forzar el vaciado del buffer antes de consultar
-            self.logger.info("💾 Vaciando buffer de eventos a disco antes de consultar...")
-            if hasattr(self.registro_temporal, '_flush_buffer_to_disk'):
-                self.registro_temporal._flush_buffer_to_disk()
-                self.logger.info("✅ Buffer de eventos vaciado exitosamente")
-            else:
-                self.logger.warning("⚠️ No se encontró el método _flush_buffer_to_disk")
-
-            # 1. Obtener todos los eventos procesados del registro temporal
-            all_processed_events = self.registro_temporal.consultar_eventos()
-            self.logger.info(f"Recuperados {len(all_processed_events)} eventos procesados del registro temporal.")
-
-            # 2. Compilar los resultados finales usando los eventos procesados
-            results = self._compilar_resultados_compatibles(all_processed_events)
+            # 1. Los resultados y el audit log se han ido construyendo evento a evento:
+            #    sólo queda ordenarlos y añadir las columnas que dependen del conjunto
+            results = self._completar_resultados(self.resultados_en_curso)
             self.logger.info(f"Compilados {len(results)} resultados finales.")
 
-            # 3. ✅ CORRECCIÓN: Compilar el audit log completo (que ya incluye audit_log_interno)
-            audit_log_completo = self._compilar_audit_log_compatible(all_processed_events)
+            # 2. Audit log completo (incluye audit_log_interno)
+            audit_log_completo = self._cerrar_audit_log(self.audit_log_en_curso)
             self.logger.info(f"Audit log completo compilado con {len(audit_log_completo)} eventos.")
 
-            # 4. Devolver los resultados y el audit log completo
+            # 3. Devolver los resultados y el audit log completo
             return results, audit_log_completo
 
+    def _grupos_independientes(self, max_workers: Optional[int]) -> List[Set[str]]:
+        """
+        Grupos de tareas a simular en procesos separados, o [] si hay que simular
+        en este proceso. Sólo se reparte una simulación completa desde cero y sin
+        plazos: un plazo incumplido detiene todos los grupos a la vez, y el
+        registro de eventos y las instantáneas necesitan el estado global.
+        """
+        if not max_workers or max_workers < 2:
+            return []
+        if self._iniciada or self.eventos_en_cola() or self.plazos or self.registro_temporal is not None \
+                or self.intervalo_instantaneas or self.agrupar_por_instante:
+            return []
+        calendarios = (*self.gestor_recursos.calendario_trabajadores.values(),
+                       *self.gestor_recursos.calendario_maquinas.values())
+        if any(len(calendario) for calendario in calendarios):
+            # Recursos bloqueados antes de empezar (escenarios): no viajan a los procesos
+            return []
+        from simulation_partition import repartir_componentes
+        return repartir_componentes(self.production_flow, max_workers)
+
+    def _procesar_en_paralelo(self, grupos: List[Set[str]]) -> int:
+        """Simula los grupos en paralelo y deja en el motor los resultados fusionados."""
+        from simulation_partition import simular_en_paralelo
+        fusion, particiones = simular_en_paralelo(self, grupos)
+
+        self.resultados_en_curso = fusion.filas
+        self.audit_log_en_curso = fusion.auditoria
+        self.audit_log_interno = fusion.auditoria_interna
+        self.eventos_procesados = fusion.eventos_procesados
+        self.tiempo_actual = max(particion.tiempo_final for particion in particiones)
+        # Las líneas temporales y los calendarios de este motor no se han usado: sólo
+        # los resultados reflejan la simulación. Tampoco se puede volver a ejecutar.
+        self._iniciada = True
+        return fusion.eventos_procesados
+
+    def _iniciar(self):
+        """Genera los eventos iniciales y prepara los plazos (una sola vez)."""
+        if self._iniciada:
+            return
+        # PASO NUEVO: Limpiar fechas conflictivas
+        self._generar_eventos_iniciales()
+        self._preparar_plazos()
+        self._iniciada = True
+        if self.intervalo_instantaneas:
+            self.instantaneas.append(InstantaneaMotor(self))
+
+    def _procesar_eventos(self, hasta: Optional[int] = None) -> int:
+        """
+        Bucle principal: procesa eventos en orden hasta vaciar la cola o detenerse
+        por un plazo. Con 'hasta' (tics) se para antes del primer evento que no sea
+        anterior a ese instante. Devuelve cuántos eventos ha procesado.
+        """
+        procesados = 0
+        # --- BUCLE SECUENCIAL ---
+        while self.eventos_futuros and self.plazo_incumplido is None:
+            if hasta is not None and self.eventos_futuros[0][0] >= hasta:
+                break
+
+            if self.agrupar_por_instante:
+                procesados_instante, detenido = self._procesar_instante()
+                procesados += procesados_instante
+                if detenido:
+                    break
+                continue
+
+            # Extraer el siguiente evento
+            tics, contador, evento = heapq.heappop(self.eventos_futuros)
+            if evento.cancelado:
+                # Lápida: ya salió de los índices al cancelarse
+                self.lapidas_en_cola -= 1
+                continue
+            self.indice_eventos.retirar(evento)
+            self.finalizaciones_pendientes.extraer(tics, contador, evento)
+            self.tiempo_actual = evento.timestamp
+
+            self.traza('motor', "[%s] Evento #%d: %s (%d en cola)",
+                       self.tiempo_actual, self.eventos_procesados + 1, evento.tipo_evento, self.eventos_en_cola())
+
+            # ⚠️ OPTIMIZACIÓN MÁXIMA: Visualización deshabilitada para mejor rendimiento
+            # Las señales visuales están comentadas para evitar overhead en simulaciones grandes
+            # (El bloque de emisión de señales ha sido eliminado)
+
+            try:
+                nuevos_eventos = evento.procesar(self)
+            except Exception:
+                self.traza.volcar(f"error procesando {evento.tipo_evento} en {self.tiempo_actual}")
+                raise
+
+            if nuevos_eventos:
+                self.programar_eventos(nuevos_eventos)
+                self.traza('motor', "  %d nuevo(s) evento(s) programado(s)", len(nuevos_eventos))
+
+            self._acumular_resultados(evento)
+            if self.registro_temporal is not None:
+                self.registro_temporal.guardar_evento(evento)
+            if self.orden_procesado is not None:
+                self.orden_procesado.append((tics, contador, self.event_counter, len(self.resultados_en_curso),
+                                             len(self.audit_log_en_curso), len(self.audit_log_interno)))
+            procesados += 1
+            self.eventos_procesados += 1
+            if self.intervalo_instantaneas:
+                self._registrar_contacto(evento)
+                if self.eventos_procesados % self.intervalo_instantaneas == 0:
+                    self.instantaneas.append(InstantaneaMotor(self))
+            if self.al_progresar is not None and self.eventos_procesados % INTERVALO_PROGRESO == 0:
+                self.al_progresar(self.eventos_procesados, self.eventos_en_cola())
+
+            if self.limite_por_lote and self._plazo_superado(evento):
+                break
+        return procesados
+
+    def _procesar_instante(self) -> Tuple[int, bool]:
+        """
+        Modo por instantes: saca del heap todos los eventos del instante más
+        próximo y los procesa por 'prioridad' (reasignaciones, fines, inicios,
+        inactividad) y, a igual prioridad, en el orden en que se programaron. Lo
+        que programan entra al heap de una vez al acabar el instante (si es del
+        mismo instante, forma el siguiente lote) y el registro de eventos recibe
+        el lote entero.
+
+        El orden dentro de un instante no es el del modo secuencial, que sólo
+        sigue el orden de programación: los resultados pueden diferir en empates.
+        Devuelve (eventos procesados, detenida por un plazo).
+        """
+        tics_instante = self.eventos_futuros[0][0]
+        lote = []
+        while self.eventos_futuros and self.eventos_futuros[0][0] == tics_instante:
+            entrada = heapq.heappop(self.eventos_futuros)
+            if entrada[2].cancelado:
+                self.lapidas_en_cola -= 1
+            else:
+                lote.append(entrada)
+        lote.sort(key=lambda entrada: (entrada[2].prioridad, entrada[1]))
+        self._lote_en_curso = {id(evento): evento for _, _, evento in lote}
+        self._programados_en_lote = []
+        self._minutos_hasta_instante = {}
+
+        procesados = []
+        detenido = False
+        instantaneas_antes = self.eventos_procesados // self.intervalo_instantaneas if self.intervalo_instantaneas else 0
+        progreso_antes = self.eventos_procesados // INTERVALO_PROGRESO
+        try:
+            for posicion, (tics, contador, evento) in enumerate(lote):
+                if self._lote_en_curso.pop(id(evento), None) is None:
+                    continue  # Cancelado por un evento anterior del mismo instante
+                self.indice_eventos.retirar(evento)
+                self.finalizaciones_pendientes.extraer(tics, contador, evento)
+                self.tiempo_actual = evento.timestamp
+                self.traza('motor', "[%s] Evento #%d: %s (%d en cola)",
+                           self.tiempo_actual, self.eventos_procesados + 1, evento.tipo_evento, self.eventos_en_cola())
+
+                try:
+                    nuevos_eventos = evento.procesar(self)
+                except Exception:
+                    self.traza.volcar(f"error procesando {evento.tipo_evento} en {self.tiempo_actual}")
+                    raise
+                if nuevos_eventos:
+                    self.programar_eventos(nuevos_eventos)
+
+                self._acumular_resultados(evento)
+                procesados.append(evento)
+                self.eventos_procesados += 1
+                if self.intervalo_instantaneas:
+                    self._registrar_contacto(evento)
+
+                if self.limite_por_lote and self._plazo_superado(evento):
+                    detenido = True
+                    # Lo que quedaba del instante vuelve a la cola sin procesar
+                    self._programados_en_lote.extend(entrada for entrada in lote[posicion + 1:]
+                                                     if id(entrada[2]) in self._lote_en_curso)
+                    break
+        finally:
+            programados, self._programados_en_lote = self._programados_en_lote, None
+            self._lote_en_curso = {}
+            self._minutos_hasta_instante = None
+            self._fusionar_en_cola(programados)
+
+        if self.registro_temporal is not None:
+            self.registro_temporal.guardar_eventos(procesados)
+        if self.intervalo_instantaneas and \
+                self.eventos_procesados // self.intervalo_instantaneas > instantaneas_antes:
+            # Sólo entre instantes: a mitad de uno la cola está repartida fuera del heap
+            self.instantaneas.append(InstantaneaMotor(self))
+        if self.al_progresar is not None and self.eventos_procesados // INTERVALO_PROGRESO > progreso_antes:
+            self.al_progresar(self.eventos_procesados, self.eventos_en_cola())
+        return len(procesados), detenido
+
+    def _fusionar_en_cola(self, entradas: List[tuple]):
+        """
+        Añade al heap las entradas (tics, contador, evento) de un instante. Si son
+        muchas respecto a la cola, reconstruirlo (lineal) sale más barato que
+        insertarlas una a una (logarítmico cada una).
+        """
+        if len(entradas) * max(1, len(self.eventos_futuros).bit_length()) > len(self.eventos_futuros):
+            self.eventos_futuros.extend(entradas)
+            heapq.heapify(self.eventos_futuros)
+        else:
+            for entrada in entradas:
+                heapq.heappush(self.eventos_futuros, entrada)
+
+    def _registrar_contacto(self, evento: EventoDeSimulacion):
+        """Anota el primer evento (por número de orden) que lee o modifica cada tarea."""
+        extra = evento.extra
+        for tarea_id in (evento.tarea_id, extra.get('tarea_origen'), extra.get('tarea_destino')):
+            if tarea_id is not None and tarea_id not in self.primer_evento_por_tarea:
+                self.primer_evento_por_tarea[tarea_id] = self.eventos_procesados
+
+    # ------------------------------------------------------------------
+    # Instantáneas y bifurcaciones (escenarios "qué pasaría si")
+    # ------------------------------------------------------------------
+
+    def avanzar_hasta(self, instante: datetime) -> int:
+        """
+        Simula hasta 'instante' sin pasarlo: procesa los eventos anteriores y deja
+        el reloj en 'instante'. Se puede seguir con ejecutar_simulacion() o tomar una
+        instantanea() para bifurcar escenarios. Devuelve los eventos procesados.
+        """
+        self._iniciar()
+        procesados = self._procesar_eventos(hasta=self.reloj.a_tics(instante))
+        if self.plazo_incumplido is None and instante > self.tiempo_actual:
+            self.tiempo_actual = instante
+        return procesados
+
+    def instantanea(self) -> 'InstantaneaMotor':
+        """Congela el estado actual (ver InstantaneaMotor)."""
+        self._iniciar()
+        return InstantaneaMotor(self)
+
+    def bifurcar(self) -> 'MotorDeEventos':
+        """Motor independiente que continúa desde el estado actual; éste no se modifica."""
+        self._iniciar()
+        return InstantaneaMotor(self).bifurcar()
+
+    def reasignar_trabajador(self, trabajador_id: str, tarea_destino_id: str,
+                             desde: Optional[datetime] = None, mode: str = 'PARALLEL_JOIN'):
+        """
+        Escenario: mueve un trabajador a otra tarea a partir de 'desde' (por defecto,
+        el instante actual). Programa un EventoReasignacionTrabajador, el mismo que
+        disparan las reglas de reasignación (y con el mismo 'mode'); la unidad que
+        esté haciendo la termina.
+        """
+        desde = desde or self.tiempo_actual
+        if desde < self.tiempo_actual:
+            raise ValueError(f"No se puede reasignar en el pasado ({desde} < {self.tiempo_actual}).")
+        if tarea_destino_id not in self.lineas_temporales:
+            raise KeyError(f"Tarea destino desconocida: {tarea_destino_id}")
+        tarea_origen_id = next((tarea_id for tarea_id, linea in self.lineas_temporales.items()
+                                if trabajador_id in linea.trabajadores_asignados and tarea_id != tarea_destino_id), None)
+        self.programar_eventos([EventoReasignacionTrabajador(
+            timestamp=desde,
+            datos={
+                'trabajador_id': trabajador_id,
+                'tarea_origen': tarea_origen_id,
+                'tarea_destino': tarea_destino_id,
+                'mode': mode,
+                'motivo': "Escenario: reasignación manual"
+            }
+        )])
+
+    def bloquear_recurso(self, recurso_id, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                         es_trabajador: bool = False):
+        """
+        Escenario: el recurso (por defecto una máquina) no está disponible entre
+        'desde' y 'hasta' (sin 'hasta', indefinidamente). Se reserva en su
+        calendario, así que afecta a las unidades que aún no han empezado.
+        """
+        desde = desde or self.tiempo_actual
+        hasta = hasta or desde + BLOQUEO_INDEFINIDO
+        self.gestor_recursos.asignar_recurso(recurso_id, desde, hasta, TAREA_NO_DISPONIBLE,
+                                             es_trabajador=es_trabajador)
+
+    def _preparar_plazos(self):
+        """
+        Convierte los plazos en límites (ver limite_de_plazo) y agrupa las tareas por lote.
+        """
+        self.limite_por_lote = {}
+        for lote, plazo in self.plazos.items():
+            limite = limite_de_plazo(plazo)
+            if limite is not None:
+                self.limite_por_lote[lote] = limite
+
+        self.tareas_por_lote = {}
+        for tarea_id, linea in self.lineas_temporales.items():
+            lote = linea.task_data.get('fabricacion_id')
+            if lote in self.limite_por_lote:
+                self.tareas_por_lote.setdefault(lote, []).append(tarea_id)
+
+        # Límites aún no alcanzados por el reloj; el más próximo al final de la lista
+        self._limites_pendientes = sorted(((limite, lote) for lote, limite in self.limite_por_lote.items()),
+                                          key=lambda par: par[0], reverse=True)
+
+    def _plazo_superado(self, evento: EventoDeSimulacion) -> bool:
+        """
+        Poda por plazo: detecta que un lote ya no puede cumplir su deadline porque
+          - una de sus unidades acaba de terminar después del límite, o
+          - el reloj ha pasado el límite y al lote le quedan unidades programadas o
+            en curso, que terminarán después.
+        Sólo se descartan escenarios cuyo incumplimiento es seguro.
+        """
+        if evento.tipo_evento == 'FIN_BLOQUE_TRABAJO' and evento.tarea_id in self.lineas_temporales:
+            lote = self.lineas_temporales[evento.tarea_id].task_data.get('fabricacion_id')
+            limite = self.limite_por_lote.get(lote)
+            if limite is not None and evento.timestamp >= limite:
+                return self._marcar_plazo_incumplido(lote, "una unidad termina después del plazo")
+
+        while self._limites_pendientes and self.tiempo_actual >= self._limites_pendientes[-1][0]:
+            _, lote = self._limites_pendientes.pop()
+            if any(self.indice_eventos.unidades_programadas(tarea_id) for tarea_id in self.tareas_por_lote.get(lote, ())):
+                return self._marcar_plazo_incumplido(lote, "quedan unidades pendientes al vencer el plazo")
+        return False
+
+    def _marcar_plazo_incumplido(self, lote, motivo: str) -> bool:
+        plazo = self.limite_por_lote[lote].date() - timedelta(days=1)
+        self.plazo_incumplido = {'lote': lote, 'plazo': plazo, 'momento': self.tiempo_actual, 'motivo': motivo}
+        self.audit_log_en_curso.append(CalculationDecision(
+            timestamp=self.tiempo_actual,
+            decision_type=DECISION_PLAZO_INVIABLE,
+            reason=f"Simulación detenida: el lote '{lote}' no puede cumplir el plazo "
+                   f"{plazo.strftime('%d/%m/%Y')} ({motivo}).",
+            user_friendly_reason=f"El lote '{lote}' no llega a su plazo; el cálculo se detuvo antes de terminar.",
+            task_name=f"LOTE '{lote}'",
+            details={'lote': lote, 'plazo': plazo, 'motivo': motivo},
+            status=DecisionStatus.CRITICAL,
+            icon="⏹️"
+        ))
+        return True
+
+    def _acumular_resultados(self, evento: EventoDeSimulacion):
+        """
+        Compilación incremental: añade la entrada de audit log del evento recién
+        procesado y, si es un fin de unidad, su fila de resultados.
+        """
+        datos = evento.datos or {}
+        if evento.tipo_evento == 'FIN_BLOQUE_TRABAJO':
+            fila = self._fila_resultado(datos, evento.timestamp)
+            if fila is not None:
+                self.resultados_en_curso.append(fila)
+        self.audit_log_en_curso.append(self._decision_audit(evento.tipo_evento, datos, evento.timestamp))
+
     def _compilar_resultados_compatibles(self, all_events):
         """
         CORREGIDO: Lee la lista de eventos del motor y crea UNA entrada de resultado
@@ -680,106 +1108,112 @@ class MotorDeEventos:
         """
         resultados_individuales = []
 
-        # ✅ DIAGNÓSTICO TEMPORAL
-        self.logger.critical("=" * 80)
-        self.logger.critical(f"🔍 DEBUG _compilar_resultados_compatibles:")
-        self.logger.critical(f"  Total eventos recibidos: {len(all_events)}")
-
-        # Contar tipos de eventos
-        tipos_eventos = {}
-        for ev in all_events:
-            tipo = ev.get('tipo_evento', 'DESCONOCIDO')
-            tipos_eventos[tipo] = tipos_eventos.get(tipo, 0) + 1
-
-        self.logger.critical(f"  Tipos de eventos encontrados:")
-        for tipo, cantidad in tipos_eventos.items():
-            self.logger.critical(f"    - {tipo}: {cantidad}")
-
-        # Mostrar los primeros 3 eventos como ejemplo
-        self.logger.critical(f"  Muestra de primeros 3 eventos:")
-        for i, ev in enumerate(all_events[:3]):
-            self.logger.critical(f"    Evento {i}: {ev}")
-        self.logger.critical("=" * 80)
-        # FIN DIAGNÓSTICO
+        # Diagnóstico: recuento por tipo (sólo si la categoría está activa, recorre todos los eventos)
+        if self.traza.activa('resultados'):
+            tipos_eventos = {}
+            for ev in all_events:
+                tipo = ev.get('tipo_evento', 'DESCONOCIDO')
+                tipos_eventos[tipo] = tipos_eventos.get(tipo, 0) + 1
+            self.traza('resultados', "Compilando %d eventos. Tipos: %s", len(all_events), tipos_eventos)
 
         # --- PASO 1: Recopilar todos los eventos de fin de unidad ---
         for evento in all_events:
             if evento['tipo_evento'] != 'FIN_BLOQUE_TRABAJO':
                 continue
-
-            datos = evento.get('datos', {})
-            tarea_id = datos.get('tarea_id')
-
-            if not tarea_id or tarea_id not in self.lineas_temporales:
-                self.logger.warning(f"Evento de fin sin tarea válida: tarea_id={tarea_id}")
-                continue
-
-            linea_temporal = self.lineas_temporales[tarea_id]
-            task_info = linea_temporal.task_data  # Accedemos a los datos originales de la tarea
-            numero_unidad = datos.get('numero_unidad', datos.get('unidad', 1))
-            inicio_bloque = datos.get('inicio')
-            fin_bloque = evento.get('timestamp')
-
-            if isinstance(inicio_bloque, str):
-                try:
-                    inicio_bloque = datetime.fromisoformat(inicio_bloque)
-                except (ValueError, AttributeError):
-                    inicio_bloque = None
-
-            # ✅ CORRECCIÓN 1: Calcular duración REAL de trabajo
-            if inicio_bloque and fin_bloque:
+            resultado_unidad = self._fila_resultado(evento.get('datos', {}), evento.get('timestamp'))
+            if resultado_unidad is not None:
+                resultados_individuales.append(resultado_unidad)
+
+        return self._completar_resultados(resultados_individuales)
+
+    def _fila_resultado(self, datos: dict, fin_bloque: datetime) -> Optional[dict]:
+        """Fila de resultados de una unidad completada (None si la tarea no es válida)."""
+        tarea_id = datos.get('tarea_id')
+
+        if not tarea_id or tarea_id not in self.lineas_temporales:
+            self.logger.warning(f"Evento de fin sin tarea válida: tarea_id={tarea_id}")
+            return None
+
+        linea_temporal = self.lineas_temporales[tarea_id]
+        task_info = linea_temporal.task_data  # Accedemos a los datos originales de la tarea
+        numero_unidad = datos.get('numero_unidad', datos.get('unidad', 1))
+        inicio_bloque = datos.get('inicio')
+
+        if isinstance(inicio_bloque, str):
+            try:
+                inicio_bloque = datetime.fromisoformat(inicio_bloque)
+            except (ValueError, AttributeError):
+                inicio_bloque = None
+
+        # ✅ CORRECCIÓN 1: Calcular duración REAL de trabajo
+        if inicio_bloque and fin_bloque:
+            minutos_hasta_instante = self._minutos_hasta_instante
+            if minutos_hasta_instante is not None and fin_bloque == self.tiempo_actual:
+                duracion_min = minutos_hasta_instante.get(inicio_bloque)
+                if duracion_min is None:
+                    duracion_min = minutos_hasta_instante[inicio_bloque] = \
+                        self.calculador_tiempos.calculate_work_minutes_between(inicio_bloque, fin_bloque)
+            else:
                 duracion_min = self.calculador_tiempos.calculate_work_minutes_between(
                     inicio_bloque, fin_bloque
                 )
-            else:
-                duracion_min = 0.0
-
-            trabajadores = datos.get('trabajadores', [])
-            # Usamos el nombre base de la tarea (sin el "Unidad X") para Tarea
-            nombre_base_tarea = task_info.get('name', 'Tarea Desconocida')
-            # Creamos un nombre más descriptivo para el log/detalle si fuera necesario
-            nombre_completo_unidad = f"{nombre_base_tarea} - Unidad {numero_unidad}"
-
-            product_info = task_info.get('original_product_info', {})
-
-            # ✅ CORRECCIÓN 2: Extraer de forma robusta el código y la descripción del producto origen
-            product_desc = product_info.get('desc', task_info.get('product_desc', 'N/A'))
-            product_code = task_info.get('original_product_code', task_info.get('product_code', 'N/A'))
-
-            # --- 👇 INICIO DE LA MODIFICACIÓN IMPORTANTE 👇 ---
-            # Recuperamos el fabricacion_id (identificador del lote) desde task_info
-            identificador_lote = task_info.get('fabricacion_id', 'N/A')
-            # --- 👆 FIN DE LA MODIFICACIÓN IMPORTANTE 👆 ---
-
-            resultado_unidad = {
-                # Mantenemos 'Tarea' con el nombre base para agrupar en el Excel si se desea
-                'Tarea': nombre_base_tarea,
-                # Añadimos un campo más específico si es necesario para depuración
-                'TareaDetalle': nombre_completo_unidad,
-                'Departamento': task_info.get('department', 'N/A'),
-                'Inicio': inicio_bloque,
-                'Fin': fin_bloque,
-                'Duracion (min)': round(duracion_min, 2),
-                'Trabajador Asignado': ', '.join(trabajadores) if trabajadores else 'Sin asignar',
-                'Lista Trabajadores': trabajadores,
-                'nombre_maquina': datos.get('maquina_id') or task_info.get('machine_id') or 'N/A',
-                'Codigo Producto': product_code,
-                'Descripcion Producto': product_desc,
-                'Numero Unidad': numero_unidad,
-                # --- 👇 INCLUSIÓN DEL NUEVO DATO 👇 ---
-                'fabricacion_id': identificador_lote,  # Se añade la clave y el valor
-                # --- 👆 FIN INCLUSIÓN 👆 ---
-                'Index': self.tarea_id_a_indice.get(tarea_id),  # Índice original en production_flow
-                'Parent Index': task_info.get('previous_task_index'),  # Índice del predecesor
-            }
-            # --- 👇 LÍNEA DE DEPURACIÓN A AÑADIR 👇 ---
-            self.logger.critical(f"DEBUG: Contenido de resultado_unidad antes de añadir: {resultado_unidad}")
-            # --- 👆 FIN LÍNEA DE DEPURACIÓN 👆 ---
-            resultados_individuales.append(resultado_unidad)
+        else:
+            duracion_min = 0.0
+
+        # Copia: la lista del evento puede seguir cambiando después de compilar la fila
+        trabajadores = list(datos.get('trabajadores', []))
+        # Usamos el nombre base de la tarea (sin el "Unidad X") para Tarea
+        nombre_base_tarea = task_info.get('name', 'Tarea Desconocida')
+        # Creamos un nombre más descriptivo para el log/detalle si fuera necesario
+        nombre_completo_unidad = f"{nombre_base_tarea} - Unidad {numero_unidad}"
+
+        product_info = task_info.get('original_product_info', {})
+
+        # ✅ CORRECCIÓN 2: Extraer de forma robusta el código y la descripción del producto origen
+        product_desc = product_info.get('desc', task_info.get('product_desc', 'N/A'))
+        product_code = task_info.get('original_product_code', task_info.get('product_code', 'N/A'))
+
+        # --- 👇 INICIO DE LA MODIFICACIÓN IMPORTANTE 👇 ---
+        # Recuperamos el fabricacion_id (identificador del lote) desde task_info
+        identificador_lote = task_info.get('fabricacion_id', 'N/A')
+        # --- 👆 FIN DE LA MODIFICACIÓN IMPORTANTE 👆 ---
+
+        resultado_unidad = {
+            # Mantenemos 'Tarea' con el nombre base para agrupar en el Excel si se desea
+            'Tarea': nombre_base_tarea,
+            # Añadimos un campo más específico si es necesario para depuración
+            'TareaDetalle': nombre_completo_unidad,
+            'Departamento': task_info.get('department', 'N/A'),
+            'Inicio': inicio_bloque,
+            'Fin': fin_bloque,
+            'Duracion (min)': round(duracion_min, 2),
+            'Trabajador Asignado': ', '.join(trabajadores) if trabajadores else 'Sin asignar',
+            'Lista Trabajadores': trabajadores,
+            'nombre_maquina': datos.get('maquina_id') or task_info.get('machine_id') or 'N/A',
+            'Codigo Producto': product_code,
+            'Descripcion Producto': product_desc,
+            'Numero Unidad': numero_unidad,
+            # --- 👇 INCLUSIÓN DEL NUEVO DATO 👇 ---
+            'fabricacion_id': identificador_lote,  # Se añade la clave y el valor
+            # --- 👆 FIN INCLUSIÓN 👆 ---
+            'Index': self.tarea_id_a_indice.get(tarea_id),  # Índice original en production_flow
+            'Parent Index': self.grafo_dependencias.indice_predecesor(tarea_id),  # Índice del predecesor
+        }
+        self.traza('resultados', "resultado_unidad: %s", resultado_unidad)
+        return resultado_unidad
 
+    def _completar_resultados(self, resultados_individuales: List[dict]) -> List[dict]:
+        """
+        Ordena las filas por fin de unidad y añade las columnas que dependen del
+        conjunto completo (fecha de inicio global, 'Día X', días laborables).
+        """
         if not resultados_individuales:
             return []
 
+        # El orden estable por fin conserva el orden de procesamiento en los empates.
+        # Se trabaja sobre copias: las filas acumuladas se comparten con las instantáneas.
+        resultados_individuales = sorted((dict(r) for r in resultados_individuales), key=lambda r: r['Fin'])
+
         # --- PASO 2: Encontrar la fecha de inicio global (sin cambios) ---
         fecha_inicio_simulacion_valida = [r['Inicio'] for r in resultados_individuales if r['Inicio']]
         if not fecha_inicio_simulacion_valida:
@@ -824,44 +1258,50 @@ class MotorDeEventos:
         Genera descripciones específicas por tipo de evento con iconos y status apropiados.
         MODIFICADO: Ahora incluye también los eventos del audit_log_interno (como TIEMPO_INACTIVO).
         """
-        audit_log = []
+        audit_log = [
+            self._decision_audit(evento.get('tipo_evento', 'DESCONOCIDO'), evento.get('datos', {}),
+                                 evento.get('timestamp'))
+            for evento in all_events
+        ]
+        return self._cerrar_audit_log(audit_log)
+
+    def _decision_audit(self, tipo_evento: str, datos: dict, timestamp: datetime) -> CalculationDecision:
+        """Entrada del audit log correspondiente a un evento procesado."""
+        # Extraer el ID de la tarea de los datos del evento
+        tarea_id = datos.get('tarea_id')
+        task_info = {'name': 'Tarea Desconocida', 'product_code': 'N/A', 'product_desc': 'N/A'}
+
+        # Buscar la información de la tarea en las líneas temporales
+        if tarea_id and tarea_id in self.lineas_temporales:
+            original_task_data = self.lineas_temporales[tarea_id].task_data
+            task_info = {
+                'name': original_task_data.get('name', 'N/A'),
+                'product_code': original_task_data.get('original_product_code', 'N/A'),
+                'product_desc': original_task_data.get('original_product_info', {}).get('desc', 'N/A')
+            }
 
-        # Primero, compilar los eventos estándar desde all_events
-        for evento in all_events:
-            tipo_evento = evento.get('tipo_evento', 'DESCONOCIDO')
-            datos = evento.get('datos', {})
-            timestamp = evento.get('timestamp')
-
-            # Extraer el ID de la tarea de los datos del evento
-            tarea_id = datos.get('tarea_id')
-            task_info = {'name': 'Tarea Desconocida', 'product_code': 'N/A', 'product_desc': 'N/A'}
-
-            # Buscar la información de la tarea en las líneas temporales
-            if tarea_id and tarea_id in self.lineas_temporales:
-                original_task_data = self.lineas_temporales[tarea_id].task_data
-                task_info = {
-                    'name': original_task_data.get('name', 'N/A'),
-                    'product_code': original_task_data.get('original_product_code', 'N/A'),
-                    'product_desc': original_task_data.get('original_product_info', {}).get('desc', 'N/A')
-                }
-
-            # ✅ NUEVO: Generar descripción específica según el tipo de evento
-            reason, user_friendly_reason, icon, status = self._generar_descripcion_evento(
-                tipo_evento, datos, task_info
-            )
+        # ✅ NUEVO: Generar descripción específica según el tipo de evento
+        reason, user_friendly_reason, icon, status = self._generar_descripcion_evento(
+            tipo_evento, datos, task_info
+        )
 
-            decision = CalculationDecision(
-                timestamp=timestamp,
-                decision_type=tipo_evento,
-                reason=reason,
-                user_friendly_reason=user_friendly_reason,
-                task_name=task_info.get('name', 'N/A'),
-                product_code=task_info.get('product_code', 'N/A'),
-                product_desc=task_info.get('product_desc', 'N/A'),
-                status=status,
-                icon=icon
-            )
-            audit_log.append(decision)
+        decision = CalculationDecision(
+            timestamp=timestamp,
+            decision_type=tipo_evento,
+            reason=reason,
+            user_friendly_reason=user_friendly_reason,
+            task_name=task_info.get('name', 'N/A'),
+            product_code=task_info.get('product_code', 'N/A'),
+            product_desc=task_info.get('product_desc', 'N/A'),
+            status=status,
+            icon=icon
+        )
+        return decision
+
+    def _cerrar_audit_log(self, audit_log: List[CalculationDecision]) -> List[CalculationDecision]:
+        """Añade el audit_log_interno a las entradas estándar y lo ordena cronológicamente."""
+        audit_log = list(audit_log)
+        num_estandar = len(audit_log)
 
         # ✅ NUEVO: Añadir los eventos del audit_log_interno (TIEMPO_INACTIVO, etc.)
         if hasattr(self, 'audit_log_interno') and self.audit_log_interno:
@@ -875,7 +1315,7 @@ class MotorDeEventos:
 
         self.logger.info(
             f"📋 Audit log compilado: {len(audit_log)} eventos registrados "
-            f"({len(all_events)} estándar + "
+            f"({num_estandar} estándar + "
             f"{len(self.audit_log_interno) if hasattr(self, 'audit_log_interno') else 0} internos)"
         )
         return audit_log
@@ -1003,4 +1443,105 @@ class MotorDeEventos:
             reason = f"Evento '{tipo_evento}': {datos}"
             user_friendly_reason = f"Evento de tipo '{tipo_evento}' procesado"
             icon = "⚙️"
-            return reason, user_friendly_reason, icon, DecisionStatus.NEUTRAL
\ No newline at end of file
+            return reason, user_friendly_reason, icon, DecisionStatus.NEUTRAL
+
+
+class InstantaneaMotor:
+    """
+    Estado de un MotorDeEventos en un instante de la simulación.
+
+    Permite simular una sola vez el tramo común y ramificar desde ahí varios
+    escenarios independientes:
+
+        motor.avanzar_hasta(T)
+        base = motor.instantanea()
+        a = base.bifurcar(); a.reasignar_trabajador('Ana', 'montaje')
+        b = base.bifurcar(); b.bloquear_recurso(3)
+        resultados_a, resultados_b = a.ejecutar_simulacion(), b.ejecutar_simulacion()
+
+    El estado mutable (cola de eventos, líneas temporales, calendarios de
+    recursos, contadores) se guarda serializado con pickle, que es bastante más
+    rápido que copy.deepcopy, y cada bifurcar() lo reconstruye: lo que se haga
+    después con el motor original o con las bifurcaciones no altera la
+    instantánea. Las listas que el motor sólo amplía (resultados y audit log
+    acumulados) no se serializan: se guarda su longitud y la bifurcación recibe
+    una copia de ese prefijo.
+
+    Se comparten, porque no cambian durante la simulación, el flujo de
+    producción, el calculador de tiempos, el reloj, los plazos, la traza y el
+    callback de progreso. El diálogo visual y el registro de eventos no pasan a
+    las bifurcaciones: los escenarios no deben pintar ni escribir sobre la
+    simulación original.
+    """
+
+    # Listas del motor en las que sólo se añaden elementos
+    LISTAS_ACUMULADAS = ('resultados_en_curso', 'audit_log_en_curso', 'audit_log_interno')
+
+    def __init__(self, motor: MotorDeEventos):
+        self.instante = motor.tiempo_actual
+        self.eventos_procesados = motor.eventos_procesados
+        # Flujo con el que se simuló hasta aquí (el motor no lo modifica)
+        self.production_flow = motor.production_flow
+
+        self._compartidos = {
+            'production_flow': motor.production_flow,
+            'calculador_tiempos': motor.calculador_tiempos,
+            'reloj': motor.reloj,
+            'plazos': motor.plazos,
+            'traza': motor.traza,
+            'al_progresar': motor.al_progresar,
+        }
+        self._prefijos = {nombre: (getattr(motor, nombre), len(getattr(motor, nombre)))
+                          for nombre in self.LISTAS_ACUMULADAS}
+
+        claves = {id(obj): clave for clave, obj in self._compartidos.items() if obj is not None}
+        claves.update({id(lista): nombre for nombre, (lista, _) in self._prefijos.items()})
+        # Cada bifurcación tiene sus propios locks y empieza sin instantáneas
+        claves[id(motor.lock)] = claves[id(motor.gestor_recursos.lock)] = '<lock>'
+        claves[id(motor.instantaneas)] = '<lista vacia>'
+        for excluido in (motor.visual_dialog_reference, motor.registro_temporal):
+            if excluido is not None:
+                claves[id(excluido)] = '<ninguno>'
+
+        buffer = io.BytesIO()
+        _Congelador(buffer, claves).dump(motor)
+        self._estado = buffer.getvalue()
+
+    def bifurcar(self) -> MotorDeEventos:
+        motor = _Descongelador(io.BytesIO(self._estado), self._resolver).load()
+        # El índice secundario identifica los eventos por id(): se regenera con los eventos copiados
+        motor.indice_eventos.reconstruir(motor.eventos_futuros)
+        return motor
+
+    def _resolver(self, clave):
+        if clave == '<lock>':
+            return Lock()
+        if clave == '<lista vacia>':
+            return []
+        if clave == '<ninguno>':
+            return None
+        if clave in self._prefijos:
+            lista, longitud = self._prefijos[clave]
+            return lista[:longitud]
+        return self._compartidos[clave]
+
+
+class _Congelador(pickle.Pickler):
+    """Pickler que sustituye los objetos compartidos por una clave (ver InstantaneaMotor)."""
+
+    def __init__(self, archivo, claves: Dict[int, str]):
+        super().__init__(archivo, protocol=pickle.HIGHEST_PROTOCOL)
+        self._claves = claves
+
+    def persistent_id(self, obj):
+        return self._claves.get(id(obj))
+
+
+class _Descongelador(pickle.Unpickler):
+
+    def __init__(self, archivo, resolver: Callable[[str], object]):
+        super().__init__(archivo)
+        self._resolver = resolver
+
+    def persistent_load(self, clave):
+        return self._resolver(clave)
\ No newline at end of file
@@ -0,0 +1,226 @@
+# event_index.py
+import math
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from simulation_events import EventoDeSimulacion, EventoInicioUnidad, EventoFinUnidad
+
+
+class IndiceEventosFuturos:
+    """
+    Índice secundario de los eventos vivos (no cancelados) de la cola del motor.
+
+    El heap 'eventos_futuros' sólo permite extraer el mínimo; cualquier pregunta
+    del tipo "¿ya está programada la unidad N de esta tarea?" obligaba a recorrerlo
+    entero. Este índice se mantiene sincronizado con el heap (programar, cancelar
+    y extraer) y responde esas preguntas en tiempo constante.
+
+    Los eventos se identifican por id() porque los dataclasses de eventos no son
+    hashables.
+    """
+
+    def __init__(self):
+        # id(evento) -> evento, para todos los eventos vivos
+        self._vivos: Dict[int, EventoDeSimulacion] = {}
+        # (tarea_id, unidad) -> {id_instancia: nº de eventos}. Sólo inicio/fin de unidad.
+        self._por_unidad: Dict[Tuple[Any, Any], Dict[Optional[str], int]] = {}
+        # tarea_id -> {unidad: nº de eventos} de unidades en proceso o programadas
+        self._unidades_por_tarea: Dict[Any, Dict[Any, int]] = {}
+        # tipo_evento -> {id(evento): evento}
+        self._por_tipo: Dict[str, Dict[int, EventoDeSimulacion]] = {}
+
+    def __len__(self) -> int:
+        return len(self._vivos)
+
+    def __contains__(self, evento: EventoDeSimulacion) -> bool:
+        return id(evento) in self._vivos
+
+    # ------------------------------------------------------------------
+    # Claves derivadas de un evento
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _clave_unidad(evento: EventoDeSimulacion) -> Optional[Tuple[Any, Any]]:
+        """Clave (tarea_id, unidad) usada para detectar eventos duplicados."""
+        if isinstance(evento, EventoInicioUnidad):
+            return evento.tarea_id, evento.unidad
+        if isinstance(evento, EventoFinUnidad):
+            # Igual que el recorrido original: un fin no expone 'unidad' (usa 'numero_unidad')
+            return evento.tarea_id, None
+        return None
+
+    @staticmethod
+    def _unidad_programada(evento: EventoDeSimulacion):
+        """
+        Devuelve (tarea_id, unidad) si el evento ocupa una unidad de su tarea
+        (inicio programado o fin de bloque con número de unidad), o None.
+        """
+        if evento.tipo_evento == 'INICIO_UNIDAD' or (
+                evento.tipo_evento == 'FIN_BLOQUE_TRABAJO' and evento.unidad):
+            return evento.tarea_id, evento.unidad
+        return None
+
+    # ------------------------------------------------------------------
+    # Mantenimiento
+    # ------------------------------------------------------------------
+
+    def registrar(self, evento: EventoDeSimulacion):
+        """Añade un evento recién programado. Los cancelados no se indexan."""
+        clave_id = id(evento)
+        if evento.cancelado or clave_id in self._vivos:
+            return
+        self._vivos[clave_id] = evento
+
+        clave = self._clave_unidad(evento)
+        if clave is not None:
+            instancias = self._por_unidad.setdefault(clave, {})
+            id_instancia = evento.id_instancia
+            instancias[id_instancia] = instancias.get(id_instancia, 0) + 1
+
+        programada = self._unidad_programada(evento)
+        if programada is not None:
+            tarea_id, unidad = programada
+            unidades = self._unidades_por_tarea.setdefault(tarea_id, {})
+            unidades[unidad] = unidades.get(unidad, 0) + 1
+
+        self._por_tipo.setdefault(evento.tipo_evento, {})[clave_id] = evento
+
+    def retirar(self, evento: EventoDeSimulacion):
+        """Quita un evento extraído o cancelado. Es idempotente."""
+        clave_id = id(evento)
+        if self._vivos.pop(clave_id, None) is None:
+            return
+
+        clave = self._clave_unidad(evento)
+        if clave is not None:
+            instancias = self._por_unidad.get(clave)
+            if instancias is not None:
+                id_instancia = evento.id_instancia
+                restantes = instancias.get(id_instancia, 0) - 1
+                if restantes > 0:
+                    instancias[id_instancia] = restantes
+                else:
+                    instancias.pop(id_instancia, None)
+                if not instancias:
+                    del self._por_unidad[clave]
+
+        programada = self._unidad_programada(evento)
+        if programada is not None:
+            tarea_id, unidad = programada
+            unidades = self._unidades_por_tarea.get(tarea_id)
+            if unidades is not None:
+                restantes = unidades.get(unidad, 0) - 1
+                if restantes > 0:
+                    unidades[unidad] = restantes
+                else:
+                    unidades.pop(unidad, None)
+                if not unidades:
+                    del self._unidades_por_tarea[tarea_id]
+
+        por_tipo = self._por_tipo.get(evento.tipo_evento)
+        if por_tipo is not None:
+            por_tipo.pop(clave_id, None)
+
+    def reconstruir(self, eventos_futuros: List[Tuple]):
+        """Regenera el índice a partir de las entradas (timestamp, contador, evento) del heap."""
+        self.__init__()
+        for _, _, evento in eventos_futuros:
+            self.registrar(evento)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def tiene_unidad(self, tarea_id: str, numero_unidad: int,
+                     id_instancia: Optional[str] = None) -> bool:
+        """True si hay un inicio/fin vivo para esa unidad (y esa instancia, si se indica)."""
+        instancias = self._por_unidad.get((tarea_id, numero_unidad))
+        if not instancias:
+            return False
+        if id_instancia:
+            return id_instancia in instancias
+        return True
+
+    def unidades_programadas(self, tarea_id: str) -> set:
+        """Unidades de una tarea con un inicio programado o un fin de bloque pendiente."""
+        return set(self._unidades_por_tarea.get(tarea_id, ()))
+
+    def eventos_de_tipo(self, tipo_evento: str) -> List[EventoDeSimulacion]:
+        """Eventos vivos de un tipo, en orden de programación."""
+        return list(self._por_tipo.get(tipo_evento, {}).values())
+
+    def contar_por_tipo(self, tipo_evento: str) -> int:
+        return len(self._por_tipo.get(tipo_evento, ()))
+
+
+class FinalizacionesPendientes:
+    """
+    Fines de bloque (FIN_BLOQUE_TRABAJO) que siguen en la cola del motor,
+    agrupados por tarea y ordenados por (tics, contador): el mismo orden en que
+    saldrán del heap.
+
+    Responde "¿cuándo termina la próxima unidad de esta tarea?" con una búsqueda
+    binaria, en lugar de ordenar la cola entera cada vez que se registra un
+    tiempo inactivo. Los eventos cancelados se retiran al cancelarse.
+    """
+
+    TIPO = 'FIN_BLOQUE_TRABAJO'
+
+    def __init__(self):
+        # tarea_id -> [(tics, contador, evento)] ordenada
+        self._por_tarea: Dict[Any, List[Tuple[int, int, EventoDeSimulacion]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(pendientes) for pendientes in self._por_tarea.values())
+
+    def programar(self, tics: int, contador: int, evento: EventoDeSimulacion):
+        """Añade un evento recién programado. Los cancelados no se indexan."""
+        if evento.tipo_evento == self.TIPO and not evento.cancelado:
+            # El contador es único: la comparación nunca llega al evento
+            insort(self._por_tarea.setdefault(evento.tarea_id, []), (tics, contador, evento))
+
+    def extraer(self, tics: int, contador: int, evento: EventoDeSimulacion):
+        """El evento ha salido del heap. Al salir en orden, es el primero de su tarea."""
+        if evento.tipo_evento != self.TIPO:
+            return
+        pendientes = self._por_tarea.get(evento.tarea_id)
+        if not pendientes:
+            return
+        if pendientes[0][1] == contador:
+            del pendientes[0]
+        else:
+            posicion = bisect_right(pendientes, (tics, contador - 0.5))
+            if posicion < len(pendientes) and pendientes[posicion][1] == contador:
+                del pendientes[posicion]
+        if not pendientes:
+            del self._por_tarea[evento.tarea_id]
+
+    def retirar(self, evento: EventoDeSimulacion):
+        """Quita un evento cancelado antes de salir del heap. Es idempotente."""
+        pendientes = self._por_tarea.get(evento.tarea_id) if evento.tipo_evento == self.TIPO else None
+        if not pendientes or evento.tics is None:
+            return
+        # El evento no guarda su contador: se busca por tics y se desempata por identidad
+        posicion = bisect_left(pendientes, (evento.tics,))
+        while posicion < len(pendientes) and pendientes[posicion][0] == evento.tics:
+            if pendientes[posicion][2] is evento:
+                del pendientes[posicion]
+                break
+            posicion += 1
+        if not pendientes:
+            del self._por_tarea[evento.tarea_id]
+
+    def siguiente(self, tarea_id, despues_de: int) -> Optional[EventoDeSimulacion]:
+        """Primer fin de bloque de la tarea con tics estrictamente posteriores a 'despues_de'."""
+        pendientes = self._por_tarea.get(tarea_id)
+        if not pendientes:
+            return None
+        posicion = bisect_right(pendientes, (despues_de, math.inf))
+        return pendientes[posicion][2] if posicion < len(pendientes) else None
+
+    def reconstruir(self, eventos_futuros: List[Tuple]):
+        """Regenera el índice a partir de las entradas (tics, contador, evento) del heap."""
+        self._por_tarea = {}
+        for tics, contador, evento in sorted(eventos_futuros, key=lambda entrada: entrada[:2]):
+            if evento.tipo_evento == self.TIPO and not evento.cancelado:
+                self._por_tarea.setdefault(evento.tarea_id, []).append((tics, contador, evento))
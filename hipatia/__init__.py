@@ -0,0 +1,30 @@
+# =================================================================================
+# hipatia/__init__.py
+# Núcleo de simulación sin interfaz gráfica - Exporta las clases públicas.
+# =================================================================================
+"""
+Punto de entrada del núcleo de simulación. Nada de lo que se importa aquí
+depende de PyQt6, así que puede usarse en procesos de trabajo, scripts por
+lotes o la línea de comandos sin cargar Qt.
+
+El progreso se comunica con callbacks normales (al_progresar, al_terminar);
+los adaptadores a señales de Qt viven en la capa de UI
+(controllers/simulation_worker.py).
+"""
+
+from event_engine import MotorDeEventos
+from simulation_adapter import AdaptadorScheduler
+from time_calculator import CalculadorDeTiempos
+from resource_manager import GestorDeRecursos
+from simulation_engine import Optimizer
+from optimizer_pool import EvaluadorCandidatos, simular_candidato
+
+__all__ = [
+    'MotorDeEventos',
+    'AdaptadorScheduler',
+    'CalculadorDeTiempos',
+    'GestorDeRecursos',
+    'Optimizer',
+    'EvaluadorCandidatos',
+    'simular_candidato',
+]
@@ -0,0 +1,259 @@
+# hipatia/simulate.py
+"""
+Simulación por lotes desde la línea de comandos, sin interfaz gráfica.
+
+    python -m hipatia.simulate --pila 12 --pila 15 --db montaje.db --out resultados.parquet
+
+Carga cada Pila guardada con PilaRepository.load_pila, la simula con
+MotorDeEventos (a través de AdaptadorScheduler) y escribe en formato columnar
+los resultados de todas las pilas en '--out' y la auditoría en
+'<out>_audit.<ext>'. Ambas tablas llevan una columna 'pila_id'.
+
+Con '--replicas N' se añade el modo Monte Carlo: cada pila se simula N veces
+con duraciones por unidad ajustadas al historial de tiempos reales y el fin de
+cada lote (P50, P90 y fracción de réplicas en que no termina) se escribe en
+'<out>_montecarlo.<ext>'.
+
+Pensado para replanificar por la noche todas las pilas abiertas desde cron.
+"""
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from database.database_manager import DatabaseManager
+from monte_carlo import ResultadoMonteCarlo, distribuciones_del_flujo, simular_monte_carlo
+from optimizer_pool import EvaluadorCandidatos, simular_candidato
+from schedule_config import ScheduleConfig
+
+# Extensión de '--out' -> escritor de pandas. Parquet necesita pyarrow;
+# CSV queda como alternativa sin dependencias adicionales.
+FORMATOS = {
+    '.parquet': 'to_parquet',
+    '.csv': 'to_csv',
+}
+
+logger = logging.getLogger('hipatia.simulate')
+
+
+def asignar_trabajadores_por_defecto(production_flow: List[Dict], workers: List) -> List[Dict]:
+    """
+    Asigna a los pasos sin trabajadores el de mayor nivel que cumpla el
+    'required_skill_level' de la tarea, igual que el editor visual al calcular.
+    """
+    sorted_workers = sorted(workers, key=lambda w: w.tipo_trabajador, reverse=True)
+    for step in production_flow:
+        if step.get('workers'):
+            continue
+        required_skill = step.get('task', {}).get('required_skill_level', 1)
+        assigned_worker = next((w for w in sorted_workers if w.tipo_trabajador >= required_skill), None)
+        step['workers'] = [{'name': assigned_worker.nombre_completo}] if assigned_worker else []
+    return production_flow
+
+
+def cargar_candidatos(db_manager: DatabaseManager, pila_ids: Sequence[int]) -> Tuple[Dict[int, Tuple], List[int]]:
+    """
+    Lee de la BD todo lo necesario para simular cada pila.
+
+    Returns:
+        ({pila_id: (production_flow, workers, machines)}, pilas que no se pudieron cargar)
+    """
+    workers = db_manager.worker_repo.get_all_workers(include_inactive=False)
+    worker_names_and_skills = [(w.nombre_completo, w.tipo_trabajador) for w in workers]
+    machines_dict = {m.id: m.nombre for m in db_manager.machine_repo.get_all_machines(include_inactive=False)}
+
+    candidatos, fallidas = {}, []
+    for pila_id in pila_ids:
+        _, _, production_flow, _ = db_manager.pila_repo.load_pila(pila_id)
+        if not production_flow:
+            logger.error(f"La pila {pila_id} no existe o no tiene flujo de producción.")
+            fallidas.append(pila_id)
+            continue
+        production_flow = asignar_trabajadores_por_defecto(production_flow, workers)
+        candidatos[pila_id] = (production_flow, worker_names_and_skills, machines_dict)
+    return candidatos, fallidas
+
+
+def simular_pilas(candidatos: Dict[int, Tuple], schedule_config, start_date: datetime,
+                  procesos: int = 1) -> Tuple[Dict[int, Tuple[List[Dict], List[Any]]], List[int]]:
+    """
+    Simula cada pila (en paralelo si procesos > 1). Con una sola pila, los
+    procesos se usan para sus cadenas independientes. Una pila cuya simulación
+    falla se registra en el log y no detiene las demás.
+
+    Returns:
+        ({pila_id: (results, audit)}, pilas cuya simulación falló)
+    """
+    simulaciones, fallidas = {}, []
+
+    def al_fallar(pila_id, error):
+        logger.error(f"La simulación de la pila {pila_id} falló: {error}", exc_info=error)
+        fallidas.append(pila_id)
+
+    if procesos > 1 and len(candidatos) > 1:
+        with EvaluadorCandidatos(max_procesos=procesos) as evaluador:
+            for pila_id, results, audit in evaluador.evaluar(candidatos, schedule_config, start_date,
+                                                             al_fallar=al_fallar):
+                simulaciones[pila_id] = (results, audit)
+        return simulaciones, fallidas
+
+    for pila_id, (flow, workers, machines) in candidatos.items():
+        try:
+            simulaciones[pila_id] = simular_candidato(flow, workers, machines, schedule_config, start_date,
+                                                      max_procesos=procesos)
+        except Exception as e:
+            al_fallar(pila_id, e)
+    return simulaciones, fallidas
+
+
+def simular_pilas_monte_carlo(candidatos: Dict[int, Tuple], historial: Dict, schedule_config,
+                              start_date: datetime, replicas: int,
+                              procesos: int = 1) -> Tuple[Dict[int, ResultadoMonteCarlo], List[int]]:
+    """
+    Modo Monte Carlo de cada pila: las duraciones se muestrean de las
+    distribuciones ajustadas a 'historial' (TrackingRepository.obtener_duraciones_historicas)
+    y las réplicas de cada pila se reparten entre 'procesos'. Como en
+    simular_pilas, una pila que falla no detiene las demás.
+
+    Returns:
+        ({pila_id: ResultadoMonteCarlo}, pilas cuya simulación falló)
+    """
+    resultados, fallidas = {}, []
+    for pila_id, (flow, workers, machines) in candidatos.items():
+        distribuciones = distribuciones_del_flujo(flow, historial)
+        logger.info(f"Monte Carlo de la pila {pila_id}: {len(distribuciones)} tarea(s) con duración aleatoria.")
+        try:
+            resultados[pila_id] = simular_monte_carlo(flow, workers, machines, schedule_config, start_date,
+                                                      distribuciones, replicas=replicas, procesos=procesos)
+        except Exception as e:
+            logger.error(f"El Monte Carlo de la pila {pila_id} falló: {e}", exc_info=e)
+            fallidas.append(pila_id)
+    return resultados, fallidas
+
+
+def fila_auditoria(decision) -> Dict[str, Any]:
+    """Una CalculationDecision como fila plana."""
+    return {
+        'timestamp': decision.timestamp,
+        'decision_type': decision.decision_type,
+        'reason': decision.reason,
+        'user_friendly_reason': decision.user_friendly_reason,
+        'task_name': decision.task_name,
+        'product_code': decision.product_code,
+        'product_desc': decision.product_desc,
+        'status': decision.status.value,
+        'icon': decision.icon,
+        'start_date': decision.start_date,
+        'end_date': decision.end_date,
+        'details': json.dumps(decision.details, default=str, ensure_ascii=False),
+    }
+
+
+def tabla(filas_por_pila: Dict[int, List[Dict]]) -> pd.DataFrame:
+    """
+    Une las filas de todas las pilas en un DataFrame con columna 'pila_id'.
+    Las columnas de objetos con tipos mezclados (listas, ids de máquina
+    numéricos o 'N/A'...) se pasan a texto para que el formato columnar las acepte.
+    """
+    filas = [{'pila_id': pila_id, **fila} for pila_id, lista in filas_por_pila.items() for fila in lista]
+    df = pd.DataFrame(filas)
+    for columna in df.columns[df.dtypes == object]:
+        valores = df[columna].dropna()
+        if not valores.map(lambda v: isinstance(v, str)).all():
+            df[columna] = df[columna].map(
+                lambda v: v if v is None or isinstance(v, str)
+                else json.dumps(v, default=str, ensure_ascii=False) if isinstance(v, (list, dict)) else str(v))
+    return df
+
+
+def escribir(df: pd.DataFrame, ruta: Path):
+    """Escribe la tabla con el formato que indica la extensión."""
+    escritor = FORMATOS[ruta.suffix.lower()]
+    try:
+        getattr(df, escritor)(ruta, index=False)
+    except ImportError as e:
+        raise ImportError(f"No se puede escribir {ruta.name}: {e}. Instala con: pip install pyarrow") from e
+
+
+def ruta_auditoria(out: Path) -> Path:
+    return out.with_name(f"{out.stem}_audit{out.suffix}")
+
+
+def ruta_monte_carlo(out: Path) -> Path:
+    return out.with_name(f"{out.stem}_montecarlo{out.suffix}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m hipatia.simulate',
+        description="Simula pilas de producción guardadas y escribe resultados y auditoría en formato columnar.")
+    parser.add_argument('--pila', dest='pilas', type=int, action='append', required=True,
+                        help="ID de la pila a simular (repetible para simular varias)")
+    parser.add_argument('--db', default='montaje.db', help="Ruta a la base de datos (por defecto: montaje.db)")
+    parser.add_argument('--out', required=True, type=Path,
+                        help=f"Fichero de resultados ({', '.join(FORMATOS)}); la auditoría va a <out>_audit")
+    parser.add_argument('--inicio', type=datetime.fromisoformat, default=None,
+                        help="Fecha de inicio ISO (AAAA-MM-DD[THH:MM]); por defecto, ahora")
+    parser.add_argument('--procesos', type=int, default=1, help="Procesos para simular varias pilas en paralelo "
+                             "(con una sola pila, sus cadenas independientes)")
+    parser.add_argument('--replicas', type=int, default=0,
+                        help="Réplicas del modo Monte Carlo por pila; el resumen va a <out>_montecarlo "
+                             "(por defecto, sin Monte Carlo)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log detallado")
+    args = parser.parse_args(argv)
+
+    if args.out.suffix.lower() not in FORMATOS:
+        parser.error(f"Formato de salida no soportado: '{args.out.suffix}'. Usa {', '.join(FORMATOS)}.")
+    if not Path(args.db).exists():
+        parser.error(f"No existe la base de datos: {args.db}")
+    if args.replicas < 0:
+        parser.error("--replicas no puede ser negativo.")
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    db_manager = DatabaseManager(db_path=args.db)
+    try:
+        schedule_config = ScheduleConfig(db_manager)
+        candidatos, fallidas = cargar_candidatos(db_manager, args.pilas)
+        historial = db_manager.tracking_repo.obtener_duraciones_historicas() if args.replicas else None
+    finally:
+        db_manager.close()
+
+    start_date = args.inicio or datetime.now()
+    simulaciones, fallos_simulacion = simular_pilas(candidatos, schedule_config, start_date, args.procesos)
+    fallidas += fallos_simulacion
+    # Mismo orden que en la línea de comandos, aunque terminen en otro orden
+    simulaciones = {pila_id: simulaciones[pila_id] for pila_id in args.pilas if pila_id in simulaciones}
+
+    escribir(tabla({pila_id: results for pila_id, (results, _) in simulaciones.items()}), args.out)
+    escribir(tabla({pila_id: [fila_auditoria(d) for d in audit] for pila_id, (_, audit) in simulaciones.items()}),
+             ruta_auditoria(args.out))
+
+    for pila_id, (results, _) in simulaciones.items():
+        fin = max((r['Fin'] for r in results), default=None)
+        print(f"Pila {pila_id}: {len(results)} unidades, fin {fin:%d/%m/%Y %H:%M}" if fin
+              else f"Pila {pila_id}: sin resultados")
+
+    if args.replicas:
+        monte_carlo, fallos_monte_carlo = simular_pilas_monte_carlo(
+            {pila_id: candidatos[pila_id] for pila_id in simulaciones}, historial, schedule_config, start_date,
+            args.replicas, args.procesos)
+        fallidas += fallos_monte_carlo
+        escribir(tabla({pila_id: resultado.resumen() for pila_id, resultado in monte_carlo.items()}),
+                 ruta_monte_carlo(args.out))
+        for pila_id, resultado in monte_carlo.items():
+            for fila in resultado.resumen():
+                p50, p90 = (f"{fila[p]:%d/%m/%Y %H:%M}" if fila[p] else "sin terminar" for p in ('P50', 'P90'))
+                print(f"Pila {pila_id}, lote {fila['fabricacion_id']}: P50 {p50}, P90 {p90}, "
+                      f"sin terminar en el {fila['Sin Terminar']:.0%} de {resultado.replicas} réplicas")
+    return 1 if fallidas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
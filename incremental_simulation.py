@@ -0,0 +1,164 @@
+# incremental_simulation.py
+import copy
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from event_engine import InstantaneaMotor, MotorDeEventos
+from simulation_cache import contexto_simulacion, forma_canonica
+
+# Instantáneas que se guardan por simulación cuando el intervalo es automático.
+# Más instantáneas reanudan más cerca de la edición pero cuestan memoria y tiempo
+# de copia. En la primera simulación aún no se sabe cuántos eventos tendrá.
+INSTANTANEAS_POR_SIMULACION = 8
+INTERVALO_MINIMO = 100
+INTERVALO_INICIAL = 500
+
+# Lo que se puede cambiar de un paso sin re-simular desde cero
+CAMPOS_PASO_EDITABLES = ('workers',)
+CAMPOS_TAREA_EDITABLES = ('duration',)
+
+
+def _sin_campos(datos: Dict, campos) -> Dict:
+    return {clave: valor for clave, valor in datos.items() if clave not in campos}
+
+
+def edicion_incremental(anterior: Dict, nuevo: Dict) -> bool:
+    """
+    True si el paso sólo cambia en duración o trabajadores y no es una raíz
+    ('is_cycle_start'): las raíces crean su instancia al generar los eventos
+    iniciales, antes de cualquier instantánea.
+    """
+    if nuevo.get('is_cycle_start'):
+        return False
+    if _sin_campos(anterior, CAMPOS_PASO_EDITABLES + ('task',)) != _sin_campos(nuevo, CAMPOS_PASO_EDITABLES + ('task',)):
+        return False
+    return (_sin_campos(anterior.get('task', {}), CAMPOS_TAREA_EDITABLES) ==
+            _sin_campos(nuevo.get('task', {}), CAMPOS_TAREA_EDITABLES))
+
+
+class SimulacionIncremental:
+    """
+    Re-simulación incremental para el editor visual.
+
+    Guarda el motor de la última simulación, con sus instantáneas periódicas y
+    el primer evento que tocó cada tarea. Si la siguiente simulación sólo cambia
+    la duración o los trabajadores de algunos pasos, se busca la instantánea más
+    reciente anterior a cualquier evento que pudiera leer esos pasos (el de la
+    propia tarea, el de su predecesora o el de un origen cíclico, y las
+    reasignaciones hacia ella), se sustituyen en ella las tareas editadas y se
+    simula sólo desde ahí. Todo lo anterior es idéntico a una simulación
+    completa, así que el resultado también lo es.
+
+    Cualquier otro cambio (trabajadores disponibles, máquinas, horario,
+    estructura del flujo...) simula desde cero.
+
+    Sin 'intervalo_instantaneas' el intervalo se ajusta tras cada simulación
+    para guardar unas INSTANTANEAS_POR_SIMULACION.
+    """
+
+    def __init__(self, intervalo_instantaneas: Optional[int] = None):
+        self._intervalo_fijo = intervalo_instantaneas
+        self.intervalo_instantaneas = intervalo_instantaneas or INTERVALO_INICIAL
+        self.logger = logging.getLogger(__name__)
+        self._motor_anterior: Optional[MotorDeEventos] = None
+        self._contexto_anterior = None
+        # Eventos de la última simulación que se reaprovecharon de la anterior
+        self.eventos_reutilizados = 0
+
+    def ejecutar(self, motor: MotorDeEventos, workers: List[Tuple[str, int]], machines: Dict,
+                 schedule_config, start_date, plazos: Dict = None) -> Tuple[List[Dict], List[Any]]:
+        """
+        Ejecuta 'motor' (recién creado, sin ejecutar) o, si se puede, continúa la
+        simulación anterior desde una instantánea. Devuelve (results, audit_log).
+        """
+        # El flujo se congela: el editor puede seguir modificando el suyo
+        motor.production_flow = copy.deepcopy(motor.production_flow)
+        contexto = repr(forma_canonica(
+            contexto_simulacion(motor.production_flow, workers, machines, schedule_config, start_date, plazos)))
+
+        ejecutado = None
+        if self._motor_anterior is not None and contexto == self._contexto_anterior:
+            ejecutado = self._reanudar(motor)
+        if ejecutado is None:
+            ejecutado = motor
+            self.eventos_reutilizados = 0
+
+        ejecutado.intervalo_instantaneas = self.intervalo_instantaneas
+        results, audit_log = ejecutado.ejecutar_simulacion()
+        self._motor_anterior, self._contexto_anterior = ejecutado, contexto
+        if self._intervalo_fijo is None:
+            self.intervalo_instantaneas = max(INTERVALO_MINIMO,
+                                              ejecutado.eventos_procesados // INSTANTANEAS_POR_SIMULACION)
+        return results, audit_log
+
+    def _reanudar(self, motor: MotorDeEventos) -> Optional[MotorDeEventos]:
+        anterior = self._motor_anterior
+        for instantanea in reversed(anterior.instantaneas):
+            cambiadas = self._tareas_cambiadas(instantanea, motor)
+            if cambiadas is None:
+                return None
+            if all(self._primer_contacto(anterior, tarea_id) > instantanea.eventos_procesados for tarea_id in cambiadas):
+                bifurcado = self._bifurcar_con_cambios(instantanea, motor, cambiadas)
+                if bifurcado is None:
+                    continue
+                self.eventos_reutilizados = instantanea.eventos_procesados
+                self.logger.info(
+                    f"Re-simulación incremental: {len(cambiadas)} tarea(s) editada(s), se reanuda tras "
+                    f"{instantanea.eventos_procesados} eventos ({instantanea.instante:%d/%m/%Y %H:%M}).")
+                return bifurcado
+        return None
+
+    @staticmethod
+    def _tareas_cambiadas(instantanea: InstantaneaMotor, motor: MotorDeEventos) -> Optional[Set[str]]:
+        """Tareas cuyo paso difiere entre la instantánea y el flujo nuevo (None si no es incremental)."""
+        flujo_anterior, flujo_nuevo = instantanea.production_flow, motor.production_flow
+        if len(flujo_anterior) != len(flujo_nuevo):
+            return None
+        cambiadas = set()
+        for i, (anterior, nuevo) in enumerate(zip(flujo_anterior, flujo_nuevo)):
+            if anterior == nuevo:
+                continue
+            tarea_id = motor.indice_a_tarea_id.get(i)
+            if tarea_id is None or not edicion_incremental(anterior, nuevo):
+                return None
+            cambiadas.add(tarea_id)
+        return cambiadas
+
+    @staticmethod
+    def _primer_contacto(motor: MotorDeEventos, tarea_id: str) -> float:
+        """
+        Número del primer evento que pudo leer la configuración de la tarea: uno
+        suyo, de su predecesora o de una tarea cuyo ciclo salta a ella.
+        """
+        grafo = motor.grafo_dependencias
+        influyentes = {tarea_id, grafo.predecesor(tarea_id), *grafo.origenes_ciclicos(tarea_id)}
+        return min((motor.primer_evento_por_tarea[t] for t in influyentes if t in motor.primer_evento_por_tarea),
+                   default=float('inf'))
+
+    def _bifurcar_con_cambios(self, instantanea: InstantaneaMotor, motor: MotorDeEventos,
+                              cambiadas: Set[str]) -> Optional[MotorDeEventos]:
+        bifurcado = instantanea.bifurcar()
+        for tarea_id in cambiadas:
+            linea = bifurcado.lineas_temporales.get(tarea_id)
+            if linea is None or linea.instancias or linea.unidades_finalizadas_total or linea.eventos_futuros:
+                # La tarea ya había empezado en la instantánea: no se puede sustituir
+                return None
+            # La línea nueva viene del motor recién creado, aún sin estado
+            nueva = motor.lineas_temporales[tarea_id]
+            nueva.gestor_recursos = bifurcado.gestor_recursos
+            nueva.calculador_tiempos = bifurcado.calculador_tiempos
+            nueva.traza = bifurcado.traza
+            bifurcado.lineas_temporales[tarea_id] = nueva
+
+        bifurcado.production_flow = motor.production_flow
+        # Las reglas de reasignación se compilan del flujo: las del motor nuevo incluyen las ediciones
+        bifurcado.reglas_reasignacion = motor.reglas_reasignacion
+        bifurcado.al_progresar = motor.al_progresar
+        bifurcado.visual_dialog_reference = motor.visual_dialog_reference
+        bifurcado.registro_temporal = motor.registro_temporal
+        if hasattr(motor, '_visual_updates_enabled'):
+            bifurcado._visual_updates_enabled = motor._visual_updates_enabled
+        # Las instantáneas hasta aquí siguen valiendo para la próxima edición
+        bifurcado.instantaneas = [anterior for anterior in self._motor_anterior.instantaneas
+                                  if anterior.eventos_procesados <= instantanea.eventos_procesados]
+        return bifurcado
@@ -0,0 +1,246 @@
+# monte_carlo.py
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from event_engine import MotorDeEventos, limite_de_plazo
+from optimizer_pool import ConfiguracionHorarioSerializable
+from time_calculator import CalculadorDeTiempos
+
+logger = logging.getLogger(__name__)
+
+REPLICAS_POR_DEFECTO = 200
+# Con menos duraciones registradas el ajuste es poco fiable y la tarea sigue siendo determinista
+MUESTRAS_MINIMAS_AJUSTE = 5
+
+
+@dataclass(frozen=True)
+class DistribucionTriangular:
+    """Duración por unidad (minutos) entre 'minimo' y 'maximo', con el valor más probable en 'moda'."""
+    minimo: float
+    moda: float
+    maximo: float
+
+    def muestrear(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        if self.maximo <= self.minimo:
+            return np.full(n, float(self.moda))
+        return rng.triangular(self.minimo, self.moda, self.maximo, n)
+
+
+@dataclass(frozen=True)
+class DistribucionLogNormal:
+    """
+    Duración por unidad (minutos) log-normal: el logaritmo sigue N(mu, sigma).
+    Los tiempos reales son positivos y con cola a la derecha (paradas,
+    retrabajos), que es justo lo que describe.
+    """
+    mu: float
+    sigma: float
+
+    @classmethod
+    def ajustar(cls, duraciones_minutos: Sequence[float]) -> 'DistribucionLogNormal':
+        """Ajuste por máxima verosimilitud (media y desviación de los logaritmos)."""
+        duraciones = np.asarray(duraciones_minutos, dtype=float)
+        logaritmos = np.log(duraciones[duraciones > 0])
+        if not len(logaritmos):
+            raise ValueError("Se necesita al menos una duración positiva para ajustar la distribución.")
+        sigma = float(logaritmos.std(ddof=1)) if len(logaritmos) > 1 else 0.0
+        return cls(float(logaritmos.mean()), sigma)
+
+    def muestrear(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.lognormal(self.mu, self.sigma, n)
+
+
+def distribuciones_del_flujo(production_flow: List[Dict], historial: Dict[str, Dict[str, List[int]]] = None,
+                             minimo_muestras: int = MUESTRAS_MINIMAS_AJUSTE) -> Dict[str, Any]:
+    """
+    Distribución de la duración por unidad de cada tarea ({tarea_id: distribución}):
+      - triangular si la tarea trae 'duration_min' y 'duration_max' (la moda es 'duration');
+      - si no, log-normal ajustada al historial (TrackingRepository.obtener_duraciones_historicas,
+        en segundos): primero los pasos con el nombre de la tarea y, si el producto
+        sólo tiene esa tarea en el flujo, los trabajos completos del producto.
+    Las tareas sin distribución conservan su duración fija.
+    """
+    historial = historial or {}
+    pasos, productos = historial.get('pasos', {}), historial.get('productos', {})
+
+    def codigo_producto(task: Dict):
+        return task.get('original_product_code', task.get('product_code'))
+
+    tareas_por_producto: Dict[Any, int] = {}
+    for step in production_flow:
+        codigo = codigo_producto(step.get('task', {}))
+        tareas_por_producto[codigo] = tareas_por_producto.get(codigo, 0) + 1
+
+    distribuciones = {}
+    for step in production_flow:
+        task = step.get('task', {})
+        tarea_id = task.get('id', 'task_sin_id')
+        if task.get('duration_min') is not None and task.get('duration_max') is not None:
+            distribuciones[tarea_id] = DistribucionTriangular(
+                task['duration_min'], task.get('duration', task['duration_min']), task['duration_max'])
+            continue
+        muestras = pasos.get(task.get('name'), [])
+        codigo = codigo_producto(task)
+        if len(muestras) < minimo_muestras and tareas_por_producto.get(codigo) == 1:
+            muestras = productos.get(codigo, [])
+        if len(muestras) >= minimo_muestras:
+            distribuciones[tarea_id] = DistribucionLogNormal.ajustar(np.asarray(muestras, dtype=float) / 60.0)
+    return distribuciones
+
+
+def lotes_del_flujo(production_flow: List[Dict], plazos: Dict = None) -> List[Hashable]:
+    """Lotes (fabricacion_id) en el orden en que aparecen en el flujo, seguidos de los que sólo tienen plazo."""
+    lotes = dict.fromkeys(step.get('task', {}).get('fabricacion_id') for step in production_flow)
+    lotes.pop(None, None)
+    lotes.update(dict.fromkeys(plazos or {}))
+    return list(lotes)
+
+
+def simular_replicas(production_flow: List[Dict], workers: List[Tuple[str, Any]], machines: Dict,
+                     schedule_config, start_date: datetime, distribuciones: Dict[str, Any],
+                     lotes: List[Hashable], semilla: int, replicas: range) -> np.ndarray:
+    """
+    Punto de entrada de los procesos: simula las réplicas indicadas y devuelve
+    una matriz (réplicas x lotes) con el fin de cada lote en segundos desde
+    'start_date' (NaN si el lote no llegó a producir nada).
+
+    Cada tarea muestrea con su propio generador, sembrado con (semilla, réplica,
+    índice de la tarea en el flujo): el resultado no depende de cómo se repartan
+    las réplicas entre procesos, y cambiar la distribución de una tarea no altera
+    las muestras de las demás.
+    """
+    posicion = {lote: i for i, lote in enumerate(lotes)}
+    origen = np.datetime64(start_date, 's')
+    fines = np.full((len(replicas), len(lotes)), np.nan)
+    for fila, replica in enumerate(replicas):
+        motor = MotorDeEventos(production_flow, workers, machines, schedule_config, start_date,
+                               CalculadorDeTiempos(schedule_config))
+        for tarea_id, distribucion in distribuciones.items():
+            linea = motor.lineas_temporales.get(tarea_id)
+            if linea is None:
+                continue
+            rng = np.random.default_rng([semilla, replica, motor.tarea_id_a_indice[tarea_id]])
+            linea.duraciones_muestreadas = distribucion.muestrear(rng, max(1, linea.unidades_a_producir))
+        motor._iniciar()
+        motor._procesar_eventos()
+
+        filas = [r for r in motor.resultados_en_curso if r['Fin'] is not None and r['fabricacion_id'] in posicion]
+        if not filas:
+            continue
+        indices = np.fromiter((posicion[r['fabricacion_id']] for r in filas), dtype=np.intp, count=len(filas))
+        segundos = (np.array([r['Fin'] for r in filas], dtype='datetime64[s]') - origen).astype(float)
+        maximos = np.full(len(lotes), -np.inf)
+        np.maximum.at(maximos, indices, segundos)
+        fines[fila] = np.where(np.isneginf(maximos), np.nan, maximos)
+    return fines
+
+
+@dataclass
+class ResultadoMonteCarlo:
+    """
+    Fines de lote de todas las réplicas, agregados por columnas.
+
+    fines: matriz (réplicas x lotes), segundos desde 'origen' (NaN si el lote no produjo nada,
+        es decir, no terminó en esa réplica).
+    limites: por lote, primer instante que incumple su plazo en segundos desde
+        'origen' (ver limite_de_plazo); NaN si el lote no tiene plazo.
+    """
+    lotes: List[Hashable]
+    origen: datetime
+    fines: np.ndarray
+    limites: np.ndarray
+
+    @property
+    def replicas(self) -> int:
+        return self.fines.shape[0]
+
+    def _fecha(self, segundos: float) -> Optional[datetime]:
+        return None if np.isnan(segundos) else self.origen + timedelta(seconds=float(segundos))
+
+    def percentil(self, q: float) -> Dict[Hashable, Optional[datetime]]:
+        """
+        Fecha de fin de cada lote que no se supera en el q% de las réplicas
+        (interpolación lineal, como np.percentile). Las réplicas en que el lote
+        no terminó cuentan como las más tardías: si el percentil cae entre
+        ellas, el lote no tiene fecha (None).
+        """
+        if not self.replicas:
+            return dict.fromkeys(self.lotes)
+        # np.sort deja los NaN al final de cada columna
+        ordenados = np.sort(self.fines, axis=0)
+        posicion = (self.replicas - 1) * q / 100.0
+        inferior, superior = int(np.floor(posicion)), int(np.ceil(posicion))
+        valores = ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+        return {lote: self._fecha(valor) for lote, valor in zip(self.lotes, valores)}
+
+    def sin_terminar(self) -> Dict[Hashable, float]:
+        """Fracción de réplicas en que cada lote no llega a terminar."""
+        fracciones = np.isnan(self.fines).mean(axis=0) if self.replicas else np.zeros(len(self.lotes))
+        return {lote: float(f) for lote, f in zip(self.lotes, fracciones)}
+
+    def probabilidad_cumplir(self) -> Dict[Hashable, float]:
+        """Fracción de réplicas en que cada lote con plazo termina a tiempo (no terminar es incumplir)."""
+        cumple = (self.fines < self.limites).mean(axis=0)
+        return {lote: float(p) for lote, p, limite in zip(self.lotes, cumple, self.limites) if not np.isnan(limite)}
+
+    def resumen(self) -> List[Dict[str, Any]]:
+        """Una fila por lote: P50, P90, réplicas sin terminar, límite del plazo y probabilidad de cumplirlo."""
+        p50, p90 = self.percentil(50), self.percentil(90)
+        sin_terminar = self.sin_terminar()
+        probabilidades = self.probabilidad_cumplir()
+        return [{
+            'fabricacion_id': lote,
+            'P50': p50[lote],
+            'P90': p90[lote],
+            'Sin Terminar': sin_terminar[lote],
+            'Limite': self._fecha(limite),
+            'Probabilidad Cumplir': probabilidades.get(lote),
+        } for lote, limite in zip(self.lotes, self.limites)]
+
+
+def simular_monte_carlo(production_flow: List[Dict], workers: List[Tuple[str, Any]], machines: Dict,
+                        schedule_config, start_date: datetime, distribuciones: Dict[str, Any],
+                        plazos: Dict = None, replicas: int = REPLICAS_POR_DEFECTO,
+                        procesos: int = None, semilla: int = 0) -> ResultadoMonteCarlo:
+    """
+    Modo Monte Carlo: repite la simulación 'replicas' veces con duraciones por
+    unidad muestreadas de 'distribuciones' ({tarea_id: distribución}, ver
+    distribuciones_del_flujo) y reúne el fin de cada lote en una matriz.
+
+    Las réplicas se reparten en bloques contiguos entre 'procesos' procesos
+    (por defecto uno por CPU); con uno solo se simula aquí mismo. Los plazos
+    ({fabricacion_id: deadline}) no detienen las réplicas: sólo se comparan
+    con el fin de cada lote al agregar.
+    """
+    lotes = lotes_del_flujo(production_flow, plazos)
+    origen = np.datetime64(start_date, 's')
+    limites = np.full(len(lotes), np.nan)
+    for i, lote in enumerate(lotes):
+        limite = limite_de_plazo((plazos or {}).get(lote))
+        if limite is not None:
+            limites[i] = (np.datetime64(limite, 's') - origen).astype(float)
+
+    procesos = max(1, min(procesos or os.cpu_count() or 1, replicas))
+    bloques = [range(int(b[0]), int(b[-1]) + 1) for b in np.array_split(np.arange(replicas), procesos) if len(b)]
+    logger.info(f"Monte Carlo: {replicas} réplica(s) de {len(lotes)} lote(s) en {len(bloques)} proceso(s).")
+
+    if len(bloques) <= 1:
+        partes = [simular_replicas(production_flow, workers, machines, schedule_config, start_date,
+                                   distribuciones, lotes, semilla, bloque) for bloque in bloques]
+    else:
+        config = ConfiguracionHorarioSerializable(schedule_config)
+        # 'spawn': hacer fork de un proceso con hilos de Qt en marcha no es seguro
+        with ProcessPoolExecutor(max_workers=len(bloques), mp_context=multiprocessing.get_context('spawn')) as executor:
+            futuros = [executor.submit(simular_replicas, production_flow, workers, machines, config, start_date,
+                                       distribuciones, lotes, semilla, bloque) for bloque in bloques]
+            partes = [futuro.result() for futuro in futuros]
+
+    fines = np.vstack(partes) if partes else np.empty((0, len(lotes)))
+    return ResultadoMonteCarlo(lotes=lotes, origen=start_date, fines=fines, limites=limites)
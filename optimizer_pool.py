@@ -0,0 +1,116 @@
+# optimizer_pool.py
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from simulation_adapter import AdaptadorScheduler
+from time_calculator import CalculadorDeTiempos
+
+
+class ConfiguracionHorarioSerializable:
+    """
+    Copia mínima de ScheduleConfig con lo que necesita la simulación (jornada,
+    descansos y festivos). ScheduleConfig guarda el gestor de BD, así que no se
+    envía tal cual a otros procesos.
+    """
+
+    def __init__(self, schedule_config):
+        self.WORK_START_TIME = schedule_config.WORK_START_TIME
+        self.WORK_END_TIME = schedule_config.WORK_END_TIME
+        self.BREAKS = list(schedule_config.BREAKS)
+        self.HOLIDAYS = list(schedule_config.HOLIDAYS)
+
+
+def simular_candidato(production_flow: List[Dict], workers: List[Tuple[str, int]], machines: Dict,
+                      schedule_config, start_date: datetime, plazos: Dict = None,
+                      max_procesos: int = None) -> Tuple[List[Dict], List[Any]]:
+    """
+    Punto de entrada de los procesos del pool: una simulación completa sin Qt
+    ni base de datos. Devuelve (results, audit_log) como AdaptadorScheduler.
+    Con 'plazos' ({lote: deadline}) la simulación se detiene si un lote no llega.
+    'max_procesos' reparte las cadenas independientes del flujo entre varios
+    procesos; no se usa desde el pool, cuyos procesos ya van en paralelo.
+    """
+    scheduler = AdaptadorScheduler(
+        production_flow=production_flow,
+        all_workers_with_skills=workers,
+        available_machines=machines,
+        schedule_config=schedule_config,
+        time_calculator=CalculadorDeTiempos(schedule_config),
+        start_date=start_date,
+        plazos=plazos,
+        max_procesos=max_procesos
+    )
+    return scheduler.run_simulation()
+
+
+class EvaluadorCandidatos:
+    """
+    Evalúa varias simulaciones candidatas a la vez en un ProcessPoolExecutor.
+
+    La simulación es Python puro y depende de la CPU, así que varios hilos no la
+    aceleran (el GIL los serializa). Cada candidato se envía serializado a un
+    proceso: flujo de producción, trabajadores, máquinas y una copia de la
+    configuración de horario. Los resultados se devuelven según van terminando.
+
+    Uso:
+        with EvaluadorCandidatos(max_procesos=8) as evaluador:
+            for clave, results, audit in evaluador.evaluar(candidatos, schedule_config, inicio):
+                ...
+    """
+
+    def __init__(self, max_procesos: int = None):
+        self.max_procesos = max_procesos or os.cpu_count() or 1
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+
+    def __enter__(self):
+        # 'spawn': hacer fork de un proceso con hilos de Qt en marcha no es seguro
+        self._executor = ProcessPoolExecutor(max_workers=self.max_procesos,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+
+    def evaluar(self, candidatos: Dict[Hashable, Tuple[List[Dict], List[Tuple[str, int]], Dict]],
+                schedule_config, start_date: datetime, plazos: Dict = None,
+                al_fallar: Optional[Callable[[Hashable, Exception], None]] = None
+                ) -> Iterator[Tuple[Hashable, List[Dict], List[Any]]]:
+        """
+        Lanza todos los candidatos ({clave: (production_flow, workers, machines)}) y
+        produce (clave, results, audit_log) en orden de finalización. 'plazos' se
+        pasa a todos los candidatos (ver simular_candidato).
+
+        Sin 'al_fallar', el error de un candidato se propaga y detiene la
+        evaluación. Con él, se llama al_fallar(clave, error) y se sigue con los demás.
+
+        Si quien consume el generador deja de iterar, los candidatos que aún no
+        hayan empezado se cancelan.
+        """
+        if self._executor is None:
+            raise RuntimeError("EvaluadorCandidatos debe usarse como context manager.")
+
+        config = ConfiguracionHorarioSerializable(schedule_config)
+        futuros = {
+            self._executor.submit(simular_candidato, flow, workers, machines, config, start_date, plazos): clave
+            for clave, (flow, workers, machines) in candidatos.items()
+        }
+        self.logger.info(f"Evaluando {len(futuros)} candidato(s) en hasta {self.max_procesos} procesos.")
+        try:
+            for futuro in as_completed(futuros):
+                try:
+                    results, audit = futuro.result()
+                except Exception as e:
+                    if al_fallar is None:
+                        raise
+                    al_fallar(futuros[futuro], e)
+                    continue
+                yield futuros[futuro], results, audit
+        finally:
+            for futuro in futuros:
+                futuro.cancel()
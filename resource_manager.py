@@ -1,13 +1,17 @@
 # resource_manager.py
 import logging
+import math
+from bisect import bisect_right, insort
 from datetime import datetime
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 from threading import Lock
 # Importamos las clases base que ya creamos.
 # Asumimos que la raíz del proyecto está en el path de Python.
 from simulation_events import EventoReasignacionTrabajador
 from time_calculator import CalculadorDeTiempos
+from sim_clock import RelojSimulacion
+from simulation_trace import TrazaSimulacion
 
 
 @dataclass
@@ -18,6 +22,99 @@ class IntervaloOcupacion:
     tarea_id: str
 
 
+class CalendarioRecurso:
+    """
+    Calendario de ocupación de un recurso: intervalos ordenados por inicio.
+
+    Junto a la lista ordenada se mantiene, para cada posición, el mayor 'fin' de
+    todos los intervalos que empiezan hasta ella. Con eso, saber si un momento
+    está ocupado y hasta cuándo se resuelve con una búsqueda binaria en lugar de
+    recorrer todos los intervalos. Las claves internas son tics enteros del reloj
+    de la simulación; los métodos públicos aceptan y devuelven datetime.
+
+    Se comporta como una secuencia de solo lectura de IntervaloOcupacion.
+    """
+
+    def __init__(self, intervalos: List[IntervaloOcupacion] = None, reloj: RelojSimulacion = None):
+        self.reloj = reloj or RelojSimulacion()
+        self._intervalos: List[IntervaloOcupacion] = []
+        self._inicios: List[int] = []
+        self._fines: List[int] = []
+        self._max_fin: List[int] = []
+        for intervalo in intervalos or []:
+            self.insertar(intervalo)
+
+    def __len__(self) -> int:
+        return len(self._intervalos)
+
+    def __iter__(self):
+        return iter(self._intervalos)
+
+    def __getitem__(self, indice):
+        return self._intervalos[indice]
+
+    def __repr__(self) -> str:
+        return f"CalendarioRecurso({self._intervalos!r})"
+
+    def insertar(self, intervalo: IntervaloOcupacion, tics: Tuple[int, int] = None):
+        """
+        Inserta manteniendo el orden por inicio (estable: tras los de igual inicio).
+        'tics' son el inicio y el fin ya convertidos, si el llamador los tiene.
+        """
+        if tics is None:
+            inicio, fin = self.reloj.a_tics(intervalo.inicio), self.reloj.a_tics(intervalo.fin)
+        else:
+            inicio, fin = tics
+        posicion = bisect_right(self._inicios, inicio)
+        self._intervalos.insert(posicion, intervalo)
+        self._inicios.insert(posicion, inicio)
+        self._fines.insert(posicion, fin)
+
+        anterior = self._max_fin[posicion - 1] if posicion > 0 else None
+        self._max_fin.insert(posicion, fin if anterior is None else max(anterior, fin))
+        # Propagar el nuevo máximo hacia la derecha hasta que deje de cambiar
+        for j in range(posicion + 1, len(self._max_fin)):
+            nuevo = max(self._max_fin[j - 1], self._fines[j])
+            if nuevo == self._max_fin[j]:
+                break
+            self._max_fin[j] = nuevo
+
+    def ocupado_hasta_tics(self, momento: int):
+        """Versión en tics de ocupado_hasta()."""
+        posicion = bisect_right(self._inicios, momento)
+        if posicion == 0:
+            return None
+        fin = self._max_fin[posicion - 1]
+        return fin if fin > momento else None
+
+    def ocupado_hasta(self, momento: datetime):
+        """
+        Si 'momento' cae dentro de algún intervalo, devuelve el mayor 'fin' de los
+        intervalos que ya han empezado en ese momento; si está libre, None.
+        """
+        fin = self.ocupado_hasta_tics(self.reloj.a_tics(momento))
+        return None if fin is None else self.reloj.a_datetime(fin)
+
+    def primer_inicio_entre_tics(self, desde: int, hasta: int):
+        """Versión en tics de primer_inicio_entre()."""
+        for posicion in range(bisect_right(self._inicios, desde), len(self._inicios)):
+            inicio = self._inicios[posicion]
+            if inicio >= hasta:
+                return None
+            if self._fines[posicion] > inicio:
+                return inicio
+        return None
+
+    def primer_inicio_entre(self, desde: datetime, hasta: datetime):
+        """
+        Inicio del primer intervalo no vacío que empieza en (desde, hasta), o None.
+        Sirve para comprobar que una ventana que arranca en un momento libre no
+        choca con un trabajo ya reservado más adelante.
+        """
+        inicio = self.primer_inicio_entre_tics(self.reloj.a_tics(desde), self.reloj.a_tics(hasta))
+        return None if inicio is None else self.reloj.a_datetime(inicio)
+
+
 @dataclass
 class ReglaReasignacion:
     """Define las condiciones para reasignar un trabajador."""
@@ -26,35 +123,142 @@ class ReglaReasignacion:
     tarea_destino_id: str
     condicion_tipo: str  # E.g., 'AFTER_UNITS'
     condicion_valor: int
+    modo: str = 'PARALLEL_JOIN'
+
+
+class IndiceReglasReasignacion:
+    """
+    Reglas de reasignación agrupadas por tarea de origen.
+
+    Las AFTER_UNITS se guardan ordenadas por umbral (condicion_valor): las que
+    se cumplen con N unidades completadas son un prefijo de la lista, así que
+    comprobar una tarea cuyo primer umbral aún no se ha alcanzado es una sola
+    comparación. Las ON_FINISH se guardan aparte.
+
+    Las consultas devuelven las reglas en el orden en que se añadieron (el de
+    los trabajadores en el paso).
+    """
+
+    def __init__(self):
+        self._contador = 0
+        # tarea_origen_id -> [(condicion_valor, orden, regla)] ordenada por umbral
+        self._por_umbral: Dict[Any, List[Tuple[Any, int, ReglaReasignacion]]] = {}
+        # tarea_origen_id -> [(orden, regla)] de las reglas ON_FINISH
+        self._al_terminar: Dict[Any, List[Tuple[int, ReglaReasignacion]]] = {}
+
+    @classmethod
+    def construir(cls, production_flow: List[Dict], indice_a_tarea_id: Dict[int, str]) -> 'IndiceReglasReasignacion':
+        """Compila las 'reassignment_rule' de los trabajadores de cada paso del flujo."""
+        indice = cls()
+        for i, step in enumerate(production_flow):
+            tarea_id = indice_a_tarea_id.get(i)
+            if tarea_id is None:
+                continue
+            for worker in step.get('workers') or []:
+                if not isinstance(worker, dict):
+                    continue
+                regla = worker.get('reassignment_rule')
+                if not regla or not worker.get('name'):
+                    continue
+                indice.agregar(ReglaReasignacion(
+                    trabajador_id=worker['name'],
+                    tarea_origen_id=tarea_id,
+                    tarea_destino_id=regla.get('target_task_id'),
+                    condicion_tipo=regla.get('condition_type'),
+                    condicion_valor=regla.get('condition_value', 0),
+                    modo=regla.get('mode', 'PARALLEL_JOIN'),
+                ))
+        return indice
+
+    def __len__(self) -> int:
+        return (sum(len(reglas) for reglas in self._por_umbral.values()) +
+                sum(len(reglas) for reglas in self._al_terminar.values()))
+
+    def __iter__(self):
+        entradas = [(orden, regla) for reglas in self._por_umbral.values() for _, orden, regla in reglas]
+        entradas.extend(entrada for reglas in self._al_terminar.values() for entrada in reglas)
+        return (regla for _, regla in sorted(entradas, key=lambda entrada: entrada[0]))
+
+    def agregar(self, regla: ReglaReasignacion):
+        """Añade una regla. Las de otros tipos nunca se disparan y no se guardan."""
+        orden = self._contador
+        self._contador += 1
+        if regla.condicion_tipo == 'AFTER_UNITS':
+            # El orden es único: la comparación nunca llega a la regla
+            insort(self._por_umbral.setdefault(regla.tarea_origen_id, []), (regla.condicion_valor, orden, regla))
+        elif regla.condicion_tipo == 'ON_FINISH':
+            self._al_terminar.setdefault(regla.tarea_origen_id, []).append((orden, regla))
+
+    def _alcanzadas(self, tarea_origen_id, unidades_completadas: int) -> int:
+        """Cuántas reglas AFTER_UNITS de la tarea tienen umbral <= unidades_completadas."""
+        reglas = self._por_umbral.get(tarea_origen_id)
+        if not reglas or reglas[0][0] > unidades_completadas:
+            return 0
+        return bisect_right(reglas, (unidades_completadas, math.inf))
+
+    def disparadas(self, tarea_origen_id, unidades_completadas: int,
+                   tarea_completada: bool = False) -> List[ReglaReasignacion]:
+        """
+        Reglas que se cumplen: las AFTER_UNITS con umbral alcanzado y, si la
+        tarea está completada, las ON_FINISH. No se retiran.
+        """
+        alcanzadas = self._alcanzadas(tarea_origen_id, unidades_completadas)
+        al_terminar = self._al_terminar.get(tarea_origen_id, ()) if tarea_completada else ()
+        if not alcanzadas and not al_terminar:
+            return []
+        entradas = [(orden, regla) for _, orden, regla in self._por_umbral.get(tarea_origen_id, ())[:alcanzadas]]
+        entradas.extend(al_terminar)
+        return [regla for _, regla in sorted(entradas, key=lambda entrada: entrada[0])]
+
+    def retirar_alcanzadas(self, tarea_origen_id, unidades_completadas: int) -> List[ReglaReasignacion]:
+        """Quita y devuelve las reglas AFTER_UNITS cuyo umbral se ha alcanzado."""
+        alcanzadas = self._alcanzadas(tarea_origen_id, unidades_completadas)
+        if not alcanzadas:
+            return []
+        reglas = self._por_umbral[tarea_origen_id]
+        retiradas = sorted(reglas[:alcanzadas], key=lambda entrada: entrada[1])
+        del reglas[:alcanzadas]
+        if not reglas:
+            del self._por_umbral[tarea_origen_id]
+        return [regla for _, _, regla in retiradas]
+
+    def al_terminar(self, tarea_origen_id) -> List[ReglaReasignacion]:
+        """Reglas ON_FINISH de la tarea."""
+        return [regla for _, regla in self._al_terminar.get(tarea_origen_id, ())]
 
 
 class GestorDeRecursos:
     """Gestiona la disponibilidad y asignación de trabajadores y máquinas."""
 
-    def __init__(self, time_calculator: CalculadorDeTiempos):
+    def __init__(self, time_calculator: CalculadorDeTiempos, reloj: RelojSimulacion = None,
+                 traza: Optional[TrazaSimulacion] = None):
         self.logger = logging.getLogger(__name__)
         self.time_calculator = time_calculator
+        # Trazas por reserva: las del motor (sin búfer si se usa suelto)
+        self.traza = traza if traza is not None else TrazaSimulacion(capacidad=0)
+        # Base de tiempo entera compartida con el motor (claves de los calendarios)
+        self.reloj = reloj or RelojSimulacion()
 
         # Estructura de datos avanzada: Un diccionario por cada recurso que contiene
-        # una lista ordenada de sus intervalos de ocupación.
-        self.calendario_trabajadores: Dict[str, List[IntervaloOcupacion]] = {}
-        self.calendario_maquinas: Dict[int, List[IntervaloOcupacion]] = {}
+        # su calendario de intervalos de ocupación ordenados por inicio.
+        self.calendario_trabajadores: Dict[str, CalendarioRecurso] = {}
+        self.calendario_maquinas: Dict[int, CalendarioRecurso] = {}
         self.lock = Lock()
-        # Registro de reglas de reasignación pendientes.
-        self.reglas_reasignacion: List[ReglaReasignacion] = []
+        # Registro de reglas de reasignación pendientes, por tarea de origen y umbral.
+        self.reglas_reasignacion = IndiceReglasReasignacion()
 
     def registrar_recurso(self, recurso_id, es_trabajador=True):
         """Inicializa el calendario para un nuevo trabajador o máquina."""
         if es_trabajador:
             if recurso_id not in self.calendario_trabajadores:
-                self.calendario_trabajadores[recurso_id] = []
+                self.calendario_trabajadores[recurso_id] = CalendarioRecurso(reloj=self.reloj)
         else:
             if recurso_id not in self.calendario_maquinas:
-                self.calendario_maquinas[recurso_id] = []
+                self.calendario_maquinas[recurso_id] = CalendarioRecurso(reloj=self.reloj)
 
     def programar_reasignacion(self, regla: ReglaReasignacion):
         """Registra una nueva regla de reasignación para ser evaluada."""
-        self.reglas_reasignacion.append(regla)
+        self.reglas_reasignacion.agregar(regla)
         self.logger.info(
             f"Regla de reasignación programada: {regla.trabajador_id} de {regla.tarea_origen_id} a {regla.tarea_destino_id}")
 
@@ -65,58 +269,101 @@ class GestorDeRecursos:
         respetando tanto los bloques de trabajo ya asignados como el horario laboral.
         THREAD-SAFE: Protegido con lock para prevenir lecturas inconsistentes.
         """
-        with self.lock:  # ✅ Bloqueo para thread safety
-            calendario = self.calendario_trabajadores if es_trabajador else self.calendario_maquinas
-            # Crear una copia de los intervalos para trabajar con ella fuera del lock
-            intervalos_ocupados = list(calendario.get(recurso_id, []))
-
-        # El resto del procesamiento se hace fuera del lock para no bloquearlo demasiado tiempo
         # 1. Ajustar 'desde_fecha' al próximo momento laborable válido usando el calculador.
         momento_propuesto = self.time_calculator.add_work_minutes(desde_fecha, 0)
 
-        # 2. Bucle para resolver conflictos con tareas ya asignadas.
-        while True:
-            # Comprobar si el momento_propuesto se solapa con algún trabajo ya asignado.
-            conflicto = next(
-                (intervalo for intervalo in intervalos_ocupados
-                 if intervalo.inicio <= momento_propuesto < intervalo.fin),
-                None
-            )
+        with self.lock:  # ✅ Bloqueo para thread safety
+            calendario = self.calendario_trabajadores if es_trabajador else self.calendario_maquinas
+            intervalos_ocupados = calendario.get(recurso_id)
+            if not intervalos_ocupados:
+                return momento_propuesto
 
-            if conflicto:
-                # Si hay conflicto, nuestro nuevo momento propuesto es justo cuando termina ese trabajo.
-                momento_propuesto = self.time_calculator.add_work_minutes(conflicto.fin, 0)
-                continue
-            else:
-                # Si no hay conflictos, hemos encontrado un hueco válido.
+            # 2. Saltar de conflicto en conflicto: cada salto lleva al final más lejano
+            #    de los trabajos ya empezados, hasta caer en un hueco libre.
+            #    (add_work_minutes(x, 0) devuelve x, así que los saltos se hacen en tics)
+            tics_propuesto = self.reloj.a_tics(momento_propuesto)
+            ocupado_hasta = intervalos_ocupados.ocupado_hasta_tics(tics_propuesto)
+            if ocupado_hasta is None:
                 return momento_propuesto
+            while ocupado_hasta is not None:
+                tics_propuesto = ocupado_hasta
+                ocupado_hasta = intervalos_ocupados.ocupado_hasta_tics(tics_propuesto)
+            return self.reloj.a_datetime(tics_propuesto)
+
+    def encontrar_ventana_comun(self, recursos: List, desde_fecha: datetime,
+                                duracion_minutos: float) -> Tuple[datetime, datetime]:
+        """
+        Busca la primera ventana a partir de 'desde_fecha' en la que TODOS los recursos
+        indicados (trabajadores y/o máquina) están libres durante 'duracion_minutos'
+        de trabajo. Devuelve (inicio, fin).
+
+        Envoltorio con datetime de encontrar_ventana_comun_tics.
+        """
+        tics_inicio, tics_fin = self.encontrar_ventana_comun_tics(
+            recursos, self.reloj.a_tics(desde_fecha), duracion_minutos)
+        return self.reloj.a_datetime(tics_inicio), self.reloj.a_datetime(tics_fin)
+
+    def encontrar_ventana_comun_tics(self, recursos: List, desde_tics: int,
+                                     duracion_minutos: float) -> Tuple[int, int]:
+        """
+        Igual que encontrar_ventana_comun, pero en tics del reloj de principio a fin.
+
+        Se intersectan los calendarios en una sola pasada: cada vez que un recurso
+        desplaza el inicio, se vuelven a comprobar los demás, y la ventana completa
+        [inicio, fin) se valida contra las reservas futuras de todos ellos.
+        THREAD-SAFE: Protegido con lock para prevenir lecturas inconsistentes.
+        """
+        with self.lock:
+            calendarios = []
+            for recurso_id in recursos:
+                es_trabajador = recurso_id in self.calendario_trabajadores
+                calendario = self.calendario_trabajadores if es_trabajador else self.calendario_maquinas
+                if calendario.get(recurso_id):
+                    calendarios.append(calendario[recurso_id])
+
+            # add_work_minutes(x, 0) devuelve x: se parte de 'desde_tics' tal cual
+            tics_propuesto = desde_tics
+            while True:
+                # 1. Avanzar hasta un momento libre en todos los calendarios a la vez
+                desplazado = True
+                while desplazado:
+                    desplazado = False
+                    for calendario in calendarios:
+                        ocupado_hasta = calendario.ocupado_hasta_tics(tics_propuesto)
+                        if ocupado_hasta is not None:
+                            tics_propuesto = ocupado_hasta
+                            desplazado = True
+
+                # 2. La ventana completa no debe chocar con ninguna reserva posterior
+                tics_fin = self.time_calculator.add_work_minutes_tics(self.reloj, tics_propuesto, duracion_minutos)
+                conflictos = [inicio for inicio in
+                              (calendario.primer_inicio_entre_tics(tics_propuesto, tics_fin)
+                               for calendario in calendarios)
+                              if inicio is not None]
+                if not conflictos:
+                    return tics_propuesto, tics_fin
+                tics_propuesto = min(conflictos)
 
     def asignar_recurso(self, recurso_id: str, inicio: datetime, fin: datetime,
-                        tarea_id: str, es_trabajador=True):
+                        tarea_id: str, es_trabajador=True, tics: Tuple[int, int] = None):
         """
         Añade un nuevo intervalo de ocupación al calendario de un recurso.
+        'tics' son (inicio, fin) en tics del reloj, si el llamador ya los tiene.
         THREAD-SAFE: Protegido con lock para prevenir modificaciones concurrentes.
         """
         with self.lock:  # ✅ Bloqueo para thread safety
             calendario = self.calendario_trabajadores if es_trabajador else self.calendario_maquinas
 
-            # Obtener o crear la lista de intervalos para este recurso
+            # Obtener o crear el calendario de este recurso
             if recurso_id not in calendario:
-                calendario[recurso_id] = []
+                calendario[recurso_id] = CalendarioRecurso(reloj=self.reloj)
 
-            intervalos = calendario[recurso_id]
-
-            # Crear el nuevo intervalo
+            # Crear el nuevo intervalo e insertarlo en su posición (búsqueda binaria)
             nuevo_intervalo = IntervaloOcupacion(inicio=inicio, fin=fin, tarea_id=tarea_id)
+            calendario[recurso_id].insertar(nuevo_intervalo, tics)
 
-            # Insertar y ordenar de forma segura
-            intervalos.append(nuevo_intervalo)
-            intervalos.sort(key=lambda i: i.inicio)
-
-            self.logger.debug(
-                f"Recurso '{recurso_id}' asignado a tarea '{tarea_id}' "
-                f"de {inicio.strftime('%d/%m %H:%M')} a {fin.strftime('%d/%m %H:%M')}"
-            )
+            self.traza('recursos', "Recurso '%s' asignado a tarea '%s' de %s a %s",
+                       recurso_id, tarea_id, inicio, fin)
 
     def notificar_unidades_completadas(self, tarea_id: str, unidades_completadas: int) -> List[
         EventoReasignacionTrabajador]:
@@ -124,25 +371,18 @@ class GestorDeRecursos:
         Evalúa si la finalización de unidades en una tarea dispara alguna regla de reasignación.
         """
         eventos_generados = []
-        reglas_a_eliminar = []
-
-        for regla in self.reglas_reasignacion:
-            if regla.tarea_origen_id == tarea_id:
-                if regla.condicion_tipo == 'AFTER_UNITS' and unidades_completadas >= regla.condicion_valor:
-                    # Se cumplió la condición, generamos el evento
-                    evento = EventoReasignacionTrabajador(
-                        timestamp=datetime.now(),  # El motor sobrescribirá esto con el tiempo correcto
-                        datos={
-                            'trabajador_id': regla.trabajador_id,
-                            'tarea_origen_id': regla.tarea_origen_id,
-                            'tarea_destino_id': regla.tarea_destino_id
-                        }
-                    )
-                    eventos_generados.append(evento)
-                    reglas_a_eliminar.append(regla)
-                    self.logger.info(f"¡Disparada reasignación para {regla.trabajador_id}!")
-
-        # Eliminar las reglas que ya se han disparado
-        self.reglas_reasignacion = [r for r in self.reglas_reasignacion if r not in reglas_a_eliminar]
+
+        # Las reglas disparadas se retiran del índice: cada una se dispara una sola vez
+        for regla in self.reglas_reasignacion.retirar_alcanzadas(tarea_id, unidades_completadas):
+            evento = EventoReasignacionTrabajador(
+                timestamp=datetime.now(),  # El motor sobrescribirá esto con el tiempo correcto
+                datos={
+                    'trabajador_id': regla.trabajador_id,
+                    'tarea_origen_id': regla.tarea_origen_id,
+                    'tarea_destino_id': regla.tarea_destino_id
+                }
+            )
+            eventos_generados.append(evento)
+            self.traza('reasignacion', "¡Disparada reasignación para %s!", regla.trabajador_id)
 
         return eventos_generados
\ No newline at end of file
@@ -0,0 +1,46 @@
+# sim_clock.py
+from datetime import datetime, timedelta
+
+# Resolución del reloj interno: la misma que la de datetime, para que la
+# conversión en ambos sentidos sea exacta y no cambie ningún resultado.
+UN_MICROSEGUNDO = timedelta(microseconds=1)
+TICS_POR_MINUTO = 60 * 1_000_000
+TICS_POR_DIA = 24 * 60 * TICS_POR_MINUTO
+
+# Época por defecto para componentes creados fuera de un motor de eventos
+EPOCA_POR_DEFECTO = datetime(2000, 1, 1)
+
+
+class RelojSimulacion:
+    """
+    Base de tiempo entera del motor: microsegundos ('tics') desde la época de la
+    simulación.
+
+    Los eventos llevan sus tics desde que se crean, y la búsqueda de ventanas en
+    los calendarios de recursos y la suma de minutos de trabajo del calendario
+    compilado se hacen en tics. Los datetime de eventos, resultados y auditoría
+    se obtienen de los tics una sola vez por unidad.
+    """
+
+    def __init__(self, epoca: datetime = EPOCA_POR_DEFECTO):
+        self.epoca = epoca
+        # Para la aritmética por días del calendario laboral compilado: día (ordinal)
+        # de la época y microsegundos desde su medianoche
+        self.ordinal_epoca = epoca.toordinal()
+        self.tics_desde_medianoche = (epoca - epoca.replace(hour=0, minute=0, second=0, microsecond=0)) \
+            // UN_MICROSEGUNDO
+        # El calendario compilado sólo trabaja con datetimes sin zona horaria
+        self.admite_calendario = type(epoca) is datetime and epoca.tzinfo is None
+
+    def a_tics(self, momento: datetime) -> int:
+        """datetime -> microsegundos desde la época."""
+        return (momento - self.epoca) // UN_MICROSEGUNDO
+
+    def a_datetime(self, tics: int) -> datetime:
+        """Microsegundos desde la época -> datetime."""
+        return self.epoca + timedelta(microseconds=tics)
+
+    @staticmethod
+    def minutos_a_tics(minutos: float) -> int:
+        """Duración en minutos -> tics (redondeada al microsegundo, como timedelta)."""
+        return timedelta(minutes=minutos) // UN_MICROSEGUNDO
@@ -14,14 +14,41 @@ class AdaptadorScheduler:
     """
     Clase adaptadora que tiene la misma interfaz que el antiguo Scheduler,
     pero utiliza internamente el nuevo MotorDeEventos.
+
+    No importa Qt. El progreso y el final de la simulación se comunican con
+    callbacks opcionales:
+      - al_progresar(eventos_procesados, eventos_en_cola)
+      - al_terminar()
+    La capa de UI los conecta a sus señales (ver controllers/simulation_worker.py).
+
+    Con 'cache' (simulation_cache.CacheSimulaciones) una simulación con las
+    mismas entradas que otra anterior devuelve el resultado guardado sin ejecutar el motor.
+    Con 'incremental' (incremental_simulation.SimulacionIncremental) una
+    simulación que sólo cambia algunos pasos respecto a la anterior continúa
+    desde una instantánea de aquélla en vez de empezar de cero.
+    Con 'max_procesos' > 1 las cadenas independientes del flujo se simulan en
+    paralelo (ver MotorDeEventos.ejecutar_simulacion).
     """
 
     # NUEVO: Añadir 'visual_dialog_reference=None' como parámetro opcional
     def __init__(self, production_flow, all_workers_with_skills, available_machines,
-                 schedule_config, time_calculator, start_date=None, visual_dialog_reference=None): # <-- NUEVO PARÁMETRO
+                 schedule_config, time_calculator, start_date=None, visual_dialog_reference=None, # <-- NUEVO PARÁMETRO
+                 al_progresar=None, al_terminar=None, plazos=None, cache=None, incremental=None,
+                 max_procesos=None):
 
         self.logger = logging.getLogger(__name__)
-        self.progress_signal = None # Este parece no usarse, pero lo mantenemos por si acaso
+        self.al_progresar = al_progresar
+        self.al_terminar = al_terminar
+
+        start_date = start_date or datetime.now()
+
+        # Huella de las entradas, antes de que el motor toque el flujo
+        self.cache = cache
+        self.huella_cache = cache.huella(production_flow, all_workers_with_skills, available_machines,
+                                         schedule_config, start_date, plazos) if cache is not None else None
+        self.incremental = incremental
+        self.max_procesos = max_procesos
+        self._entradas_incremental = (all_workers_with_skills, available_machines, schedule_config, start_date, plazos)
 
         # NUEVO: Guardar la referencia al diálogo visual (Fase 8.4)
         self.visual_dialog_reference = visual_dialog_reference
@@ -35,8 +62,9 @@ class AdaptadorScheduler:
             all_machines_data=available_machines,
             schedule_config=schedule_config,
             time_calculator=time_calculator,
-            start_date=start_date or datetime.now(),
-            visual_dialog_reference=self.visual_dialog_reference # <-- NUEVO: Pasar la referencia
+            start_date=start_date,
+            visual_dialog_reference=self.visual_dialog_reference, # <-- NUEVO: Pasar la referencia
+            plazos=plazos  # {lote: deadline}: detiene la simulación si un lote ya no puede cumplirlo
         )
 
         self.time_calculator = time_calculator
@@ -97,19 +125,29 @@ class AdaptadorScheduler:
 
         try:
             # --- 1. Ejecutar la simulación ---
-            # El motor, al tener la referencia al diálogo, emitirá las señales de progreso internamente.
-            results, audit_log = self.motor.ejecutar_simulacion()
+            # El callback de progreso puede asignarse después de crear el adaptador (p. ej. SimulationWorker)
+            self.motor.al_progresar = self.al_progresar
+            guardado = self.cache.obtener(self.huella_cache) if self.cache is not None else None
+            if guardado is not None:
+                self.logger.info("ADAPTADOR: Entradas sin cambios, resultados recuperados de la caché.")
+                results, audit_log = guardado
+            else:
+                if self.incremental is not None:
+                    results, audit_log = self.incremental.ejecutar(self.motor, *self._entradas_incremental)
+                else:
+                    results, audit_log = self.motor.ejecutar_simulacion(max_workers=self.max_procesos)
+                if self.cache is not None:
+                    self.cache.guardar(self.huella_cache, results, audit_log)
 
             self.logger.info(
                 f"ADAPTADOR: Simulación completada. Obtenidos {len(results)} resultados y {len(audit_log)} eventos de auditoría.")
 
-            # NUEVO: Emitir señal de finalización SI hay una referencia al diálogo (Fase 8.4)
-            if self.visual_dialog_reference and hasattr(self.visual_dialog_reference, 'simulation_finished'):
+            # Avisar del final (el editor visual conecta aquí su señal 'simulation_finished')
+            if self.al_terminar is not None:
                 try:
-                    self.visual_dialog_reference.simulation_finished.emit()
-                    self.logger.info("ADAPTADOR: Señal 'simulation_finished' emitida al diálogo.")
+                    self.al_terminar()
                 except Exception as e:
-                    self.logger.error(f"ADAPTADOR: Error al emitir 'simulation_finished': {e}")
+                    self.logger.error(f"ADAPTADOR: Error en el callback 'al_terminar': {e}")
 
 
             # --- 2. Devolver los resultados ---
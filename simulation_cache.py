@@ -0,0 +1,318 @@
+# simulation_cache.py
+import hashlib
+import json
+import logging
+import os
+import stat
+import sys
+import tempfile
+from dataclasses import fields, is_dataclass
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from calculation_audit import CalculationDecision, DecisionStatus
+
+# Módulos cuyo código determina el resultado de una simulación: simulation_adapter
+# y todo lo que importa del proyecto. Su contenido entra en la huella: al cambiar
+# el motor, las entradas antiguas dejan de coincidir.
+MODULOS_MOTOR = (
+    'event_engine.py', 'event_index.py', 'dependency_graph.py', 'sim_clock.py',
+    'simulation_events.py', 'simulation_adapter.py', 'resource_manager.py',
+    'timeline_task.py', 'time_calculator.py', 'work_calendar.py', 'temporal_storage.py',
+    'calculation_audit.py', 'simulation_partition.py', 'simulation_trace.py', 'optimizer_pool.py',
+)
+
+
+def _directorio_cache_usuario() -> str:
+    """Directorio de caché del usuario (LOCALAPPDATA en Windows, XDG_CACHE_HOME o ~/.cache en el resto)."""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.environ.get('APPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'Hipatia', 'simulaciones')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'hipatia', 'simulaciones')
+
+
+DIRECTORIO_POR_DEFECTO = _directorio_cache_usuario()
+TAMANO_MAXIMO_POR_DEFECTO = 256 * 1024 * 1024  # 256 MB
+
+_EXTENSION = '.json'
+_TIPO = '__tipo__'
+
+
+def forma_canonica(valor: Any) -> Any:
+    """
+    Forma canónica y estable de un valor para calcular la huella: diccionarios
+    ordenados por clave, fechas en ISO y objetos desconocidos por su repr.
+    """
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    if isinstance(valor, (datetime, date, time)):
+        return ('fecha', valor.isoformat())
+    if isinstance(valor, timedelta):
+        return ('duracion', valor.total_seconds())
+    if isinstance(valor, Enum):
+        return ('enum', type(valor).__name__, valor.name)
+    if isinstance(valor, dict):
+        return ('dict', sorted(((repr(forma_canonica(k)), forma_canonica(v)) for k, v in valor.items()), key=lambda kv: kv[0]))
+    if isinstance(valor, (list, tuple)):
+        return ('lista', [forma_canonica(v) for v in valor])
+    if isinstance(valor, (set, frozenset)):
+        return ('conjunto', sorted(repr(forma_canonica(v)) for v in valor))
+    if is_dataclass(valor) and not isinstance(valor, type):
+        return (type(valor).__name__, [(f.name, forma_canonica(getattr(valor, f.name))) for f in fields(valor)])
+    return ('objeto', type(valor).__name__, repr(valor))
+
+
+def a_json(valor: Any) -> Any:
+    """
+    Convierte (results, audit_log) en una estructura JSON. Los tipos que JSON no
+    tiene (fechas, duraciones, tuplas, diccionarios con claves no textuales y
+    CalculationDecision) se marcan con '__tipo__' para que de_json los reconstruya
+    exactamente. Cualquier otro tipo lanza TypeError: la entrada no se guarda.
+    """
+    if valor is None or isinstance(valor, (bool, str)):
+        return valor
+    if isinstance(valor, (int, float)) and not isinstance(valor, Enum):
+        return valor
+    if isinstance(valor, list):
+        return [a_json(v) for v in valor]
+    if isinstance(valor, dict):
+        if all(isinstance(k, str) for k in valor) and _TIPO not in valor:
+            return {k: a_json(v) for k, v in valor.items()}
+        return {_TIPO: 'dict', 'valor': [[a_json(k), a_json(v)] for k, v in valor.items()]}
+    if isinstance(valor, tuple):
+        return {_TIPO: 'tupla', 'valor': [a_json(v) for v in valor]}
+    if type(valor) in (datetime, date, time):
+        return {_TIPO: type(valor).__name__, 'valor': valor.isoformat()}
+    if type(valor) is timedelta:
+        return {_TIPO: 'timedelta', 'valor': [valor.days, valor.seconds, valor.microseconds]}
+    if type(valor) is DecisionStatus:
+        return {_TIPO: 'DecisionStatus', 'valor': valor.name}
+    if type(valor) is CalculationDecision:
+        return {_TIPO: 'CalculationDecision',
+                'valor': {f.name: a_json(getattr(valor, f.name)) for f in fields(valor)}}
+    raise TypeError(f"Tipo no admitido en la caché de simulaciones: {type(valor).__name__}")
+
+
+_DECODIFICADORES = {
+    'dict': lambda pares: {clave: valor for clave, valor in pares},
+    'tupla': tuple,
+    'datetime': datetime.fromisoformat,
+    'date': date.fromisoformat,
+    'time': time.fromisoformat,
+    'timedelta': lambda partes: timedelta(*partes),
+    'DecisionStatus': lambda nombre: DecisionStatus[nombre],
+    'CalculationDecision': lambda campos: CalculationDecision(**campos),
+}
+
+
+def _decodificar_objeto(objeto: Dict[str, Any]) -> Any:
+    tipo = objeto.get(_TIPO)
+    if tipo is None:
+        return objeto
+    if tipo not in _DECODIFICADORES:
+        raise ValueError(f"Tipo desconocido en la caché de simulaciones: {tipo!r}")
+    return _DECODIFICADORES[tipo](objeto['valor'])
+
+
+def de_json(texto: str) -> Any:
+    """Inversa de a_json: sólo reconstruye los tipos conocidos, nunca ejecuta código."""
+    return json.loads(texto, object_hook=_decodificar_objeto)
+
+
+def _version_motor() -> str:
+    base = os.path.dirname(os.path.abspath(__file__))
+    resumen = hashlib.sha256()
+    for nombre in MODULOS_MOTOR:
+        ruta = os.path.join(base, nombre)
+        resumen.update(nombre.encode())
+        if os.path.exists(ruta):
+            with open(ruta, 'rb') as f:
+                resumen.update(f.read())
+    return resumen.hexdigest()
+
+
+def fecha_inicio_relevante(production_flow: List[Dict]) -> bool:
+    """
+    La fecha de inicio del motor sólo afecta al resultado si alguna raíz
+    (paso con 'is_cycle_start') no tiene 'start_date' propia: en ese caso
+    arranca en la fecha del motor. Si todas la tienen, el motor se ajusta a
+    la más temprana y la fecha de inicio no cambia nada.
+    """
+    raices = [step for step in production_flow if isinstance(step, dict) and step.get('is_cycle_start')]
+    return not raices or any(step.get('start_date') is None for step in raices)
+
+
+def contexto_simulacion(production_flow: List[Dict], workers: List[Tuple[str, int]], machines: Dict,
+                        schedule_config, start_date: Optional[datetime], plazos: Dict = None) -> Dict[str, Any]:
+    """
+    Todo lo que influye en una simulación salvo el propio flujo: trabajadores,
+    máquinas, jornada, descansos, festivos, fecha de inicio (sólo si influye) y plazos.
+    """
+    return {
+        'trabajadores': workers,
+        'maquinas': machines,
+        'jornada': (getattr(schedule_config, 'WORK_START_TIME', None),
+                    getattr(schedule_config, 'WORK_END_TIME', None)),
+        'descansos': list(getattr(schedule_config, 'BREAKS', []) or []),
+        'festivos': sorted(getattr(schedule_config, 'HOLIDAYS', []) or [], key=repr),
+        'inicio': start_date if fecha_inicio_relevante(production_flow) else None,
+        'plazos': plazos,
+    }
+
+
+class CacheSimulaciones:
+    """
+    Caché en disco de simulaciones completas (results, audit_log).
+
+    La clave es una huella SHA-256 de la forma canónica de todo lo que usa el
+    motor: flujo de producción, trabajadores con su nivel, máquinas, jornada,
+    descansos y festivos de la configuración de horario, fecha de inicio (sólo
+    si influye, ver fecha_inicio_relevante), plazos y el código del propio motor.
+    Cualquier cambio en festivos o descansos produce otra huella, así que una
+    entrada antigua nunca se devuelve para una configuración distinta.
+
+    Cada entrada es un fichero JSON (ver a_json / de_json): leer la caché no
+    puede ejecutar código. Por defecto vive en el directorio de caché del
+    usuario; el directorio se crea con permisos 0700 y, donde hay propietarios
+    (POSIX), sólo se usa si pertenece al usuario actual. Leer una entrada
+    actualiza su fecha de modificación; al superar 'tamano_maximo' bytes se
+    borran primero las menos usadas recientemente (LRU).
+
+    Uso:
+        cache = CacheSimulaciones()
+        huella = cache.huella(flow, workers, machines, schedule_config, inicio)
+        salida = cache.obtener(huella)
+        if salida is None:
+            salida = motor.ejecutar_simulacion()
+            cache.guardar(huella, *salida)
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_POR_DEFECTO,
+                 tamano_maximo: int = TAMANO_MAXIMO_POR_DEFECTO):
+        self.directorio = directorio
+        self.tamano_maximo = tamano_maximo
+        self.logger = logging.getLogger(__name__)
+        self._version_motor = _version_motor()
+
+    def huella(self, production_flow: List[Dict], workers: List[Tuple[str, int]], machines: Dict,
+               schedule_config, start_date: Optional[datetime], plazos: Dict = None) -> str:
+        entradas = {
+            'motor': self._version_motor,
+            'flujo': production_flow,
+            **contexto_simulacion(production_flow, workers, machines, schedule_config, start_date, plazos),
+        }
+        return hashlib.sha256(repr(forma_canonica(entradas)).encode('utf-8')).hexdigest()
+
+    def obtener(self, huella: str) -> Optional[Tuple[List[Dict], List[Any]]]:
+        """(results, audit_log) guardados con esa huella, o None si no hay entrada válida."""
+        if not self._directorio_fiable():
+            return None
+        ruta = self._ruta(huella)
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                results, audit_log = de_json(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Entrada de caché ilegible ({huella[:12]}): {e}. Se descarta.")
+            self._borrar(ruta)
+            return None
+        try:
+            os.utime(ruta)  # Marca de uso para el LRU
+        except OSError:
+            pass
+        return results, audit_log
+
+    def guardar(self, huella: str, results: List[Dict], audit_log: List[Any]):
+        """Guarda la simulación y libera espacio si se supera el tamaño máximo."""
+        try:
+            texto = json.dumps(a_json([results, audit_log]), ensure_ascii=False)
+            os.makedirs(self.directorio, mode=0o700, exist_ok=True)
+            if not self._directorio_fiable():
+                return
+            descriptor, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                f.write(texto)
+            # Escritura atómica: un lector nunca ve un fichero a medias
+            os.replace(temporal, self._ruta(huella))
+        except Exception as e:
+            self.logger.warning(f"No se pudo guardar la simulación en caché: {e}")
+            return
+        self._expulsar(conservar=huella)
+
+    def limpiar(self):
+        for ruta, _, _ in self._entradas():
+            self._borrar(ruta)
+
+    # ------------------------------------------------------------------
+
+    def _ruta(self, huella: str) -> str:
+        return os.path.join(self.directorio, huella + _EXTENSION)
+
+    def _directorio_fiable(self) -> bool:
+        """
+        True si el directorio existe, es un directorio real (no un enlace) y, en
+        POSIX, pertenece al usuario actual. Si otros usuarios pueden escribir en
+        él, se le quitan esos permisos antes de usarlo.
+        """
+        try:
+            estado = os.lstat(self.directorio)
+        except OSError:
+            return False
+        if not stat.S_ISDIR(estado.st_mode):
+            self.logger.warning(f"La caché de simulaciones '{self.directorio}' no es un directorio. No se usa.")
+            return False
+        if not hasattr(os, 'getuid'):
+            return True
+        if estado.st_uid != os.getuid():
+            self.logger.warning(
+                f"La caché de simulaciones '{self.directorio}' pertenece a otro usuario. No se usa.")
+            return False
+        if estado.st_mode & 0o077:
+            try:
+                os.chmod(self.directorio, 0o700)
+            except OSError as e:
+                self.logger.warning(f"No se pudieron restringir los permisos de '{self.directorio}': {e}")
+                return False
+        return True
+
+    def _entradas(self) -> List[Tuple[str, float, int]]:
+        """(ruta, último uso, tamaño) de cada entrada, de la menos a la más reciente."""
+        entradas = []
+        if not self._directorio_fiable():
+            return entradas
+        try:
+            nombres = os.listdir(self.directorio)
+        except FileNotFoundError:
+            return entradas
+        for nombre in nombres:
+            if not nombre.endswith(_EXTENSION):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            entradas.append((ruta, estado.st_mtime, estado.st_size))
+        return sorted(entradas, key=lambda e: e[1])
+
+    def _expulsar(self, conservar: str):
+        entradas = self._entradas()
+        total = sum(tamano for _, _, tamano in entradas)
+        ruta_conservar = self._ruta(conservar)
+        for ruta, _, tamano in entradas:
+            if total <= self.tamano_maximo:
+                break
+            if ruta == ruta_conservar:
+                continue
+            self._borrar(ruta)
+            total -= tamano
+
+    @staticmethod
+    def _borrar(ruta: str):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
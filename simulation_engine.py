@@ -7,10 +7,8 @@ import logging
 from datetime import datetime, timedelta, time, date
 from time_calculator import CalculadorDeTiempos # ⬅️ NUEVO IMPORT
 from calendar_helper import set_schedule_config # ⬅️ (Puedes eliminar los otros si ya no se usan)
-from PyQt6.QtCore import QObject, pyqtSignal
 from enum import Enum
 from calculation_audit import CalculationDecision, DecisionStatus
-from PyQt6.QtCore import QObject, pyqtSignal
 import heapq # Para gestionar la cola de eventos de forma eficiente
 class DecisionStatus(Enum):
     NEUTRAL = "NEUTRAL"
@@ -18,25 +16,6 @@ class DecisionStatus(Enum):
     WARNING = "WARNING"
 
 
-class SimulationWorker(QObject):
-    finished = pyqtSignal(list, list)
-    progress_update = pyqtSignal(int)
-    def __init__(self, scheduler):
-        super().__init__()
-        self.scheduler = scheduler
-        self.logger = logging.getLogger("EvolucionTiemposApp")
-
-    def run(self):
-        self.scheduler.progress_signal = self.progress_update
-        self.logger.info("SimulationWorker: Iniciando simulación en un hilo separado...")
-        try:
-            results, audit = self.scheduler.run_simulation()
-            self.finished.emit(results, audit)
-            self.logger.info("SimulationWorker: Simulación completada.")
-        except Exception as e:
-            self.logger.critical(f"Error crítico en el hilo de simulación: {e}", exc_info=True)
-            self.finished.emit([], [])
-
 class Optimizer:
     """
     Motor de optimización que determina el número mínimo de trabajadores
@@ -216,6 +195,12 @@ class Optimizer:
             f"Se han recopilado y ordenado {len(self.prioritized_tasks)} tareas finales para la simulación.")
         return self.prioritized_tasks
 
+    def _deadlines_by_instance(self):
+        """{identificador de lote: deadline}, para que el motor detenga los intentos sin solución."""
+        return {lote_instance["identificador"]: lote_instance["deadline"]
+                for lote_instance in self.planning_session
+                if lote_instance.get("identificador") is not None and lote_instance.get("deadline")}
+
     def _verify_deadlines(self, results):
         """
         Verifica si todas las fabricaciones en los resultados cumplen sus plazos
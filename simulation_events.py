@@ -1,19 +1,78 @@
 # simulation_events.py
-from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, List
+from typing import Any, ClassVar, Dict, List, Optional
 
 
 # --- CLASE BASE REFACTORIZADA ---
 # Se elimina 'order=True' y se deja que el motor ordene por el timestamp explícitamente.
-@dataclass
 class EventoDeSimulacion:
-    """Clase base para todos los eventos de la simulación."""
-    timestamp: datetime
-    datos: dict = field(default_factory=dict)
-    cancelado: bool = field(default=False)
-    tipo_evento: str = field(init=False)
-    prioridad: int = field(init=False)
+    """
+    Clase base para todos los eventos de la simulación.
+
+    Los eventos usan __slots__: los campos que consulta el motor en cada evento
+    (tarea, unidad, instancia) son atributos tipados, y el resto de datos
+    propios de cada tipo de evento va en 'extra'. El tipo y la prioridad son
+    atributos de clase.
+
+    'tics' es el mismo instante en tics del reloj de la simulación. Quien ya lo
+    tiene (el fin de una ventana, un evento generado en el instante de otro) lo
+    pasa al crear el evento; si no, el motor lo calcula una vez al programarlo.
+
+    'datos' se mantiene por compatibilidad: se puede pasar al constructor como
+    antes y, al leerlo, devuelve un diccionario nuevo con todos los campos.
+    Modificar ese diccionario no cambia el evento.
+    """
+    __slots__ = ('timestamp', 'tics', 'tarea_id', 'unidad', 'id_instancia', 'extra', 'cancelado')
+
+    tipo_evento: ClassVar[str]
+    prioridad: ClassVar[int]
+    # Clave con la que cada tipo de evento expone su unidad en 'datos'
+    CLAVE_UNIDAD: ClassVar[str] = 'unidad'
+
+    def __init__(self, timestamp: datetime, datos: Optional[Dict[str, Any]] = None, cancelado: bool = False,
+                 tarea_id: Optional[str] = None, unidad: Optional[int] = None,
+                 id_instancia: Optional[int] = None, extra: Optional[Dict[str, Any]] = None,
+                 tics: Optional[int] = None):
+        self.timestamp = timestamp
+        self.tics = tics
+        self.cancelado = cancelado
+        self.tarea_id = tarea_id
+        self.unidad = unidad
+        self.id_instancia = id_instancia
+        self.extra = extra if extra is not None else {}
+        if datos:
+            self.datos = datos
+
+    @property
+    def datos(self) -> Dict[str, Any]:
+        """Vista de compatibilidad con el antiguo diccionario 'datos'."""
+        datos = {}
+        if self.tarea_id is not None:
+            datos['tarea_id'] = self.tarea_id
+        if self.unidad is not None:
+            datos[self.CLAVE_UNIDAD] = self.unidad
+        if self.id_instancia is not None:
+            datos['id_instancia'] = self.id_instancia
+        datos.update(self.extra)
+        return datos
+
+    @datos.setter
+    def datos(self, datos: Dict[str, Any]):
+        extra = dict(datos)
+        self.tarea_id = extra.pop('tarea_id', None)
+        self.unidad = extra.pop(self.CLAVE_UNIDAD, None)
+        self.id_instancia = extra.pop('id_instancia', None)
+        self.extra = extra
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Representación plana usada por los registros de eventos."""
+        return {'timestamp': self.timestamp, 'datos': self.datos, 'cancelado': self.cancelado,
+                'tipo_evento': self.tipo_evento, 'prioridad': self.prioridad}
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(timestamp={self.timestamp!r}, tarea_id={self.tarea_id!r}, "
+                f"unidad={self.unidad!r}, id_instancia={self.id_instancia!r}, extra={self.extra!r}, "
+                f"cancelado={self.cancelado!r})")
 
     def procesar(self, motor_eventos) -> List['EventoDeSimulacion']:
         """Método que debe ser implementado por las subclases."""
@@ -23,11 +82,11 @@ class EventoDeSimulacion:
 # --- SUBCLASES REFACTORIZADAS ---
 # Ya no tienen __init__, usan el de la clase base y definen sus propios valores.
 
-@dataclass
 class EventoInicioUnidad(EventoDeSimulacion):
     """Evento que marca el inicio del trabajo en una unidad de una tarea."""
-    tipo_evento: str = 'INICIO_UNIDAD'
-    prioridad: int = 2
+    __slots__ = ()
+    tipo_evento = 'INICIO_UNIDAD'
+    prioridad = 2
 
     def procesar(self, motor_eventos) -> List['EventoDeSimulacion']:
         """
@@ -35,15 +94,13 @@ class EventoInicioUnidad(EventoDeSimulacion):
         disponibilidad real de los recursos de ESA instancia.
         """
         # --- 1. Obtener datos del evento ---
-        tarea_id = self.datos.get('tarea_id')
-        numero_unidad = self.datos.get('unidad')
-        id_instancia = self.datos.get('id_instancia')  # CRÍTICO: ID de la instancia
-        es_paralela = self.datos.get('es_instancia_paralela', False)
-
-        motor_eventos.logger.info(
-            f"🟦 [EventoInicioUnidad] Procesando tarea='{tarea_id}', U{numero_unidad}, "
-            f"Instancia={id_instancia[:8] if id_instancia else 'N/A'}"
-        )
+        tarea_id = self.tarea_id
+        numero_unidad = self.unidad
+        id_instancia = self.id_instancia  # CRÍTICO: ID de la instancia
+        es_paralela = self.extra.get('es_instancia_paralela', False)
+
+        traza = motor_eventos.traza
+        traza('inicio', "Procesando tarea='%s', U%s, instancia=%s", tarea_id, numero_unidad, id_instancia)
 
         if not tarea_id or tarea_id not in motor_eventos.lineas_temporales:
             motor_eventos.logger.warning(f"❌ EventoInicioUnidad: tarea {tarea_id} no encontrada.")
@@ -62,7 +119,7 @@ class EventoInicioUnidad(EventoDeSimulacion):
         if not instancia:
             # Esto puede pasar si la tarea se canceló pero el evento ya estaba en cola
             motor_eventos.logger.warning(
-                f"❌ EventoInicioUnidad: Instancia {id_instancia[:8]} no encontrada en '{linea_temporal.name}'. "
+                f"❌ EventoInicioUnidad: Instancia {id_instancia} no encontrada en '{linea_temporal.name}'. "
                 f"Probablemente fue cancelada. Se ignora."
             )
             return []
@@ -70,20 +127,15 @@ class EventoInicioUnidad(EventoDeSimulacion):
         # --- 3. Verificar estado de la tarea ---
         # Usamos el contador global
         if linea_temporal.unidades_finalizadas_total >= linea_temporal.unidades_a_producir:
-            motor_eventos.logger.debug(f"   Tarea '{linea_temporal.name}' ya completada globalmente. Ignorando evento.")
+            traza('inicio', "Tarea '%s' ya completada globalmente. Ignorando evento.", linea_temporal.name)
             return []
 
         trabajadores_instancia = instancia['trabajadores']
-        # --- LOG 6 (Después de obtener trabajadores_instancia) ---
-        motor_eventos.logger.critical(
-            f"DEBUG INICIO_U: Instancia {id_instancia[:8]} - Trabajadores: {trabajadores_instancia}")
-        motor_eventos.logger.info(
-            f"   Trabajadores en esta instancia ({id_instancia[:8]}): {trabajadores_instancia}"
-        )
+        traza('inicio', "Trabajadores de la instancia %s: %s", id_instancia, trabajadores_instancia)
 
         if not trabajadores_instancia:
             motor_eventos.logger.error(
-                f"⚠️ Instancia {id_instancia[:8]} en '{linea_temporal.name}' no tiene trabajadores. No se puede planificar.")
+                f"⚠️ Instancia {id_instancia} en '{linea_temporal.name}' no tiene trabajadores. No se puede planificar.")
             return []
 
         # --- 4. Calcular disponibilidad de recursos de la instancia ---
@@ -91,41 +143,15 @@ class EventoInicioUnidad(EventoDeSimulacion):
         if linea_temporal.machine_id:
             recursos_necesarios.append(linea_temporal.machine_id)
 
-        motor_eventos.logger.debug(f"   Recursos necesarios para instancia: {recursos_necesarios}")
 
-        inicio_propuesto = self.timestamp
-        motor_eventos.logger.debug(f"   Inicio propuesto inicial: {inicio_propuesto}")
-
-        for recurso_id in recursos_necesarios:
-            es_trabajador = recurso_id in motor_eventos.gestor_recursos.calendario_trabajadores
-            motor_eventos.logger.debug(f"   Consultando disponibilidad de '{recurso_id}' (trabajador={es_trabajador})")
-            try:
-                disponibilidad_recurso = motor_eventos.gestor_recursos.encontrar_siguiente_momento_disponible(
-                    recurso_id, inicio_propuesto, es_trabajador
-                )
-                motor_eventos.logger.debug(f"   → Disponible desde: {disponibilidad_recurso}")
-
-                if disponibilidad_recurso > inicio_propuesto:
-                    inicio_propuesto = disponibilidad_recurso
-            except Exception as e:
-                motor_eventos.logger.critical(f"❌ ERROR al consultar disponibilidad de '{recurso_id}': {e}",
-                                              exc_info=True)
-                return []
-
-        # 1. Asigna el valor a inicio_real PRIMERO
-        inicio_real = inicio_propuesto
-        # 2. AHORA usa inicio_real en el log
-        motor_eventos.logger.critical(
-            f"DEBUG INICIO_U: Instancia {id_instancia[:8]} - Inicio real calculado: {inicio_real.strftime('%d/%m %H:%M')}")
-
-        # --- 5. Calcular duración y fin ---
+        # --- 5. Calcular duración ---
         # Mantenemos tu lógica de 'duration_per_unit'
         # El plan (fuente 167) sugiere dividir por num_trabajadores si no hay máquina.
         # Si 'duration_per_unit' ya es el tiempo final (independiente de trabajadores), esta lógica es correcta.
         # Si 'duration_per_unit' es el "esfuerzo total" y debe dividirse, habría que cambiarlo.
         # Por ahora, mantengo tu implementación:
 
-        tiempo_base = linea_temporal.duration_per_unit
+        tiempo_base = linea_temporal.duracion_unidad(numero_unidad)
         num_trabajadores = len(trabajadores_instancia)
 
         if linea_temporal.machine_id:
@@ -140,43 +166,47 @@ class EventoInicioUnidad(EventoDeSimulacion):
                 duracion_esta_unidad = tiempo_base / num_trabajadores
             else:
                 duracion_esta_unidad = tiempo_base  # Fallback
-                # --- LOG 8 (Después de calcular duracion_esta_unidad) ---
-        motor_eventos.logger.critical(
-            f"DEBUG INICIO_U: Instancia {id_instancia[:8]} - Duración unidad calculada: {duracion_esta_unidad:.2f} min")
-        motor_eventos.logger.debug(
-            f"   Duración base: {tiempo_base} min / {num_trabajadores} trabajadores = {duracion_esta_unidad} min")
+        traza('inicio', "Duración: %s min / %d trabajadores = %s min; recursos %s",
+              tiempo_base, num_trabajadores, duracion_esta_unidad, recursos_necesarios)
 
+        # --- 5b. Ventana común libre para TODOS los recursos de la instancia ---
+        # Una sola consulta conjunta: si un recurso retrasa el inicio, los demás se
+        # vuelven a comprobar, y la ventana completa no pisa reservas posteriores.
         try:
-            fin_real = motor_eventos.calculador_tiempos.add_work_minutes(inicio_real, duracion_esta_unidad)
-            motor_eventos.logger.debug(f"   Fin calculado: {fin_real}")
+            tics_evento = self.tics if self.tics is not None else motor_eventos.reloj.a_tics(self.timestamp)
+            tics_inicio, tics_fin = motor_eventos.gestor_recursos.encontrar_ventana_comun_tics(
+                recursos_necesarios, tics_evento, duracion_esta_unidad
+            )
+            inicio_real = motor_eventos.reloj.a_datetime(tics_inicio)
+            fin_real = motor_eventos.reloj.a_datetime(tics_fin)
         except Exception as e:
-            motor_eventos.logger.critical(f"❌ ERROR al calcular fin de tarea: {e}", exc_info=True)
+            traza.volcar("ventana común")
+            motor_eventos.logger.critical(
+                f"❌ ERROR al buscar ventana común para {recursos_necesarios}: {e}", exc_info=True)
             return []
 
         # --- 6. Asignar recursos y actualizar instancia ---
-        motor_eventos.logger.debug(f"   Asignando recursos...")
         for recurso_id in recursos_necesarios:
             es_trabajador = recurso_id in motor_eventos.gestor_recursos.calendario_trabajadores
             try:
                 motor_eventos.gestor_recursos.asignar_recurso(recurso_id, inicio_real, fin_real, tarea_id,
-                                                              es_trabajador)
+                                                              es_trabajador, tics=(tics_inicio, tics_fin))
             except Exception as e:
+                traza.volcar("asignación de recurso")
                 motor_eventos.logger.critical(f"❌ ERROR al asignar recurso '{recurso_id}': {e}", exc_info=True)
                 return []
 
         # Actualizar la instancia en la línea temporal
         instancia['inicio_unidad'] = inicio_real
 
-        motor_eventos.logger.info(
-            f"▶️ Planificando [Instancia {id_instancia[:8]}] unidad {numero_unidad} de '{linea_temporal.name}' "
-            f"de {inicio_real.strftime('%d/%m %H:%M')} a {fin_real.strftime('%d/%m %H:%M')}"
-        )
+        traza('inicio', "Planificando [instancia %s] unidad %s de '%s' de %s a %s",
+              id_instancia, numero_unidad, linea_temporal.name, inicio_real, fin_real)
 
         # --- 7. Generar EventoFinUnidad ---
-        motor_eventos.logger.debug(f"   Creando EventoFinUnidad...")
         try:
             evento_fin = EventoFinUnidad(
                 timestamp=fin_real,
+                tics=tics_fin,
                 datos={
                     'tarea_id': tarea_id,
                     'numero_unidad': numero_unidad,
@@ -191,18 +221,19 @@ class EventoInicioUnidad(EventoDeSimulacion):
             # Guardar referencia al evento de fin en la instancia
             instancia['evento_fin_programado'] = evento_fin
 
-            motor_eventos.logger.info(f"✅ EventoFinUnidad creado para U{numero_unidad} [Instancia {id_instancia[:8]}]")
             return [evento_fin]
 
         except Exception as e:
+            traza.volcar("creación de EventoFinUnidad")
             motor_eventos.logger.critical(f"❌ ERROR CRÍTICO al crear EventoFinUnidad: {e}", exc_info=True)
             return []
 
-@dataclass
 class EventoFinUnidad(EventoDeSimulacion):
     """Evento que marca la finalización de una unidad, liberando recursos."""
-    tipo_evento: str = 'FIN_BLOQUE_TRABAJO'
-    prioridad: int = 1
+    __slots__ = ()
+    tipo_evento = 'FIN_BLOQUE_TRABAJO'
+    prioridad = 1
+    CLAVE_UNIDAD = 'numero_unidad'
 
     # PEGA ESTE MÉTODO COMPLETO DENTRO DE LA CLASE EventoFinUnidad EN simulation_events.py
     # (Reemplaza el método procesar existente)
@@ -214,9 +245,9 @@ class EventoFinUnidad(EventoDeSimulacion):
         ciclos y dependencias con una CADENA DE PRIORIDAD ESTRICTA.
         """
         # --- 1. Obtener datos del evento ---
-        tarea_id = self.datos.get('tarea_id')
-        numero_unidad_completada = self.datos.get('numero_unidad')
-        id_instancia = self.datos.get('id_instancia')  # CRÍTICO: Qué instancia terminó
+        tarea_id = self.tarea_id
+        numero_unidad_completada = self.unidad
+        id_instancia = self.id_instancia  # CRÍTICO: Qué instancia terminó
 
         if not tarea_id or tarea_id not in motor_eventos.lineas_temporales:
             motor_eventos.logger.warning(f"❌ EventoFinUnidad: tarea '{tarea_id}' no encontrada.")
@@ -229,12 +260,9 @@ class EventoFinUnidad(EventoDeSimulacion):
                 f"❌ EventoFinUnidad: No se proveyó id_instancia para '{linea_temporal_actual.name}'. Se ignora.")
             return []
 
-        motor_eventos.logger.info(
-            f"\n{'=' * 70}\n"
-            f"🏁 FIN UNIDAD: '{linea_temporal_actual.name}' U{numero_unidad_completada} "
-            f"[Instancia {id_instancia[:8]}]\n"
-            f"   Hora: {self.timestamp.strftime('%d/%m %H:%M')}"
-        )
+        motor_eventos.traza('fin', "\n%s\n🏁 FIN UNIDAD: '%s' U%s [Instancia %s]\n   Hora: %s", '=' * 70,
+                            linea_temporal_actual.name, numero_unidad_completada, id_instancia,
+                            self.timestamp)
 
         # --- 2. Actualizar estado en LineaTemporal ---
         # (Asumimos que 'completar_unidad_instancia' ha sido refactorizado como te indiqué:
@@ -242,7 +270,7 @@ class EventoFinUnidad(EventoDeSimulacion):
         # devolviendo los trabajadores que contenía)
 
         linea_temporal_actual.historial_unidades.append(
-            {'unidad': numero_unidad_completada, 'fin': self.timestamp, 'inicio': self.datos.get('inicio')}
+            {'unidad': numero_unidad_completada, 'fin': self.timestamp, 'inicio': self.extra.get('inicio')}
         )
 
         # Obtenemos los trabajadores de la instancia ANTES de que 'completar...' la elimine
@@ -256,10 +284,8 @@ class EventoFinUnidad(EventoDeSimulacion):
         tarea_completada = resultado['tarea_completada']
         trabajadores_liberados = resultado['trabajadores_liberados']
 
-        motor_eventos.logger.info(
-            f"   Estado post-completar: Tarea_Completa={tarea_completada}, "
-            f"Trabajadores liberados: {trabajadores_liberados}"
-        )
+        motor_eventos.traza('fin', "   Estado post-completar: Tarea_Completa=%s, Trabajadores liberados: %s",
+                            tarea_completada, trabajadores_liberados)
 
         # Inicializar lista de eventos
         eventos_nuevos = []
@@ -275,34 +301,25 @@ class EventoFinUnidad(EventoDeSimulacion):
         if indice_actual is not None and 0 <= indice_actual < len(motor_eventos.production_flow):
             step_config_actual = motor_eventos.production_flow[indice_actual]
             units_per_cycle = max(1, step_config_actual.get('units_per_cycle', 1))
-            next_cyclic_index = step_config_actual.get('next_cyclic_task_index')
+            next_cyclic_index = motor_eventos.grafo_dependencias.siguiente_ciclico(tarea_id)
             se_completo_ciclo_matematico = (numero_unidad_completada % units_per_cycle == 0)
 
         # --- Definir final_reassignment_rule_applies ---
         final_reassignment_rule_applies = False
         if tarea_completada:  # Solo tiene sentido chequear si la tarea está completada
-            indice_actual = motor_eventos.tarea_id_a_indice.get(tarea_id)
-            if indice_actual is not None and 0 <= indice_actual < len(motor_eventos.production_flow):
-                step_config = motor_eventos.production_flow[indice_actual]
-                workers_config = step_config.get('workers', [])
-                for worker_config in workers_config:
-                    # Comprobar si es un dict y si el trabajador estaba en la instancia que acaba de terminar
-                    if isinstance(worker_config, dict) and worker_config.get('name') in trabajadores_instancia:
-                        regla = worker_config.get('reassignment_rule')
-                        # Comprobar si existe la regla y es del tipo ON_FINISH
-                        if regla and regla.get('condition_type') == 'ON_FINISH':
-                            final_reassignment_rule_applies = True
-                            motor_eventos.logger.debug(
-                                f"   ℹ️ Detectada regla ON_FINISH aplicable para worker '{worker_config.get('name')}' en esta tarea completada.")
-                            break  # Encontramos una, no necesitamos buscar más
+            # Reglas ON_FINISH de la tarea (compiladas al crear el motor)
+            for regla in motor_eventos.reglas_reasignacion.al_terminar(tarea_id):
+                # Comprobar si el trabajador estaba en la instancia que acaba de terminar
+                if regla.trabajador_id in trabajadores_instancia:
+                    final_reassignment_rule_applies = True
+                    motor_eventos.traza('fin', "   ℹ️ Detectada regla ON_FINISH aplicable para worker '%s' en esta tarea completada.",
+                                        regla.trabajador_id)
+                    break  # Encontramos una, no necesitamos buscar más
         # --- FIN: Definir final_reassignment_rule_applies ---
 
-        motor_eventos.logger.debug(
-            f"📋 Configuración de reglas:\n"
-            f"   • ¿Regla ON_FINISH final aplica?: {final_reassignment_rule_applies}\n"
-            f"   • ¿Ciclo matemático completado?: {se_completo_ciclo_matematico}\n"
-            f"   • ¿Hay tarea cíclica?: {next_cyclic_index is not None}"
-        )
+        motor_eventos.traza('fin', "📋 Configuración de reglas:\n   • ¿Regla ON_FINISH final aplica?: %s\n   • ¿Ciclo matemático completado?: %s\n   • ¿Hay tarea cíclica?: %s",
+                            final_reassignment_rule_applies, se_completo_ciclo_matematico,
+                            next_cyclic_index is not None)
 
         # ============================================================================
         # 👑 INICIO DE LA LÓGICA DE DECISIÓN PRIORIZADA (CORREGIDA) 👑
@@ -313,8 +330,8 @@ class EventoFinUnidad(EventoDeSimulacion):
         # (Ocurre si tarea_completada=True Y esta es la tarea con la regla ON_FINISH)
         # ----------------------------------------------------------------------------
         if tarea_completada and final_reassignment_rule_applies:
-            motor_eventos.logger.info(
-                f"🎯 PRIORIDAD 1: REASIGNACIÓN ON_FINISH desde tarea completada '{linea_temporal_actual.name}'.")
+            motor_eventos.traza('fin', "🎯 PRIORIDAD 1: REASIGNACIÓN ON_FINISH desde tarea completada '%s'.",
+                                linea_temporal_actual.name)
             # Es importante llamar a _verificar_reglas_reasignacion para generar el evento
             eventos_reasignacion_on_finish = self._verificar_reglas_reasignacion(
                 motor_eventos, tarea_id, numero_unidad_completada,
@@ -323,7 +340,7 @@ class EventoFinUnidad(EventoDeSimulacion):
             # Filtrar para quedarnos solo con las reglas ON_FINISH
             eventos_reasignacion_on_finish = [
                 ev for ev in eventos_reasignacion_on_finish
-                if ev.datos.get('motivo', '').find('ON_FINISH') != -1
+                if ev.extra.get('motivo', '').find('ON_FINISH') != -1
             ]
             if eventos_reasignacion_on_finish:
                 eventos_nuevos.extend(eventos_reasignacion_on_finish)
@@ -339,12 +356,12 @@ class EventoFinUnidad(EventoDeSimulacion):
         elif tarea_completada and not final_reassignment_rule_applies:
             # ANTES de liberar al trabajador, VERIFICAR si había un ciclo pendiente
             if next_cyclic_index is not None:
-                motor_eventos.logger.info(
-                    f"  ⚠️ Tarea '{linea_temporal_actual.name}' completada, pero hay ciclo pendiente hacia índice {next_cyclic_index}. Siguiendo ciclo.")
+                motor_eventos.traza('fin', "  ⚠️ Tarea '%s' completada, pero hay ciclo pendiente hacia índice %s. Siguiendo ciclo.",
+                                    linea_temporal_actual.name, next_cyclic_index)
 
                 # --- INICIO LÓGICA DE CICLO (COPIADA) ---
                 trabajadores_ciclicos = trabajadores_liberados.copy()
-                motor_eventos.logger.debug(f"  📦 Trabajadores a migrar: {trabajadores_ciclicos}")
+                motor_eventos.traza('fin', "  📦 Trabajadores a migrar: %s", trabajadores_ciclicos)
                 if not (0 <= next_cyclic_index < len(motor_eventos.production_flow)):
                     motor_eventos.logger.error(f"  ❌ ERROR: Índice cíclico {next_cyclic_index} fuera de rango")
                     return eventos_nuevos
@@ -359,16 +376,11 @@ class EventoFinUnidad(EventoDeSimulacion):
                         f"  ❌ ERROR: No se encontró LineaTemporal para tarea_id '{next_tarea_id}'")
                     return eventos_nuevos
                 unidad_a_programar_en_ciclo = linea_temporal_siguiente.unidades_finalizadas_total + 1
-                motor_eventos.logger.debug(
-                    f"  🎯 Tarea destino del ciclo: '{linea_temporal_siguiente.name}'\n"
-                    f"     • Próxima unidad: {unidad_a_programar_en_ciclo}"
-                )
+                motor_eventos.traza('fin', "  🎯 Tarea destino del ciclo: '%s'\n     • Próxima unidad: %s",
+                                    linea_temporal_siguiente.name, unidad_a_programar_en_ciclo)
                 if unidad_a_programar_en_ciclo > linea_temporal_siguiente.unidades_a_producir:
-                    motor_eventos.logger.info(
-                        f"  ⭐ CICLO COMPLETO: Tarea '{linea_temporal_siguiente.name}' "
-                        f"ya completó todas sus unidades. "
-                        f"Trabajadores {trabajadores_ciclicos} quedan libres."
-                    )
+                    motor_eventos.traza('fin', "  ⭐ CICLO COMPLETO: Tarea '%s' ya completó todas sus unidades. Trabajadores %s quedan libres.",
+                                        linea_temporal_siguiente.name, trabajadores_ciclicos)
                 elif motor_eventos._tiene_evento_futuro(next_tarea_id, unidad_a_programar_en_ciclo):
                     motor_eventos.logger.warning(
                         f"  ⚠️ SALTO CÍCLICO OMITIDO: Ya existe un evento programado para "
@@ -376,20 +388,19 @@ class EventoFinUnidad(EventoDeSimulacion):
                         f"Trabajadores {trabajadores_ciclicos} quedan libres."
                     )
                 else:
-                    motor_eventos.logger.info(
-                        f"  🔄 MIGRANDO TRABAJADORES AL CICLO:\n"
-                        f"     • Hacia: '{linea_temporal_siguiente.name}' (U{unidad_a_programar_en_ciclo})\n"
-                        f"     • Trabajadores: {trabajadores_ciclicos}"
-                    )
+                    motor_eventos.traza('fin', "  🔄 MIGRANDO TRABAJADORES AL CICLO:\n     • Hacia: '%s' (U%s)\n     • Trabajadores: %s",
+                                        linea_temporal_siguiente.name, unidad_a_programar_en_ciclo,
+                                        trabajadores_ciclicos)
                     try:
                         nuevo_id_instancia = linea_temporal_siguiente.iniciar_instancia_inicial(
                             trabajadores=trabajadores_ciclicos,
                             fecha_inicio=self.timestamp,
                             numero_unidad = unidad_a_programar_en_ciclo
                         )
-                        motor_eventos.logger.info(f"     • Instancia nueva: {nuevo_id_instancia[:8]}")
+                        motor_eventos.traza('fin', "     • Instancia nueva: %s", nuevo_id_instancia)
                         evento_ciclico = EventoInicioUnidad(
                             timestamp=self.timestamp,
+                            tics=self.tics,
                             datos={
                                 'tarea_id': next_tarea_id,
                                 'unidad': unidad_a_programar_en_ciclo,
@@ -410,7 +421,7 @@ class EventoFinUnidad(EventoDeSimulacion):
                                 details={'tarea_origen': linea_temporal_actual.name,
                                          'tarea_destino': linea_temporal_siguiente.name,
                                          'trabajadores': trabajadores_ciclicos,
-                                         'instancia_nueva': nuevo_id_instancia[:8]},
+                                         'instancia_nueva': nuevo_id_instancia},
                                 status=DecisionStatus.POSITIVE, icon="🔄"
                             )
                             motor_eventos.audit_log_interno.append(decision)
@@ -424,17 +435,14 @@ class EventoFinUnidad(EventoDeSimulacion):
 
             else:
                 # SI NO había ciclo, AHORA sí queda libre
-                motor_eventos.logger.info(
-                    f"🎉 PRIORIDAD 2: TAREA '{linea_temporal_actual.name}' COMPLETADA "
-                    f"({linea_temporal_actual.unidades_finalizadas_total}/{linea_temporal_actual.unidades_a_producir}) "
-                    f"- Worker(s) {trabajadores_liberados} libres."
-                )
+                motor_eventos.traza('fin', "🎉 PRIORIDAD 2: TAREA '%s' COMPLETADA (%s/%s) - Worker(s) %s libres.",
+                                    linea_temporal_actual.name, linea_temporal_actual.unidades_finalizadas_total,
+                                    linea_temporal_actual.unidades_a_producir, trabajadores_liberados)
 
                 # --- INICIO LÓGICA TAREA COMPLETADA (COPIADA) ---
                 eventos_a_cancelar = linea_temporal_actual.eventos_futuros.copy()
                 if eventos_a_cancelar:
-                    motor_eventos.logger.info(
-                        f"  ❌ Cancelando {len(eventos_a_cancelar)} eventos futuros pendientes.")
+                    motor_eventos.traza('fin', "  ❌ Cancelando %s eventos futuros pendientes.", len(eventos_a_cancelar))
                     if hasattr(motor_eventos, 'cancelar_eventos'):
                         motor_eventos.cancelar_eventos(eventos_a_cancelar)
                     linea_temporal_actual.eventos_futuros.clear()
@@ -457,13 +465,12 @@ class EventoFinUnidad(EventoDeSimulacion):
             # Filtro extra de seguridad para ignorar reglas ON_FINISH
             eventos_reasignacion_std = [
                 ev for ev in eventos_reasignacion_std
-                if ev.datos.get('motivo', '').find('ON_FINISH') == -1
+                if ev.extra.get('motivo', '').find('ON_FINISH') == -1
             ]
 
             if eventos_reasignacion_std:
-                motor_eventos.logger.info(
-                    f"  ↪️ PRIORIDAD 3: REASIGNACIÓN ESTÁNDAR (AFTER_UNITS). {len(eventos_reasignacion_std)} evento(s) generado(s)."
-                )
+                motor_eventos.traza('fin', "  ↪️ PRIORIDAD 3: REASIGNACIÓN ESTÁNDAR (AFTER_UNITS). %s evento(s) generado(s).",
+                                    len(eventos_reasignacion_std))
                 eventos_nuevos.extend(eventos_reasignacion_std)
                 # La reasignación tiene prioridad sobre el ciclo y la continuación para estos trabajadores.
 
@@ -471,11 +478,11 @@ class EventoFinUnidad(EventoDeSimulacion):
             # PRIORIDAD 4: ¿Aplica CICLO? (Si TAREA NO completa Y NO hubo reasignación estándar)
             # ----------------------------------------------------------------------------
             elif se_completo_ciclo_matematico and next_cyclic_index is not None:
-                motor_eventos.logger.info("  🔄 PRIORIDAD 4: CICLO. Iniciando migración cíclica...")
+                motor_eventos.traza('fin', "  🔄 PRIORIDAD 4: CICLO. Iniciando migración cíclica...")
 
                 # --- INICIO LÓGICA DE CICLO (COPIADA) ---
                 trabajadores_ciclicos = trabajadores_liberados.copy()
-                motor_eventos.logger.debug(f"  📦 Trabajadores a migrar: {trabajadores_ciclicos}")
+                motor_eventos.traza('fin', "  📦 Trabajadores a migrar: %s", trabajadores_ciclicos)
                 if not (0 <= next_cyclic_index < len(motor_eventos.production_flow)):
                     motor_eventos.logger.error(f"  ❌ ERROR: Índice cíclico {next_cyclic_index} fuera de rango")
                     return eventos_nuevos
@@ -490,16 +497,11 @@ class EventoFinUnidad(EventoDeSimulacion):
                         f"  ❌ ERROR: No se encontró LineaTemporal para tarea_id '{next_tarea_id}'")
                     return eventos_nuevos
                 unidad_a_programar_en_ciclo = linea_temporal_siguiente.unidades_finalizadas_total + 1
-                motor_eventos.logger.debug(
-                    f"  🎯 Tarea destino del ciclo: '{linea_temporal_siguiente.name}'\n"
-                    f"     • Próxima unidad: {unidad_a_programar_en_ciclo}"
-                )
+                motor_eventos.traza('fin', "  🎯 Tarea destino del ciclo: '%s'\n     • Próxima unidad: %s",
+                                    linea_temporal_siguiente.name, unidad_a_programar_en_ciclo)
                 if unidad_a_programar_en_ciclo > linea_temporal_siguiente.unidades_a_producir:
-                    motor_eventos.logger.info(
-                        f"  ⭐ CICLO COMPLETO: Tarea '{linea_temporal_siguiente.name}' "
-                        f"ya completó todas sus unidades. "
-                        f"Trabajadores {trabajadores_ciclicos} quedan libres."
-                    )
+                    motor_eventos.traza('fin', "  ⭐ CICLO COMPLETO: Tarea '%s' ya completó todas sus unidades. Trabajadores %s quedan libres.",
+                                        linea_temporal_siguiente.name, trabajadores_ciclicos)
                 elif motor_eventos._tiene_evento_futuro(next_tarea_id, unidad_a_programar_en_ciclo):
                     motor_eventos.logger.warning(
                         f"  ⚠️ SALTO CÍCLICO OMITIDO: Ya existe un evento programado para "
@@ -507,20 +509,19 @@ class EventoFinUnidad(EventoDeSimulacion):
                         f"Trabajadores {trabajadores_ciclicos} quedan libres."
                     )
                 else:
-                    motor_eventos.logger.info(
-                        f"  🔄 MIGRANDO TRABAJADORES AL CICLO:\n"
-                        f"     • Hacia: '{linea_temporal_siguiente.name}' (U{unidad_a_programar_en_ciclo})\n"
-                        f"     • Trabajadores: {trabajadores_ciclicos}"
-                    )
+                    motor_eventos.traza('fin', "  🔄 MIGRANDO TRABAJADORES AL CICLO:\n     • Hacia: '%s' (U%s)\n     • Trabajadores: %s",
+                                        linea_temporal_siguiente.name, unidad_a_programar_en_ciclo,
+                                        trabajadores_ciclicos)
                     try:
                         nuevo_id_instancia = linea_temporal_siguiente.iniciar_instancia_inicial(
                             trabajadores=trabajadores_ciclicos,
                             fecha_inicio=self.timestamp,
                             numero_unidad=unidad_a_programar_en_ciclo
                         )
-                        motor_eventos.logger.info(f"     • Instancia nueva: {nuevo_id_instancia[:8]}")
+                        motor_eventos.traza('fin', "     • Instancia nueva: %s", nuevo_id_instancia)
                         evento_ciclico = EventoInicioUnidad(
                             timestamp=self.timestamp,
+                            tics=self.tics,
                             datos={
                                 'tarea_id': next_tarea_id,
                                 'unidad': unidad_a_programar_en_ciclo,
@@ -541,7 +542,7 @@ class EventoFinUnidad(EventoDeSimulacion):
                                 details={'tarea_origen': linea_temporal_actual.name,
                                          'tarea_destino': linea_temporal_siguiente.name,
                                          'trabajadores': trabajadores_ciclicos,
-                                         'instancia_nueva': nuevo_id_instancia[:8]},
+                                         'instancia_nueva': nuevo_id_instancia},
                                 status=DecisionStatus.POSITIVE, icon="🔄"
                             )
                             motor_eventos.audit_log_interno.append(decision)
@@ -557,24 +558,21 @@ class EventoFinUnidad(EventoDeSimulacion):
             # PRIORIDAD 5: (Default) CONTINUAR (Si TAREA NO completa Y NO hubo reasignación ni ciclo)
             # ----------------------------------------------------------------------------
             else:
-                motor_eventos.logger.info(
-                    f"  ➡️ PRIORIDAD 5: CONTINUAR. {trabajadores_liberados} seguirán en '{linea_temporal_actual.name}'"
-                )
+                motor_eventos.traza('fin', "  ➡️ PRIORIDAD 5: CONTINUAR. %s seguirán en '%s'", trabajadores_liberados,
+                                    linea_temporal_actual.name)
 
                 # --- INICIO LÓGICA CONTINUAR (COPIADA) ---
                 unidades_en_proceso = {
                     inst['unidad_actual']
-                    for inst in linea_temporal_actual.instancias_activas
+                    for inst in linea_temporal_actual.instancias.values()
                 }
                 siguiente_unidad_actual = linea_temporal_actual.unidades_finalizadas_total + 1
                 while siguiente_unidad_actual in unidades_en_proceso and siguiente_unidad_actual <= linea_temporal_actual.unidades_a_producir:
                     siguiente_unidad_actual += 1
 
                 if siguiente_unidad_actual > linea_temporal_actual.unidades_a_producir:
-                    motor_eventos.logger.info(
-                        f"  🔚 No hay más unidades disponibles en '{linea_temporal_actual.name}'. "
-                        f"Trabajadores {trabajadores_liberados} quedan libres."
-                    )
+                    motor_eventos.traza('fin', "  🔚 No hay más unidades disponibles en '%s'. Trabajadores %s quedan libres.",
+                                        linea_temporal_actual.name, trabajadores_liberados)
                     eventos_nuevos.extend(
                         self._registrar_inactividad_trabajadores(motor_eventos, linea_temporal_actual))
                 else:
@@ -592,21 +590,18 @@ class EventoFinUnidad(EventoDeSimulacion):
                                 pred_linea_temporal = motor_eventos.lineas_temporales.get(pred_tarea_id)
                                 if pred_linea_temporal:
                                     unidades_predecesor_completadas = pred_linea_temporal.unidades_finalizadas_total
-                                    motor_eventos.logger.debug(
-                                        f"  🔍 Verificación de dependencia para U{siguiente_unidad_actual}:\n"
-                                        f"     • Predecesor: '{pred_linea_temporal.name}'\n"
-                                        f"     • Requeridas: {unidades_predecesor_requeridas}\n"
-                                        f"     • Completadas: {unidades_predecesor_completadas}"
-                                    )
+                                    motor_eventos.traza('fin', "  🔍 Verificación de dependencia para U%s:\n     • Predecesor: '%s'\n     • Requeridas: %s\n     • Completadas: %s",
+                                                        siguiente_unidad_actual, pred_linea_temporal.name,
+                                                        unidades_predecesor_requeridas,
+                                                        unidades_predecesor_completadas)
                                     if unidades_predecesor_completadas < unidades_predecesor_requeridas:
                                         puede_continuar = False
                                         razon_bloqueo = (
                                             f"Esperando {unidades_predecesor_requeridas - unidades_predecesor_completadas} unidad(es) más de '{pred_linea_temporal.name}'")
                     if puede_continuar:
-                        motor_eventos.logger.info(
-                            f"  ⬆️ CONTINUACIÓN: Creando nueva instancia para U{siguiente_unidad_actual} "
-                            f"en '{linea_temporal_actual.name}' con {trabajadores_liberados}"
-                        )
+                        motor_eventos.traza('fin', "  ⬆️ CONTINUACIÓN: Creando nueva instancia para U%s en '%s' con %s",
+                                            siguiente_unidad_actual, linea_temporal_actual.name,
+                                            trabajadores_liberados)
                         nuevo_id_instancia = linea_temporal_actual.iniciar_instancia_inicial(
                             trabajadores_liberados,
                             self.timestamp,
@@ -614,6 +609,7 @@ class EventoFinUnidad(EventoDeSimulacion):
                         )
                         evento_continuacion = EventoInicioUnidad(
                             timestamp=self.timestamp,
+                            tics=self.tics,
                             datos={
                                 'tarea_id': tarea_id,
                                 'unidad': siguiente_unidad_actual,
@@ -622,9 +618,7 @@ class EventoFinUnidad(EventoDeSimulacion):
                         )
                         eventos_nuevos.append(evento_continuacion)
                     else:
-                        motor_eventos.logger.info(
-                            f"  ⏸️ CONTINUACIÓN BLOQUEADA: {razon_bloqueo}"
-                        )
+                        motor_eventos.traza('fin', "  ⏸️ CONTINUACIÓN BLOQUEADA: %s", razon_bloqueo)
                         eventos_nuevos.extend(
                             self._registrar_inactividad_trabajadores(motor_eventos, linea_temporal_actual))
 
@@ -634,7 +628,7 @@ class EventoFinUnidad(EventoDeSimulacion):
 
         # SIEMPRE: Verificar dependencias estándar para OTRAS tareas
         # (Esto despierta las "tareas durmientes")
-        motor_eventos.logger.debug("🔗 Verificando dependencias estándar (despertar tareas)...")
+        motor_eventos.traza('fin', "🔗 Verificando dependencias estándar (despertar tareas)...")
         eventos_dependencias = motor_eventos._verificar_dependencias_cumplidas(
             tarea_completada_id=tarea_id,
             # Usamos el contador global, que es la fuente de verdad
@@ -643,20 +637,15 @@ class EventoFinUnidad(EventoDeSimulacion):
             eventos_ya_creados=eventos_nuevos
         )
         if eventos_dependencias:
-            motor_eventos.logger.info(
-                f"  🔓 Dependencias: {len(eventos_dependencias)} tarea(s) desbloqueada(s)"
-            )
+            motor_eventos.traza('fin', "  🔓 Dependencias: %s tarea(s) desbloqueada(s)", len(eventos_dependencias))
             eventos_nuevos.extend(eventos_dependencias)
         else:
-            motor_eventos.logger.debug("  ✓ Sin dependencias que desbloquear")
+            motor_eventos.traza('fin', "  ✓ Sin dependencias que desbloquear")
 
         # --- Log final ---
-        motor_eventos.logger.info(
-            f"{'=' * 70}\n"
-            f"📦 RESUMEN EventoFinUnidad '{linea_temporal_actual.name}' U{numero_unidad_completada} [Inst {id_instancia[:8]}]:\n"
-            f"   • Eventos generados: {len(eventos_nuevos)}\n"
-            f"{'=' * 70}\n"
-        )
+        motor_eventos.traza('fin', "%s\n📦 RESUMEN EventoFinUnidad '%s' U%s [Inst %s]:\n   • Eventos generados: %s\n%s\n",
+                            '=' * 70, linea_temporal_actual.name, numero_unidad_completada, id_instancia,
+                            len(eventos_nuevos), '=' * 70)
 
         return eventos_nuevos
 
@@ -666,88 +655,48 @@ class EventoFinUnidad(EventoDeSimulacion):
                                        tarea_completada: bool) -> List['EventoDeSimulacion']:
         """
         Verifica si algún trabajador debe ser reasignado según las reglas configuradas.
+        Las reglas vienen compiladas por tarea de origen y umbral
+        (motor_eventos.reglas_reasignacion): si no se cruza ningún umbral no
+        hay nada que recorrer.
         """
         eventos_reasignacion = []
 
-        motor_eventos.logger.info(
-            f"\n{'🔍' * 30}\n"
-            f"🔍 VERIFICANDO REGLAS DE REASIGNACIÓN:\n"
-            f"   • Tarea origen: {tarea_origen_id}\n"
-            f"   • Unidades completadas: {unidades_completadas}\n"
-            f"   • Trabajadores instancia: {trabajadores_instancia}\n"
-            f"   • Tarea completada: {tarea_completada}\n"
-        )
-
         if not trabajadores_instancia:
-            motor_eventos.logger.debug("   ⏭️ No hay trabajadores en instancia")
             return []
-
-        # Obtener configuración
-        indice_origen = motor_eventos.tarea_id_a_indice.get(tarea_origen_id)
-        if indice_origen is None:
+        reglas = [regla for regla in motor_eventos.reglas_reasignacion.disparadas(
+                      tarea_origen_id, unidades_completadas, tarea_completada)
+                  if regla.trabajador_id in trabajadores_instancia]
+        if not reglas:
             return []
 
-        step_config = motor_eventos.production_flow[indice_origen]
-        workers_config = step_config.get('workers', [])
-
-        for worker_config in workers_config:
-            if not isinstance(worker_config, dict):
-                continue
-
-            worker_name = worker_config.get('name')
-            regla = worker_config.get('reassignment_rule')
-
-            if not regla or not worker_name:
-                continue
-
-            # Verificar si el trabajador está en esta instancia
-            if worker_name not in trabajadores_instancia:
-                continue
-
-            # Verificar condición según tipo
-            cumple_condicion = False
-            condition_type = regla.get('condition_type')
+        motor_eventos.traza('reasignacion', "\n%s\n🔍 VERIFICANDO REGLAS DE REASIGNACIÓN:\n   • Tarea origen: %s\n"
+                            "   • Unidades completadas: %s\n   • Trabajadores instancia: %s\n   • Tarea completada: %s\n",
+                            '🔍' * 30, tarea_origen_id, unidades_completadas, trabajadores_instancia, tarea_completada)
 
-            if condition_type == 'AFTER_UNITS':
-                condition_value = regla.get('condition_value', 0)
-                cumple_condicion = (unidades_completadas >= condition_value)
-                motor_eventos.logger.debug(
-                    f"      📊 '{worker_name}' - AFTER_UNITS: {unidades_completadas} >= {condition_value} = {cumple_condicion}"
-                )
-
-            elif condition_type == 'ON_FINISH':
-                cumple_condicion = tarea_completada
-                motor_eventos.logger.debug(
-                    f"      📊 '{worker_name}' - ON_FINISH: tarea_completada = {cumple_condicion}"
-                )
+        for regla in reglas:
+            if regla.condicion_tipo == 'AFTER_UNITS':
+                motor_eventos.traza('reasignacion', "      📊 '%s' - AFTER_UNITS: %s >= %s", regla.trabajador_id,
+                                    unidades_completadas, regla.condicion_valor)
+            else:
+                motor_eventos.traza('reasignacion', "      📊 '%s' - ON_FINISH: tarea completada", regla.trabajador_id)
 
-            if cumple_condicion:
-                target_task_id = regla.get('target_task_id')
-                mode = regla.get('mode', 'PARALLEL_JOIN')
+            motor_eventos.traza('reasignacion', "\n   ✅ REGLA DISPARADA PARA '%s':\n      • Condición: %s\n      • Tarea destino: %s\n      • Modo: %s\n",
+                                regla.trabajador_id, regla.condicion_tipo, regla.tarea_destino_id, regla.modo)
 
-                motor_eventos.logger.info(
-                    f"\n   ✅ REGLA DISPARADA PARA '{worker_name}':\n"
-                    f"      • Condición: {condition_type}\n"
-                    f"      • Tarea destino: {target_task_id}\n"
-                    f"      • Modo: {mode}\n"
-                )
-
-                evento_reasignacion = EventoReasignacionTrabajador(
-                    timestamp=self.timestamp,
-                    datos={
-                        'trabajador_id': worker_name,
-                        'tarea_origen': tarea_origen_id,
-                        'tarea_destino': target_task_id,
-                        'mode': mode,
-                        'motivo': f"Condición cumplida: {condition_type}"
-                    }
-                )
-                eventos_reasignacion.append(evento_reasignacion)
+            evento_reasignacion = EventoReasignacionTrabajador(
+                timestamp=self.timestamp,
+                datos={
+                    'trabajador_id': regla.trabajador_id,
+                    'tarea_origen': tarea_origen_id,
+                    'tarea_destino': regla.tarea_destino_id,
+                    'mode': regla.modo,
+                    'motivo': f"Condición cumplida: {regla.condicion_tipo}"
+                }
+            )
+            eventos_reasignacion.append(evento_reasignacion)
 
-        motor_eventos.logger.info(
-            f"{'🔍' * 30}\n"
-            f"📊 RESULTADO: {len(eventos_reasignacion)} reasignación(es) generada(s)\n"
-        )
+        motor_eventos.traza('reasignacion', "%s\n📊 RESULTADO: %s reasignación(es) generada(s)\n", '🔍' * 30,
+                            len(eventos_reasignacion))
 
         return eventos_reasignacion
 
@@ -759,102 +708,67 @@ class EventoFinUnidad(EventoDeSimulacion):
         """
         from calculation_audit import CalculationDecision, DecisionStatus
 
-        # ✅ DIAGNÓSTICO
-        motor_eventos.logger.critical("=" * 80)
-        motor_eventos.logger.critical(f"🔍 DEBUG _registrar_inactividad_trabajadores:")
-        motor_eventos.logger.critical(f"  Tarea completada: {linea_temporal_actual.name}")
-        motor_eventos.logger.critical(f"  Trabajadores asignados: {linea_temporal_actual.trabajadores_asignados}")
-        motor_eventos.logger.critical(f"  Timestamp actual: {self.timestamp}")
+        traza = motor_eventos.traza
+        traza('inactividad', "Tarea '%s' liberada en %s; trabajadores %s",
+              linea_temporal_actual.name, self.timestamp, linea_temporal_actual.trabajadores_asignados)
 
         trabajadores_tarea = linea_temporal_actual.trabajadores_asignados
 
         # --- UMBRAL DE INACTIVIDAD (en minutos) ---
         UMBRAL_MINUTOS_INACTIVIDAD = 5
 
-        motor_eventos.logger.critical(f"  Umbral de inactividad: {UMBRAL_MINUTOS_INACTIVIDAD} min")
-
         # ✅ NUEVA ESTRATEGIA: Buscar en eventos_futuros cuándo se desbloqueará esta tarea
         # Buscar el próximo evento FIN_BLOQUE_TRABAJO del predecesor que desbloqueará esta tarea
 
         # Obtener configuración de dependencias de esta tarea
         tarea_id_actual = None
-        for tid, linea in motor_eventos.lineas_temporales.items():
-            if linea == linea_temporal_actual:
-                tarea_id_actual = tid
-                break
-
-        motor_eventos.logger.critical(f"  Tarea ID actual: {tarea_id_actual}")
+        if motor_eventos.lineas_temporales.get(linea_temporal_actual.id) is linea_temporal_actual:
+            tarea_id_actual = linea_temporal_actual.id
 
         if not tarea_id_actual:
-            motor_eventos.logger.critical("  ✗ No se pudo obtener tarea_id actual")
-            motor_eventos.logger.critical("=" * 80)
+            traza('inactividad', "  No se pudo obtener tarea_id actual")
             return []
 
         # Obtener dependency_index directamente de la línea temporal
         dependency_index = linea_temporal_actual.dependency_index
 
-        motor_eventos.logger.critical(
-            f"  Dependency index (de linea_temporal): {dependency_index} (type: {type(dependency_index)})")
-
         # ✅ CORRECCIÓN: 0 es un índice válido, solo None o negativo significa sin dependencia
         if dependency_index is None or (isinstance(dependency_index, int) and dependency_index < 0):
-            motor_eventos.logger.critical("  ✗ Esta tarea no tiene dependencias (no está bloqueada)")
-            motor_eventos.logger.critical("=" * 80)
+            traza('inactividad', "  '%s' no tiene dependencias (no está bloqueada)", tarea_id_actual)
             return []
 
-        motor_eventos.logger.critical(f"  ✓ Dependency index válido: {dependency_index}")
-
-        # Obtener tarea predecesora
-        pred_tarea_id = motor_eventos.indice_a_tarea_id.get(dependency_index)
+        # Obtener tarea predecesora (arista inversa del grafo)
+        pred_tarea_id = motor_eventos.grafo_dependencias.predecesor(tarea_id_actual)
         if not pred_tarea_id:
-            motor_eventos.logger.critical("  ✗ No se encontró tarea predecesora")
-            motor_eventos.logger.critical("=" * 80)
+            traza('inactividad', "  No se encontró tarea predecesora (dependency_index=%s)", dependency_index)
             return []
 
         pred_linea_temporal = motor_eventos.lineas_temporales.get(pred_tarea_id)
         if not pred_linea_temporal:
-            motor_eventos.logger.critical("  ✗ No se encontró línea temporal predecesora")
-            motor_eventos.logger.critical("=" * 80)
+            traza('inactividad', "  No se encontró línea temporal predecesora '%s'", pred_tarea_id)
             return []
 
-        motor_eventos.logger.critical(f"  Predecesor: {pred_linea_temporal.name}")
-        motor_eventos.logger.critical(f"  Unidades completadas predecesor: {pred_linea_temporal.unidades_completadas}")
+        traza('inactividad', "  Predecesor '%s' con %d unidades completadas",
+              pred_linea_temporal.name, pred_linea_temporal.unidades_completadas)
 
         # Buscar el próximo evento FIN_BLOQUE_TRABAJO del predecesor
         proxima_finalizacion_predecesor = None
         unidad_que_desbloqueara = linea_temporal_actual.unidades_completadas + 1
 
-        for evento_futuro in sorted(motor_eventos.eventos_futuros):
-            timestamp_futuro, _, evento_obj = evento_futuro
-
-            if timestamp_futuro <= self.timestamp:
-                continue
-
-            if hasattr(evento_obj, 'tipo_evento') and evento_obj.tipo_evento == 'FIN_BLOQUE_TRABAJO':
-                ev_tarea_id = evento_obj.datos.get('tarea_id')
-                ev_unidad = evento_obj.datos.get('numero_unidad')
-
-                if ev_tarea_id == pred_tarea_id:
-                    motor_eventos.logger.critical(
-                        f"    Encontrado FIN del predecesor: U{ev_unidad} en {timestamp_futuro.strftime('%d/%m %H:%M')}"
-                    )
-                    # El primero que encontremos será el que desbloquee la siguiente unidad
-                    proxima_finalizacion_predecesor = timestamp_futuro
-                    break
+        # El primero posterior a este instante será el que desbloquee la siguiente unidad
+        tics_evento = self.tics if self.tics is not None else motor_eventos.reloj.a_tics(self.timestamp)
+        siguiente_fin = motor_eventos.finalizaciones_pendientes.siguiente(pred_tarea_id, tics_evento)
+        if siguiente_fin is not None:
+            traza('inactividad', "  Próximo FIN del predecesor: U%s en %s", siguiente_fin.unidad, siguiente_fin.timestamp)
+            proxima_finalizacion_predecesor = siguiente_fin.timestamp
 
         if proxima_finalizacion_predecesor:
             tiempo_espera_min = (proxima_finalizacion_predecesor - self.timestamp).total_seconds() / 60
-            motor_eventos.logger.critical(f"  ✓ Tiempo de espera calculado: {tiempo_espera_min:.1f} min")
 
             if tiempo_espera_min > UMBRAL_MINUTOS_INACTIVIDAD:
                 for trabajador_id in trabajadores_tarea:
-                    motor_eventos.logger.warning(
-                        f"     ⚠️ TIEMPO INACTIVO DETECTADO:\n"
-                        f"        Trabajador: {trabajador_id}\n"
-                        f"        Tarea bloqueada: {linea_temporal_actual.name}\n"
-                        f"        Tiempo de espera: {tiempo_espera_min:.1f} minutos\n"
-                        f"        Esperando a: {pred_linea_temporal.name}"
-                    )
+                    traza('inactividad', "  Tiempo inactivo: %s espera %.1f min en '%s' a '%s'",
+                          trabajador_id, tiempo_espera_min, linea_temporal_actual.name, pred_linea_temporal.name)
 
                     decision = CalculationDecision(
                         timestamp=self.timestamp,
@@ -877,60 +791,51 @@ class EventoFinUnidad(EventoDeSimulacion):
                     )
 
                     motor_eventos.audit_log_interno.append(decision)
-                    motor_eventos.logger.critical(f"      ✅ Evento de inactividad añadido al audit_log_interno")
             else:
-                motor_eventos.logger.critical(
-                    f"  ✗ Tiempo de espera ({tiempo_espera_min:.1f} min) no supera umbral ({UMBRAL_MINUTOS_INACTIVIDAD} min)"
-                )
+                traza('inactividad', "  Espera de %.1f min no supera el umbral (%d min)",
+                      tiempo_espera_min, UMBRAL_MINUTOS_INACTIVIDAD)
         else:
-            motor_eventos.logger.critical("  ✗ No se encontró próxima finalización del predecesor")
-
-        motor_eventos.logger.critical(
-            f"  Total eventos en audit_log_interno ahora: {len(motor_eventos.audit_log_interno)}")
-        motor_eventos.logger.critical("=" * 80)
+            traza('inactividad', "  No se encontró próxima finalización del predecesor")
 
         return []
 
-@dataclass
 class EventoReasignacionTrabajador(EventoDeSimulacion):
     """Evento que reasigna un trabajador de una tarea a otra."""
-    tipo_evento: str = 'REASIGNACION_TRABAJADOR'
-    prioridad: int = 0
+    __slots__ = ()
+    tipo_evento = 'REASIGNACION_TRABAJADOR'
+    prioridad = 0
 
     def procesar(self, motor_eventos) -> List['EventoDeSimulacion']:
         """
         Procesa la reasignación de un trabajador con soporte para modo paralelo.
         """
-        trabajador_id = self.datos.get('trabajador_id')
-        tarea_origen_id = self.datos.get('tarea_origen')
-        tarea_destino_id = self.datos.get('tarea_destino')
-        mode = self.datos.get('mode', 'REPLACE')  # PARALLEL_JOIN o REPLACE
-        motivo = self.datos.get('motivo', 'Reasignación programada')
-
-        motor_eventos.logger.info(
-            f"🔄 [{self.timestamp.strftime('%d/%m %H:%M')}] REASIGNACIÓN ({mode}): "
-            f"Trabajador '{trabajador_id}' de '{tarea_origen_id}' → '{tarea_destino_id}' ({motivo})"
-        )
+        trabajador_id = self.extra.get('trabajador_id')
+        tarea_origen_id = self.extra.get('tarea_origen')
+        tarea_destino_id = self.extra.get('tarea_destino')
+        mode = self.extra.get('mode', 'REPLACE')  # PARALLEL_JOIN o REPLACE
+        motivo = self.extra.get('motivo', 'Reasignación programada')
+
+        motor_eventos.traza('reasignacion', "🔄 [%s] REASIGNACIÓN (%s): Trabajador '%s' de '%s' → '%s' (%s)",
+                            self.timestamp, mode, trabajador_id, tarea_origen_id, tarea_destino_id,
+                            motivo)
 
         # Remover de origen (en ambos modos)
         if tarea_origen_id and tarea_origen_id in motor_eventos.lineas_temporales:
             linea_origen = motor_eventos.lineas_temporales[tarea_origen_id]
             if trabajador_id in linea_origen.trabajadores_asignados:
                 linea_origen.trabajadores_asignados.remove(trabajador_id)
-                motor_eventos.logger.debug(f"   ↪️ Removido de '{linea_origen.name}'")
+                motor_eventos.traza('reasignacion', "   ↪️ Removido de '%s'", linea_origen.name)
 
         # Procesar según el modo
         if tarea_destino_id and tarea_destino_id in motor_eventos.lineas_temporales:
             linea_destino = motor_eventos.lineas_temporales[tarea_destino_id]
 
-            motor_eventos.logger.critical(
-                f"DEBUG REASSIGN: Worker '{trabajador_id}' - Target '{tarea_destino_id}' - MODE DETECTED: '{mode}'")
+            motor_eventos.traza('reasignacion', "DEBUG REASSIGN: Worker '%s' - Target '%s' - MODE DETECTED: '%s'",
+                                trabajador_id, tarea_destino_id, mode)
 
             if mode == 'PARALLEL_JOIN':
                 # MODO PARALELO: Crear nueva instancia paralela
-                motor_eventos.logger.info(
-                    f"   🔀 Iniciando instancia paralela en '{linea_destino.name}'"
-                )
+                motor_eventos.traza('reasignacion', "   🔀 Iniciando instancia paralela en '%s'", linea_destino.name)
                 id_instancia = linea_destino.agregar_instancia_paralela(
                     trabajador_id,
                     self.timestamp,
@@ -938,9 +843,8 @@ class EventoReasignacionTrabajador(EventoDeSimulacion):
                 )
 
                 if id_instancia:
-                    motor_eventos.logger.info(
-                        f"   ✅ Instancia paralela {id_instancia[:8]} creada exitosamente"
-                    )
+                    motor_eventos.traza('reasignacion', "   ✅ Instancia paralela %s creada exitosamente",
+                                        id_instancia)
                 else:
                     motor_eventos.logger.warning(
                         f"   ⚠️ No se pudo crear instancia paralela (tarea completada o sin unidades)"
@@ -949,7 +853,7 @@ class EventoReasignacionTrabajador(EventoDeSimulacion):
                 # MODO REEMPLAZO: Solo añadir a la lista (comportamiento anterior)
                 if trabajador_id not in linea_destino.trabajadores_asignados:
                     linea_destino.trabajadores_asignados.append(trabajador_id)
-                    motor_eventos.logger.debug(f"   ↪️ Añadido a '{linea_destino.name}'")
+                    motor_eventos.traza('reasignacion', "   ↪️ Añadido a '%s'", linea_destino.name)
 
                     # Recalcular eventos si existe el método
                     if hasattr(linea_destino, 'recalcular_eventos_futuros'):
@@ -957,14 +861,14 @@ class EventoReasignacionTrabajador(EventoDeSimulacion):
 
         return []
 
-@dataclass
 class EventoTiempoInactivo(EventoDeSimulacion):
     """
     Evento que registra cuando un trabajador queda inactivo esperando trabajo.
     No genera nuevos eventos, solo registra la situación en el audit log.
     """
-    tipo_evento: str = 'TIEMPO_INACTIVO'
-    prioridad: int = 5
+    __slots__ = ()
+    tipo_evento = 'TIEMPO_INACTIVO'
+    prioridad = 5
 
     def procesar(self, motor_eventos) -> List['EventoDeSimulacion']:
         """
@@ -972,10 +876,10 @@ class EventoTiempoInactivo(EventoDeSimulacion):
         """
         from calculation_audit import CalculationDecision, DecisionStatus
 
-        trabajador = self.datos.get('trabajador', 'Trabajador desconocido')
-        tarea_actual = self.datos.get('tarea_actual', 'N/A')
-        tiempo_espera_min = self.datos.get('tiempo_espera_min', 0)
-        proxima_tarea = self.datos.get('proxima_tarea', 'N/A')
+        trabajador = self.extra.get('trabajador', 'Trabajador desconocido')
+        tarea_actual = self.extra.get('tarea_actual', 'N/A')
+        tiempo_espera_min = self.extra.get('tiempo_espera_min', 0)
+        proxima_tarea = self.extra.get('proxima_tarea', 'N/A')
 
         motor_eventos.logger.warning(
             f"⏸️ TIEMPO INACTIVO DETECTADO:\n"
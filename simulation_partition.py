@@ -0,0 +1,238 @@
+# simulation_partition.py
+import heapq
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Set, Tuple
+
+from event_engine import MotorDeEventos
+from optimizer_pool import ConfiguracionHorarioSerializable
+from time_calculator import CalculadorDeTiempos
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de estas unidades en total, arrancar los procesos cuesta más que simular
+# en uno solo (cada proceso 'spawn' vuelve a importar el motor)
+UNIDADES_MINIMAS_PARALELO = 5000
+
+
+def _nombres_trabajadores(step: Dict) -> List[str]:
+    """Nombres de los trabajadores de un paso (admite {'name': ...} y el formato antiguo de cadenas)."""
+    nombres = []
+    for worker in step.get('workers') or []:
+        if isinstance(worker, dict) and worker.get('name'):
+            nombres.append(worker['name'])
+        elif isinstance(worker, str):
+            nombres.append(worker)
+    return nombres
+
+
+def componentes_independientes(production_flow: List[Dict]) -> List[List[str]]:
+    """
+    Agrupa las tareas del flujo en componentes que no comparten nada durante la
+    simulación. Dos tareas van al mismo componente si las une una dependencia
+    ('previous_task_index'), un salto cíclico ('next_cyclic_task_index'), una
+    regla de reasignación ('target_task_id'), un trabajador o una máquina.
+
+    Devuelve las tareas de cada componente (tarea_id) en el orden del flujo, y
+    los componentes ordenados por su primera tarea. Sin ids de tarea únicos
+    devuelve un único componente con todo el flujo.
+    """
+    ids = [step.get('task', {}).get('id', 'task_sin_id') for step in production_flow]
+    if len(set(ids)) != len(ids):
+        return [ids] if ids else []
+
+    padre = list(range(len(ids)))
+
+    def raiz(i: int) -> int:
+        while padre[i] != i:
+            padre[i] = padre[padre[i]]
+            i = padre[i]
+        return i
+
+    def unir(i: int, j) -> None:
+        if isinstance(j, int) and 0 <= j < len(ids):
+            padre[raiz(i)] = raiz(j)
+
+    indice_por_id = {tarea_id: i for i, tarea_id in enumerate(ids)}
+    primero_por_recurso: Dict[Tuple[str, Any], int] = {}
+    for i, step in enumerate(production_flow):
+        unir(i, step.get('previous_task_index'))
+        unir(i, step.get('next_cyclic_task_index'))
+        recursos = [('trabajador', nombre) for nombre in _nombres_trabajadores(step)]
+        machine_id = step.get('task', {}).get('machine_id')
+        if machine_id is not None:
+            recursos.append(('maquina', machine_id))
+        for recurso in recursos:
+            unir(i, primero_por_recurso.setdefault(recurso, i))
+        for worker in step.get('workers') or []:
+            regla = worker.get('reassignment_rule') if isinstance(worker, dict) else None
+            if regla:
+                unir(i, indice_por_id.get(regla.get('target_task_id')))
+
+    componentes: Dict[int, List[str]] = {}
+    for i, tarea_id in enumerate(ids):
+        componentes.setdefault(raiz(i), []).append(tarea_id)
+    return list(componentes.values())
+
+
+def repartir_componentes(production_flow: List[Dict], max_procesos: int) -> List[Set[str]]:
+    """
+    Reparte los componentes independientes en como mucho 'max_procesos' grupos
+    de carga parecida (primero los más grandes, cada uno al grupo más ligero).
+    La carga de un componente es la suma de las unidades de sus tareas.
+    Devuelve [] si no hay al menos dos componentes o no llegan a
+    UNIDADES_MINIMAS_PARALELO unidades en total.
+    """
+    unidades = {step.get('task', {}).get('id'): step.get('trigger_units', 1) or 1 for step in production_flow}
+    if max_procesos < 2 or sum(unidades.values()) < UNIDADES_MINIMAS_PARALELO:
+        return []
+    componentes = componentes_independientes(production_flow)
+    if len(componentes) < 2:
+        return []
+
+    cargas = sorted(((sum(unidades.get(tarea_id, 1) for tarea_id in componente), n, componente)
+                     for n, componente in enumerate(componentes)), key=lambda c: (-c[0], c[1]))
+    grupos = [(0, n, set()) for n in range(min(max_procesos, len(componentes)))]
+    for carga, _, componente in cargas:
+        total, n, tareas = heapq.heappop(grupos)
+        tareas.update(componente)
+        heapq.heappush(grupos, (total + carga, n, tareas))
+    return [tareas for _, _, tareas in sorted(grupos, key=lambda g: g[1])]
+
+
+@dataclass
+class ResultadoParticion:
+    """
+    Lo que devuelve un proceso tras simular un grupo de tareas.
+
+    orden: por cada evento procesado, (tics, contador local, y tras procesarlo:
+        eventos programados, filas de resultados, entradas del audit log y del
+        audit log interno, todo acumulado).
+    inicio: lo mismo tras generar los eventos iniciales (sin tics ni contador).
+    raices: índice en el flujo de la tarea de cada evento inicial, en el orden
+        en que se programaron.
+    """
+    filas: List[Dict]
+    auditoria: List[Any]
+    auditoria_interna: List[Any]
+    orden: List[Tuple[int, int, int, int, int, int]]
+    inicio: Tuple[int, int, int, int]
+    raices: List[int]
+    tiempo_final: datetime
+
+
+def simular_particion(production_flow: List[Dict], workers: List[Tuple[str, Any]], machines: Dict,
+                      schedule_config, start_date: datetime, tareas: Set[str]) -> ResultadoParticion:
+    """
+    Punto de entrada de los procesos: simula sólo las raíces de 'tareas' con el
+    flujo completo (los índices y la fecha de inicio son los de la simulación
+    global) y anota el orden de procesamiento para poder fusionar.
+    """
+    motor = MotorDeEventos(production_flow, workers, machines, schedule_config, start_date,
+                           CalculadorDeTiempos(schedule_config))
+    motor.tareas_simuladas = set(tareas)
+    motor.orden_procesado = []
+    motor._iniciar()
+    raices = [motor.tarea_id_a_indice[evento.tarea_id]
+              for _, _, evento in sorted(motor.eventos_futuros, key=lambda entrada: entrada[1])]
+    inicio = (motor.event_counter, len(motor.resultados_en_curso), len(motor.audit_log_en_curso),
+              len(motor.audit_log_interno))
+    motor._procesar_eventos()
+    return ResultadoParticion(
+        filas=motor.resultados_en_curso,
+        auditoria=motor.audit_log_en_curso,
+        auditoria_interna=motor.audit_log_interno,
+        orden=motor.orden_procesado,
+        inicio=inicio,
+        raices=raices,
+        tiempo_final=motor.tiempo_actual,
+    )
+
+
+@dataclass
+class Fusion:
+    filas: List[Dict] = field(default_factory=list)
+    auditoria: List[Any] = field(default_factory=list)
+    auditoria_interna: List[Any] = field(default_factory=list)
+    eventos_procesados: int = 0
+
+
+def fusionar_particiones(particiones: List[ResultadoParticion]) -> Fusion:
+    """
+    Reconstruye el orden en que un único heap habría procesado los eventos de
+    todas las particiones y concatena filas y audit logs en ese orden.
+
+    El heap global ordena por (tics, contador) y el contador se asigna al
+    programar cada evento. Las particiones no comparten estado, así que cada
+    una procesa sus eventos en el mismo orden relativo que la simulación global;
+    sólo falta intercalarlas. Se recorren a la vez asignando contadores globales
+    como lo haría el motor: primero los eventos iniciales en el orden del flujo
+    y después, al procesar cada evento, los que éste programó.
+    """
+    fusion = Fusion()
+    contadores: List[Dict[int, int]] = [{} for _ in particiones]
+    iniciales = sorted((indice, n, local) for n, particion in enumerate(particiones)
+                       for local, indice in enumerate(particion.raices))
+    for global_, (_, n, local) in enumerate(iniciales):
+        contadores[n][local] = global_
+    siguiente = len(iniciales)
+
+    previos = []
+    cola = []
+    for n, particion in enumerate(particiones):
+        programados, filas, auditoria, internas = particion.inicio
+        fusion.filas.extend(particion.filas[:filas])
+        fusion.auditoria.extend(particion.auditoria[:auditoria])
+        fusion.auditoria_interna.extend(particion.auditoria_interna[:internas])
+        previos.append(particion.inicio)
+        if particion.orden:
+            tics, contador = particion.orden[0][:2]
+            cola.append((tics, contadores[n].pop(contador), n))
+    heapq.heapify(cola)
+
+    posiciones = [0] * len(particiones)
+    while cola:
+        _, _, n = heapq.heappop(cola)
+        particion, k = particiones[n], posiciones[n]
+        _, _, programados, filas, auditoria, internas = particion.orden[k]
+        programados_antes, filas_antes, auditoria_antes, internas_antes = previos[n]
+
+        # Los eventos que programó este evento reciben los siguientes contadores globales
+        for local in range(programados_antes, programados):
+            contadores[n][local] = siguiente
+            siguiente += 1
+        fusion.filas.extend(particion.filas[filas_antes:filas])
+        fusion.auditoria.extend(particion.auditoria[auditoria_antes:auditoria])
+        fusion.auditoria_interna.extend(particion.auditoria_interna[internas_antes:internas])
+        previos[n] = (programados, filas, auditoria, internas)
+
+        posiciones[n] = k + 1
+        if k + 1 < len(particion.orden):
+            tics, contador = particion.orden[k + 1][:2]
+            heapq.heappush(cola, (tics, contadores[n].pop(contador), n))
+
+    fusion.eventos_procesados = sum(len(particion.orden) for particion in particiones)
+    return fusion
+
+
+def simular_en_paralelo(motor: MotorDeEventos, grupos: List[Set[str]]) -> Tuple[Fusion, List[ResultadoParticion]]:
+    """
+    Simula cada grupo de tareas de 'motor' en un proceso y fusiona el resultado.
+    El motor no se ejecuta: sólo aporta el flujo, los recursos registrados, la
+    configuración de horario y la fecha de inicio.
+    """
+    config = ConfiguracionHorarioSerializable(motor.calculador_tiempos.schedule_config)
+    # El motor sólo usa los nombres de los trabajadores y los ids de las máquinas
+    workers = [(nombre, None) for nombre in motor.gestor_recursos.calendario_trabajadores]
+    machines = dict.fromkeys(motor.gestor_recursos.calendario_maquinas)
+
+    logger.info(f"Simulando {len(grupos)} grupo(s) de tareas independientes en paralelo.")
+    # 'spawn': hacer fork de un proceso con hilos de Qt en marcha no es seguro
+    with ProcessPoolExecutor(max_workers=len(grupos), mp_context=multiprocessing.get_context('spawn')) as executor:
+        futuros = [executor.submit(simular_particion, motor.production_flow, workers, machines, config,
+                                   motor.reloj.epoca, tareas) for tareas in grupos]
+        particiones = [futuro.result() for futuro in futuros]
+    return fusionar_particiones(particiones), particiones
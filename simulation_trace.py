@@ -0,0 +1,99 @@
+# simulation_trace.py
+import logging
+import os
+from collections import deque
+from typing import Iterable, List, Optional
+
+# Variable de entorno para activar categorías sin tocar código: "motor,inicio" o "*"
+VARIABLE_ENTORNO = 'HIPATIA_TRAZA'
+
+CATEGORIAS = (
+    'configuracion',  # Construcción del motor y del flujo
+    'motor',          # Bucle principal y cola de eventos
+    'inicio',         # EventoInicioUnidad
+    'fin',            # EventoFinUnidad
+    'dependencias',   # Desbloqueo de tareas dependientes
+    'inactividad',    # Detección de tiempo inactivo
+    'recursos',       # Reservas en los calendarios de recursos
+    'reasignacion',   # Reglas y eventos de reasignación
+    'resultados',     # Compilación de resultados
+)
+
+
+# El estado del motor (trabajadores de una instancia, tareas pendientes...) cambia
+# después de registrar la traza; estos tipos se copian al guardarla en el búfer
+_MUTABLES = (list, set, dict)
+
+
+def _copiar_mutable(valor):
+    return valor.copy() if isinstance(valor, _MUTABLES) else valor
+
+
+class TrazaSimulacion:
+    """
+    Trazas de diagnóstico del motor de eventos con coste casi nulo.
+
+    - Cada traza pertenece a una categoría que se activa o desactiva por separado.
+    - Los mensajes usan el formato perezoso de logging ('%s' + argumentos): nunca
+      se formatean salvo que la categoría esté activa o se vuelque el búfer.
+    - Las últimas N trazas se guardan sin formatear en un búfer circular, que se
+      vuelca al log sólo cuando hay un error. Así una ejecución normal no escribe
+      nada, pero ante un fallo se ve qué estaba haciendo el motor. Las listas,
+      conjuntos y diccionarios se copian al registrar la traza (copia superficial):
+      el volcado muestra su contenido de entonces, no el del momento del error.
+    """
+
+    def __init__(self, categorias: Optional[Iterable[str]] = None, capacidad: int = 500,
+                 logger: logging.Logger = None):
+        """
+        Args:
+            categorias: Categorías que se emiten en vivo (a DEBUG). Si es None se leen
+                de la variable de entorno HIPATIA_TRAZA; '*' activa todas.
+            capacidad: Tamaño del búfer circular. 0 desactiva el búfer.
+            logger: Logger de destino (por defecto 'simulacion.traza').
+        """
+        self.logger = logger or logging.getLogger('simulacion.traza')
+        if categorias is None:
+            categorias = [c.strip() for c in os.environ.get(VARIABLE_ENTORNO, '').split(',') if c.strip()]
+        self.activas = frozenset(CATEGORIAS if '*' in categorias else categorias)
+        self._buffer = deque(maxlen=capacidad) if capacidad > 0 else None
+
+    def __call__(self, categoria: str, mensaje: str, *args):
+        """Registra una traza. 'mensaje' y 'args' se formatean como en logging."""
+        if self._buffer is not None:
+            self._buffer.append((categoria, mensaje, tuple(map(_copiar_mutable, args)) if args else args))
+        if categoria in self.activas:
+            self.logger.debug('[%s] ' + mensaje, categoria, *args)
+
+    def activa(self, categoria: str) -> bool:
+        """Para envolver diagnósticos caros que no caben en una sola traza."""
+        return categoria in self.activas
+
+    def ultimas(self, n: int = None) -> List[str]:
+        """Las últimas n trazas del búfer, ya formateadas (todas si n es None)."""
+        if not self._buffer:
+            return []
+        entradas = list(self._buffer)
+        if n is not None:
+            entradas = entradas[-n:]
+        return [self._formatear(*entrada) for entrada in entradas]
+
+    def volcar(self, motivo: str = '', nivel: int = logging.ERROR) -> List[str]:
+        """
+        Escribe en el log el contenido del búfer y lo vacía. Se llama al detectar
+        un error. Devuelve las líneas volcadas.
+        """
+        lineas = self.ultimas()
+        if lineas:
+            self.logger.log(nivel, "Últimas %d trazas de la simulación%s:\n%s",
+                            len(lineas), f" ({motivo})" if motivo else '', '\n'.join(lineas))
+            self._buffer.clear()
+        return lineas
+
+    @staticmethod
+    def _formatear(categoria: str, mensaje: str, args: tuple) -> str:
+        try:
+            texto = mensaje % args if args else mensaje
+        except (TypeError, ValueError) as e:
+            texto = f"{mensaje} {args!r} (error de formato: {e})"
+        return f"[{categoria}] {texto}"
@@ -1,9 +1,16 @@
 # temporal_storage.py
 import json
 import logging
+import os
+import tempfile
 from datetime import datetime
 from enum import Enum
+from typing import Dict, List, Optional
+
+import numpy as np
+
 from simulation_events import EventoDeSimulacion
+from sim_clock import RelojSimulacion, EPOCA_POR_DEFECTO
 import sqlite3
 import threading
 
@@ -64,7 +71,8 @@ class RegistroTemporal:
 
         return self._local.conn
 
-    def _default_serializer(self, obj):
+    @staticmethod
+    def _default_serializer(obj):
         """Serializador JSON para objetos datetime y Enum."""
         if isinstance(obj, datetime):
             return obj.isoformat()
@@ -75,7 +83,14 @@ class RegistroTemporal:
     def guardar_evento(self, evento: EventoDeSimulacion):
         """Añade un evento al buffer y lo vuelca a disco si está lleno."""
         with self._lock:
-            self.buffer.append(vars(evento))
+            self.buffer.append(evento.como_dict())
+            if len(self.buffer) >= self.buffer_size:
+                self._flush_buffer_to_disk()
+
+    def guardar_eventos(self, eventos: List[EventoDeSimulacion]):
+        """Añade varios eventos de una vez (un solo acceso al lock)."""
+        with self._lock:
+            self.buffer.extend(evento.como_dict() for evento in eventos)
             if len(self.buffer) >= self.buffer_size:
                 self._flush_buffer_to_disk()
 
@@ -170,4 +185,271 @@ class RegistroTemporal:
             return eventos_reconstruidos
         except sqlite3.Error as e:
             self.logger.error(f"Error al consultar eventos desde SQLite: {e}")
-            return []
\ No newline at end of file
+            return []
+
+
+class RegistroColumnar:
+    """
+    Registro de eventos alternativo a RegistroTemporal, pensado para analizar
+    simulaciones muy grandes después de ejecutarlas.
+
+    Los eventos se guardan por lotes en columnas tipadas. Cada columna es un
+    fichero binario de sólo-anexado dentro de 'ruta':
+
+    - timestamp.i64: microsegundos desde la época del registro.
+    - tipo.i16, tarea.i32: códigos de tipo de evento y de tarea. Los diccionarios
+      de códigos se guardan en meta.json.
+    - unidad.i32: número de unidad (-1 si el evento no tiene).
+    - datos.jsonl + datos_offset.i64: los 'datos' completos en JSON, que sólo se
+      leen para las filas que devuelve una consulta.
+
+    Para leer, las columnas se mapean en memoria con numpy. Los filtros de
+    consultar_eventos / consultar_columnas son máscaras vectorizadas y no SQL.
+    """
+
+    COLUMNAS = (('timestamp', np.int64), ('tipo', np.int16), ('tarea', np.int32),
+                ('unidad', np.int32), ('datos_offset', np.int64))
+    SIN_CODIGO = -1
+
+    def __init__(self, ruta: str, buffer_size: int = 10000, epoca: datetime = EPOCA_POR_DEFECTO,
+                 guardar_datos: bool = True, reiniciar: bool = True):
+        """
+        Args:
+            ruta: Directorio de las columnas (se crea si no existe).
+            buffer_size: Eventos acumulados en memoria antes de anexarlos a disco.
+            epoca: Origen de los timestamps enteros. Si el directorio ya tiene un
+                registro y no se reinicia, se usa la época guardada.
+            guardar_datos: Si es False no se escribe el JSON de 'datos' y las
+                consultas devuelven diccionarios vacíos (sólo columnas).
+            reiniciar: Borra un registro existente en 'ruta' (como hace RegistroTemporal).
+                Si es False, 'ruta' puede no tener registro todavía, pero si tiene
+                columnas sin un meta.json legible se lanza ValueError y no se toca nada.
+        """
+        self.ruta = ruta
+        self.buffer_size = buffer_size
+        self.guardar_datos = guardar_datos
+        self.buffer = []
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(ruta, exist_ok=True)
+
+        if reiniciar:
+            self._borrar_columnas()
+            meta = None
+        else:
+            meta = self._leer_meta()
+        if meta is None:
+            meta = {'epoca': epoca.isoformat(), 'num_eventos': 0, 'bytes_datos': 0,
+                    'tipos': [], 'tareas': []}
+        self.reloj = RelojSimulacion(datetime.fromisoformat(meta['epoca']))
+        self.num_eventos = meta['num_eventos']
+        self._bytes_datos = meta['bytes_datos']
+        self.tipos: List[str] = meta['tipos']
+        self.tareas: List[str] = meta['tareas']
+        self._codigo_tipo = {tipo: i for i, tipo in enumerate(self.tipos)}
+        self._codigo_tarea = {tarea: i for i, tarea in enumerate(self.tareas)}
+
+    @classmethod
+    def abrir(cls, ruta: str) -> 'RegistroColumnar':
+        """Abre un registro ya escrito para consultarlo (o seguir anexando) sin borrarlo."""
+        return cls(ruta, reiniciar=False)
+
+    # --- Escritura ---
+
+    def guardar_evento(self, evento: EventoDeSimulacion):
+        """Añade un evento al buffer y lo anexa a disco si está lleno."""
+        with self._lock:
+            self.buffer.append(evento.como_dict())
+            if len(self.buffer) >= self.buffer_size:
+                self._flush_buffer_to_disk()
+
+    def guardar_eventos(self, eventos: List[EventoDeSimulacion]):
+        """Añade varios eventos de una vez (un solo acceso al lock)."""
+        with self._lock:
+            self.buffer.extend(evento.como_dict() for evento in eventos)
+            if len(self.buffer) >= self.buffer_size:
+                self._flush_buffer_to_disk()
+
+    def _flush_buffer_to_disk(self):
+        """Convierte el buffer en columnas y las anexa a sus ficheros."""
+        if not self.buffer:
+            return
+
+        n = len(self.buffer)
+        columnas = {nombre: np.empty(n, dtype=dtype) for nombre, dtype in self.COLUMNAS}
+        trozos_datos = []
+        offset = self._bytes_datos
+        for i, evento_dict in enumerate(self.buffer):
+            datos = evento_dict.get('datos') or {}
+            columnas['timestamp'][i] = self.reloj.a_tics(evento_dict['timestamp'])
+            columnas['tipo'][i] = self._codificar(evento_dict.get('tipo_evento'), self.tipos, self._codigo_tipo)
+            columnas['tarea'][i] = self._codificar(datos.get('tarea_id'), self.tareas, self._codigo_tarea)
+            unidad = datos.get('numero_unidad', datos.get('unidad'))
+            columnas['unidad'][i] = unidad if isinstance(unidad, int) else self.SIN_CODIGO
+            columnas['datos_offset'][i] = offset
+            if self.guardar_datos:
+                linea = (json.dumps(datos, default=RegistroTemporal._default_serializer) + '\n').encode('utf-8')
+                trozos_datos.append(linea)
+                offset += len(linea)
+
+        # Tamaño de cada fichero con los eventos ya registrados: si un anexado falla
+        # a medias, todos vuelven ahí y las columnas siguen alineadas fila a fila
+        tamanos = {nombre: self.num_eventos * np.dtype(dtype).itemsize for nombre, dtype in self.COLUMNAS}
+        tamanos['datos'] = self._bytes_datos
+        try:
+            for nombre, _ in self.COLUMNAS:
+                with open(self._fichero(nombre), 'ab') as f:
+                    f.write(columnas[nombre].tobytes())
+            if trozos_datos:
+                with open(self._fichero('datos'), 'ab') as f:
+                    f.write(b''.join(trozos_datos))
+            # meta.json es lo último: hasta que se sustituye, el registro sigue siendo el anterior
+            self._escribir_meta(self.num_eventos + n, offset)
+        except OSError as e:
+            self.logger.error(f"Error al anexar {n} eventos al registro columnar '{self.ruta}': {e}")
+            self._truncar(tamanos)
+            return
+
+        self.num_eventos += n
+        self._bytes_datos = offset
+        self.buffer.clear()
+        self.logger.info(f"Anexados {n} eventos al registro columnar '{self.ruta}'.")
+
+    def close(self):
+        """Asegura que el buffer se guarde en disco."""
+        with self._lock:
+            self._flush_buffer_to_disk()
+
+    # --- Lectura ---
+
+    def consultar_columnas(self, rango_temporal=None, tipo_evento=None, tarea_id=None) -> Dict[str, np.ndarray]:
+        """
+        Devuelve las columnas de los eventos que cumplen los filtros, ordenadas por
+        timestamp (estable: los empates quedan en el orden en que se guardaron).
+        Los timestamps se devuelven en tics del reloj del registro.
+        """
+        columnas, indices = self._seleccionar(rango_temporal, tipo_evento, tarea_id)
+        return {nombre: columna[indices] for nombre, columna in columnas.items()}
+
+    def consultar_eventos(self, rango_temporal=None, tipo_evento=None, tarea_id=None):
+        """Misma interfaz y formato de salida que RegistroTemporal.consultar_eventos."""
+        try:
+            columnas, indices = self._seleccionar(rango_temporal, tipo_evento, tarea_id)
+        except OSError as e:
+            self.logger.error(f"Error al leer el registro columnar '{self.ruta}': {e}")
+            return []
+        if not len(indices):
+            return []
+
+        timestamps = columnas['timestamp'][indices].tolist()
+        tipos = columnas['tipo'][indices].tolist()
+        datos_json = [None] * len(indices)
+        if self.guardar_datos and self._bytes_datos:
+            # Cada fila de 'datos' termina donde empieza la siguiente
+            offsets = columnas['datos_offset']
+            fines = np.append(offsets[1:], self._bytes_datos)
+            datos_mm = np.memmap(self._fichero('datos'), dtype=np.uint8, mode='r', shape=(self._bytes_datos,))
+            datos_json = [datos_mm[inicio:fin].tobytes()
+                          for inicio, fin in zip(offsets[indices].tolist(), fines[indices].tolist())]
+
+        eventos_reconstruidos = []
+        for ts, tipo, datos_str in zip(timestamps, tipos, datos_json):
+            eventos_reconstruidos.append({
+                "timestamp": self.reloj.a_datetime(ts),
+                "tipo_evento": self.tipos[tipo],
+                "datos": json.loads(datos_str) if datos_str else {}
+            })
+        return eventos_reconstruidos
+
+    def _seleccionar(self, rango_temporal, tipo_evento, tarea_id):
+        """Columnas mapeadas e índices (ordenados por timestamp) de las filas que cumplen los filtros."""
+        with self._lock:
+            self._flush_buffer_to_disk()
+
+        columnas = self._mapear_columnas()
+        mascara = np.ones(self.num_eventos, dtype=bool)
+        if rango_temporal:
+            inicio, fin = rango_temporal
+            ts = columnas['timestamp']
+            mascara &= (ts >= self.reloj.a_tics(inicio)) & (ts <= self.reloj.a_tics(fin))
+        if tipo_evento:
+            mascara &= columnas['tipo'] == self._codigo_tipo.get(tipo_evento, self.SIN_CODIGO - 1)
+        if tarea_id:
+            mascara &= columnas['tarea'] == self._codigo_tarea.get(tarea_id, self.SIN_CODIGO - 1)
+
+        indices = np.flatnonzero(mascara)
+        return columnas, indices[np.argsort(columnas['timestamp'][indices], kind='stable')]
+
+    # --- Auxiliares ---
+
+    def _mapear_columnas(self) -> Dict[str, np.ndarray]:
+        if not self.num_eventos:
+            return {nombre: np.empty(0, dtype=dtype) for nombre, dtype in self.COLUMNAS}
+        return {nombre: np.memmap(self._fichero(nombre), dtype=dtype, mode='r', shape=(self.num_eventos,))
+                for nombre, dtype in self.COLUMNAS}
+
+    @staticmethod
+    def _codificar(valor, valores: List[str], codigos: Dict[str, int]) -> int:
+        """Código interno de un valor, asignando uno nuevo si no se había visto."""
+        if valor is None:
+            return RegistroColumnar.SIN_CODIGO
+        valor = str(valor)
+        codigo = codigos.get(valor)
+        if codigo is None:
+            codigo = codigos[valor] = len(valores)
+            valores.append(valor)
+        return codigo
+
+    def _fichero(self, nombre: str) -> str:
+        if nombre == 'datos':
+            return os.path.join(self.ruta, 'datos.jsonl')
+        dtype = dict(self.COLUMNAS)[nombre]
+        return os.path.join(self.ruta, f"{nombre}.{np.dtype(dtype).kind}{np.dtype(dtype).itemsize * 8}")
+
+    def _truncar(self, tamanos: Dict[str, int]):
+        """Devuelve cada fichero existente al tamaño indicado (deshace un anexado parcial)."""
+        for nombre, tamano in tamanos.items():
+            fichero = self._fichero(nombre)
+            try:
+                if os.path.exists(fichero) and os.path.getsize(fichero) > tamano:
+                    os.truncate(fichero, tamano)
+            except OSError as e:
+                self.logger.error(f"No se pudo deshacer el anexado parcial de '{fichero}': {e}")
+
+    def _leer_meta(self) -> Optional[dict]:
+        """
+        Metadatos del registro guardado en 'ruta', o None si el directorio no tiene
+        registro. Lanza ValueError si hay columnas pero meta.json falta o está dañado.
+        """
+        ruta_meta = os.path.join(self.ruta, 'meta.json')
+        try:
+            with open(ruta_meta, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            columnas = [self._fichero(nombre) for nombre, _ in self.COLUMNAS] + [self._fichero('datos')]
+            if not any(os.path.exists(columna) for columna in columnas):
+                return None
+            raise ValueError(f"El registro columnar '{self.ruta}' tiene columnas pero no meta.json.")
+        except (OSError, ValueError) as e:
+            raise ValueError(f"No se puede leer meta.json del registro columnar '{self.ruta}': {e}") from e
+
+    def _escribir_meta(self, num_eventos: int, bytes_datos: int):
+        """Sustituye meta.json de forma atómica (un fallo a medias deja el anterior)."""
+        meta = {'epoca': self.reloj.epoca.isoformat(), 'num_eventos': num_eventos,
+                'bytes_datos': bytes_datos, 'tipos': self.tipos, 'tareas': self.tareas}
+        descriptor, temporal = tempfile.mkstemp(dir=self.ruta, prefix='meta.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(temporal, os.path.join(self.ruta, 'meta.json'))
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    def _borrar_columnas(self):
+        for nombre in [n for n, _ in self.COLUMNAS] + ['datos']:
+            if os.path.exists(self._fichero(nombre)):
+                os.remove(self._fichero(nombre))
+        if os.path.exists(os.path.join(self.ruta, 'meta.json')):
+            os.remove(os.path.join(self.ruta, 'meta.json'))
@@ -0,0 +1,60 @@
+# tests/unit/conftest.py
+"""
+Piezas compartidas por los tests del motor de simulación.
+
+ConfiguracionHorario, paso() y motor_de_eventos() se importan desde los tests
+(from tests.unit.conftest import ...); 'sin_logs' es una fixture.
+"""
+import logging
+from datetime import datetime, time
+
+import pytest
+
+from event_engine import MotorDeEventos
+from time_calculator import CalculadorDeTiempos
+
+# Jueves; jornada de 8:00 a 17:00 (540 min)
+INICIO = datetime(2025, 1, 2, 8, 0)
+DESCANSO_COMIDA = [{"start": "12:00", "end": "13:00"}]
+
+
+class ConfiguracionHorario:
+    """
+    Sustituto de ScheduleConfig sin base de datos: jornada de 8:00 a 17:00 con
+    los descansos y festivos indicados (por defecto, ninguno).
+    """
+
+    def __init__(self, breaks=(), holidays=()):
+        self.WORK_START_TIME = time(8, 0)
+        self.WORK_END_TIME = time(17, 0)
+        self.BREAKS = list(breaks)
+        self.HOLIDAYS = list(holidays)
+
+
+def paso(tarea_id, duracion, trabajador, unidades, inicio=None, previa=None, **task):
+    """
+    Un paso del flujo de producción con un único trabajador. Con 'inicio' abre
+    un ciclo (is_cycle_start); con 'previa' depende del paso de ese índice. El
+    resto de argumentos van a 'task' (fabricacion_id, machine_id...).
+    """
+    step = {'task': {'id': tarea_id, 'name': tarea_id, 'duration': duracion, **task},
+            'workers': [{'name': trabajador}], 'trigger_units': unidades}
+    if inicio is not None:
+        step.update(is_cycle_start=True, start_date=inicio)
+    if previa is not None:
+        step['previous_task_index'] = previa
+    return step
+
+
+def motor_de_eventos(flujo, workers, config=None, machines=None, inicio=INICIO, **kwargs):
+    """MotorDeEventos sobre 'flujo' con su propio CalculadorDeTiempos."""
+    config = config or ConfiguracionHorario()
+    return MotorDeEventos(flujo, workers, machines or {}, config, inicio, CalculadorDeTiempos(config), **kwargs)
+
+
+@pytest.fixture
+def sin_logs():
+    """Silencia el log durante el test: el motor registra cada decisión."""
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
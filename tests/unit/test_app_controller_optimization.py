@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import MagicMock, patch, call
 from controllers.app_controller import AppController
 from controllers.pila_controller import OptimizerWorker
+from capacity_bound import CotaInferior
 
 # --- FIXTURES ---
 
@@ -86,3 +87,92 @@ class TestOptimizerWorker:
             # Flexible workers should be 1
             args = mock_signal.call_args[0]
             assert args[2] == 1
+
+    @pytest.mark.parametrize("minimum", [0, 1, 3, 7, 12, 20])
+    def test_worker_run_search_finds_minimum(self, minimum):
+        """With monotone deadlines the search returns the same minimum as the linear scan."""
+        mock_optimizer = MagicMock()
+        mock_optimizer._prepare_and_prioritize_tasks.return_value = [{'name': 'Task'}]
+        mock_optimizer.model.worker_repo.get_all_workers.return_value = []
+        mock_optimizer.model.machine_repo.get_all_machines.return_value = []
+        mock_optimizer.audit_log = []
+        attempts = []
+
+        def verify(results):
+            attempts.append(results[0])
+            return results[0] >= minimum
+
+        mock_optimizer._verify_deadlines.side_effect = verify
+        worker = OptimizerWorker(mock_optimizer, "2025-01-01", "2025-01-05", 1)
+        mock_signal = MagicMock()
+        worker.finished.connect(mock_signal)
+
+        with patch('controllers.pila_controller.CalculadorDeTiempos'), \
+             patch('controllers.pila_controller.AdaptadorScheduler') as MockScheduler:
+            MockScheduler.side_effect = lambda **kw: MagicMock(
+                run_simulation=MagicMock(return_value=([len(kw['all_workers_with_skills'])], [])))
+
+            worker.run()
+
+        results, _, needed = mock_signal.call_args[0]
+        assert needed == minimum
+        assert results == [minimum]
+        assert len(attempts) <= 10
+        # Workers and machines are loaded only once
+        assert mock_optimizer.model.worker_repo.get_all_workers.call_count == 1
+        assert mock_optimizer.model.machine_repo.get_all_machines.call_count == 1
+
+    def test_worker_run_infeasible_plan(self):
+        mock_optimizer = MagicMock()
+        mock_optimizer._prepare_and_prioritize_tasks.return_value = [{'name': 'Task'}]
+        mock_optimizer.model.worker_repo.get_all_workers.return_value = []
+        mock_optimizer.model.machine_repo.get_all_machines.return_value = []
+        mock_optimizer._verify_deadlines.return_value = False
+        mock_optimizer.audit_log = []
+        worker = OptimizerWorker(mock_optimizer, "2025-01-01", "2025-01-05", 1)
+        mock_signal = MagicMock()
+        worker.finished.connect(mock_signal)
+
+        with patch('controllers.pila_controller.CalculadorDeTiempos'), \
+             patch('controllers.pila_controller.AdaptadorScheduler') as MockScheduler:
+            MockScheduler.return_value.run_simulation.return_value = ([], [])
+            worker.run()
+
+        # 0, 1, 2, 4, 8, 16, 20 instead of 21 simulations
+        assert mock_optimizer._verify_deadlines.call_count == 7
+        assert mock_signal.call_args[0][2] == OptimizerWorker.MAX_FLEXIBLE_WORKERS + 1
+
+    @pytest.mark.parametrize("bound, minimum, expected_attempts", [
+        (CotaInferior(3, 'capacity'), 5, [3, 4, 5]),
+        (CotaInferior(5, 'capacity'), 5, [5]),
+        (CotaInferior(None, 'critical path'), 99, [20]),
+    ])
+    def test_worker_run_starts_at_lower_bound(self, bound, minimum, expected_attempts):
+        """Counts below the analytic lower bound are never simulated."""
+        mock_optimizer = MagicMock()
+        mock_optimizer._prepare_and_prioritize_tasks.return_value = [{'name': 'Task'}]
+        mock_optimizer.model.worker_repo.get_all_workers.return_value = []
+        mock_optimizer.model.machine_repo.get_all_machines.return_value = []
+        mock_optimizer.audit_log = []
+        attempts = []
+
+        def verify(results):
+            attempts.append(results[0])
+            return results[0] >= minimum
+
+        mock_optimizer._verify_deadlines.side_effect = verify
+        worker = OptimizerWorker(mock_optimizer, "2025-01-01", "2025-01-05", 1)
+        mock_signal = MagicMock()
+        worker.finished.connect(mock_signal)
+
+        with patch('controllers.pila_controller.CalculadorDeTiempos'), \
+             patch('controllers.pila_controller.EstimadorCotaInferior') as MockEstimator, \
+             patch('controllers.pila_controller.AdaptadorScheduler') as MockScheduler:
+            MockEstimator.return_value.estimar.return_value = bound
+            MockScheduler.side_effect = lambda **kw: MagicMock(
+                run_simulation=MagicMock(return_value=([len(kw['all_workers_with_skills'])], [])))
+
+            worker.run()
+
+        assert sorted(attempts) == expected_attempts
+        assert mock_signal.call_args[0][2] == min(minimum, OptimizerWorker.MAX_FLEXIBLE_WORKERS + 1)
@@ -0,0 +1,69 @@
+import pytest
+from datetime import date
+
+from capacity_bound import EstimadorCotaInferior
+from tests.unit.conftest import INICIO, ConfiguracionHorario
+from time_calculator import CalculadorDeTiempos
+
+# --- FIXTURES ---
+
+PLAZO = date(2025, 1, 2)
+
+
+def _tarea(duracion, nivel=1, plazo=PLAZO, previa=None):
+    return {'name': f'T{duracion}', 'duration': duracion, 'required_skill_level': nivel,
+            'deadline': plazo, 'previous_task_index': previa}
+
+
+def _estimar(tareas, unidades=1, reales=(('W1', 1),)):
+    estimador = EstimadorCotaInferior(tareas, unidades, CalculadorDeTiempos(ConfiguracionHorario()), INICIO)
+    return estimador.estimar(list(reales), skill_flexible=3)
+
+
+# --- TESTS ---
+
+class TestEstimadorCotaInferior:
+
+    def test_sin_plazos_no_acota(self):
+        assert _estimar([{'name': 'A', 'duration': 10_000}]).flexibles == 0
+
+    def test_capacidad_cabe_con_la_plantilla(self):
+        assert _estimar([_tarea(54)], unidades=10).flexibles == 0
+
+    def test_capacidad_exige_flexibles(self):
+        # 2 x 60 min x 10 unidades = 1200 min; 540 min por trabajador -> 3 trabajadores
+        cota = _estimar([_tarea(60), _tarea(60)], unidades=10)
+        assert cota.flexibles == 2
+        assert '1200 min' in cota.motivo
+
+    def test_nivel_solo_cuentan_los_que_lo_tienen(self):
+        # El trabajador real (nivel 1) no sirve para la tarea de nivel 2
+        assert _estimar([_tarea(60, nivel=2)], unidades=5).flexibles == 1
+
+    def test_plazo_mas_lejano_reparte_el_trabajo(self):
+        tareas = [_tarea(60, plazo=date(2025, 1, 3))]  # 1080 min hasta el viernes
+        assert _estimar(tareas, unidades=18).flexibles == 0
+        assert _estimar(tareas, unidades=19).flexibles == 1
+
+    def test_nivel_que_no_tiene_nadie_es_inviable(self):
+        cota = _estimar([_tarea(10, nivel=4)])
+        assert cota.inviable
+
+    def test_camino_critico_inviable(self):
+        # Una unidad necesita 3 x 200 min seguidos: no cabe en 540, con cualquier plantilla
+        cota = _estimar([_tarea(200), _tarea(200, previa=0), _tarea(200, previa=1)])
+        assert cota.inviable
+        assert 'camino crítico' in cota.motivo
+
+    def test_plazo_anterior_al_inicio_es_inviable(self):
+        assert _estimar([_tarea(10, plazo=date(2025, 1, 1))]).inviable
+
+    def test_caminos_criticos(self):
+        tareas = [_tarea(5), _tarea(3, previa=0), _tarea(2, previa=1), _tarea(1, previa=0)]
+        estimador = EstimadorCotaInferior(tareas, 1, None, INICIO)
+        assert estimador._caminos_criticos() == {0: 5.0, 1: 8.0, 2: 10.0, 3: 6.0}
+
+    def test_ciclo_en_las_dependencias_termina(self):
+        tareas = [_tarea(5, previa=1), _tarea(3, previa=0)]
+        estimador = EstimadorCotaInferior(tareas, 1, None, INICIO)
+        assert set(estimador._caminos_criticos()) == {0, 1}
@@ -0,0 +1,89 @@
+import pytest
+
+from dependency_graph import GrafoDependencias
+from tests.unit.conftest import DESCANSO_COMIDA, INICIO, ConfiguracionHorario, motor_de_eventos
+
+# --- FIXTURES ---
+
+
+class _Linea:
+    """Sustituto mínimo de LineaTemporalTarea: sólo id y dependency_index."""
+
+    def __init__(self, id, dependency_index=None):
+        self.id = id
+        self.dependency_index = dependency_index
+
+
+def _grafo(flow, lineas):
+    lineas_temporales = {linea.id: linea for linea in lineas}
+    indice_a_tarea_id = {i: linea.id for i, linea in enumerate(lineas)}
+    return GrafoDependencias.construir(flow, lineas_temporales, indice_a_tarea_id)
+
+
+@pytest.fixture
+def motor():
+    """Motor con una bifurcación A -> (B, C) y un ciclo C -> A."""
+    flow = [
+        {'task': {'id': 'A', 'name': 'A', 'duration': 10}, 'workers': ['W1'],
+         'trigger_units': 2, 'is_cycle_start': True, 'start_date': INICIO},
+        {'task': {'id': 'B', 'name': 'B', 'duration': 10}, 'workers': ['W2'],
+         'trigger_units': 2, 'previous_task_index': 0},
+        {'task': {'id': 'C', 'name': 'C', 'duration': 10}, 'workers': ['W3'],
+         'trigger_units': 2, 'previous_task_index': 0, 'next_cyclic_task_index': 0},
+    ]
+    return motor_de_eventos(flow, [('W1', 1), ('W2', 1), ('W3', 1)], ConfiguracionHorario(DESCANSO_COMIDA))
+
+
+# --- TESTS ---
+
+class TestGrafoDependencias:
+
+    def test_aristas_directas_e_inversas(self):
+        flow = [{}, {}, {}, {}]
+        grafo = _grafo(flow, [_Linea('A'), _Linea('B', 0), _Linea('C', 1), _Linea('D', 0)])
+
+        assert grafo.dependientes('A') == ['B', 'D']
+        assert grafo.dependientes('B') == ['C']
+        assert grafo.dependientes('C') == []
+        assert grafo.predecesor('C') == 'B'
+        assert grafo.predecesor('A') is None
+        assert grafo.indice_predecesor('D') == 0
+
+    def test_tarea_que_depende_de_si_misma_no_es_dependiente(self):
+        grafo = _grafo([{}, {}], [_Linea('A', 0), _Linea('B', 0)])
+        assert grafo.dependientes('A') == ['B']
+
+    def test_indice_negativo_no_tiene_predecesor(self):
+        grafo = _grafo([{}, {}], [_Linea('A'), _Linea('B', -1)])
+        assert grafo.predecesor('B') is None
+        assert grafo.tiene_dependencia_estandar('B')
+        assert not grafo.tiene_dependencia_estandar('A')
+
+    def test_aristas_ciclicas(self):
+        flow = [{}, {}, {'next_cyclic_task_index': 0}]
+        grafo = _grafo(flow, [_Linea('A'), _Linea('B', 0), _Linea('C', 1)])
+
+        assert grafo.siguiente_ciclico('C') == 0
+        assert grafo.siguiente_ciclico('A') is None
+        assert grafo.origenes_ciclicos('A') == ['C']
+
+    def test_tarea_desconocida(self):
+        grafo = _grafo([{}], [_Linea('A')])
+        assert not grafo.contiene('X')
+        assert grafo.dependientes('X') == []
+        assert grafo.predecesor('X') is None
+
+
+class TestMotorUsaGrafo:
+
+    def test_encontrar_tareas_dependientes(self, motor):
+        dependientes = motor._encontrar_tareas_dependientes('A')
+        assert [linea.id for linea in dependientes] == ['B', 'C']
+        assert all(linea is motor.lineas_temporales[linea.id] for linea in dependientes)
+
+    def test_tarea_desconocida_devuelve_lista_vacia(self, motor):
+        assert motor._encontrar_tareas_dependientes('no_existe') == []
+
+    def test_grafo_refleja_el_ciclo(self, motor):
+        assert motor.grafo_dependencias.siguiente_ciclico('C') == 0
+        assert motor.grafo_dependencias.origenes_ciclicos('A') == ['C']
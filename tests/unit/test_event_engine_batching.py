@@ -0,0 +1,102 @@
+import copy
+from datetime import date, timedelta
+from unittest.mock import MagicMock
+
+from simulation_events import EventoDeSimulacion
+from tests.unit.conftest import DESCANSO_COMIDA, INICIO, ConfiguracionHorario, motor_de_eventos, paso
+
+# --- FIXTURES ---
+
+
+def _flujo_sincronizado(cadenas=6, unidades=4):
+    """Cadenas independientes X -> Y con la misma duración: muchos eventos por instante."""
+    flujo = []
+    for n in range(cadenas):
+        flujo.append(paso(f'X{n}', 30, f'WX{n}', unidades, inicio=INICIO, fabricacion_id='L1'))
+        flujo.append(paso(f'Y{n}', 30, f'WY{n}', unidades, previa=len(flujo) - 1, fabricacion_id='L1'))
+    return flujo
+
+
+def _motor(flujo, agrupar, **kwargs):
+    trabajadores = sorted({w['name'] for step in flujo for w in step['workers']})
+    motor = motor_de_eventos(copy.deepcopy(flujo), [(w, 1) for w in trabajadores],
+                             ConfiguracionHorario(DESCANSO_COMIDA), **kwargs)
+    motor.agrupar_por_instante = agrupar
+    return motor
+
+
+class _Anotado(EventoDeSimulacion):
+    """Evento de prueba que anota su nombre al procesarse y puede cancelar otros."""
+    __slots__ = ()
+    tipo_evento = 'PRUEBA'
+    prioridad = 3
+
+    def procesar(self, motor_eventos):
+        motor_eventos.procesados_prueba.append(self.extra['nombre'])
+        motor_eventos.cancelar_eventos(self.extra.get('cancela', []))
+        return []
+
+
+class _Urgente(_Anotado):
+    __slots__ = ()
+    prioridad = 0
+
+
+def _anotado(clase, nombre, minutos=0, **extra):
+    return clase(timestamp=INICIO + timedelta(minutes=minutos), extra={'nombre': nombre, **extra})
+
+
+# --- TESTS ---
+
+class TestAgruparPorInstante:
+
+    def test_flujo_sincronizado_da_el_mismo_resultado(self):
+        secuencial = _motor(_flujo_sincronizado(), agrupar=False).ejecutar_simulacion()
+        motor = _motor(_flujo_sincronizado(), agrupar=True)
+
+        assert motor.ejecutar_simulacion() == secuencial
+        assert motor.eventos_en_cola() == 0 and not motor._lote_en_curso
+
+    def test_un_instante_se_procesa_por_prioridad(self):
+        motor = _motor(_flujo_sincronizado(1), agrupar=True)
+        motor._iniciar()
+        motor.procesados_prueba = []
+        motor.programar_eventos([_anotado(_Anotado, 'tarde', 10), _anotado(_Anotado, 'normal'),
+                                 _anotado(_Urgente, 'urgente')])
+
+        motor._procesar_eventos()
+
+        assert motor.procesados_prueba == ['urgente', 'normal', 'tarde']
+
+    def test_evento_cancelado_dentro_del_instante_no_se_procesa(self):
+        motor = _motor(_flujo_sincronizado(1), agrupar=True)
+        motor._iniciar()
+        motor.procesados_prueba = []
+        cancelado = _anotado(_Anotado, 'cancelado')
+        motor.programar_eventos([cancelado, _anotado(_Urgente, 'urgente', cancela=[cancelado])])
+
+        motor._procesar_eventos()
+
+        assert motor.procesados_prueba == ['urgente']
+        assert motor.lapidas_en_cola == 0
+
+    def test_el_registro_recibe_cada_instante_de_una_vez(self):
+        registro = MagicMock()
+        motor = _motor(_flujo_sincronizado(), agrupar=True, registro_eventos=registro)
+        motor.ejecutar_simulacion()
+
+        registro.guardar_evento.assert_not_called()
+        guardados = [evento for llamada in registro.guardar_eventos.call_args_list for evento in llamada.args[0]]
+        assert len(guardados) == motor.eventos_procesados
+        assert registro.guardar_eventos.call_count < motor.eventos_procesados
+
+    def test_parada_por_plazo(self):
+        # 20 unidades de 30 min no caben en la jornada del día 2
+        flujo, plazos = _flujo_sincronizado(unidades=20), {'L1': date(2025, 1, 2)}
+        secuencial = _motor(flujo, agrupar=False, plazos=plazos)
+        motor = _motor(flujo, agrupar=True, plazos=plazos)
+
+        assert motor.ejecutar_simulacion() == secuencial.ejecutar_simulacion()
+        assert motor.plazo_incumplido is not None
+        # Lo que quedaba del instante en que se detuvo vuelve a la cola
+        assert motor.eventos_en_cola() == secuencial.eventos_en_cola() > 0
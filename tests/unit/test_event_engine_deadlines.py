@@ -0,0 +1,69 @@
+import pytest
+from datetime import datetime, date
+from unittest.mock import MagicMock
+
+from calculation_audit import CalculationDecision
+from controllers.pila_controller import OptimizerWorker
+from event_engine import DECISION_PLAZO_INVIABLE, simulacion_inviable
+from tests.unit.conftest import INICIO, motor_de_eventos, paso
+
+# --- FIXTURES ---
+
+
+def _paso(tarea_id, lote, duracion, unidades, trabajador):
+    return paso(tarea_id, duracion, trabajador, unidades, inicio=INICIO, fabricacion_id=lote)
+
+
+def _simular(flow, plazos=None):
+    trabajadores = sorted({w['name'] for step in flow for w in step['workers']})
+    motor = motor_de_eventos(flow, [(w, 1) for w in trabajadores], plazos=plazos)
+    results, audit = motor.ejecutar_simulacion()
+    return motor, results, audit
+
+
+# --- TESTS ---
+
+class TestPodaPorPlazo:
+
+    def test_unidad_terminada_tras_el_plazo_detiene_la_simulacion(self):
+        # 4 unidades de 240 min: la 3ª termina el viernes, la 4ª ya no se simula
+        flow = [_paso('A', 'L1', 240, 4, 'W1')]
+        motor, results, audit = _simular(flow, plazos={'L1': date(2025, 1, 2)})
+
+        assert [r['Numero Unidad'] for r in results] == [1, 2, 3]
+        assert motor.plazo_incumplido['lote'] == 'L1'
+        assert motor.eventos_futuros
+        assert simulacion_inviable(audit)
+
+    def test_unidades_pendientes_al_vencer_el_plazo(self):
+        # L1 tiene una única unidad de 2000 min en curso cuando el reloj pasa su plazo
+        flow = [_paso('A', 'L1', 2000, 1, 'W1'), _paso('B', 'L2', 30, 40, 'W2')]
+        motor, results, audit = _simular(flow, plazos={'L1': date(2025, 1, 2), 'L2': date(2025, 1, 31)})
+
+        assert motor.plazo_incumplido['lote'] == 'L1'
+        assert 'pendientes' in motor.plazo_incumplido['motivo']
+        assert not any(r['fabricacion_id'] == 'L1' for r in results)
+        assert max(r['Fin'] for r in results) < datetime(2025, 1, 3, 9, 0)
+        parada = [d for d in audit if d.decision_type == DECISION_PLAZO_INVIABLE]
+        assert len(parada) == 1 and parada[0].task_name == "LOTE 'L1'"
+
+    def test_plazo_alcanzable_no_cambia_el_resultado(self):
+        flow = [_paso('A', 'L1', 240, 4, 'W1'), _paso('B', 'L2', 30, 10, 'W2')]
+        _, sin_plazos, audit_sin = _simular(flow)
+        motor, con_plazos, audit_con = _simular(flow, plazos={'L1': date(2025, 1, 3), 'L2': datetime(2025, 1, 2)})
+
+        assert motor.plazo_incumplido is None
+        assert con_plazos == sin_plazos
+        assert [d.reason for d in audit_con] == [d.reason for d in audit_sin]
+
+
+class TestOptimizadorUsaLaParada:
+
+    def test_intento_detenido_no_cumple_plazos(self):
+        worker = OptimizerWorker(MagicMock(), INICIO, INICIO, 1)
+        worker.optimizer._verify_deadlines.return_value = True
+        parada = CalculationDecision(timestamp=INICIO, decision_type=DECISION_PLAZO_INVIABLE,
+                                     reason='', user_friendly_reason='')
+
+        assert worker._deadlines_met([], []) is True
+        assert not worker._deadlines_met([], [parada])
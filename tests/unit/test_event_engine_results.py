@@ -0,0 +1,60 @@
+import pytest
+from datetime import date
+
+from temporal_storage import RegistroTemporal
+from tests.unit.conftest import INICIO, ConfiguracionHorario, motor_de_eventos
+
+# --- FIXTURES ---
+
+CONFIGURACION = ConfiguracionHorario(breaks=[{"start": "10:00", "end": "10:15"}], holidays=[date(2025, 1, 6)])
+
+
+def _motor(registro_eventos=None):
+    flow = [
+        {'task': {'id': 'A', 'name': 'A', 'duration': 35, 'fabricacion_id': 'L1'}, 'workers': ['W1'],
+         'trigger_units': 4, 'is_cycle_start': True, 'start_date': INICIO},
+        {'task': {'id': 'B', 'name': 'B', 'duration': 50}, 'workers': ['W2'],
+         'trigger_units': 4, 'previous_task_index': 0},
+    ]
+    return motor_de_eventos(flow, [('W1', 1), ('W2', 1)], CONFIGURACION, registro_eventos=registro_eventos)
+
+
+def _canon(results, audit):
+    filas = [(r['Tarea'], r['Inicio'], r['Fin'], r['Lista Trabajadores'], r['Numero Unidad'],
+              r['Duracion (min)'], r['Inicio Formateado'], r['Dias Laborables'], r['Parent Index'])
+             for r in results]
+    entradas = [(d.timestamp, d.decision_type, d.reason, d.task_name) for d in audit]
+    return filas, entradas
+
+
+# --- TESTS ---
+
+class TestCompilacionIncremental:
+
+    def test_no_crea_bd_temporal(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        motor = _motor()
+
+        results, audit = motor.ejecutar_simulacion()
+
+        assert motor.registro_temporal is None
+        assert len(results) == 8
+        assert list(tmp_path.iterdir()) == []
+
+    def test_equivale_a_compilar_desde_el_registro(self, tmp_path):
+        registro = RegistroTemporal(db_path=str(tmp_path / 'eventos.db'))
+        motor = _motor(registro_eventos=registro)
+
+        results, audit = motor.ejecutar_simulacion()
+        eventos = registro.consultar_eventos()
+        registro.close()
+
+        assert len(eventos) == len(motor.audit_log_en_curso)
+        assert _canon(results, audit) == _canon(motor._compilar_resultados_compatibles(eventos),
+                                                motor._compilar_audit_log_compatible(eventos))
+
+    def test_filas_ordenadas_por_fin(self):
+        results, _ = _motor().ejecutar_simulacion()
+        fines = [r['Fin'] for r in results]
+        assert fines == sorted(fines)
+        assert results[0]['Inicio Formateado'] == 'Día 1 - 08:00'
@@ -0,0 +1,131 @@
+from datetime import datetime
+
+import pytest
+
+from event_engine import TAREA_NO_DISPONIBLE
+from tests.unit.conftest import INICIO, motor_de_eventos, paso
+
+pytestmark = pytest.mark.usefixtures('sin_logs')
+
+# --- FIXTURES ---
+
+CORTE = datetime(2025, 1, 2, 10, 30)
+
+
+def _motor():
+    # A (60 min, máquina 1) y B (30 min) en paralelo, cada una con su trabajador
+    flujo = [
+        paso('A', 60, 'W1', 4, inicio=INICIO, fabricacion_id='L1', machine_id=1),
+        paso('B', 30, 'W2', 12, inicio=INICIO, fabricacion_id='L1'),
+    ]
+    return motor_de_eventos(flujo, [('W1', 1), ('W2', 1)], machines={1: 'M1'})
+
+
+def _filas(results):
+    return sorted((r['Tarea'], r['Trabajador Asignado'], r['Inicio'], r['Fin']) for r in results)
+
+
+@pytest.fixture
+def referencia():
+    return _motor().ejecutar_simulacion()[0]
+
+
+# --- TESTS ---
+
+class TestAvanzarHasta:
+
+    def test_no_procesa_eventos_del_instante_ni_posteriores(self):
+        motor = _motor()
+        assert motor.avanzar_hasta(CORTE) > 0
+        assert motor.tiempo_actual == CORTE
+        assert all(tics >= motor.reloj.a_tics(CORTE) for tics, _, _ in motor.eventos_futuros)
+        assert all(r['Fin'] < CORTE for r in motor.resultados_en_curso)
+
+    def test_continuar_da_el_mismo_resultado(self, referencia):
+        motor = _motor()
+        motor.avanzar_hasta(CORTE)
+        assert motor.ejecutar_simulacion()[0] == referencia
+
+
+class TestInstantanea:
+
+    def test_bifurcaciones_sin_cambios_reproducen_la_simulacion(self, referencia):
+        motor = _motor()
+        motor.avanzar_hasta(CORTE)
+        instantanea = motor.instantanea()
+
+        assert instantanea.instante == CORTE
+        assert instantanea.bifurcar().ejecutar_simulacion()[0] == referencia
+        assert instantanea.bifurcar().ejecutar_simulacion()[0] == referencia
+        assert motor.ejecutar_simulacion()[0] == referencia
+
+    def test_bifurcaciones_independientes(self, referencia):
+        motor = _motor()
+        motor.avanzar_hasta(CORTE)
+        instantanea = motor.instantanea()
+
+        parada = instantanea.bifurcar()
+        parada.bloquear_recurso(1, hasta=datetime(2025, 1, 3, 8, 0))
+        parada.ejecutar_simulacion()
+
+        # Ni la instantánea ni el motor original ven el bloqueo
+        assert instantanea.bifurcar().ejecutar_simulacion()[0] == referencia
+        assert motor.ejecutar_simulacion()[0] == referencia
+        assert not any(i.tarea_id == TAREA_NO_DISPONIBLE for i in motor.gestor_recursos.calendario_maquinas[1])
+
+    def test_bifurcacion_tiene_su_propio_indice_de_eventos(self):
+        motor = _motor()
+        motor.avanzar_hasta(CORTE)
+        bifurcacion = motor.bifurcar()
+
+        # Los eventos de la cola de la bifurcación son copias: el índice debe apuntar a ellas
+        # (un fin de bloque se indexa por tarea e instancia, sin número de unidad)
+        fin = next(e for _, _, e in bifurcacion.eventos_futuros if e.tarea_id == 'A')
+        assert bifurcacion._tiene_evento_futuro('A', None, fin.id_instancia)
+        bifurcacion.cancelar_eventos([fin])
+        assert not bifurcacion._tiene_evento_futuro('A', None, fin.id_instancia)
+        assert motor._tiene_evento_futuro('A', None, fin.id_instancia)
+
+        bifurcacion.avanzar_hasta(datetime(2025, 1, 2, 12, 0))
+        vivos = [e for _, _, e in bifurcacion.eventos_futuros if not e.cancelado]
+        assert len(bifurcacion.indice_eventos) == len(vivos)
+        assert all(e in bifurcacion.indice_eventos for e in vivos)
+
+    def test_bifurcar_no_copia_el_dialogo_visual(self):
+        motor = _motor()
+        motor.visual_dialog_reference = object()
+        motor.avanzar_hasta(CORTE)
+        copia = motor.bifurcar()
+        assert copia.visual_dialog_reference is None
+        assert copia.calculador_tiempos is motor.calculador_tiempos
+        assert copia.lineas_temporales['A'] is not motor.lineas_temporales['A']
+
+
+class TestEscenarios:
+
+    def test_maquina_parada_retrasa_las_unidades_pendientes(self, referencia):
+        motor = _motor()
+        motor.avanzar_hasta(CORTE)
+        motor.bloquear_recurso(1, hasta=datetime(2025, 1, 3, 8, 0))
+        results = motor.ejecutar_simulacion()[0]
+
+        antes = [f for f in _filas(referencia) if f[0] == 'A']
+        despues = [f for f in _filas(results) if f[0] == 'A']
+        assert despues[:3] == antes[:3]
+        assert despues[3][2] == datetime(2025, 1, 3, 8, 0)
+
+    def test_reasignar_trabajador_ayuda_en_otra_tarea(self, referencia):
+        motor = _motor()
+        motor.avanzar_hasta(CORTE)
+        motor.reasignar_trabajador('W1', 'B')
+        results = motor.ejecutar_simulacion()[0]
+
+        assert any(t == 'B' and w == 'W1' and inicio >= CORTE for t, w, inicio, _ in _filas(results))
+        fin_b = max(r['Fin'] for r in results if r['Tarea'] == 'B')
+        assert fin_b < max(r['Fin'] for r in referencia if r['Tarea'] == 'B')
+
+    def test_no_se_reasigna_en_el_pasado(self):
+        motor = _motor()
+        motor.avanzar_hasta(CORTE)
+        with pytest.raises(ValueError):
+            motor.reasignar_trabajador('W1', 'B', desde=INICIO)
@@ -0,0 +1,232 @@
+import heapq
+
+import pytest
+from datetime import datetime
+
+from event_engine import MINIMO_LAPIDAS_COMPACTAR
+from event_index import FinalizacionesPendientes, IndiceEventosFuturos
+from simulation_events import EventoInicioUnidad, EventoFinUnidad, EventoReasignacionTrabajador
+from tests.unit.conftest import DESCANSO_COMIDA, INICIO, ConfiguracionHorario, motor_de_eventos, paso
+
+# --- FIXTURES ---
+
+
+@pytest.fixture
+def motor():
+    """Motor con dos tareas encadenadas."""
+    flow = [paso('A', 30, 'W1', 3, inicio=INICIO), paso('B', 30, 'W2', 3, previa=0)]
+    return motor_de_eventos(flow, [('W1', 1), ('W2', 1)], ConfiguracionHorario(DESCANSO_COMIDA))
+
+
+def _inicio(tarea_id, unidad, id_instancia='inst-1'):
+    return EventoInicioUnidad(timestamp=datetime(2025, 1, 2, 9, 0),
+                              datos={'tarea_id': tarea_id, 'unidad': unidad, 'id_instancia': id_instancia})
+
+
+def _fin(tarea_id, unidad, hora, minuto=0):
+    return EventoFinUnidad(timestamp=datetime(2025, 1, 2, hora, minuto),
+                           datos={'tarea_id': tarea_id, 'numero_unidad': unidad, 'unidad': unidad})
+
+
+# --- TESTS ---
+
+class TestIndiceEventosFuturos:
+
+    def test_registrar_y_consultar_unidad(self):
+        indice = IndiceEventosFuturos()
+        evento = _inicio('A', 1)
+        indice.registrar(evento)
+
+        assert len(indice) == 1
+        assert evento in indice
+        assert indice.tiene_unidad('A', 1)
+        assert indice.tiene_unidad('A', 1, 'inst-1')
+        assert not indice.tiene_unidad('A', 1, 'otra')
+        assert not indice.tiene_unidad('A', 2)
+        assert indice.unidades_programadas('A') == {1}
+
+    def test_retirar_es_idempotente(self):
+        indice = IndiceEventosFuturos()
+        evento = _inicio('A', 1)
+        indice.registrar(evento)
+
+        indice.retirar(evento)
+        indice.retirar(evento)
+
+        assert len(indice) == 0
+        assert not indice.tiene_unidad('A', 1)
+        assert indice.unidades_programadas('A') == set()
+
+    def test_eventos_cancelados_no_se_indexan(self):
+        indice = IndiceEventosFuturos()
+        evento = _inicio('A', 1)
+        evento.cancelado = True
+        indice.registrar(evento)
+        assert len(indice) == 0
+
+    def test_fin_de_bloque_cuenta_como_unidad_programada(self):
+        """Un FIN_BLOQUE_TRABAJO usa 'numero_unidad', no 'unidad'."""
+        indice = IndiceEventosFuturos()
+        fin = EventoFinUnidad(timestamp=datetime(2025, 1, 2, 9, 30),
+                              datos={'tarea_id': 'A', 'numero_unidad': 2, 'id_instancia': 'x'})
+        indice.registrar(fin)
+
+        assert indice.unidades_programadas('A') == {2}
+        # Igual que el recorrido original: el fin no coincide por 'unidad'
+        assert not indice.tiene_unidad('A', 2)
+
+    def test_eventos_por_tipo(self):
+        indice = IndiceEventosFuturos()
+        reasignacion = EventoReasignacionTrabajador(timestamp=datetime(2025, 1, 2, 9, 0),
+                                                    datos={'trabajador_id': 'W1'})
+        indice.registrar(_inicio('A', 1))
+        indice.registrar(reasignacion)
+
+        assert indice.eventos_de_tipo('REASIGNACION_TRABAJADOR') == [reasignacion]
+        assert indice.contar_por_tipo('INICIO_UNIDAD') == 1
+        assert indice.contar_por_tipo('FIN_BLOQUE_TRABAJO') == 0
+
+    def test_varios_eventos_misma_unidad(self):
+        indice = IndiceEventosFuturos()
+        primero, segundo = _inicio('A', 1, 'i1'), _inicio('A', 1, 'i2')
+        indice.registrar(primero)
+        indice.registrar(segundo)
+
+        indice.retirar(primero)
+
+        assert indice.tiene_unidad('A', 1)
+        assert indice.tiene_unidad('A', 1, 'i2')
+        assert not indice.tiene_unidad('A', 1, 'i1')
+
+
+class TestFinalizacionesPendientes:
+
+    def test_siguiente_es_el_primer_fin_estrictamente_posterior(self):
+        pendientes = FinalizacionesPendientes()
+        for contador, (evento, tics) in enumerate([(_fin('A', 2, 10), 20), (_fin('A', 1, 9), 10),
+                                                   (_fin('B', 1, 9), 10), (_inicio('A', 3), 5)]):
+            pendientes.programar(tics, contador, evento)
+
+        assert len(pendientes) == 3
+        assert pendientes.siguiente('A', 5).unidad == 1
+        assert pendientes.siguiente('A', 10).unidad == 2
+        assert pendientes.siguiente('A', 20) is None
+        assert pendientes.siguiente('C', 0) is None
+
+    def test_extraer_quita_el_evento(self):
+        pendientes = FinalizacionesPendientes()
+        primero, segundo = _fin('A', 1, 9), _fin('A', 2, 10)
+        pendientes.programar(10, 0, primero)
+        pendientes.programar(20, 1, segundo)
+
+        pendientes.extraer(10, 0, primero)
+        assert pendientes.siguiente('A', 0) is segundo
+        pendientes.extraer(20, 1, segundo)
+        assert len(pendientes) == 0
+
+    def test_retirar_busca_por_tics_y_desempata_por_identidad(self):
+        pendientes = FinalizacionesPendientes()
+        eventos = [_fin('A', unidad, 9) for unidad in range(1, 5)]
+        for contador, (evento, tics) in enumerate(zip(eventos, (10, 20, 20, 30))):
+            evento.tics = tics
+            pendientes.programar(tics, contador, evento)
+
+        pendientes.retirar(eventos[2])
+        pendientes.retirar(eventos[2])
+
+        assert len(pendientes) == 3
+        assert pendientes.siguiente('A', 10) is eventos[1]
+        assert pendientes.siguiente('A', 20) is eventos[3]
+        pendientes.retirar(eventos[1])
+        assert pendientes.siguiente('A', 10) is eventos[3]
+
+
+class TestMotorMantieneIndice:
+
+    def test_programar_y_cancelar_actualizan_indice(self, motor):
+        evento = _inicio('A', 1)
+        motor.programar_eventos([evento])
+        assert motor._tiene_evento_futuro('A', 1)
+
+        motor.cancelar_eventos([evento])
+        assert not motor._tiene_evento_futuro('A', 1)
+        # El evento sigue físicamente en el heap, pero ya no cuenta
+        assert len(motor.eventos_futuros) == 1
+        assert motor.eventos_en_cola() == 0
+
+    def test_eventos_ya_cancelados_no_entran_en_los_indices(self, motor):
+        evento = _fin('A', 1, 9)
+        evento.cancelado = True
+        motor.programar_eventos([evento])
+
+        assert motor.lapidas_en_cola == 1
+        assert len(motor.indice_eventos) == 0
+        assert len(motor.finalizaciones_pendientes) == 0
+
+    def test_indice_vacio_al_terminar_simulacion(self, motor):
+        results, _ = motor.ejecutar_simulacion()
+
+        assert len(results) == 6
+        assert len(motor.indice_eventos) == 0
+        assert len(motor.finalizaciones_pendientes) == 0
+
+    def test_reconstruir_desde_heap(self, motor):
+        motor.programar_eventos([_inicio('A', 1), _inicio('B', 2, 'i9')])
+        motor.indice_eventos = IndiceEventosFuturos()
+
+        motor.indice_eventos.reconstruir(motor.eventos_futuros)
+
+        assert motor._tiene_evento_futuro('B', 2, 'i9')
+        assert motor.indice_eventos.unidades_programadas('A') == {1}
+
+    def test_finalizaciones_pendientes_siguen_al_heap(self, motor):
+        motor._iniciar()
+        motor._procesar_eventos(hasta=motor.reloj.a_tics(datetime(2025, 1, 2, 9, 15)))
+
+        en_cola = sorted((tics, contador) for tics, contador, evento in motor.eventos_futuros
+                         if evento.tipo_evento == 'FIN_BLOQUE_TRABAJO')
+        assert en_cola
+        reconstruido = FinalizacionesPendientes()
+        reconstruido.reconstruir(motor.eventos_futuros)
+        assert len(motor.finalizaciones_pendientes) == len(reconstruido) == len(en_cola)
+        for tarea_id in ('A', 'B'):
+            assert motor.finalizaciones_pendientes.siguiente(tarea_id, 0) is reconstruido.siguiente(tarea_id, 0)
+
+
+class TestLapidas:
+
+    def test_los_cancelados_se_descartan_al_salir(self, motor):
+        vivo, cancelado = _inicio('A', 1), _fin('A', 1, 8, 30)
+        motor.programar_eventos([cancelado, vivo])
+        motor.cancelar_eventos([cancelado])
+        assert motor.finalizaciones_pendientes.siguiente('A', 0) is None
+
+        procesados = motor._procesar_eventos(hasta=motor.reloj.a_tics(datetime(2025, 1, 2, 8, 45)))
+
+        assert procesados == 0
+        assert motor.lapidas_en_cola == 0
+        assert [evento for _, _, evento in motor.eventos_futuros] == [vivo]
+
+    def test_cancelar_un_evento_ya_procesado_no_deja_lapida(self, motor):
+        evento = _inicio('A', 1)
+        motor.programar_eventos([evento])
+        motor.indice_eventos.retirar(evento)
+        motor.eventos_futuros.clear()
+
+        motor.cancelar_eventos([evento, evento])
+
+        assert motor.lapidas_en_cola == 0
+
+    def test_compacta_al_superar_la_proporcion(self, motor):
+        vivos = [_inicio('A', unidad) for unidad in range(1, 11)]
+        cancelados = [_inicio('B', unidad) for unidad in range(1, MINIMO_LAPIDAS_COMPACTAR + 1)]
+        motor.programar_eventos(cancelados[:20] + vivos + cancelados[20:])
+
+        motor.cancelar_eventos(cancelados[:-1])
+        assert motor.lapidas_en_cola == MINIMO_LAPIDAS_COMPACTAR - 1
+
+        motor.cancelar_eventos(cancelados[-1:])
+        assert motor.lapidas_en_cola == 0
+        assert motor.eventos_en_cola() == len(motor.eventos_futuros) == len(vivos)
+        # El orden de salida se conserva
+        assert [heapq.heappop(motor.eventos_futuros)[2] for _ in vivos] == vivos
@@ -0,0 +1,66 @@
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import event_engine
+from controllers.simulation_worker import SimulationWorker, simulation_finished_callback
+from simulation_adapter import AdaptadorScheduler
+from tests.unit.conftest import INICIO, ConfiguracionHorario
+from time_calculator import CalculadorDeTiempos
+
+# --- FIXTURES ---
+
+RAIZ = Path(__file__).resolve().parents[2]
+
+
+def _adaptador(**callbacks):
+    flow = [{'task': {'id': 'A', 'name': 'A', 'duration': 10}, 'workers': ['W1'],
+             'trigger_units': 4, 'is_cycle_start': True, 'start_date': INICIO}]
+    config = ConfiguracionHorario()
+    return AdaptadorScheduler(flow, [('W1', 1)], {}, config, CalculadorDeTiempos(config),
+                              start_date=INICIO, **callbacks)
+
+
+# --- TESTS ---
+
+class TestNucleoSinQt:
+
+    def test_importar_el_nucleo_no_carga_qt(self):
+        codigo = "import sys, hipatia; sys.exit(1 if any(m.startswith('PyQt6') for m in sys.modules) else 0)"
+        assert subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ).returncode == 0
+
+    def test_callbacks_de_progreso_y_fin(self, monkeypatch):
+        monkeypatch.setattr(event_engine, 'INTERVALO_PROGRESO', 2)
+        progreso, terminado = [], MagicMock()
+
+        results, _ = _adaptador(al_progresar=lambda p, c: progreso.append((p, c)),
+                                al_terminar=terminado).run_simulation()
+
+        assert len(results) == 4
+        assert progreso[-1][1] == 0
+        assert [p for p, _ in progreso[:-1]] == list(range(2, progreso[-1][0] + 1, 2))
+        terminado.assert_called_once_with()
+
+    def test_error_en_al_terminar_no_pierde_resultados(self):
+        results, _ = _adaptador(al_terminar=MagicMock(side_effect=RuntimeError)).run_simulation()
+        assert len(results) == 4
+
+
+class TestSimulationWorker:
+
+    def test_traduce_el_progreso_a_senal(self):
+        worker = SimulationWorker(_adaptador())
+        worker.progress_update = MagicMock()
+        worker.finished = MagicMock()
+
+        worker.run()
+
+        percent, message = worker.progress_update.emit.call_args[0]
+        assert percent == 99 and 'eventos procesados' in message
+        assert len(worker.finished.emit.call_args[0][0]) == 4
+
+    def test_callback_de_fin_del_editor_visual(self):
+        dialog = MagicMock()
+        assert simulation_finished_callback(dialog) is dialog.simulation_finished.emit
+        assert simulation_finished_callback(None) is None
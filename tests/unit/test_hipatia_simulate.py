@@ -0,0 +1,141 @@
+import sys
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# test_app_controller_visual_editor sustituye 'pandas' por un MagicMock al recolectarse
+if isinstance(sys.modules.get('pandas'), MagicMock):
+    del sys.modules['pandas']
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from database.database_manager import DatabaseManager
+from database.models import Base
+from hipatia import simulate
+
+# --- FIXTURES ---
+
+INICIO = datetime(2025, 1, 2, 8, 0)
+
+
+def _flujo(duracion):
+    return [
+        {'task': {'id': 'A', 'name': 'A', 'duration': duracion}, 'workers': [{'name': 'W1'}],
+         'trigger_units': 3, 'is_cycle_start': True, 'start_date': INICIO},
+        {'task': {'id': 'B', 'name': 'B', 'duration': 20}, 'workers': [{'name': 'W2'}],
+         'trigger_units': 3, 'previous_task_index': 0},
+    ]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """BD en fichero con dos pilas guardadas (ids 1 y 2) y una que no se puede simular (id 3)."""
+    path = tmp_path / 'montaje.db'
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    db_manager = DatabaseManager(db_path=str(path))
+    assert db_manager.pila_repo.save_pila('Corta', '', {'unidades': 3}, _flujo(10), []) == 1
+    assert db_manager.pila_repo.save_pila('Larga', '', {'unidades': 3}, _flujo(40), []) == 2
+    assert db_manager.pila_repo.save_pila('Rota', '', {'unidades': 3}, _flujo('x'), []) == 3
+    db_manager.close()
+    return path
+
+
+def _ejecutar(db_path, out, *extra):
+    return simulate.main(['--pila', '1', '--pila', '2', '--db', str(db_path), '--out', str(out),
+                          '--inicio', '2025-01-02T08:00', *extra])
+
+
+# --- TESTS ---
+
+class TestSimulateCLI:
+
+    def test_varias_pilas_en_una_invocacion(self, db_path, tmp_path):
+        out = tmp_path / 'resultados.csv'
+        assert _ejecutar(db_path, out) == 0
+
+        resultados = pd.read_csv(out)
+        assert resultados.groupby('pila_id').size().to_dict() == {1: 6, 2: 6}
+        assert set(resultados.loc[resultados['pila_id'] == 2, 'Duracion (min)']) == {40.0, 20.0}
+
+        auditoria = pd.read_csv(tmp_path / 'resultados_audit.csv')
+        assert set(auditoria['pila_id']) == {1, 2}
+        assert {'decision_type', 'status', 'details'} <= set(auditoria.columns)
+
+    def test_procesos_en_paralelo_dan_lo_mismo(self, db_path, tmp_path):
+        _ejecutar(db_path, tmp_path / 'secuencial.csv')
+        _ejecutar(db_path, tmp_path / 'paralelo.csv', '--procesos', '2')
+        pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'secuencial.csv'),
+                                      pd.read_csv(tmp_path / 'paralelo.csv'))
+
+    def test_pila_inexistente_no_detiene_las_demas(self, db_path, tmp_path):
+        out = tmp_path / 'resultados.csv'
+        codigo = simulate.main(['--pila', '99', '--pila', '1', '--db', str(db_path), '--out', str(out)])
+        assert codigo == 1
+        assert set(pd.read_csv(out)['pila_id']) == {1}
+
+    @pytest.mark.parametrize("procesos", ['1', '2'])
+    def test_pila_que_falla_al_simular_no_detiene_las_demas(self, db_path, tmp_path, procesos, caplog):
+        out = tmp_path / 'resultados.csv'
+        codigo = simulate.main(['--pila', '1', '--pila', '3', '--pila', '2', '--db', str(db_path),
+                                '--out', str(out), '--inicio', '2025-01-02T08:00', '--procesos', procesos])
+
+        assert codigo == 1
+        assert pd.read_csv(out).groupby('pila_id').size().to_dict() == {1: 6, 2: 6}
+        assert set(pd.read_csv(tmp_path / 'resultados_audit.csv')['pila_id']) == {1, 2}
+        assert any('pila 3' in r.getMessage() for r in caplog.records if r.levelname == 'ERROR')
+
+    def test_parquet_escribe_con_pandas(self, db_path, tmp_path):
+        with patch.object(pd.DataFrame, 'to_parquet') as to_parquet:
+            assert _ejecutar(db_path, tmp_path / 'resultados.parquet') == 0
+        rutas = [c.args[0].name for c in to_parquet.call_args_list]
+        assert rutas == ['resultados.parquet', 'resultados_audit.parquet']
+
+    def test_formato_no_soportado(self, db_path, tmp_path):
+        with pytest.raises(SystemExit):
+            _ejecutar(db_path, tmp_path / 'resultados.xlsx')
+
+    def test_replicas_escribe_el_resumen_monte_carlo(self, db_path, tmp_path):
+        flujo = _flujo(30)
+        for step in flujo:
+            step['task']['fabricacion_id'] = 'L1'
+        flujo[0]['task'].update(duration_min=20, duration_max=60)
+        db_manager = DatabaseManager(db_path=str(db_path))
+        assert db_manager.pila_repo.save_pila('Con lote', '', {'unidades': 3}, flujo, []) == 4
+        db_manager.close()
+
+        out = tmp_path / 'resultados.csv'
+        assert simulate.main(['--pila', '4', '--db', str(db_path), '--out', str(out),
+                              '--inicio', '2025-01-02T08:00', '--replicas', '20']) == 0
+
+        assert len(pd.read_csv(out)) == 6
+        resumen = pd.read_csv(tmp_path / 'resultados_montecarlo.csv', parse_dates=['P50', 'P90'])
+        assert resumen[['pila_id', 'fabricacion_id', 'Sin Terminar']].values.tolist() == [[4, 'L1', 0.0]]
+        assert INICIO < resumen['P50'][0] <= resumen['P90'][0]
+
+    def test_replicas_negativas(self, db_path, tmp_path):
+        with pytest.raises(SystemExit):
+            _ejecutar(db_path, tmp_path / 'resultados.csv', '--replicas', '-1')
+
+
+class TestPreparacion:
+
+    def test_asigna_el_trabajador_de_mayor_nivel_que_cumple(self):
+        workers = [SimpleNamespace(nombre_completo='Junior', tipo_trabajador=1),
+                   SimpleNamespace(nombre_completo='Senior', tipo_trabajador=3)]
+        flow = [{'task': {'required_skill_level': 2}, 'workers': []},
+                {'task': {'required_skill_level': 5}},
+                {'task': {}, 'workers': [{'name': 'Fijo'}]}]
+
+        simulate.asignar_trabajadores_por_defecto(flow, workers)
+
+        assert [step['workers'] for step in flow] == [[{'name': 'Senior'}], [], [{'name': 'Fijo'}]]
+
+    def test_tabla_convierte_tipos_mezclados_a_texto(self):
+        df = simulate.tabla({1: [{'maquina': 3, 'lista': ['W1']}, {'maquina': 'N/A', 'lista': []}]})
+        assert df['maquina'].tolist() == ['3', 'N/A']
+        assert df['lista'].tolist() == ['["W1"]', '[]']
@@ -0,0 +1,145 @@
+import copy
+
+import pytest
+
+from incremental_simulation import INTERVALO_MINIMO, SimulacionIncremental, edicion_incremental
+from tests.unit.conftest import INICIO, ConfiguracionHorario, motor_de_eventos, paso
+from time_calculator import CalculadorDeTiempos
+
+pytestmark = pytest.mark.usefixtures('sin_logs')
+
+# --- FIXTURES ---
+
+WORKERS = [('W1', 1), ('W2', 1), ('W3', 1)]
+
+
+def _flujo():
+    # Cadena A -> B -> C, cada paso con su trabajador
+    return [
+        paso('A', 30, 'W1', 6, inicio=INICIO, fabricacion_id='L1'),
+        paso('B', 30, 'W2', 6, previa=0, fabricacion_id='L1'),
+        paso('C', 30, 'W3', 6, previa=1, fabricacion_id='L1'),
+    ]
+
+
+def _motor(flujo, workers=WORKERS):
+    return motor_de_eventos(flujo, workers)
+
+
+def _completa(flujo, workers=WORKERS):
+    return _motor(copy.deepcopy(flujo), workers).ejecutar_simulacion()
+
+
+@pytest.fixture
+def incremental():
+    # Intervalo mínimo para que haya instantáneas antes de que se toquen B y C
+    simulacion = SimulacionIncremental(intervalo_instantaneas=2)
+    simulacion.ejecutar(_motor(_flujo()), WORKERS, {}, ConfiguracionHorario(), INICIO)
+    return simulacion
+
+
+# --- TESTS ---
+
+class TestEdicionIncremental:
+
+    def test_duracion_y_trabajadores_son_incrementales(self):
+        anterior, nuevo = _flujo()[1], _flujo()[1]
+        nuevo['task']['duration'] = 45
+        nuevo['workers'] = [{'name': 'W3'}]
+        assert edicion_incremental(anterior, nuevo)
+
+    def test_otros_campos_y_raices_no(self):
+        anterior, nuevo = _flujo()[1], _flujo()[1]
+        nuevo['previous_task_index'] = None
+        assert not edicion_incremental(anterior, nuevo)
+
+        anterior, nuevo = _flujo()[0], _flujo()[0]
+        nuevo['task']['duration'] = 45
+        assert not edicion_incremental(anterior, nuevo)
+
+
+class TestSimulacionIncremental:
+
+    def test_cambiar_duracion_reanuda_y_coincide_con_simulacion_completa(self, incremental):
+        flujo = _flujo()
+        flujo[2]['task']['duration'] = 45
+
+        results, audit = incremental.ejecutar(_motor(flujo), WORKERS, {}, ConfiguracionHorario(), INICIO)
+
+        assert incremental.eventos_reutilizados > 0
+        assert (results, audit) == _completa(flujo)
+
+    def test_cambiar_trabajadores_coincide_con_simulacion_completa(self, incremental):
+        flujo = _flujo()
+        flujo[2]['workers'] = [{'name': 'W1'}]
+
+        results, audit = incremental.ejecutar(_motor(flujo), WORKERS, {}, ConfiguracionHorario(), INICIO)
+
+        assert (results, audit) == _completa(flujo)
+
+    def test_ediciones_sucesivas(self, incremental):
+        flujo = _flujo()
+        for duracion in (45, 10, 90):
+            flujo[2]['task']['duration'] = duracion
+            resultado = incremental.ejecutar(_motor(flujo), WORKERS, {}, ConfiguracionHorario(), INICIO)
+            assert resultado == _completa(flujo)
+
+    def test_el_editor_puede_seguir_modificando_su_flujo(self, incremental):
+        flujo = _flujo()
+        incremental.ejecutar(_motor(flujo), WORKERS, {}, ConfiguracionHorario(), INICIO)
+        flujo[2]['task']['duration'] = 45
+
+        resultado = incremental.ejecutar(_motor(flujo), WORKERS, {}, ConfiguracionHorario(), INICIO)
+
+        assert resultado == _completa(flujo)
+
+    def test_cambio_estructural_simula_desde_cero(self, incremental):
+        flujo = _flujo()
+        flujo[2]['previous_task_index'] = 0
+
+        resultado = incremental.ejecutar(_motor(flujo), WORKERS, {}, ConfiguracionHorario(), INICIO)
+
+        assert incremental.eventos_reutilizados == 0
+        assert resultado == _completa(flujo)
+
+    def test_cambiar_la_raiz_simula_desde_cero(self, incremental):
+        flujo = _flujo()
+        flujo[0]['task']['duration'] = 45
+
+        resultado = incremental.ejecutar(_motor(flujo), WORKERS, {}, ConfiguracionHorario(), INICIO)
+
+        assert incremental.eventos_reutilizados == 0
+        assert resultado == _completa(flujo)
+
+    def test_cambiar_la_plantilla_simula_desde_cero(self, incremental):
+        flujo, workers = _flujo(), WORKERS + [('W4', 2)]
+        flujo[2]['task']['duration'] = 45
+
+        resultado = incremental.ejecutar(_motor(flujo, workers), workers, {}, ConfiguracionHorario(), INICIO)
+
+        assert incremental.eventos_reutilizados == 0
+        assert resultado == _completa(flujo, workers)
+
+    def test_intervalo_automatico_no_baja_del_minimo(self):
+        simulacion = SimulacionIncremental()
+        simulacion.ejecutar(_motor(_flujo()), WORKERS, {}, ConfiguracionHorario(), INICIO)
+        assert simulacion.intervalo_instantaneas == INTERVALO_MINIMO
+
+
+class TestAdaptadorIncremental:
+
+    def test_el_adaptador_delega_en_la_simulacion_incremental(self, incremental):
+        from simulation_adapter import AdaptadorScheduler
+
+        flujo = _flujo()
+        flujo[2]['task']['duration'] = 45
+        config = ConfiguracionHorario()
+        adaptador = AdaptadorScheduler(
+            production_flow=flujo, all_workers_with_skills=WORKERS, available_machines={},
+            schedule_config=config, time_calculator=CalculadorDeTiempos(config),
+            start_date=INICIO, incremental=incremental)
+
+        results, audit = adaptador.run_simulation()
+
+        assert incremental.eventos_reutilizados > 0
+        assert (results, audit) == _completa(flujo)
@@ -0,0 +1,120 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from monte_carlo import (
+    DistribucionLogNormal, DistribucionTriangular, ResultadoMonteCarlo, distribuciones_del_flujo,
+    simular_monte_carlo
+)
+from tests.unit.conftest import INICIO, ConfiguracionHorario, motor_de_eventos, paso
+
+pytestmark = pytest.mark.usefixtures('sin_logs')
+
+# --- FIXTURES ---
+
+WORKERS = [('W1', 1), ('W2', 1), ('W3', 1)]
+
+
+def _flujo():
+    # Lote L1: cadena A -> B. Lote L2: C, independiente
+    return [
+        paso('A', 30, 'W1', 6, inicio=INICIO, fabricacion_id='L1'),
+        paso('B', 30, 'W2', 6, previa=0, fabricacion_id='L1'),
+        paso('C', 45, 'W3', 8, inicio=INICIO, fabricacion_id='L2', product_code='P2'),
+    ]
+
+
+def _monte_carlo(distribuciones, plazos=None, replicas=30, semilla=0):
+    return simular_monte_carlo(_flujo(), WORKERS, {}, ConfiguracionHorario(), INICIO, distribuciones,
+                               plazos=plazos, replicas=replicas, procesos=1, semilla=semilla)
+
+
+# --- TESTS ---
+
+class TestDistribuciones:
+
+    def test_triangular_respeta_los_extremos(self):
+        muestras = DistribucionTriangular(20, 30, 60).muestrear(np.random.default_rng(1), 1000)
+        assert muestras.min() >= 20 and muestras.max() <= 60
+
+    def test_ajuste_lognormal_recupera_los_parametros(self):
+        muestras = np.random.default_rng(1).lognormal(np.log(30), 0.2, 5000)
+        ajuste = DistribucionLogNormal.ajustar(muestras)
+        assert ajuste.mu == pytest.approx(np.log(30), abs=0.02)
+        assert ajuste.sigma == pytest.approx(0.2, abs=0.02)
+
+    def test_distribuciones_del_flujo(self):
+        flujo = _flujo()
+        flujo[0]['task'].update(duration_min=20, duration_max=60)
+        historial = {'pasos': {'B': [1800] * 3}, 'productos': {'P2': [2400, 2700, 3000, 2700, 2600]}}
+
+        distribuciones = distribuciones_del_flujo(flujo, historial)
+
+        assert distribuciones['A'] == DistribucionTriangular(20, 30, 60)
+        # B no llega al mínimo de muestras: sigue siendo determinista
+        assert 'B' not in distribuciones
+        # C es la única tarea de su producto: se ajusta a los trabajos completos, en minutos
+        assert np.exp(distribuciones['C'].mu) == pytest.approx(45, rel=0.05)
+
+
+class TestSimulacionMonteCarlo:
+
+    def test_sin_distribuciones_coincide_con_la_simulacion_determinista(self):
+        results, _ = motor_de_eventos(_flujo(), WORKERS).ejecutar_simulacion()
+
+        resultado = _monte_carlo({}, replicas=3)
+
+        for lote, fin in resultado.percentil(50).items():
+            assert fin == max(r['Fin'] for r in results if r['fabricacion_id'] == lote)
+        assert np.ptp(resultado.fines, axis=0).tolist() == [0, 0]
+
+    def test_misma_semilla_mismas_replicas(self):
+        distribuciones = {'A': DistribucionTriangular(20, 30, 60), 'C': DistribucionLogNormal(np.log(45), 0.3)}
+        a, b = _monte_carlo(distribuciones), _monte_carlo(distribuciones)
+        assert np.array_equal(a.fines, b.fines)
+        assert not np.array_equal(a.fines, _monte_carlo(distribuciones, semilla=1).fines)
+
+    def test_la_distribucion_de_una_tarea_no_cambia_las_muestras_de_otra(self):
+        solo_c = _monte_carlo({'C': DistribucionLogNormal(np.log(45), 0.3)})
+        con_a = _monte_carlo({'A': DistribucionTriangular(20, 30, 60), 'C': DistribucionLogNormal(np.log(45), 0.3)})
+        assert np.array_equal(solo_c.fines[:, 1], con_a.fines[:, 1])
+
+    def test_percentiles_y_probabilidad_de_cumplir(self):
+        resultado = _monte_carlo({'C': DistribucionTriangular(40, 65, 90)},
+                                 plazos={'L1': date(2025, 1, 2), 'L2': date(2025, 1, 2)}, replicas=60)
+
+        p50, p90 = resultado.percentil(50), resultado.percentil(90)
+        assert p50['L2'] <= p90['L2']
+        # L1 es determinista y termina el mismo día
+        assert resultado.probabilidad_cumplir()['L1'] == 1.0
+        # L2 cumple en las réplicas que terminan antes del día siguiente
+        limite = datetime(2025, 1, 3)
+        esperado = np.mean(resultado.fines[:, 1] < (limite - INICIO).total_seconds())
+        assert resultado.probabilidad_cumplir()['L2'] == pytest.approx(esperado)
+        assert 0 < esperado < 1
+
+        resumen = {fila['fabricacion_id']: fila for fila in resultado.resumen()}
+        assert resumen['L2']['P90'] == p90['L2']
+        assert resumen['L2']['Limite'] == limite
+
+    def test_percentil_coincide_con_numpy_si_todos_terminan(self):
+        fines = np.random.default_rng(3).uniform(0, 1e5, size=(37, 2))
+        resultado = ResultadoMonteCarlo(['L1', 'L2'], INICIO, fines, np.full(2, np.nan))
+
+        for q in (0, 10, 50, 90, 100):
+            esperado = np.percentile(fines, q, axis=0)
+            obtenido = resultado.percentil(q)
+            for lote, segundos in zip(['L1', 'L2'], esperado):
+                assert (obtenido[lote] - INICIO).total_seconds() == pytest.approx(segundos)
+
+    def test_lotes_sin_terminar_cuentan_como_los_mas_tardios(self):
+        # L2 sólo termina en una de cuatro réplicas
+        fines = np.array([[0.0, 100.0], [3600.0, np.nan], [7200.0, np.nan], [10800.0, np.nan]])
+        resultado = ResultadoMonteCarlo(['L1', 'L2'], INICIO, fines, np.array([np.nan, 200.0]))
+
+        assert resultado.percentil(50) == {'L1': datetime(2025, 1, 2, 9, 30), 'L2': None}
+        assert resultado.percentil(0)['L2'] == datetime(2025, 1, 2, 8, 1, 40)
+        assert resultado.sin_terminar() == {'L1': 0.0, 'L2': 0.75}
+        assert resultado.probabilidad_cumplir() == {'L2': 0.25}
+        assert [fila['Sin Terminar'] for fila in resultado.resumen()] == [0.0, 0.75]
@@ -0,0 +1,154 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from controllers.pila_controller import OptimizerWorker
+from optimizer_pool import EvaluadorCandidatos, ConfiguracionHorarioSerializable
+from tests.unit.conftest import DESCANSO_COMIDA, INICIO, ConfiguracionHorario, paso
+
+# --- FIXTURES ---
+
+
+def _configuracion_con_bd():
+    config = ConfiguracionHorario(DESCANSO_COMIDA)
+    # Como ScheduleConfig: referencia a la BD que no se puede enviar a otro proceso
+    config.db_manager = MagicMock()
+    return config
+
+
+def _flujo(duracion):
+    return [paso('A', duracion, 'W1', 3, inicio=INICIO)]
+
+
+class _EvaluadorEnProceso:
+    """Sustituto de EvaluadorCandidatos que simula sin procesos (resultados = nº de flexibles)."""
+    instancias = []
+    # Números de flexibles cuya simulación lanza una excepción
+    fallan = set()
+
+    def __init__(self, max_procesos):
+        self.max_procesos = max_procesos
+        self.rondas = []
+        _EvaluadorEnProceso.instancias.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def evaluar(self, candidatos, schedule_config, start_date, plazos=None, al_fallar=None):
+        self.rondas.append(sorted(candidatos))
+        for n in sorted(candidatos, reverse=True):
+            if n in self.fallan:
+                al_fallar(n, RuntimeError("fallo simulado"))
+                continue
+            yield n, [n], []
+
+
+def _optimizer(minimo):
+    optimizer = MagicMock()
+    optimizer.visual_dialog_reference = None
+    optimizer._prepare_and_prioritize_tasks.return_value = [{'name': 'Task'}]
+    optimizer.model.worker_repo.get_all_workers.return_value = []
+    optimizer.model.machine_repo.get_all_machines.return_value = []
+    optimizer._verify_deadlines.side_effect = lambda results: results[0] >= minimo
+    optimizer.audit_log = []
+    return optimizer
+
+
+# --- TESTS ---
+
+class TestEvaluadorCandidatos:
+
+    def test_simula_en_procesos_separados(self):
+        config = _configuracion_con_bd()
+        candidatos = {
+            'corto': (_flujo(30), [('W1', 1)], {}),
+            'largo': (_flujo(90), [('W1', 1)], {}),
+        }
+        with EvaluadorCandidatos(max_procesos=2) as evaluador:
+            resultados = {clave: results for clave, results, _ in evaluador.evaluar(candidatos, config, INICIO)}
+
+        assert set(resultados) == {'corto', 'largo'}
+        assert [r['Duracion (min)'] for r in resultados['corto']] == [30.0] * 3
+        assert max(r['Fin'] for r in resultados['largo']) > max(r['Fin'] for r in resultados['corto'])
+
+    def test_configuracion_serializable_no_incluye_la_bd(self):
+        copia = ConfiguracionHorarioSerializable(_configuracion_con_bd())
+        assert not hasattr(copia, 'db_manager')
+        assert copia.BREAKS == DESCANSO_COMIDA
+
+    def test_requiere_context_manager(self):
+        with pytest.raises(RuntimeError):
+            next(EvaluadorCandidatos(1).evaluar({}, ConfiguracionHorario(), INICIO))
+
+
+def _worker(optimizer, unidades=OptimizerWorker.MIN_PARALLEL_TASK_UNITS):
+    worker = OptimizerWorker(optimizer, INICIO, INICIO, unidades, max_processes=4)
+    worker.finished = MagicMock()
+    worker.candidate_finished = MagicMock()
+    return worker
+
+
+class TestOptimizerWorkerParalelo:
+
+    @pytest.mark.parametrize("minimo", [0, 1, 5, 13, 20, 21])
+    def test_mismo_minimo_que_la_busqueda_secuencial(self, minimo):
+        worker = _worker(_optimizer(minimo))
+
+        with patch('controllers.pila_controller.EvaluadorCandidatos', _EvaluadorEnProceso):
+            worker.run()
+
+        results, _, necesarios = worker.finished.emit.call_args[0]
+        assert necesarios == minimo
+        assert results == [min(minimo, OptimizerWorker.MAX_FLEXIBLE_WORKERS)]
+        # Cada candidato se comunica en cuanto termina
+        assert worker.candidate_finished.emit.call_count >= 1
+        rondas = _EvaluadorEnProceso.instancias[-1].rondas
+        assert all(len(ronda) <= 4 for ronda in rondas)
+        assert len(rondas) <= 4
+
+    def test_puntos_entre_fallo_y_exito(self):
+        assert OptimizerWorker._points_between(4, 8, 4) == [5, 6, 7]
+        assert OptimizerWorker._points_between(-1, 20, 3) == [4, 9, 14]
+        assert OptimizerWorker._points_between(3, 4, 4) == []
+
+    def test_candidato_que_falla_no_detiene_la_busqueda(self):
+        worker = _worker(_optimizer(5))
+
+        with patch('controllers.pila_controller.EvaluadorCandidatos', _EvaluadorEnProceso), \
+                patch.object(_EvaluadorEnProceso, 'fallan', {2}):
+            worker.run()
+
+        results, _, necesarios = worker.finished.emit.call_args[0]
+        assert (results, necesarios) == ([5], 5)
+        worker.candidate_finished.emit.assert_any_call(2, False, [], [])
+
+    def test_fallan_todos_los_candidatos(self):
+        worker = _worker(_optimizer(5))
+
+        with patch('controllers.pila_controller.EvaluadorCandidatos', _EvaluadorEnProceso), \
+                patch.object(_EvaluadorEnProceso, 'fallan', set(range(OptimizerWorker.MAX_FLEXIBLE_WORKERS + 1))):
+            worker.run()
+
+        worker.finished.emit.assert_called_once_with([], [], OptimizerWorker.MAX_FLEXIBLE_WORKERS + 1)
+
+    def test_flujo_pequeno_no_arranca_el_pool(self):
+        worker = _worker(_optimizer(3), unidades=1)
+        worker._run_attempt = MagicMock(side_effect=lambda n, *args: ([n], n >= 3))
+        evaluador = MagicMock()
+
+        with patch('controllers.pila_controller.EvaluadorCandidatos', evaluador):
+            worker.run()
+
+        evaluador.assert_not_called()
+        assert worker.finished.emit.call_args[0][2] == 3
+
+    def test_un_error_siempre_emite_finished(self):
+        optimizer = _optimizer(0)
+        optimizer._prepare_and_prioritize_tasks.side_effect = RuntimeError("sin flujo")
+        worker = _worker(optimizer)
+
+        worker.run()
+
+        worker.finished.emit.assert_called_once_with([], [], OptimizerWorker.MAX_FLEXIBLE_WORKERS + 1)
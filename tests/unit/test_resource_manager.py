@@ -0,0 +1,186 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from resource_manager import (GestorDeRecursos, CalendarioRecurso, IndiceReglasReasignacion, IntervaloOcupacion,
+                              ReglaReasignacion)
+
+# --- FIXTURES ---
+
+INICIO = datetime(2025, 1, 2, 8, 0)
+
+
+@pytest.fixture
+def gestor():
+    calculador = MagicMock()
+    # Minutos de reloj: add_work_minutes(x, 0) devuelve x sin cambios, igual que el calculador real
+    calculador.add_work_minutes.side_effect = lambda momento, minutos: momento + timedelta(minutes=minutos)
+    calculador.add_work_minutes_tics.side_effect = lambda reloj, tics, minutos: tics + reloj.minutos_a_tics(minutos)
+    gestor = GestorDeRecursos(calculador)
+    gestor.registrar_recurso('W1', es_trabajador=True)
+    gestor.registrar_recurso(7, es_trabajador=False)
+    return gestor
+
+
+def _en(minutos):
+    return INICIO + timedelta(minutes=minutos)
+
+
+def _siguiente_libre_por_recorrido(intervalos, desde):
+    """Búsqueda lineal original, usada como referencia."""
+    momento = desde
+    while True:
+        conflicto = next((i for i in intervalos if i.inicio <= momento < i.fin), None)
+        if conflicto is None:
+            return momento
+        momento = conflicto.fin
+
+
+def _regla(trabajador, umbral, tipo='AFTER_UNITS', origen='A'):
+    return ReglaReasignacion(trabajador, origen, 'B', tipo, umbral)
+
+
+# --- TESTS ---
+
+class TestCalendarioRecurso:
+
+    def test_mantiene_orden_por_inicio(self):
+        calendario = CalendarioRecurso()
+        for inicio in (30, 0, 60, 10):
+            calendario.insertar(IntervaloOcupacion(_en(inicio), _en(inicio + 5), f't{inicio}'))
+
+        assert [i.tarea_id for i in calendario] == ['t0', 't10', 't30', 't60']
+        assert len(calendario) == 4
+        assert calendario[0].tarea_id == 't0'
+
+    def test_empates_conservan_orden_de_insercion(self):
+        calendario = CalendarioRecurso()
+        calendario.insertar(IntervaloOcupacion(_en(0), _en(5), 'primero'))
+        calendario.insertar(IntervaloOcupacion(_en(0), _en(9), 'segundo'))
+        assert [i.tarea_id for i in calendario] == ['primero', 'segundo']
+
+    def test_ocupado_hasta(self):
+        calendario = CalendarioRecurso([
+            IntervaloOcupacion(_en(0), _en(60), 'a'),
+            IntervaloOcupacion(_en(10), _en(20), 'b'),
+            IntervaloOcupacion(_en(90), _en(120), 'c'),
+        ])
+        assert calendario.ocupado_hasta(_en(15)) == _en(60)
+        assert calendario.ocupado_hasta(_en(60)) is None  # el fin es abierto
+        assert calendario.ocupado_hasta(_en(-5)) is None
+        assert calendario.ocupado_hasta(_en(100)) == _en(120)
+
+    def test_primer_inicio_entre_ignora_intervalos_vacios(self):
+        calendario = CalendarioRecurso([
+            IntervaloOcupacion(_en(10), _en(10), 'vacio'),
+            IntervaloOcupacion(_en(20), _en(30), 'a'),
+        ])
+        assert calendario.primer_inicio_entre(_en(0), _en(25)) == _en(20)
+        assert calendario.primer_inicio_entre(_en(0), _en(20)) is None
+
+
+class TestGestorDeRecursos:
+
+    def test_recurso_sin_ocupacion(self, gestor):
+        assert gestor.encontrar_siguiente_momento_disponible('W1', _en(0)) == _en(0)
+        assert gestor.encontrar_siguiente_momento_disponible('desconocido', _en(3)) == _en(3)
+
+    def test_encadena_intervalos_contiguos(self, gestor):
+        gestor.asignar_recurso('W1', _en(0), _en(30), 'A')
+        gestor.asignar_recurso('W1', _en(30), _en(45), 'A')
+        gestor.asignar_recurso('W1', _en(50), _en(55), 'B')
+
+        assert gestor.encontrar_siguiente_momento_disponible('W1', _en(10)) == _en(45)
+        assert gestor.encontrar_siguiente_momento_disponible('W1', _en(47)) == _en(47)
+
+    def test_maquinas_tienen_calendario_propio(self, gestor):
+        gestor.asignar_recurso(7, _en(0), _en(30), 'A', es_trabajador=False)
+
+        assert gestor.encontrar_siguiente_momento_disponible(7, _en(5), es_trabajador=False) == _en(30)
+        assert gestor.encontrar_siguiente_momento_disponible('W1', _en(5)) == _en(5)
+
+    def test_ventana_comun_revisa_todos_los_recursos(self, gestor):
+        """La máquina retrasa el inicio a un momento en el que el trabajador ya está ocupado."""
+        gestor.asignar_recurso(7, _en(0), _en(30), 'A', es_trabajador=False)
+        gestor.asignar_recurso('W1', _en(30), _en(60), 'B')
+
+        assert gestor.encontrar_ventana_comun(['W1', 7], _en(0), 15) == (_en(60), _en(75))
+
+    def test_ventana_comun_no_pisa_reservas_posteriores(self, gestor):
+        gestor.asignar_recurso('W1', _en(20), _en(30), 'B')
+
+        assert gestor.encontrar_ventana_comun(['W1'], _en(0), 15) == (_en(0), _en(15))
+        assert gestor.encontrar_ventana_comun(['W1'], _en(0), 30) == (_en(30), _en(60))
+
+    def test_ventana_comun_sin_reservas(self, gestor):
+        assert gestor.encontrar_ventana_comun(['W1', 'W2', 7], _en(5), 10) == (_en(5), _en(15))
+
+    def test_equivale_al_recorrido_lineal(self, gestor):
+        rng = random.Random(42)
+        asignados = []
+        for _ in range(300):
+            inicio = rng.randint(0, 2000)
+            intervalo = IntervaloOcupacion(_en(inicio), _en(inicio + rng.randint(0, 40)), 'T')
+            asignados.append(intervalo)
+            gestor.asignar_recurso('W1', intervalo.inicio, intervalo.fin, 'T')
+
+        assert [i.inicio for i in gestor.calendario_trabajadores['W1']] == \
+            sorted(i.inicio for i in asignados)
+        for _ in range(300):
+            desde = _en(rng.randint(-10, 2100))
+            assert gestor.encontrar_siguiente_momento_disponible('W1', desde) == \
+                _siguiente_libre_por_recorrido(asignados, desde)
+
+
+class TestIndiceReglasReasignacion:
+
+    def test_construir_desde_el_flujo(self):
+        flujo = [
+            {'task': {'id': 'A'}, 'workers': [
+                {'name': 'W1', 'reassignment_rule': {'condition_type': 'AFTER_UNITS', 'condition_value': 3,
+                                                     'target_task_id': 'B', 'mode': 'REPLACE'}},
+                {'name': 'W2', 'reassignment_rule': None},
+                'W3',
+                {'name': 'W4', 'reassignment_rule': {'condition_type': 'ON_FINISH', 'target_task_id': 'B'}},
+            ]},
+            {'task': {'id': 'B'}, 'workers': [{'name': 'W2'}]},
+        ]
+        indice = IndiceReglasReasignacion.construir(flujo, {0: 'A', 1: 'B'})
+
+        assert [(r.trabajador_id, r.condicion_tipo, r.modo) for r in indice] == \
+            [('W1', 'AFTER_UNITS', 'REPLACE'), ('W4', 'ON_FINISH', 'PARALLEL_JOIN')]
+        assert indice.disparadas('A', 2) == []
+        assert [r.trabajador_id for r in indice.disparadas('A', 3)] == ['W1']
+        assert [r.trabajador_id for r in indice.disparadas('A', 3, tarea_completada=True)] == ['W1', 'W4']
+        assert indice.disparadas('B', 100, tarea_completada=True) == []
+
+    def test_disparadas_respeta_el_orden_de_los_trabajadores(self):
+        indice = IndiceReglasReasignacion()
+        for trabajador, umbral in (('W1', 5), ('W2', 1), ('W3', 3)):
+            indice.agregar(_regla(trabajador, umbral))
+
+        assert [r.trabajador_id for r in indice.disparadas('A', 4)] == ['W2', 'W3']
+        assert [r.trabajador_id for r in indice.disparadas('A', 5)] == ['W1', 'W2', 'W3']
+        assert len(indice) == 3
+
+    def test_retirar_alcanzadas(self):
+        indice = IndiceReglasReasignacion()
+        for trabajador, umbral in (('W1', 5), ('W2', 1), ('W3', 3)):
+            indice.agregar(_regla(trabajador, umbral))
+
+        assert [r.trabajador_id for r in indice.retirar_alcanzadas('A', 3)] == ['W2', 'W3']
+        assert indice.retirar_alcanzadas('A', 3) == []
+        assert [r.trabajador_id for r in indice] == ['W1']
+
+    def test_gestor_dispara_cada_regla_una_vez(self, gestor):
+        gestor.programar_reasignacion(_regla('W1', 2))
+        gestor.programar_reasignacion(_regla('W2', 4))
+        gestor.programar_reasignacion(_regla('W3', 1, origen='C'))
+
+        assert gestor.notificar_unidades_completadas('A', 1) == []
+        eventos = gestor.notificar_unidades_completadas('A', 2)
+        assert [e.extra['trabajador_id'] for e in eventos] == ['W1']
+        assert gestor.notificar_unidades_completadas('A', 2) == []
+        assert [e.extra['trabajador_id'] for e in gestor.notificar_unidades_completadas('A', 5)] == ['W2']
+        assert [r.trabajador_id for r in gestor.reglas_reasignacion] == ['W3']
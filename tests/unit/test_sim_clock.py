@@ -0,0 +1,63 @@
+import pytest
+from datetime import datetime, timedelta
+
+from sim_clock import RelojSimulacion, TICS_POR_MINUTO
+from simulation_events import EventoFinUnidad, EventoInicioUnidad
+from tests.unit.conftest import INICIO as EPOCA, motor_de_eventos
+
+# --- FIXTURES ---
+
+
+@pytest.fixture
+def motor():
+    flow = [{'task': {'id': 'A', 'name': 'A', 'duration': 10}, 'workers': ['W1'],
+             'trigger_units': 2, 'is_cycle_start': True, 'start_date': EPOCA}]
+    return motor_de_eventos(flow, [('W1', 1)], inicio=EPOCA)
+
+
+# --- TESTS ---
+
+class TestRelojSimulacion:
+
+    def test_ida_y_vuelta_exacta(self):
+        reloj = RelojSimulacion(EPOCA)
+        for momento in (EPOCA, EPOCA + timedelta(minutes=7.3), EPOCA - timedelta(days=3, microseconds=1),
+                        datetime(2031, 12, 31, 23, 59, 59, 999999)):
+            assert reloj.a_datetime(reloj.a_tics(momento)) == momento
+
+    def test_orden_se_conserva(self):
+        reloj = RelojSimulacion(EPOCA)
+        a, b = EPOCA + timedelta(microseconds=1), EPOCA + timedelta(microseconds=2)
+        assert reloj.a_tics(a) < reloj.a_tics(b)
+
+    def test_minutos_a_tics(self):
+        assert RelojSimulacion.minutos_a_tics(1) == TICS_POR_MINUTO
+        assert RelojSimulacion.minutos_a_tics(0.5) == TICS_POR_MINUTO // 2
+
+
+class TestMotorUsaTics:
+
+    def test_claves_del_heap_son_enteras(self, motor):
+        evento = EventoInicioUnidad(timestamp=EPOCA + timedelta(minutes=90),
+                                    datos={'tarea_id': 'A', 'unidad': 1, 'id_instancia': 'x'})
+        motor.programar_eventos([evento])
+
+        tics, _, programado = motor.eventos_futuros[0]
+        assert tics == 90 * TICS_POR_MINUTO
+        assert programado is evento
+
+    def test_calendarios_comparten_el_reloj_del_motor(self, motor):
+        assert motor.gestor_recursos.reloj is motor.reloj
+        assert motor.gestor_recursos.calendario_trabajadores['W1'].reloj is motor.reloj
+
+    def test_eventos_llevan_sus_tics(self, motor):
+        programados = []
+        programar = motor.programar_eventos
+        motor.programar_eventos = lambda eventos: (programados.extend(eventos), programar(eventos))
+        motor.ejecutar_simulacion()
+
+        assert any(isinstance(evento, EventoFinUnidad) for evento in programados)
+        for evento in programados:
+            assert evento.tics == motor.reloj.a_tics(evento.timestamp)
+        reservas = motor.gestor_recursos.calendario_trabajadores['W1']
+        assert reservas._inicios == [motor.reloj.a_tics(intervalo.inicio) for intervalo in reservas]
@@ -0,0 +1,214 @@
+import ast
+import os
+import stat
+import tempfile
+from datetime import date, datetime, time, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from simulation_adapter import AdaptadorScheduler
+from calculation_audit import CalculationDecision, DecisionStatus
+from simulation_cache import DIRECTORIO_POR_DEFECTO, MODULOS_MOTOR, CacheSimulaciones, fecha_inicio_relevante
+from tests.unit.conftest import DESCANSO_COMIDA, INICIO, ConfiguracionHorario, paso
+from time_calculator import CalculadorDeTiempos
+
+# --- FIXTURES ---
+
+
+def _config(breaks=DESCANSO_COMIDA, holidays=(date(2025, 1, 6),)):
+    return ConfiguracionHorario(breaks, holidays)
+
+
+def _flujo(start_date=INICIO):
+    # start_date=None: raíz de ciclo sin fecha, que toma la de inicio de la simulación
+    raiz = paso('A', 30, 'W1', 4, fabricacion_id='L1')
+    raiz.update(is_cycle_start=True, start_date=start_date)
+    return [raiz, paso('B', 20, 'W2', 4, previa=0, fabricacion_id='L1')]
+
+
+WORKERS = [('W1', 1), ('W2', 1)]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheSimulaciones(directorio=str(tmp_path))
+
+
+def _adaptador(cache, config=None, flujo=None, start_date=INICIO):
+    config = config or _config()
+    return AdaptadorScheduler(
+        production_flow=flujo or _flujo(), all_workers_with_skills=WORKERS, available_machines={},
+        schedule_config=config, time_calculator=CalculadorDeTiempos(config),
+        start_date=start_date, cache=cache)
+
+
+# --- TESTS ---
+
+class TestHuella:
+
+    def test_misma_entrada_misma_huella(self, cache):
+        a = cache.huella(_flujo(), WORKERS, {}, _config(), INICIO)
+        b = cache.huella(_flujo(), list(WORKERS), {}, _config(), INICIO)
+        assert a == b
+
+    def test_orden_de_claves_no_importa(self, cache):
+        flujo = _flujo()
+        flujo[0]['task'] = dict(reversed(list(flujo[0]['task'].items())))
+        assert cache.huella(flujo, WORKERS, {}, _config(), INICIO) == \
+            cache.huella(_flujo(), WORKERS, {}, _config(), INICIO)
+
+    @pytest.mark.parametrize("config", [
+        _config(holidays=[date(2025, 1, 6), date(2025, 1, 7)]),
+        _config(holidays=[]),
+        _config(breaks=[{"start": "12:00", "end": "13:30"}]),
+        _config(breaks=[]),
+    ])
+    def test_festivos_y_descansos_cambian_la_huella(self, cache, config):
+        assert cache.huella(_flujo(), WORKERS, {}, config, INICIO) != \
+            cache.huella(_flujo(), WORKERS, {}, _config(), INICIO)
+
+    def test_trabajadores_maquinas_y_plazos_cambian_la_huella(self, cache):
+        base = cache.huella(_flujo(), WORKERS, {}, _config(), INICIO)
+        assert cache.huella(_flujo(), [('W1', 2), ('W2', 1)], {}, _config(), INICIO) != base
+        assert cache.huella(_flujo(), WORKERS, {1: 'M1'}, _config(), INICIO) != base
+        assert cache.huella(_flujo(), WORKERS, {}, _config(), INICIO, {'L1': date(2025, 1, 3)}) != base
+
+    def test_fecha_de_inicio_solo_cuenta_si_alguna_raiz_no_tiene_fecha(self, cache):
+        otra = datetime(2025, 1, 1, 9, 30)
+        assert fecha_inicio_relevante(_flujo(None))
+        assert not fecha_inicio_relevante(_flujo())
+        assert cache.huella(_flujo(), WORKERS, {}, _config(), INICIO) == \
+            cache.huella(_flujo(), WORKERS, {}, _config(), otra)
+        assert cache.huella(_flujo(None), WORKERS, {}, _config(), INICIO) != \
+            cache.huella(_flujo(None), WORKERS, {}, _config(), otra)
+
+
+    def test_version_del_motor_cubre_todo_lo_que_usa_el_adaptador(self):
+        raiz = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        importados, pendientes = set(), ['simulation_adapter']
+        while pendientes:
+            modulo = pendientes.pop()
+            ruta = os.path.join(raiz, modulo + '.py')
+            if modulo in importados or not os.path.exists(ruta):
+                continue
+            importados.add(modulo)
+            with open(ruta, encoding='utf-8') as f:
+                arbol = ast.parse(f.read())
+            for nodo in ast.walk(arbol):
+                if isinstance(nodo, ast.Import):
+                    pendientes.extend(alias.name for alias in nodo.names)
+                elif isinstance(nodo, ast.ImportFrom) and nodo.module and not nodo.level:
+                    pendientes.append(nodo.module)
+
+        assert {modulo + '.py' for modulo in importados} <= set(MODULOS_MOTOR)
+
+
+class TestAlmacenamiento:
+
+    def test_fallo_y_acierto(self, cache):
+        assert cache.obtener('x' * 64) is None
+        cache.guardar('x' * 64, [{'Tarea': 'A'}], ['auditoria'])
+        assert cache.obtener('x' * 64) == ([{'Tarea': 'A'}], ['auditoria'])
+
+    def test_entrada_corrupta_se_descarta(self, cache, tmp_path):
+        (tmp_path / ('y' * 64 + '.json')).write_text('no es json')
+        assert cache.obtener('y' * 64) is None
+        assert not (tmp_path / ('y' * 64 + '.json')).exists()
+
+    def test_expulsa_la_menos_usada_al_superar_el_tamano(self, tmp_path):
+        cache = CacheSimulaciones(directorio=str(tmp_path), tamano_maximo=10**9)
+        carga = [{'datos': 'z' * 2000}]
+        for i, clave in enumerate(('a', 'b', 'c')):
+            cache.guardar(clave, carga, [])
+            os.utime(tmp_path / f'{clave}.json', (1000 + i, 1000 + i))
+        os.utime(tmp_path / 'a.json', (2000, 2000))  # 'a' se usó la última
+
+        cache.tamano_maximo = 2 * os.path.getsize(tmp_path / 'a.json') + 1
+        cache.guardar('d', carga, [])
+
+        restantes = sorted(p.stem for p in tmp_path.glob('*.json'))
+        assert restantes == ['a', 'd']
+
+
+    def test_decisiones_y_tipos_no_json_vuelven_iguales(self, cache):
+        decision = CalculationDecision(
+            timestamp=INICIO, decision_type='INICIO', reason='r', user_friendly_reason='u',
+            details={'hueco': (INICIO, timedelta(minutes=7.5)), 3: [date(2025, 1, 6), time(8)], '__tipo__': 'x'},
+            status=DecisionStatus.WARNING, start_date=INICIO)
+        results = [{'Inicio': INICIO, 'Maquina': None, 'Trabajadores': ['W1'], 'Duracion (min)': 0.1 + 0.2}]
+
+        cache.guardar('d' * 64, results, [decision])
+
+        assert cache.obtener('d' * 64) == (results, [decision])
+
+    def test_tipo_no_admitido_no_se_guarda(self, cache, tmp_path):
+        cache.guardar('o' * 64, [{'objeto': object()}], [])
+        assert cache.obtener('o' * 64) is None
+        assert not list(tmp_path.iterdir())
+
+    def test_tipo_desconocido_en_el_fichero_se_descarta(self, cache, tmp_path):
+        (tmp_path / ('t' * 64 + '.json')).write_text('[[{"__tipo__": "os.system", "valor": "ls"}], []]')
+        assert cache.obtener('t' * 64) is None
+        assert not (tmp_path / ('t' * 64 + '.json')).exists()
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="permisos POSIX")
+class TestDirectorio:
+
+    def test_por_defecto_no_esta_en_el_temporal_compartido(self):
+        assert not DIRECTORIO_POR_DEFECTO.startswith(tempfile.gettempdir())
+
+    def test_se_crea_solo_para_el_usuario(self, tmp_path):
+        cache = CacheSimulaciones(directorio=str(tmp_path / 'cache'))
+        cache.guardar('x' * 64, [], [])
+        assert stat.S_IMODE(os.stat(tmp_path / 'cache').st_mode) == 0o700
+
+    def test_permisos_abiertos_se_restringen(self, tmp_path):
+        directorio = tmp_path / 'cache'
+        directorio.mkdir(mode=0o777)
+        os.chmod(directorio, 0o777)
+        CacheSimulaciones(directorio=str(directorio)).guardar('x' * 64, [], [])
+        assert stat.S_IMODE(os.stat(directorio).st_mode) == 0o700
+
+    def test_directorio_de_otro_usuario_no_se_lee(self, cache):
+        cache.guardar('x' * 64, [{'Tarea': 'A'}], [])
+        with patch('os.getuid', return_value=os.getuid() + 1):
+            assert cache.obtener('x' * 64) is None
+            cache.limpiar()
+        assert cache.obtener('x' * 64) == ([{'Tarea': 'A'}], [])
+
+    def test_enlace_simbolico_no_se_usa(self, cache, tmp_path):
+        cache.guardar('x' * 64, [], [])
+        enlace = tmp_path.parent / (tmp_path.name + '_enlace')
+        enlace.symlink_to(tmp_path, target_is_directory=True)
+        assert CacheSimulaciones(directorio=str(enlace)).obtener('x' * 64) is None
+
+
+class TestAdaptadorConCache:
+
+    def test_segunda_simulacion_sale_de_la_cache(self, cache):
+        results, audit = _adaptador(cache).run_simulation()
+        assert results
+
+        adaptador = _adaptador(cache)
+        with patch.object(adaptador.motor, 'ejecutar_simulacion') as ejecutar:
+            assert adaptador.run_simulation()[0] == results
+        ejecutar.assert_not_called()
+
+    def test_cambiar_descansos_vuelve_a_simular(self, cache):
+        antes, _ = _adaptador(cache).run_simulation()
+
+        adaptador = _adaptador(cache, config=_config(breaks=[{"start": "08:30", "end": "10:00"}]))
+        with patch.object(adaptador.motor, 'ejecutar_simulacion', wraps=adaptador.motor.ejecutar_simulacion) as ejecutar:
+            despues, _ = adaptador.run_simulation()
+        ejecutar.assert_called_once()
+        assert max(r['Fin'] for r in despues) > max(r['Fin'] for r in antes)
+
+    def test_al_terminar_tambien_con_acierto(self, cache):
+        _adaptador(cache).run_simulation()
+        adaptador = _adaptador(cache)
+        avisos = []
+        adaptador.al_terminar = lambda: avisos.append(True)
+        adaptador.run_simulation()
+        assert avisos == [True]
@@ -0,0 +1,76 @@
+import pickle
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from simulation_events import EventoInicioUnidad, EventoFinUnidad, EventoReasignacionTrabajador
+from timeline_task import LineaTemporalTarea
+
+# --- FIXTURES ---
+
+INICIO = datetime(2025, 1, 2, 8, 0)
+
+
+@pytest.fixture
+def linea():
+    return LineaTemporalTarea({'id': 'A', 'name': 'A', 'duration': 10, 'trigger_units': 5},
+                              MagicMock(), MagicMock())
+
+
+# --- TESTS ---
+
+class TestEventosConSlots:
+
+    def test_datos_se_reparten_en_campos_tipados(self):
+        evento = EventoInicioUnidad(timestamp=INICIO, datos={
+            'tarea_id': 'A', 'unidad': 3, 'id_instancia': 7, 'desbloqueada_por': 'B'})
+
+        assert (evento.tarea_id, evento.unidad, evento.id_instancia) == ('A', 3, 7)
+        assert evento.extra == {'desbloqueada_por': 'B'}
+        assert not hasattr(evento, '__dict__')
+
+    def test_datos_de_compatibilidad(self):
+        datos = {'tarea_id': 'A', 'numero_unidad': 2, 'id_instancia': 1, 'inicio': INICIO}
+        fin = EventoFinUnidad(timestamp=INICIO, datos=datos)
+
+        # El fin conserva su clave 'numero_unidad'
+        assert fin.unidad == 2
+        assert fin.datos == datos
+        assert fin.datos is not fin.datos
+
+    def test_campos_vacios_no_aparecen_en_datos(self):
+        reasignacion = EventoReasignacionTrabajador(timestamp=INICIO, datos={'trabajador_id': 'W1'})
+        assert reasignacion.datos == {'trabajador_id': 'W1'}
+        assert reasignacion.tarea_id is None
+
+    def test_tipo_y_prioridad_son_de_clase(self):
+        evento = EventoInicioUnidad(timestamp=INICIO)
+        assert (evento.tipo_evento, evento.prioridad) == ('INICIO_UNIDAD', 2)
+        assert evento.como_dict()['tipo_evento'] == 'INICIO_UNIDAD'
+
+    def test_se_puede_serializar(self):
+        evento = EventoFinUnidad(timestamp=INICIO, datos={'tarea_id': 'A', 'numero_unidad': 1}, cancelado=True)
+        copia = pickle.loads(pickle.dumps(evento))
+        assert copia.datos == evento.datos
+        assert copia.cancelado
+
+
+class TestTablaDeInstancias:
+
+    def test_ids_enteros_consecutivos(self, linea):
+        primera = linea.iniciar_instancia_inicial(['W1'], INICIO)
+        segunda = linea.iniciar_instancia_inicial(['W2'], INICIO, numero_unidad=2)
+
+        assert (primera, segunda) == (1, 2)
+        assert linea.obtener_instancia(segunda)['trabajadores'] == ['W2']
+        assert [i['id_instancia'] for i in linea.instancias_activas] == [1, 2]
+
+    def test_completar_elimina_de_la_tabla(self, linea):
+        id_instancia = linea.iniciar_instancia_inicial(['W1'], INICIO)
+
+        resultado = linea.completar_unidad_instancia(id_instancia)
+
+        assert resultado['trabajadores_liberados'] == ['W1']
+        assert linea.obtener_instancia(id_instancia) is None
+        assert linea.instancias == {}
+        assert linea.completar_unidad_instancia(id_instancia)['instancia_completada'] is False
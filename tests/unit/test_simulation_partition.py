@@ -0,0 +1,117 @@
+import copy
+from datetime import datetime
+
+import pytest
+
+import simulation_partition
+from simulation_partition import (componentes_independientes, fusionar_particiones, repartir_componentes,
+                                  simular_particion)
+from tests.unit.conftest import DESCANSO_COMIDA, INICIO, ConfiguracionHorario, motor_de_eventos, paso
+
+pytestmark = pytest.mark.usefixtures('sin_logs')
+
+# --- FIXTURES ---
+
+
+def _cadena(n, base, unidades=6, inicio=INICIO):
+    # A -> B -> C con trabajadores propios. Cadenas iguales empatan en todos los instantes.
+    return [
+        paso(f'A{n}', 30, f'W{n}a', unidades, inicio=inicio, fabricacion_id=f'L{n}'),
+        paso(f'B{n}', 45, f'W{n}b', unidades, previa=base, fabricacion_id=f'L{n}'),
+        paso(f'C{n}', 20, f'W{n}c', unidades, previa=base + 1, fabricacion_id=f'L{n}'),
+    ]
+
+
+def _flujo(cadenas=3):
+    return sum((_cadena(n, 3 * n) for n in range(cadenas)), [])
+
+
+def _workers(cadenas=3):
+    return [(f'W{n}{x}', 1) for n in range(cadenas) for x in 'abc']
+
+
+def _motor(flujo, workers, plazos=None):
+    return motor_de_eventos(copy.deepcopy(flujo), workers, ConfiguracionHorario(DESCANSO_COMIDA), plazos=plazos)
+
+
+@pytest.fixture
+def sin_minimo(monkeypatch):
+    monkeypatch.setattr(simulation_partition, 'UNIDADES_MINIMAS_PARALELO', 0)
+
+
+# --- TESTS ---
+
+class TestComponentes:
+
+    def test_cadenas_independientes(self):
+        assert componentes_independientes(_flujo()) == [['A0', 'B0', 'C0'], ['A1', 'B1', 'C1'], ['A2', 'B2', 'C2']]
+
+    def test_trabajador_compartido_une_cadenas(self):
+        flujo = _flujo()
+        flujo[4]['workers'] = [{'name': 'W0c'}]
+        assert len(componentes_independientes(flujo)) == 2
+
+    def test_maquina_compartida_une_cadenas(self):
+        flujo = _flujo()
+        flujo[0]['task']['machine_id'] = 1
+        flujo[8]['task']['machine_id'] = 1
+        assert componentes_independientes(flujo) == [['A0', 'B0', 'C0', 'A2', 'B2', 'C2'], ['A1', 'B1', 'C1']]
+
+    def test_salto_ciclico_y_reasignacion_unen_cadenas(self):
+        flujo = _flujo()
+        flujo[2]['next_cyclic_task_index'] = 3
+        flujo[5]['workers'][0]['reassignment_rule'] = {'condition_type': 'ON_FINISH', 'target_task_id': 'A2'}
+        assert len(componentes_independientes(flujo)) == 1
+
+
+class TestReparto:
+
+    def test_pocas_unidades_no_se_reparten(self):
+        assert repartir_componentes(_flujo(), 4) == []
+
+    def test_agrupa_en_como_mucho_max_procesos(self, sin_minimo):
+        grupos = repartir_componentes(_flujo(), 2)
+        assert len(grupos) == 2
+        assert set().union(*grupos) == {f'{t}{n}' for n in range(3) for t in 'ABC'}
+
+    def test_un_solo_componente_no_se_reparte(self, sin_minimo):
+        assert repartir_componentes(_cadena(0, 0), 4) == []
+
+
+class TestFusion:
+
+    def test_fusion_identica_a_un_solo_heap(self):
+        flujo, workers = _flujo(), _workers()
+        # La segunda cadena empieza más tarde: mezcla empates y eventos intercalados
+        flujo[3]['start_date'] = datetime(2025, 1, 2, 9, 15)
+        esperado = _motor(flujo, workers).ejecutar_simulacion()
+
+        motor = _motor(flujo, workers)
+        particiones = [simular_particion(flujo, workers, {}, ConfiguracionHorario(DESCANSO_COMIDA), INICIO, set(grupo))
+                       for grupo in componentes_independientes(flujo)]
+        fusion = fusionar_particiones(particiones)
+        motor.resultados_en_curso = fusion.filas
+        motor.audit_log_en_curso = fusion.auditoria
+        motor.audit_log_interno = fusion.auditoria_interna
+
+        assert motor._completar_resultados(motor.resultados_en_curso) == esperado[0]
+        assert motor._cerrar_audit_log(motor.audit_log_en_curso) == esperado[1]
+        assert fusion.eventos_procesados == len(fusion.auditoria)
+
+
+class TestMotorEnParalelo:
+
+    def test_ejecutar_en_procesos_da_lo_mismo(self, sin_minimo):
+        flujo, workers = _flujo(), _workers()
+        esperado = _motor(flujo, workers).ejecutar_simulacion()
+
+        motor = _motor(flujo, workers)
+        assert motor.ejecutar_simulacion(max_workers=2) == esperado
+        assert motor.eventos_procesados > 0
+
+    def test_con_plazos_simula_en_un_solo_proceso(self, sin_minimo):
+        motor = _motor(_flujo(), _workers(), plazos={'L0': INICIO.date()})
+        assert motor._grupos_independientes(4) == []
+
+    def test_sin_max_workers_simula_en_un_solo_proceso(self, sin_minimo):
+        assert _motor(_flujo(), _workers())._grupos_independientes(None) == []
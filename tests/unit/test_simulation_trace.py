@@ -0,0 +1,119 @@
+import logging
+import pytest
+from unittest.mock import MagicMock
+
+from simulation_trace import TrazaSimulacion, CATEGORIAS
+from tests.unit.conftest import INICIO as EPOCA, motor_de_eventos
+
+# --- FIXTURES ---
+
+
+class _NoFormateable:
+    """Falla el test si alguien lo formatea."""
+
+    def __str__(self):
+        raise AssertionError("se formateó una traza inactiva")
+
+    __repr__ = __str__
+
+
+@pytest.fixture
+def logger():
+    return MagicMock(spec=logging.Logger)
+
+
+# --- TESTS ---
+
+class TestTrazaSimulacion:
+
+    def test_categoria_inactiva_no_formatea(self, logger):
+        traza = TrazaSimulacion(categorias=[], logger=logger)
+        traza('motor', "evento %s", _NoFormateable())
+        logger.debug.assert_not_called()
+
+    def test_categoria_activa_emite_a_debug(self, logger):
+        traza = TrazaSimulacion(categorias=['fin'], logger=logger)
+        traza('fin', "unidad %s", 3)
+        traza('inicio', "no sale")
+        logger.debug.assert_called_once_with('[%s] unidad %s', 'fin', 3)
+        assert traza.activa('fin') and not traza.activa('inicio')
+
+    def test_asterisco_activa_todas(self, logger):
+        assert TrazaSimulacion(categorias=['*'], logger=logger).activas == frozenset(CATEGORIAS)
+
+    def test_categorias_desde_entorno(self, monkeypatch, logger):
+        monkeypatch.setenv('HIPATIA_TRAZA', 'motor, fin')
+        assert TrazaSimulacion(logger=logger).activas == {'motor', 'fin'}
+
+    def test_buffer_circular_guarda_las_ultimas(self, logger):
+        traza = TrazaSimulacion(categorias=[], capacidad=3, logger=logger)
+        for i in range(5):
+            traza('motor', "evento %d", i)
+        assert traza.ultimas() == ['[motor] evento 2', '[motor] evento 3', '[motor] evento 4']
+        assert traza.ultimas(1) == ['[motor] evento 4']
+
+    def test_volcar_escribe_y_vacia_el_buffer(self, logger):
+        traza = TrazaSimulacion(categorias=[], logger=logger)
+        traza('inicio', "U%s", 1)
+
+        assert traza.volcar("fallo") == ['[inicio] U1']
+        assert logger.log.call_args[0][0] == logging.ERROR
+        assert traza.ultimas() == []
+        assert traza.volcar() == []
+
+    def test_sin_buffer(self, logger):
+        traza = TrazaSimulacion(categorias=[], capacidad=0, logger=logger)
+        traza('motor', "x")
+        assert traza.ultimas() == []
+
+    def test_error_de_formato_no_rompe_el_volcado(self, logger):
+        traza = TrazaSimulacion(categorias=[], logger=logger)
+        traza('motor', "faltan %s %s", 1)
+        assert 'error de formato' in traza.ultimas()[0]
+
+    def test_buffer_guarda_el_estado_de_los_argumentos_al_trazar(self, logger):
+        traza = TrazaSimulacion(categorias=[], logger=logger)
+        trabajadores, pendientes = ['W1'], {'A': 1}
+        traza('fin', "liberados %s, pendientes %s", trabajadores, pendientes)
+
+        trabajadores.append('W2')
+        pendientes.clear()
+
+        assert traza.volcar() == ["[fin] liberados ['W1'], pendientes {'A': 1}"]
+
+
+class TestMotorVuelcaTrazasAlFallar:
+
+    def test_error_en_evento_vuelca_el_buffer(self):
+        flow = [{'task': {'id': 'A', 'name': 'A', 'duration': 10}, 'workers': ['W1'],
+                 'trigger_units': 1, 'start_date': EPOCA}]
+        motor = motor_de_eventos(flow, [('W1', 1)], inicio=EPOCA)
+        motor.traza = TrazaSimulacion(categorias=[], logger=MagicMock(spec=logging.Logger))
+
+        evento = MagicMock(timestamp=EPOCA, tics=None, tipo_evento='ROTO', cancelado=False)
+        evento.procesar.side_effect = RuntimeError("boom")
+        motor.programar_eventos([evento])
+        with pytest.raises(RuntimeError):
+            motor.ejecutar_simulacion()
+
+        motor.traza.logger.log.assert_called_once()
+        assert 'ROTO' in motor.traza.logger.log.call_args[0][1] % motor.traza.logger.log.call_args[0][2:]
+
+
+class TestTrazasPorUnidad:
+
+    def test_lineas_y_recursos_trazan_con_el_motor_sin_escribir_en_el_log(self, caplog):
+        flow = [{'task': {'id': 'A', 'name': 'A', 'duration': 10}, 'workers': ['W1'],
+                 'trigger_units': 3, 'is_cycle_start': True, 'start_date': EPOCA}]
+        motor = motor_de_eventos(flow, [('W1', 1)], inicio=EPOCA)
+
+        assert motor.lineas_temporales['A'].traza is motor.traza
+        assert motor.gestor_recursos.traza is motor.traza
+
+        with caplog.at_level(logging.DEBUG, logger='timeline_task'), \
+                caplog.at_level(logging.DEBUG, logger='resource_manager'):
+            motor.ejecutar_simulacion()
+
+        assert not [r for r in caplog.records if r.name in ('timeline_task', 'resource_manager')]
+        categorias = {linea.split(']')[0].lstrip('[') for linea in motor.traza.ultimas()}
+        assert {'inicio', 'fin', 'recursos'} <= categorias
@@ -0,0 +1,141 @@
+import builtins
+
+import pytest
+from datetime import datetime, timedelta
+
+from simulation_events import EventoInicioUnidad, EventoFinUnidad
+import temporal_storage
+from temporal_storage import RegistroTemporal, RegistroColumnar
+
+# --- FIXTURES ---
+
+INICIO = datetime(2025, 1, 2, 8, 0)
+
+
+def _eventos():
+    """Eventos de dos tareas, no ordenados por timestamp y con empates."""
+    eventos = []
+    for unidad, minuto in enumerate([30, 10, 10, 50, 20], start=1):
+        momento = INICIO + timedelta(minutes=minuto, microseconds=unidad)
+        eventos.append(EventoInicioUnidad(timestamp=momento, datos={
+            'tarea_id': 'A', 'unidad': unidad, 'trabajadores': ['W1'], 'inicio': momento}))
+        eventos.append(EventoFinUnidad(timestamp=momento + timedelta(minutes=5), datos={
+            'tarea_id': 'B' if unidad % 2 else 'A', 'numero_unidad': unidad, 'maquina_id': None}))
+    eventos.append(EventoFinUnidad(timestamp=INICIO, datos={'sin_tarea': True}))
+    return eventos
+
+
+@pytest.fixture
+def registros(tmp_path):
+    sqlite = RegistroTemporal(db_path=str(tmp_path / 'eventos.db'), buffer_size=4)
+    columnar = RegistroColumnar(str(tmp_path / 'columnas'), buffer_size=4)
+    for evento in _eventos():
+        sqlite.guardar_evento(evento)
+        columnar.guardar_evento(evento)
+    yield sqlite, columnar
+    sqlite.close()
+    columnar.close()
+
+
+# --- TESTS ---
+
+class TestRegistroColumnar:
+
+    @pytest.mark.parametrize("filtros", [
+        {},
+        {'tipo_evento': 'FIN_BLOQUE_TRABAJO'},
+        {'tarea_id': 'A'},
+        {'tarea_id': 'A', 'tipo_evento': 'INICIO_UNIDAD'},
+        {'rango_temporal': (INICIO + timedelta(minutes=10), INICIO + timedelta(minutes=35))},
+        {'tarea_id': 'inexistente'},
+        {'tipo_evento': 'DESCONOCIDO'},
+    ])
+    def test_equivale_a_sqlite(self, registros, filtros):
+        sqlite, columnar = registros
+        assert columnar.consultar_eventos(**filtros) == sqlite.consultar_eventos(**filtros)
+
+    def test_columnas_tipadas(self, registros):
+        _, columnar = registros
+        columnas = columnar.consultar_columnas(tipo_evento='INICIO_UNIDAD')
+
+        assert columnas['timestamp'].dtype.name == 'int64'
+        assert list(columnas['unidad']) == [2, 3, 5, 1, 4]
+        assert all(columnar.tareas[c] == 'A' for c in columnas['tarea'])
+
+    def test_reabrir_sin_borrar(self, registros, tmp_path):
+        _, columnar = registros
+        columnar.close()
+
+        reabierto = RegistroColumnar.abrir(str(tmp_path / 'columnas'))
+        assert reabierto.num_eventos == len(_eventos())
+        assert reabierto.consultar_eventos() == columnar.consultar_eventos()
+
+        reiniciado = RegistroColumnar(str(tmp_path / 'columnas'))
+        assert reiniciado.consultar_eventos() == []
+
+    def test_sin_datos(self, tmp_path):
+        columnar = RegistroColumnar(str(tmp_path / 'columnas'), guardar_datos=False)
+        for evento in _eventos():
+            columnar.guardar_evento(evento)
+
+        eventos = columnar.consultar_eventos(tarea_id='B')
+        assert [e['datos'] for e in eventos] == [{}, {}, {}]
+        assert not (tmp_path / 'columnas' / 'datos.jsonl').exists()
+
+    def test_fallo_a_medias_no_desalinea_columnas(self, tmp_path, monkeypatch):
+        def open_que_falla(fichero, *args, **kwargs):
+            # Las columnas anteriores ya se han anexado cuando falla 'unidad'
+            if str(fichero).endswith('unidad.i32'):
+                raise OSError("disco lleno")
+            return builtins.open(fichero, *args, **kwargs)
+
+        sqlite = RegistroTemporal(db_path=str(tmp_path / 'eventos.db'))
+        columnar = RegistroColumnar(str(tmp_path / 'columnas'), buffer_size=1000)
+        columnar.guardar_eventos(_eventos()[:4])
+        columnar.close()
+        columnar.guardar_eventos(_eventos()[4:])
+        monkeypatch.setattr(temporal_storage, 'open', open_que_falla, raising=False)
+        columnar.close()
+        monkeypatch.undo()
+
+        assert columnar.num_eventos == 4
+        assert (tmp_path / 'columnas' / 'timestamp.i64').stat().st_size == 4 * 8
+        # El reintento anexa el buffer completo con las columnas alineadas
+        columnar.close()
+        for evento in _eventos():
+            sqlite.guardar_evento(evento)
+        assert columnar.consultar_eventos() == sqlite.consultar_eventos()
+        sqlite.close()
+
+    def test_fallo_al_escribir_meta_conserva_el_registro(self, registros, tmp_path, monkeypatch):
+        _, columnar = registros
+        columnar.close()
+        antes = columnar.consultar_eventos()
+        columnar.guardar_eventos(_eventos()[:3])
+
+        def replace_que_falla(*args):
+            raise OSError("disco lleno")
+
+        monkeypatch.setattr(temporal_storage.os, 'replace', replace_que_falla)
+        columnar.close()
+        monkeypatch.undo()
+
+        reabierto = RegistroColumnar.abrir(str(tmp_path / 'columnas'))
+        assert reabierto.consultar_eventos() == antes
+        assert [p.name for p in (tmp_path / 'columnas').iterdir() if p.suffix == '.tmp'] == []
+
+    def test_abrir_sin_meta_valido_no_borra_nada(self, registros, tmp_path):
+        _, columnar = registros
+        columnar.close()
+        meta = tmp_path / 'columnas' / 'meta.json'
+        meta.write_text('{"epoca": ')
+
+        with pytest.raises(ValueError):
+            RegistroColumnar.abrir(str(tmp_path / 'columnas'))
+        meta.unlink()
+        with pytest.raises(ValueError):
+            RegistroColumnar.abrir(str(tmp_path / 'columnas'))
+        assert (tmp_path / 'columnas' / 'timestamp.i64').stat().st_size == len(_eventos()) * 8
+
+    def test_abrir_directorio_vacio_crea_registro(self, tmp_path):
+        assert RegistroColumnar.abrir(str(tmp_path / 'nuevo')).consultar_eventos() == []
@@ -118,6 +118,21 @@ class TestTrackingRepoStatsExport:
         # No assigned workers yet via link
         assert stats['trabajadores_asignados'] == 0
 
+    def test_obtener_duraciones_historicas(self, tracking_repo_test, seed_stats_data, session_no_close):
+        _, _, p_code = seed_stats_data
+        trabajo_id = session_no_close.query(TrabajoLog.id).filter_by(qr_code="QR-STAT-0").scalar()
+        for segundos, estado in ((600, 'completado'), (900, 'completado'), (300, 'en_proceso')):
+            session_no_close.add(PasoTrazabilidad(
+                trabajo_log_id=trabajo_id, paso_nombre="Corte", duracion_paso_segundos=segundos,
+                estado_paso=estado))
+        session_no_close.commit()
+
+        duraciones = tracking_repo_test.obtener_duraciones_historicas()
+
+        # Only completed jobs and steps count
+        assert duraciones['productos'] == {p_code: [3600, 3600, 3600]}
+        assert sorted(duraciones['pasos']["Corte"]) == [600, 900]
+
     def test_get_trabajo_logs_por_trabajador(self, tracking_repo_test, seed_stats_data):
         w_id, _, _ = seed_stats_data
         
@@ -0,0 +1,148 @@
+import pytest
+from datetime import datetime, time, date, timedelta
+from unittest.mock import MagicMock, patch
+
+from hypothesis import given, settings, strategies as st
+
+from sim_clock import RelojSimulacion
+from tests.unit.conftest import DESCANSO_COMIDA, ConfiguracionHorario
+from time_calculator import CalculadorDeTiempos
+from work_calendar import CalendarioLaboralCompilado
+
+# --- FIXTURES ---
+
+
+def _config():
+    return ConfiguracionHorario([{"start": "10:00", "end": "10:15"}, *DESCANSO_COMIDA],
+                                [date(2025, 1, 6), date(2025, 1, 20), date(2025, 4, 18)])
+
+
+@pytest.fixture
+def calculador():
+    return CalculadorDeTiempos(_config())
+
+
+# Calculador compartido por los tests de propiedades (hypothesis no admite fixtures por ejemplo)
+_CALCULADOR = CalculadorDeTiempos(_config())
+
+_momentos = st.builds(
+    lambda segundos, microsegundos: datetime(2024, 12, 20) + timedelta(seconds=segundos,
+                                                                       microseconds=microsegundos),
+    st.integers(min_value=0, max_value=200 * 86400),
+    st.one_of(st.just(0), st.integers(min_value=0, max_value=999999)),
+)
+_minutos = st.one_of(
+    st.integers(min_value=1, max_value=20000),
+    st.floats(min_value=1e-9, max_value=50000, allow_nan=False, allow_infinity=False),
+    st.fractions(min_value=0, max_value=3000, max_denominator=60).map(float),
+)
+
+
+# --- TESTS ---
+
+class TestEquivalenciaConCalculoIterativo:
+
+    @settings(max_examples=400, deadline=None)
+    @given(inicio=_momentos, minutos=_minutos)
+    def test_add_work_minutes(self, inicio, minutos):
+        if minutos <= 0:
+            return
+        assert _CALCULADOR.add_work_minutes(inicio, minutos) == \
+            _CALCULADOR._add_work_minutes_iterativo(inicio, minutos)
+
+    @settings(max_examples=400, deadline=None)
+    @given(inicio=_momentos, duracion=st.integers(min_value=1, max_value=40 * 86400 * 10 ** 6))
+    def test_calculate_work_minutes_between(self, inicio, duracion):
+        fin = inicio + timedelta(microseconds=duracion)
+        assert _CALCULADOR.calculate_work_minutes_between(inicio, fin) == \
+            _CALCULADOR._calculate_work_minutes_between_iterativo(inicio, fin)
+
+    @settings(max_examples=400, deadline=None)
+    @given(inicio=_momentos, minutos=_minutos)
+    def test_add_work_minutes_tics(self, inicio, minutos):
+        # Época a media mañana: hay tics negativos y días que no empiezan en la época
+        reloj = RelojSimulacion(datetime(2025, 1, 2, 9, 30, 0, 250))
+        tics = _CALCULADOR.add_work_minutes_tics(reloj, reloj.a_tics(inicio), minutos)
+        assert reloj.a_datetime(tics) == _CALCULADOR.add_work_minutes(inicio, minutos)
+
+    @settings(max_examples=200, deadline=None)
+    @given(inicio=_momentos, minutos=_minutos)
+    def test_ida_y_vuelta(self, inicio, minutos):
+        fin = _CALCULADOR.add_work_minutes(inicio, minutos)
+        assert _CALCULADOR.calculate_work_minutes_between(inicio, fin) == \
+            _CALCULADOR._calculate_work_minutes_between_iterativo(inicio, fin)
+
+
+class TestCalendarioLaboralCompilado:
+
+    def test_casos_conocidos(self, calculador):
+        # Jueves 09:50 + 30 min: cruza el descanso de 10:00-10:15
+        assert calculador.add_work_minutes(datetime(2025, 1, 2, 9, 50), 30) == datetime(2025, 1, 2, 10, 35)
+        # Viernes 16:30 + 60 min: salta el fin de semana y el festivo del lunes 6
+        assert calculador.add_work_minutes(datetime(2025, 1, 3, 16, 30), 60) == datetime(2025, 1, 7, 8, 30)
+        assert calculador.calculate_work_minutes_between(
+            datetime(2025, 1, 2, 8, 0), datetime(2025, 1, 3, 8, 0)) == 465.0
+
+    def test_es_laborable_usa_festivos(self, calculador):
+        assert not calculador.is_workday(date(2025, 1, 6))
+        assert not calculador.is_workday(date(2025, 1, 4))
+        assert calculador.is_workday(date(2025, 1, 7))
+
+    @pytest.mark.parametrize("descansos", [
+        [(time(8, 0), time(9, 0))],                          # empieza con la jornada
+        [(time(10, 0), time(11, 0)), (time(10, 30), time(12, 0))],  # solapados
+        [(time(10, 0), time(11, 0)), (time(11, 0), time(12, 0))],   # contiguos
+        [(time(16, 30), time(18, 0))],                       # termina fuera de la jornada
+    ])
+    def test_configuraciones_no_compilables(self, descansos):
+        assert CalendarioLaboralCompilado.desde_configuracion(time(8, 0), time(17, 0), descansos, []) is None
+
+    def test_horas_con_segundos_no_se_compilan(self):
+        assert CalendarioLaboralCompilado.desde_configuracion(time(8, 0, 30), time(17, 0), [], []) is None
+
+    def test_configuracion_simulada_usa_calculo_iterativo(self):
+        config = MagicMock()
+        config.BREAKS = []
+        calculador = CalculadorDeTiempos(config)
+        assert calculador._calendario_compilado() is None
+
+    def test_recompila_al_cambiar_festivos(self):
+        config = _config()
+        calculador = CalculadorDeTiempos(config)
+        assert calculador.is_workday(date(2025, 1, 8))
+
+        config.HOLIDAYS = [date(2025, 1, 8)]
+
+        assert not calculador.is_workday(date(2025, 1, 8))
+        assert calculador.add_work_minutes(datetime(2025, 1, 7, 16, 30), 60) == datetime(2025, 1, 9, 8, 30)
+
+    def test_invalidar_tras_editar_festivos_en_su_sitio(self):
+        config = _config()
+        calculador = CalculadorDeTiempos(config)
+        assert calculador.is_workday(date(2025, 1, 8))
+
+        config.HOLIDAYS[0] = date(2025, 1, 8)
+        # Editar la lista en su sitio no cambia la firma del calendario: hay que invalidarlo
+        calculador.invalidar_calendario()
+
+        assert not calculador.is_workday(date(2025, 1, 8))
+        assert calculador.add_work_minutes(datetime(2025, 1, 7, 16), 120) == datetime(2025, 1, 9, 9, 0)
+
+    def test_no_recompila_en_cada_calculo(self):
+        config = _config()
+        calculador = CalculadorDeTiempos(config)
+        with patch.object(CalendarioLaboralCompilado, 'desde_configuracion',
+                          wraps=CalendarioLaboralCompilado.desde_configuracion) as compilar:
+            for horas in range(50):
+                calculador.add_work_minutes(datetime(2025, 1, 2, 8, 0), horas * 60)
+            assert compilar.call_count == 1
+
+            config.HOLIDAYS = config.HOLIDAYS + [date(2025, 1, 8)]
+            calculador.add_work_minutes(datetime(2025, 1, 2, 8, 0), 60)
+            assert compilar.call_count == 2
+
+    def test_horizonte_hacia_atras(self, calculador):
+        """Consultar una fecha anterior al horizonte ya compilado lo recompila."""
+        calculador.add_work_minutes(datetime(2025, 6, 2, 8, 0), 10)
+        assert calculador.add_work_minutes(datetime(2024, 1, 2, 8, 0), 600) == \
+            calculador._add_work_minutes_iterativo(datetime(2024, 1, 2, 8, 0), 600)
@@ -2,6 +2,8 @@
 import logging
 from datetime import datetime, time, timedelta, date
 
+from work_calendar import CalendarioLaboralCompilado
+
 
 class CalculadorDeTiempos:
     """
@@ -20,8 +22,54 @@ class CalculadorDeTiempos:
             key=lambda x: x[0]
         )
 
+        # Calendario compilado (se genera bajo demanda y se invalida si cambia la jornada
+        # o se asigna otra lista de festivos; ver invalidar_calendario)
+        self._calendario = None
+        self._firma_calendario = None
+        self._festivos_compilados = None
+
+    def _calendario_compilado(self):
+        """
+        Devuelve el calendario compilado para la configuración actual, o None si la
+        configuración no admite el cálculo compilado (se usa entonces el iterativo).
+
+        Se llama en cada cálculo, así que la comprobación es O(1): la jornada y la
+        identidad de la lista de festivos (ScheduleConfig.reload_config asigna una
+        lista nueva). Se guarda una referencia a esa lista para que su id() no
+        pueda reutilizarse mientras el calendario esté vigente.
+        """
+        config = self.schedule_config
+        try:
+            firma = (config.WORK_START_TIME, config.WORK_END_TIME, id(config.HOLIDAYS))
+        except AttributeError:
+            return None
+        if firma != self._firma_calendario:
+            self._firma_calendario = firma
+            self._festivos_compilados = config.HOLIDAYS
+            self._calendario = CalendarioLaboralCompilado.desde_configuracion(
+                config.WORK_START_TIME, config.WORK_END_TIME, self.parsed_breaks, config.HOLIDAYS
+            )
+        return self._calendario
+
+    def invalidar_calendario(self):
+        """
+        Descarta el calendario compilado; el siguiente cálculo lo vuelve a generar.
+        Necesario si se editan los festivos de la configuración en su sitio.
+        """
+        self._calendario = None
+        self._firma_calendario = None
+        self._festivos_compilados = None
+
+    @staticmethod
+    def _admite_calendario(momento) -> bool:
+        """El calendario compilado sólo trabaja con datetimes sin zona horaria."""
+        return type(momento) is datetime and momento.tzinfo is None
+
     def is_workday(self, current_date: date) -> bool:
         """Verifica si un día es laborable (no es fin de semana ni festivo)."""
+        calendario = self._calendario_compilado()
+        if calendario is not None:
+            return calendario.es_laborable(current_date)
         if current_date.weekday() >= 5:  # 5=Sábado, 6=Domingo
             return False
         if current_date in self.schedule_config.HOLIDAYS:
@@ -73,6 +121,28 @@ class CalculadorDeTiempos:
         if minutes_to_add <= 0:
             return start_datetime
 
+        calendario = self._calendario_compilado()
+        if calendario is not None and self._admite_calendario(start_datetime) \
+                and isinstance(minutes_to_add, (int, float)):
+            return calendario.sumar_minutos(start_datetime, minutes_to_add)
+        return self._add_work_minutes_iterativo(start_datetime, minutes_to_add)
+
+    def add_work_minutes_tics(self, reloj, tics: int, minutes_to_add: float) -> int:
+        """
+        add_work_minutes sobre los tics de un RelojSimulacion. Con el calendario
+        compilado no se construye ningún datetime; si no, se convierte en los bordes.
+        """
+        if minutes_to_add <= 0:
+            return tics
+
+        calendario = self._calendario_compilado()
+        if calendario is not None and reloj.admite_calendario \
+                and isinstance(minutes_to_add, (int, float)):
+            return calendario.sumar_minutos_tics(reloj, tics, minutes_to_add)
+        return reloj.a_tics(self.add_work_minutes(reloj.a_datetime(tics), minutes_to_add))
+
+    def _add_work_minutes_iterativo(self, start_datetime: datetime, minutes_to_add: float) -> datetime:
+        """Cálculo segmento a segmento; referencia del calendario compilado."""
         remaining_minutes = minutes_to_add
         # Asegura que el punto de partida sea un momento válido para trabajar
         current_time = self._move_to_next_valid_work_moment(start_datetime)
@@ -157,6 +227,15 @@ class CalculadorDeTiempos:
         if start_datetime >= end_datetime:
             return 0.0
 
+        calendario = self._calendario_compilado()
+        if calendario is not None and self._admite_calendario(start_datetime) \
+                and self._admite_calendario(end_datetime):
+            return calendario.minutos_entre(start_datetime, end_datetime)
+        return self._calculate_work_minutes_between_iterativo(start_datetime, end_datetime)
+
+    def _calculate_work_minutes_between_iterativo(self, start_datetime: datetime,
+                                                  end_datetime: datetime) -> float:
+        """Cálculo segmento a segmento; referencia del calendario compilado."""
         total_minutes = 0.0
 
         # Ajustar el inicio al siguiente momento laboral válido
@@ -1,6 +1,5 @@
 # timeline_task.py
 import logging
-import uuid
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
@@ -8,6 +7,7 @@ from typing import List, Dict, Any, Optional
 from time_calculator import CalculadorDeTiempos
 from resource_manager import GestorDeRecursos
 from simulation_events import EventoDeSimulacion, EventoInicioUnidad, EventoFinUnidad
+from simulation_trace import TrazaSimulacion
 
 
 class LineaTemporalTarea:
@@ -17,9 +17,11 @@ class LineaTemporalTarea:
     """
 
     def __init__(self, task_data: Dict[str, Any], gestor_recursos: GestorDeRecursos,
-                 calculador_tiempos: CalculadorDeTiempos):
+                 calculador_tiempos: CalculadorDeTiempos, traza: Optional[TrazaSimulacion] = None):
 
         self.logger = logging.getLogger(__name__)
+        # Trazas por unidad: las del motor que la crea (sin búfer si se usa suelta)
+        self.traza = traza if traza is not None else TrazaSimulacion(capacidad=0)
 
         # --- Dependencias Externas ---
         self.gestor_recursos = gestor_recursos
@@ -33,6 +35,8 @@ class LineaTemporalTarea:
         self.id = task_data.get('id', 'task_sin_id')
         self.name = task_data.get('name', 'Tarea sin nombre')
         self.duration_per_unit = task_data.get('duration', 0.0)
+        # Modo Monte Carlo: duración muestreada de cada unidad (None = determinista)
+        self.duraciones_muestreadas = None
         self.required_skill_level = task_data.get('tipo_trabajador', 1)
         self.machine_id = task_data.get('machine_id')
         self.dependency_index = task_data.get('previous_task_index')
@@ -41,10 +45,8 @@ class LineaTemporalTarea:
         self.scheduled_start_date = task_data.get('scheduled_start_date', None)
 
         if self.scheduled_start_date:
-            self.logger.info(
-                f"Tarea '{self.name}' tiene fecha de inicio programada: "
-                f"{self.scheduled_start_date.strftime('%d/%m/%Y %H:%M')}"
-            )
+            self.traza('configuracion', "Tarea '%s' tiene fecha de inicio programada: %s",
+                       self.name, self.scheduled_start_date)
 
         # --- Atributos de Estado (evolucionan durante la simulación) ---
         self.unidades_a_producir = task_data.get('trigger_units', 1)
@@ -52,11 +54,14 @@ class LineaTemporalTarea:
         self.unidades_completadas = 0  # Servirá como alias
         self.trabajadores_asignados: List[str] = []  # Será una lista agregada de todos los trabajadores
 
-        # NUEVO: Estructura para trabajo paralelo
-        self.instancias_activas: List[Dict] = []
-        # Cada diccionario en la lista tendrá esta estructura:
+        # NUEVO: Estructura para trabajo paralelo. Tabla id_instancia -> instancia
+        # (en orden de creación), para localizar una instancia sin recorrerlas todas.
+        self.instancias: Dict[int, Dict] = {}
+        # Los identificadores son enteros consecutivos dentro de la tarea (empiezan en 1)
+        self._ultimo_id_instancia = 0
+        # Cada diccionario de la tabla tendrá esta estructura:
         # {
-        #     'id_instancia': str (uuid),
+        #     'id_instancia': int,
         #     'trabajadores': List[str],
         #     'unidad_actual': int,
         #     'inicio_unidad': datetime,
@@ -71,7 +76,26 @@ class LineaTemporalTarea:
         # Mantiene una referencia a los eventos futuros para poder cancelarlos
         self.eventos_futuros: List[EventoDeSimulacion] = []
 
-        self.logger.info(f"Inicializada LineaTemporal para Tarea '{self.name}' ({self.id})")
+        self.traza('configuracion', "Inicializada LineaTemporal para Tarea '%s' (%s)", self.name, self.id)
+
+    @property
+    def instancias_activas(self) -> List[Dict]:
+        """Instancias activas en orden de creación (compatibilidad con la antigua lista)."""
+        return list(self.instancias.values())
+
+    def duracion_unidad(self, numero_unidad: int) -> float:
+        """
+        Minutos de la unidad 'numero_unidad' (desde 1). Sin muestras es siempre
+        duration_per_unit; con ellas, la muestra de la unidad (las unidades de
+        más de los ciclos reutilizan las muestras desde el principio).
+        """
+        if self.duraciones_muestreadas is None or not len(self.duraciones_muestreadas):
+            return self.duration_per_unit
+        return float(self.duraciones_muestreadas[(numero_unidad - 1) % len(self.duraciones_muestreadas)])
+
+    def _nuevo_id_instancia(self) -> int:
+        self._ultimo_id_instancia += 1
+        return self._ultimo_id_instancia
 
     def __repr__(self):
         return f"<LineaTemporalTarea(id={self.id}, name='{self.name}', completadas={self.unidades_completadas}/{self.unidades_a_producir})>"
@@ -89,9 +113,9 @@ class LineaTemporalTarea:
             fecha_inicio: Momento de inicio de la instancia
 
         Returns:
-            id_instancia: UUID de la instancia creada
+            id_instancia: Identificador de la instancia creada
         """
-        id_instancia = str(uuid.uuid4())
+        id_instancia = self._nuevo_id_instancia()
 
         instancia = {
             'id_instancia': id_instancia,
@@ -101,17 +125,15 @@ class LineaTemporalTarea:
             'evento_fin_programado': None  # Se asigna después
         }
 
-        self.instancias_activas.append(instancia)
+        self.instancias[id_instancia] = instancia
 
         # Mantener trabajadores_asignados actualizado
         for trab in trabajadores:
             if trab not in self.trabajadores_asignados:
                 self.trabajadores_asignados.append(trab)
 
-        self.logger.info(
-            f"✨ Nueva instancia {id_instancia[:8]} creada en '{self.name}' "
-            f"con trabajadores {trabajadores}"
-        )
+        self.traza('inicio', "✨ Nueva instancia %s creada en '%s' con trabajadores %s",
+                   id_instancia, self.name, trabajadores)
 
         return id_instancia
 
@@ -130,10 +152,6 @@ class LineaTemporalTarea:
         Returns:
             id_instancia si se creó exitosamente, None si no hay trabajo disponible
         """
-        # --- LOG 1 (Al inicio) ---
-        self.logger.critical(
-            f"DEBUG PARALLEL_ADD: Tarea '{self.name}' - Worker '{trabajador_id}' intenta unirse en paralelo.")
-
         # 1. Verificar si hay unidades disponibles
         if self.unidades_finalizadas_total >= self.unidades_a_producir:
             self.logger.warning(
@@ -145,18 +163,12 @@ class LineaTemporalTarea:
         # 2. Calcular próxima unidad disponible
         # Las instancias activas están trabajando en ciertas unidades
         # Necesitamos encontrar la próxima unidad que no esté siendo trabajada
-        unidades_en_proceso = {inst['unidad_actual'] for inst in self.instancias_activas}
-
-        self.logger.critical(f"DEBUG PARALLEL_ADD: Unidades en proceso: {unidades_en_proceso}")
-        self.logger.critical(f"DEBUG PARALLEL_ADD: Unidades finalizadas total: {self.unidades_finalizadas_total}")
+        unidades_en_proceso = {inst['unidad_actual'] for inst in self.instancias.values()}
 
         proxima_unidad = self.unidades_finalizadas_total + 1
         while proxima_unidad in unidades_en_proceso:
             proxima_unidad += 1
 
-        # --- LOG 3 (Después de proxima_unidad) ---
-        self.logger.critical(f"DEBUG PARALLEL_ADD: Próxima unidad calculada: {proxima_unidad}")
-
         if proxima_unidad > self.unidades_a_producir:
             self.logger.warning(
                 f"⚠️ No hay unidades disponibles para nueva instancia en '{self.name}'"
@@ -164,7 +176,7 @@ class LineaTemporalTarea:
             return None
 
         # 3. Crear nueva instancia
-        id_instancia = str(uuid.uuid4())
+        id_instancia = self._nuevo_id_instancia()
 
         instancia = {
             'id_instancia': id_instancia,
@@ -173,18 +185,14 @@ class LineaTemporalTarea:
             'inicio_unidad': fecha_inicio,
             'evento_fin_programado': None
         }
-        # --- LOG 4 (Antes de append) ---
-        self.logger.critical(f"DEBUG PARALLEL_ADD: Creando instancia {id_instancia[:8]} para unidad {proxima_unidad}.")
-        self.instancias_activas.append(instancia)
+        self.instancias[id_instancia] = instancia
 
         # Actualizar trabajadores_asignados
         if trabajador_id not in self.trabajadores_asignados:
             self.trabajadores_asignados.append(trabajador_id)
 
-        self.logger.info(
-            f"🔀 Instancia paralela {id_instancia[:8]} creada en '{self.name}' "
-            f"para trabajador '{trabajador_id}' en unidad {proxima_unidad}"
-        )
+        self.traza('reasignacion', "🔀 Instancia paralela %s creada en '%s' para trabajador '%s' en unidad %s",
+                   id_instancia, self.name, trabajador_id, proxima_unidad)
 
         # 4. Generar evento de inicio para esta instancia
         # IMPORTANTE: Esta importación debe estar aquí (o global)
@@ -201,10 +209,6 @@ class LineaTemporalTarea:
             }
         )
 
-        # --- LOG 5 (Antes de programar evento) ---
-        self.logger.critical(
-            f"DEBUG PARALLEL_ADD: Programando EventoInicioUnidad para instancia {id_instancia[:8]}, unidad {proxima_unidad}.")
-
         # Guardar referencia (opcional, para poder cancelar después)
         self.eventos_futuros.append(evento_inicio)
 
@@ -223,7 +227,7 @@ class LineaTemporalTarea:
             - EventoFinUnidad.procesar()
 
         Args:
-            id_instancia: UUID de la instancia que completó su unidad
+            id_instancia: Identificador de la instancia que completó su unidad
 
         Returns:
             Dict con información de la finalización:
@@ -235,14 +239,10 @@ class LineaTemporalTarea:
             }
         """
         # 1. Encontrar la instancia
-        instancia = None
-        for inst in self.instancias_activas:
-            if inst['id_instancia'] == id_instancia:
-                instancia = inst
-                break
+        instancia = self.instancias.get(id_instancia)
 
         if not instancia:
-            self.logger.error(f"❌ Instancia {id_instancia[:8]} no encontrada en '{self.name}' al completar unidad.")
+            self.logger.error(f"❌ Instancia {id_instancia} no encontrada en '{self.name}' al completar unidad.")
             return {
                 'instancia_completada': False,  # No se encontró, así que no se completó
                 'tarea_completada': (self.unidades_finalizadas_total >= self.unidades_a_producir),
@@ -254,10 +254,9 @@ class LineaTemporalTarea:
         self.unidades_finalizadas_total += 1
         self.unidades_completadas = self.unidades_finalizadas_total  # Mantener sincronizado
 
-        self.logger.info(
-            f"✅ Instancia {id_instancia[:8]} completó unidad {instancia['unidad_actual']} "
-            f"de '{self.name}' (Total: {self.unidades_finalizadas_total}/{self.unidades_a_producir})"
-        )
+        self.traza('fin', "✅ Instancia %s completó unidad %s de '%s' (Total: %s/%s)",
+                   id_instancia, instancia['unidad_actual'], self.name,
+                   self.unidades_finalizadas_total, self.unidades_a_producir)
 
         # 3. Verificar si la TAREA completa está terminada
         tarea_completada = (self.unidades_finalizadas_total >= self.unidades_a_producir)
@@ -266,20 +265,16 @@ class LineaTemporalTarea:
         # Hacemos esto ANTES de comprobar si la tarea está completada
         # para asegurar que la instancia siempre se elimine de la lista de activas.
         trabajadores_inst = instancia['trabajadores'].copy()
-        self.instancias_activas.remove(instancia)
+        del self.instancias[id_instancia]
 
-        self.logger.info(
-            f"🔚 Instancia {id_instancia[:8]} eliminada. "
-            f"Trabajadores {trabajadores_inst} liberados para decisión del motor."
-        )
+        self.traza('fin', "🔚 Instancia %s eliminada. Trabajadores %s liberados para decisión del motor.",
+                   id_instancia, trabajadores_inst)
 
         if tarea_completada:
             # CASO A: TAREA COMPLETADA
             # La tarea ha terminado. Todos los trabajadores de *esta* instancia quedan libres.
             # (Si había otras instancias paralelas, se cancelarán en EventoFinUnidad)
-            self.logger.info(
-                f"🏁 Tarea '{self.name}' COMPLETADA (alcanzó {self.unidades_finalizadas_total})."
-            )
+            self.traza('fin', "🏁 Tarea '%s' COMPLETADA (alcanzó %s).", self.name, self.unidades_finalizadas_total)
 
             return {
                 'instancia_completada': True,
@@ -302,22 +297,19 @@ class LineaTemporalTarea:
         """
         Obtiene los datos de una instancia específica.
         Args:
-            id_instancia: UUID de la instancia
+            id_instancia: Identificador de la instancia
 
         Returns:
             Dict con datos de la instancia o None si no existe
         """
-        for inst in self.instancias_activas:
-            if inst['id_instancia'] == id_instancia:
-                return inst
-        return None
+        return self.instancias.get(id_instancia)
 
     def generar_eventos_de_produccion(self, desde_fecha: datetime) -> List[EventoDeSimulacion]:
         """
         Genera el evento de inicio para la primera unidad, creando la instancia inicial.
         CAMBIO: Ya no genera evento de fin, solo de inicio.
         """
-        self.logger.info(f"🟢 GENERANDO EVENTOS para '{self.name}' unidad {self.unidades_finalizadas_total + 1}")
+        self.traza('inicio', "🟢 GENERANDO EVENTOS para '%s' unidad %s", self.name, self.unidades_finalizadas_total + 1)
 
         # Usamos el nuevo contador global
         if self.unidades_finalizadas_total >= self.unidades_a_producir:
@@ -329,7 +321,7 @@ class LineaTemporalTarea:
             return []
 
         # --- 2. Crear instancia inicial (si no existe) ---
-        if not self.instancias_activas:
+        if not self.instancias:
             # Si no hay instancias, creamos la primera
             id_instancia = self.iniciar_instancia_inicial(
                 self.trabajadores_asignados,
@@ -337,7 +329,7 @@ class LineaTemporalTarea:
             )
         else:
             # Si ya existe (ej. en un recálculo), usamos la primera
-            id_instancia = self.instancias_activas[0]['id_instancia']
+            id_instancia = next(iter(self.instancias))
 
         # --- 3. Generar SOLO el evento de inicio ---
         # El evento de inicio ahora debe saber a qué instancia pertenece
@@ -355,17 +347,16 @@ class LineaTemporalTarea:
         # Guardamos una referencia para poder cancelarlo después si es necesario
         self.eventos_futuros.append(evento_inicio)
 
-        self.logger.debug(
-            f"📋 Generado evento de inicio para '{self.name}' "
-            f"unidad {unidad_actual} instancia {id_instancia[:8]}"
-        )
+        self.traza('inicio', "📋 Generado evento de inicio para '%s' unidad %s instancia %s",
+                   self.name, unidad_actual, id_instancia)
         return [evento_inicio]
 
     def agregar_trabajador(self, trabajador_id: str, motor_eventos):
         """Añade un trabajador a la tarea y dispara un recálculo."""
         if trabajador_id not in self.trabajadores_asignados:
             self.trabajadores_asignados.append(trabajador_id)
-            self.logger.info(f"Trabajador '{trabajador_id}' añadido a la tarea '{self.name}'. Disparando recálculo.")
+            self.traza('reasignacion', "Trabajador '%s' añadido a la tarea '%s'. Disparando recálculo.",
+                       trabajador_id, self.name)
             # El momento del recálculo es ahora mismo (el tiempo actual del motor)
             ahora = motor_eventos.tiempo_actual
             self.recalcular_eventos_futuros(motor_eventos, ahora)
@@ -376,7 +367,7 @@ class LineaTemporalTarea:
         basados en el estado actual. Este es el núcleo del recálculo dinámico.
         """
         # --- Paso 1: Cancelar eventos futuros ---
-        self.logger.info(f"Recalculando eventos para '{self.name}' debido a un cambio.")
+        self.traza('reasignacion', "Recalculando eventos para '%s' debido a un cambio.", self.name)
 
         eventos_a_cancelar = self.eventos_futuros.copy()
         self.eventos_futuros.clear()  # Limpiamos la lista de referencias
@@ -389,13 +380,13 @@ class LineaTemporalTarea:
 
     def info_instancias(self) -> str:
         """Devuelve string con información de todas las instancias activas."""
-        if not self.instancias_activas:
+        if not self.instancias:
             return "Sin instancias activas"
 
         info = f"Instancias activas en '{self.name}':\n"
-        for inst in self.instancias_activas:
+        for inst in self.instancias.values():
             info += (
-                f"  - {inst['id_instancia'][:8]}: "
+                f"  - {inst['id_instancia']}: "
                 f"Trabajadores={inst['trabajadores']}, "
                 f"Unidad={inst['unidad_actual']}\n"
             )
@@ -0,0 +1,349 @@
+# work_calendar.py
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta, date
+from itertools import accumulate
+from typing import Iterable, List, Optional, Tuple
+
+# Misma tolerancia que el bucle original de add_work_minutes
+TOLERANCIA_MINUTOS = 1e-6
+MICROSEGUNDOS_POR_MINUTO = 60 * 1_000_000
+MICROSEGUNDOS_POR_DIA = 24 * 60 * MICROSEGUNDOS_POR_MINUTO
+
+
+class CalendarioLaboralCompilado:
+    """
+    Calendario laboral precompilado para la aritmética de minutos de trabajo.
+
+    Una jornada se descompone en segmentos de trabajo ininterrumpido
+    ([inicio, descanso1), [fin_descanso1, descanso2), ..., [fin_descansoN, fin)).
+    Con las sumas acumuladas de minutos por segmento y la lista de días laborables
+    del horizonte de planificación, sumar minutos o medir el trabajo entre dos
+    fechas se resuelve con una búsqueda binaria y aritmética entera, en lugar de
+    avanzar segmento a segmento.
+
+    Sólo se compila para configuraciones "bien formadas" (horas en minutos
+    exactos, descansos dentro de la jornada y sin solaparse); en cualquier otro
+    caso CalculadorDeTiempos sigue usando el cálculo iterativo. Los resultados
+    son idénticos a los del cálculo iterativo, incluidos los redondeos.
+
+    Los segmentos se numeran globalmente: g = indice_dia_laborable * n + i.
+
+    Las variantes *_tics trabajan con los tics (microsegundos desde la época) de
+    un RelojSimulacion: los días se identifican por su ordinal y las horas por
+    los microsegundos desde medianoche, sin construir ningún datetime.
+    """
+
+    # Días naturales que se añaden al horizonte cada vez que se queda corto
+    BLOQUE_DIAS = 366
+
+    def __init__(self, inicio_jornada: time, fin_jornada: time,
+                 descansos: List[Tuple[time, time]], festivos: Iterable[date]):
+        self.inicio_jornada = inicio_jornada
+        self.fin_jornada = fin_jornada
+        self.descansos = list(descansos)
+        self.festivos = frozenset(festivos)
+
+        self.inicios_segmento: List[time] = [inicio_jornada] + [fin for _, fin in self.descansos]
+        self.fines_segmento: List[time] = [inicio for inicio, _ in self.descansos] + [fin_jornada]
+        duraciones = [self._minuto_del_dia(fin) - self._minuto_del_dia(inicio)
+                      for inicio, fin in zip(self.inicios_segmento, self.fines_segmento)]
+        # Minutos de trabajo acumulados al final de cada segmento de la jornada
+        self.fin_acumulado: List[int] = list(accumulate(duraciones))
+        self.duraciones_segmento: List[int] = duraciones
+        self.minutos_por_dia: int = self.fin_acumulado[-1]
+        self._n = len(duraciones)
+
+        # Las mismas horas en microsegundos desde medianoche, para las variantes *_tics
+        self._us_inicio_jornada = self._microsegundo_del_dia(inicio_jornada)
+        self._us_fin_jornada = self._microsegundo_del_dia(fin_jornada)
+        self._us_descansos = [(self._microsegundo_del_dia(inicio), self._microsegundo_del_dia(fin))
+                              for inicio, fin in self.descansos]
+        self._us_inicios_segmento = [self._microsegundo_del_dia(hora) for hora in self.inicios_segmento]
+        self._us_fines_segmento = [self._microsegundo_del_dia(hora) for hora in self.fines_segmento]
+        self._festivos_ordinales = frozenset(festivo.toordinal() for festivo in self.festivos)
+
+        # Días laborables (ordinales) en [_ordinal_base, _ordinal_limite)
+        self._dias_laborables: List[int] = []
+        self._ordinal_base: Optional[int] = None
+        self._ordinal_limite: Optional[int] = None
+
+    @classmethod
+    def desde_configuracion(cls, inicio_jornada, fin_jornada, descansos,
+                            festivos) -> Optional['CalendarioLaboralCompilado']:
+        """
+        Compila el calendario si la configuración lo permite; si no, devuelve None.
+
+        Args:
+            inicio_jornada / fin_jornada: WORK_START_TIME / WORK_END_TIME.
+            descansos: Descansos ya parseados y ordenados [(inicio, fin), ...].
+            festivos: HOLIDAYS de la configuración.
+        """
+        try:
+            limites = [inicio_jornada]
+            for inicio, fin in descansos:
+                limites.extend((inicio, fin))
+            limites.append(fin_jornada)
+
+            for limite in limites:
+                if type(limite) is not time or limite.tzinfo is not None:
+                    return None
+                if limite.second or limite.microsecond:
+                    return None
+            # Estrictamente creciente: descansos dentro de la jornada, sin solaparse ni tocarse
+            if any(a >= b for a, b in zip(limites, limites[1:])):
+                return None
+
+            festivos = list(festivos)
+            # 'in' sobre la lista original compara por igualdad; sólo fechas puras son seguras
+            if any(type(festivo) is not date for festivo in festivos):
+                return None
+        except (TypeError, ValueError, AttributeError):
+            return None
+
+        return cls(inicio_jornada, fin_jornada, list(descansos), festivos)
+
+    @staticmethod
+    def _minuto_del_dia(hora: time) -> int:
+        return hora.hour * 60 + hora.minute
+
+    @classmethod
+    def _microsegundo_del_dia(cls, hora: time) -> int:
+        return cls._minuto_del_dia(hora) * MICROSEGUNDOS_POR_MINUTO
+
+    # ------------------------------------------------------------------
+    # Días laborables
+    # ------------------------------------------------------------------
+
+    def es_laborable(self, dia: date) -> bool:
+        return dia.weekday() < 5 and dia not in self.festivos
+
+    def _siguiente_dia_laborable(self, dia: date) -> date:
+        while not self.es_laborable(dia):
+            dia += timedelta(days=1)
+        return dia
+
+    def _es_laborable_ordinal(self, ordinal: int) -> bool:
+        # date.fromordinal(1) es lunes
+        return (ordinal - 1) % 7 < 5 and ordinal not in self._festivos_ordinales
+
+    def _siguiente_ordinal_laborable(self, ordinal: int) -> int:
+        while not self._es_laborable_ordinal(ordinal):
+            ordinal += 1
+        return ordinal
+
+    def _extender_horizonte(self):
+        for ordinal in range(self._ordinal_limite, self._ordinal_limite + self.BLOQUE_DIAS):
+            if self.es_laborable(date.fromordinal(ordinal)):
+                self._dias_laborables.append(ordinal)
+        self._ordinal_limite += self.BLOQUE_DIAS
+
+    def _cubrir_hasta(self, ordinal: int):
+        while self._ordinal_limite <= ordinal:
+            self._extender_horizonte()
+
+    def _indice_dia(self, dia: date) -> int:
+        """
+        Índice en el horizonte del último día laborable <= 'dia'.
+        Si 'dia' es anterior al horizonte, éste se recompila desde 'dia'
+        (sólo debe llamarse así al inicio de cada operación).
+        """
+        return self._indice_dia_ordinal(dia.toordinal())
+
+    def _indice_dia_ordinal(self, ordinal: int) -> int:
+        if self._ordinal_base is None or ordinal < self._ordinal_base:
+            self._ordinal_base = self._ordinal_limite = ordinal
+            self._dias_laborables = []
+        self._cubrir_hasta(ordinal)
+        return bisect_right(self._dias_laborables, ordinal) - 1
+
+    def _ordinal_dia_laborable(self, indice: int) -> int:
+        while len(self._dias_laborables) <= indice:
+            self._extender_horizonte()
+        return self._dias_laborables[indice]
+
+    # ------------------------------------------------------------------
+    # Segmentos globales
+    # ------------------------------------------------------------------
+
+    def _fin_acumulado_global(self, g: int) -> int:
+        """Minutos de trabajo desde el inicio del horizonte hasta el final del segmento g."""
+        dia, i = divmod(g, self._n)
+        return dia * self.minutos_por_dia + self.fin_acumulado[i]
+
+    def _inicio_segmento(self, g: int) -> datetime:
+        dia, i = divmod(g, self._n)
+        return datetime.combine(date.fromordinal(self._ordinal_dia_laborable(dia)), self.inicios_segmento[i])
+
+    def _fin_segmento(self, g: int) -> datetime:
+        dia, i = divmod(g, self._n)
+        return datetime.combine(date.fromordinal(self._ordinal_dia_laborable(dia)), self.fines_segmento[i])
+
+    @staticmethod
+    def _a_tics(reloj, ordinal: int, microsegundo: int) -> int:
+        """Día (ordinal) y microsegundo del día -> tics del reloj."""
+        return (ordinal - reloj.ordinal_epoca) * MICROSEGUNDOS_POR_DIA + microsegundo - reloj.tics_desde_medianoche
+
+    @staticmethod
+    def _desde_tics(reloj, tics: int) -> Tuple[int, int]:
+        """Tics del reloj -> (día (ordinal), microsegundo del día)."""
+        dias, microsegundo = divmod(tics + reloj.tics_desde_medianoche, MICROSEGUNDOS_POR_DIA)
+        return reloj.ordinal_epoca + dias, microsegundo
+
+    def _inicio_segmento_tics(self, reloj, g: int) -> int:
+        dia, i = divmod(g, self._n)
+        return self._a_tics(reloj, self._ordinal_dia_laborable(dia), self._us_inicios_segmento[i])
+
+    def _fin_segmento_tics(self, reloj, g: int) -> int:
+        dia, i = divmod(g, self._n)
+        return self._a_tics(reloj, self._ordinal_dia_laborable(dia), self._us_fines_segmento[i])
+
+    def _segmento_de(self, momento: datetime) -> int:
+        """Segmento global que contiene un momento laborable válido."""
+        indice_dia = self._indice_dia(momento.date())
+        i = bisect_right(self.inicios_segmento, momento.time()) - 1
+        return indice_dia * self._n + i
+
+    def _ultimo_segmento_antes_de(self, momento: datetime) -> int:
+        """Último segmento global cuyo inicio es estrictamente anterior a 'momento'."""
+        ordinal = momento.toordinal()
+        self._cubrir_hasta(ordinal)
+        indice_dia = bisect_right(self._dias_laborables, ordinal) - 1
+        if self._dias_laborables[indice_dia] == ordinal:
+            return indice_dia * self._n + bisect_left(self.inicios_segmento, momento.time()) - 1
+        return indice_dia * self._n + self._n - 1
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+
+    def siguiente_momento_laboral(self, momento: datetime) -> datetime:
+        """Equivalente compilado de CalculadorDeTiempos._move_to_next_valid_work_moment."""
+        dia = self._siguiente_dia_laborable(momento.date())
+        if dia != momento.date():
+            return datetime.combine(dia, self.inicio_jornada)
+
+        hora = momento.time()
+        if hora < self.inicio_jornada:
+            return datetime.combine(dia, self.inicio_jornada)
+        if hora >= self.fin_jornada:
+            siguiente = self._siguiente_dia_laborable(dia + timedelta(days=1))
+            return datetime.combine(siguiente, self.inicio_jornada)
+        for inicio_descanso, fin_descanso in self.descansos:
+            if inicio_descanso <= hora < fin_descanso:
+                return datetime.combine(dia, fin_descanso)
+        return momento
+
+    def siguiente_momento_laboral_tics(self, reloj, tics: int) -> int:
+        """siguiente_momento_laboral sobre los tics de 'reloj'."""
+        ordinal, microsegundo = self._desde_tics(reloj, tics)
+        dia = self._siguiente_ordinal_laborable(ordinal)
+        if dia != ordinal or microsegundo < self._us_inicio_jornada:
+            return self._a_tics(reloj, dia, self._us_inicio_jornada)
+        if microsegundo >= self._us_fin_jornada:
+            return self._a_tics(reloj, self._siguiente_ordinal_laborable(dia + 1), self._us_inicio_jornada)
+        for inicio_descanso, fin_descanso in self._us_descansos:
+            if inicio_descanso <= microsegundo < fin_descanso:
+                return self._a_tics(reloj, dia, fin_descanso)
+        return tics
+
+    def sumar_minutos(self, inicio: datetime, minutos: float) -> datetime:
+        """Equivalente compilado de add_work_minutes (para minutos > 0)."""
+        actual = self.siguiente_momento_laboral(inicio)
+        if not minutos > TOLERANCIA_MINUTOS:
+            return actual
+
+        g0 = self._segmento_de(actual)
+        # El primer segmento (posiblemente parcial) se calcula igual que en el bucle
+        minutos_primer_segmento = (self._fin_segmento(g0) - actual).total_seconds() / 60
+        if minutos_primer_segmento >= minutos:
+            return actual + timedelta(minutes=minutos)
+
+        restante = minutos - minutos_primer_segmento
+        if restante <= TOLERANCIA_MINUTOS:
+            return self._inicio_segmento(g0 + 1)
+
+        # Los segmentos siguientes duran minutos enteros: restarlos de 'restante' es
+        # exacto en coma flotante, así que basta buscar el primero cuya suma
+        # acumulada alcanza ceil(restante).
+        objetivo = self._fin_acumulado_global(g0) + math.ceil(restante)
+        dia, resto = divmod(objetivo, self.minutos_por_dia)
+        if resto == 0:
+            g = dia * self._n - 1
+        else:
+            g = dia * self._n + bisect_left(self.fin_acumulado, resto)
+
+        pendiente = restante - (self._fin_acumulado_global(g - 1) - self._fin_acumulado_global(g0))
+        if pendiente <= TOLERANCIA_MINUTOS:
+            return self._inicio_segmento(g)
+        return self._inicio_segmento(g) + timedelta(minutes=pendiente)
+
+    def sumar_minutos_tics(self, reloj, tics: int, minutos: float) -> int:
+        """
+        sumar_minutos sobre los tics de 'reloj', paso a paso igual que la versión
+        con datetime: a_datetime(sumar_minutos_tics(t)) == sumar_minutos(a_datetime(t)).
+        """
+        actual = self.siguiente_momento_laboral_tics(reloj, tics)
+        if not minutos > TOLERANCIA_MINUTOS:
+            return actual
+
+        ordinal, microsegundo = self._desde_tics(reloj, actual)
+        g0 = self._indice_dia_ordinal(ordinal) * self._n + bisect_right(self._us_inicios_segmento, microsegundo) - 1
+        # Mismas divisiones que timedelta.total_seconds() / 60
+        minutos_primer_segmento = (self._fin_segmento_tics(reloj, g0) - actual) / 1_000_000 / 60
+        if minutos_primer_segmento >= minutos:
+            return actual + reloj.minutos_a_tics(minutos)
+
+        restante = minutos - minutos_primer_segmento
+        if restante <= TOLERANCIA_MINUTOS:
+            return self._inicio_segmento_tics(reloj, g0 + 1)
+
+        objetivo = self._fin_acumulado_global(g0) + math.ceil(restante)
+        dia, resto = divmod(objetivo, self.minutos_por_dia)
+        if resto == 0:
+            g = dia * self._n - 1
+        else:
+            g = dia * self._n + bisect_left(self.fin_acumulado, resto)
+
+        pendiente = restante - (self._fin_acumulado_global(g - 1) - self._fin_acumulado_global(g0))
+        if pendiente <= TOLERANCIA_MINUTOS:
+            return self._inicio_segmento_tics(reloj, g)
+        return self._inicio_segmento_tics(reloj, g) + reloj.minutos_a_tics(pendiente)
+
+    def minutos_entre(self, inicio: datetime, fin: datetime) -> float:
+        """Equivalente compilado de calculate_work_minutes_between (para inicio < fin)."""
+        actual = self.siguiente_momento_laboral(inicio)
+        if actual >= fin:
+            return 0.0
+
+        g0 = self._segmento_de(actual)
+        fin_primer_segmento = self._fin_segmento(g0)
+        total = (min(fin_primer_segmento, fin) - actual).total_seconds() / 60
+        if fin_primer_segmento >= fin:
+            return round(total, 2)
+
+        g_ultimo = self._ultimo_segmento_antes_de(fin)
+        if g_ultimo <= g0:
+            return round(total, 2)
+
+        inicio_ultimo = self._inicio_segmento(g_ultimo)
+        parcial = (min(self._fin_segmento(g_ultimo), fin) - inicio_ultimo).total_seconds() / 60
+        completos = self._fin_acumulado_global(g_ultimo - 1) - self._fin_acumulado_global(g0)
+
+        resultado = total + completos + parcial
+        if self._redondeo_estable(resultado):
+            return round(resultado, 2)
+
+        # Cerca de un empate de redondeo, el orden de las sumas puede cambiar el
+        # último bit: se reproduce la acumulación segmento a segmento del original.
+        for g in range(g0 + 1, g_ultimo):
+            total += self.duraciones_segmento[g % self._n]
+        total += parcial
+        return round(total, 2)
+
+    @staticmethod
+    def _redondeo_estable(valor: float) -> bool:
+        """True si round(valor, 2) no puede cambiar por un error de pocos ulps."""
+        escalado = valor * 100
+        distancia_al_empate = abs(escalado - math.floor(escalado) - 0.5)
+        return distancia_al_empate > 1e-9 + abs(escalado) * 1e-12